@@ -4,6 +4,8 @@ from django.contrib import messages
 from django.http import JsonResponse
 from .models import BusinessGroup, BusinessGroupMember
 from households.models import Household
+from households.search import enrolled_household_ids, search_from_request
+from core.permissions import get_filtered_households
 from core.models import Program
 from datetime import date
 
@@ -242,26 +244,15 @@ def update_member_role(request, pk, member_id):
 
 @login_required
 def get_available_households(request, pk):
-    """AJAX endpoint to get households that can be added to the group"""
+    """AJAX endpoint to search households that can be added to the group"""
     group = get_object_or_404(BusinessGroup, pk=pk)
 
-    # Get households that are not already members of this group
-    existing_member_ids = group.members.values_list('household_id', flat=True)
-    available_households = Household.objects.exclude(id__in=existing_member_ids)
+    # Households in the user's villages that are not already members of this group
+    try:
+        results = search_from_request(
+            request, get_filtered_households(request.user), enrolled_household_ids(business_group=group)
+        )
+    except ValueError as e:
+        return JsonResponse({'households': [], 'error': str(e)}, status=400)
 
-    # Filter by user role and village assignments
-    user = request.user
-    if user.role in ['mentor', 'field_associate']:
-        if hasattr(user, 'profile') and user.profile:
-            assigned_villages = user.profile.assigned_villages.all()
-            available_households = available_households.filter(village__in=assigned_villages)
-
-    households_data = []
-    for household in available_households[:20]:  # Limit to 20 for performance
-        households_data.append({
-            'id': household.id,
-            'name': household.name,
-            'village': household.village.name if household.village else 'No Village'
-        })
-
-    return JsonResponse({'households': households_data})
\ No newline at end of file
+    return JsonResponse(results)
\ No newline at end of file
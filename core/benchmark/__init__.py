@@ -0,0 +1,12 @@
+"""
+Performance Benchmarks for UPG System
+
+dataset.py fills a database with a synthetic programme (counties, villages,
+staff and 10k-200k households with members, PPI, enrollments, milestones,
+savings, loans, grants, visits, calls and form submissions) using bulk
+inserts. runner.py requests every dashboard, report, export and API view as
+each role and records query counts, wall time and peak Python memory, and
+compares a run with a saved baseline.
+
+See the generate_benchmark_data and benchmark_views management commands.
+"""
@@ -0,0 +1,403 @@
+"""
+Synthetic Benchmark Dataset
+
+Builds a county-scale programme for benchmarking: counties, sub-counties and
+villages; staff in every role (mentors assigned to villages, supervised by
+Field Associates); and households in batches, each with members, a PPI
+score, and for most of them a programme enrollment with milestones, savings
+group membership, savings, loans, mentoring visits, phone calls, grant
+applications and form submissions.
+
+Everything is written with bulk_create, one batch of households at a time,
+so memory stays flat however many households are requested. Primary keys are
+read back by id range after each insert (MySQL's bulk_create does not return
+them), which assumes nothing else writes to the database meanwhile. Rows
+that save signals would maintain are rebuilt instead: household stats after
+each batch, form response tallies and indexed submission values at the end.
+
+Staff get unusable passwords; the view benchmark logs them in with
+force_login. Generate into a throwaway database: there is no cleanup beyond
+dropping it.
+"""
+
+from datetime import timedelta
+from decimal import Decimal
+import random
+
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import County, Mentor, Program, SubCounty, Village
+
+USERNAME_PREFIX = 'bench'
+
+HEAD_NAMES = ['Akai', 'Lokiru', 'Nakiru', 'Ekal', 'Ewoi', 'Achuka', 'Lopeyok', 'Nangiro', 'Ekiru', 'Amana',
+              'Wanjiku', 'Otieno', 'Mutua', 'Chebet', 'Kiprop', 'Njeri', 'Wafula', 'Atieno']
+SINGLE_ROLES = ['ict_admin', 'program_manager', 'me_staff', 'county_executive']
+MILESTONES = ['month_1', 'month_2', 'month_3', 'month_4', 'month_5', 'month_6']
+PARTICIPATION = ['enrolled', 'active', 'active', 'active', 'graduated', 'dropped_out']
+GRANT_STATUSES = ['submitted', 'under_review', 'approved', 'rejected', 'disbursed']
+NUDGE_TYPES = ['reminder', 'follow_up', 'support', 'check_in', 'business_advice']
+VISIT_TYPES = ['scheduled', 'follow_up', 'on_site']
+LOAN_STATUSES = ['active', 'partially_repaid', 'fully_repaid', 'defaulted']
+
+# Share of households enrolled in the programme, and per enrolled household
+ENROLLED_SHARE = 0.7
+GRANT_SHARE = 0.15
+SUBMISSION_SHARE = 0.5
+LOAN_SHARE = 0.2
+VISITS_PER_HOUSEHOLD = 3
+CALLS_PER_HOUSEHOLD = 3
+SAVINGS_PER_MEMBER = 3
+SAVINGS_GROUP_SIZE = 25
+TREND_MONTHS = 24
+
+
+def bulk_insert(model, objects, batch_size):
+    """bulk_create objects and return their new primary keys in insertion order"""
+    if not objects:
+        return []
+    last = model.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+    model.objects.bulk_create(objects, batch_size=batch_size)
+    return list(model.objects.filter(pk__gt=last).order_by('pk').values_list('pk', flat=True))
+
+
+class DatasetGenerator:
+    """
+    Writes a synthetic programme. Call generate(); counts of created rows are
+    kept in self.counts.
+    """
+
+    def __init__(self, households=10000, counties=2, subcounties_per_county=3, villages_per_subcounty=10,
+                 villages_per_mentor=3, mentors_per_fa=8, batch_size=2000, seed=1, log=None):
+        self.households = households
+        self.counties = counties
+        self.subcounties_per_county = subcounties_per_county
+        self.villages_per_subcounty = villages_per_subcounty
+        self.villages_per_mentor = villages_per_mentor
+        self.mentors_per_fa = mentors_per_fa
+        self.batch_size = batch_size
+        self.seed = seed
+        self.random = random.Random(seed)
+        self.log = log or (lambda message: None)
+        self.now = timezone.now()
+        self.today = timezone.localdate()
+        self.counts = {}
+
+    def count(self, name, number):
+        self.counts[name] = self.counts.get(name, 0) + number
+
+    def days_ago(self, days):
+        return self.today - timedelta(days=days)
+
+    def recent_datetime(self, max_days=365):
+        return self.now - timedelta(days=self.random.randint(0, max_days), minutes=self.random.randint(0, 720))
+
+    def generate(self):
+        from accounts.models import User
+
+        if User.objects.filter(username__startswith=f'{USERNAME_PREFIX}_{self.seed}_').exists():
+            raise ValueError(f'Benchmark data for seed {self.seed} already exists; use another seed or database')
+
+        with transaction.atomic():
+            self.create_geography()
+            self.create_staff()
+            self.create_programme()
+        self.log(f"{len(self.village_ids)} villages, {self.counts['users']} staff")
+
+        village_cycle = self.village_ids * (self.households // len(self.village_ids) + 1)
+        batches = range(0, self.households, self.batch_size)
+        for number, start in enumerate(batches):
+            size = min(self.batch_size, self.households - start)
+            # Each batch is registered in a later month, oldest first, for enrollment trends
+            month = TREND_MONTHS - 1 - (number * TREND_MONTHS) // len(batches)
+            with transaction.atomic():
+                self.create_batch(village_cycle[start:start + size], months_ago=month)
+            self.log(f'{start + size}/{self.households} households')
+
+        self.rebuild_derived()
+        return self.counts
+
+    # -------------------------------------------------------------------------
+    # Fixed data
+    # -------------------------------------------------------------------------
+
+    def create_geography(self):
+        tag = f'Bench {self.seed}'
+        county_ids = bulk_insert(County, [
+            County(name=f'{tag} County {c + 1}') for c in range(self.counties)
+        ], self.batch_size)
+        subcounty_ids = bulk_insert(SubCounty, [
+            SubCounty(name=f'{tag} Sub-County {c + 1}.{s + 1}', county_id=county_id)
+            for c, county_id in enumerate(county_ids) for s in range(self.subcounties_per_county)
+        ], self.batch_size)
+        self.village_ids = bulk_insert(Village, [
+            Village(name=f'{tag} Village {s + 1}.{v + 1}', subcounty_obj_id=subcounty_id, is_program_area=True)
+            for s, subcounty_id in enumerate(subcounty_ids) for v in range(self.villages_per_subcounty)
+        ], self.batch_size)
+        self.subcounty_of = {
+            village_id: subcounty_ids[index // self.villages_per_subcounty]
+            for index, village_id in enumerate(self.village_ids)
+        }
+        self.count('villages', len(self.village_ids))
+
+    def create_staff(self):
+        from accounts.models import User, UserProfile
+
+        mentors = -(-len(self.village_ids) // self.villages_per_mentor)
+        field_associates = -(-mentors // self.mentors_per_fa)
+        roles = SINGLE_ROLES + ['field_associate'] * field_associates + ['mentor'] * mentors
+
+        users = []
+        for index, role in enumerate(roles):
+            username = f'{USERNAME_PREFIX}_{self.seed}_{role}_{index}'
+            user = User(
+                username=username, email=f'{username}@benchmark.invalid', role=role,
+                first_name=self.random.choice(HEAD_NAMES), last_name=role.replace('_', ' ').title(),
+            )
+            user.set_unusable_password()
+            users.append(user)
+        user_ids = bulk_insert(User, users, self.batch_size)
+        self.staff = dict(zip(user_ids, roles))
+        self.fa_ids = [pk for pk, role in self.staff.items() if role == 'field_associate']
+        self.mentor_ids = [pk for pk, role in self.staff.items() if role == 'mentor']
+        self.admin_id = next(pk for pk, role in self.staff.items() if role == 'ict_admin')
+
+        # bulk_create skips the signal that creates profiles
+        supervisors = {mentor_id: self.fa_ids[i // self.mentors_per_fa] for i, mentor_id in enumerate(self.mentor_ids)}
+        profile_ids = bulk_insert(UserProfile, [
+            UserProfile(user_id=pk, supervisor_id=supervisors.get(pk)) for pk in user_ids
+        ], self.batch_size)
+        profile_of = dict(zip(user_ids, profile_ids))
+
+        self.mentor_of_village = {}
+        through = UserProfile.assigned_villages.through
+        links = []
+        for index, village_id in enumerate(self.village_ids):
+            mentor_id = self.mentor_ids[index // self.villages_per_mentor]
+            self.mentor_of_village[village_id] = mentor_id
+            links.append(through(userprofile_id=profile_of[mentor_id], village_id=village_id))
+        through.objects.bulk_create(links, batch_size=self.batch_size)
+
+        # Programme enrollments name the mentor through core.Mentor
+        mentor_record_ids = bulk_insert(Mentor, [
+            Mentor(user_id=pk, first_name=user.first_name, last_name=user.last_name, office='Benchmark')
+            for user, pk in zip(users, user_ids) if self.staff[pk] == 'mentor'
+        ], self.batch_size)
+        self.mentor_record_of = dict(zip(self.mentor_ids, mentor_record_ids))
+        self.count('users', len(user_ids))
+
+    def create_programme(self):
+        from forms.models import FormTemplate
+
+        self.program = Program.objects.create(
+            name=f'Bench {self.seed} Graduation Programme', cycle='2025', office='Benchmark', status='active',
+            start_date=self.days_ago(TREND_MONTHS * 31), end_date=self.days_ago(-365),
+            target_households=self.households, target_villages=len(self.village_ids),
+        )
+        self.form_template = FormTemplate.objects.create(
+            name=f'Bench {self.seed} Household Survey', form_type='household_survey', status='active',
+            created_by_id=self.admin_id, sync_to_kobo=False,
+            form_fields=[{'name': 'water_source', 'type': 'select'}, {'name': 'meals_per_day', 'type': 'number'}],
+        )
+
+    # -------------------------------------------------------------------------
+    # Households and their activity
+    # -------------------------------------------------------------------------
+
+    def create_batch(self, village_ids, months_ago):
+        from households.models import Household, HouseholdMember, PPI
+        from households.search import build_search_document
+
+        households = []
+        for village_id in village_ids:
+            serial = self.counts.get('households', 0) + len(households) + 1
+            first, last = self.random.choice(HEAD_NAMES), self.random.choice(HEAD_NAMES)
+            household = Household(
+                village_id=village_id, subcounty_id=self.subcounty_of[village_id],
+                name=f'{first} {last} Household {serial}',
+                head_first_name=first, head_last_name=last,
+                head_gender=self.random.choice(['male', 'female']),
+                national_id=f'B{self.seed}{serial:08d}', head_id_number=f'B{self.seed}{serial:08d}',
+                phone_number=f'07{self.random.randint(10000000, 99999999)}',
+                monthly_income=Decimal(self.random.randint(500, 15000)),
+                consent_given=True,
+            )
+            household.search_document = build_search_document(household)
+            households.append(household)
+        household_ids = bulk_insert(Household, households, self.batch_size)
+        Household.objects.filter(pk__in=household_ids).update(
+            created_at=self.now - timedelta(days=months_ago * 30 + 1)
+        )
+        self.count('households', len(household_ids))
+
+        members, ppis = [], []
+        for household_id in household_ids:
+            size = self.random.randint(2, 7)
+            for index in range(size):
+                relationship = 'head' if index == 0 else 'spouse' if index == 1 else 'child'
+                age = self.random.randint(25, 70) if index < 2 else self.random.randint(0, 20)
+                members.append(HouseholdMember(
+                    household_id=household_id, name=f'Member {index + 1}', age=age,
+                    gender=self.random.choice(['male', 'female']), relationship_to_head=relationship,
+                ))
+            ppis.append(PPI(
+                household_id=household_id, name='Baseline PPI', eligibility_score=self.random.randint(5, 95),
+                assessment_date=self.days_ago(self.random.randint(0, 365)),
+            ))
+        HouseholdMember.objects.bulk_create(members, batch_size=self.batch_size)
+        PPI.objects.bulk_create(ppis, batch_size=self.batch_size)
+        self.count('members', len(members))
+        self.count('ppi', len(ppis))
+
+        enrolled = [(hh_id, village_id) for hh_id, village_id in zip(household_ids, village_ids)
+                    if self.random.random() < ENROLLED_SHARE]
+        self.create_enrollments(enrolled)
+        self.create_savings(enrolled)
+        self.create_activity(enrolled)
+        self.create_grants(enrolled)
+        self.create_submissions(household_ids)
+
+        from households.stats import refresh_household_stats
+        refresh_household_stats(household_ids)
+
+    def create_enrollments(self, enrolled):
+        from households.models import HouseholdProgram, UPGMilestone
+
+        programs = []
+        for household_id, village_id in enrolled:
+            status = self.random.choice(PARTICIPATION)
+            programs.append(HouseholdProgram(
+                household_id=household_id, program=self.program,
+                mentor_id=self.mentor_record_of[self.mentor_of_village[village_id]],
+                participation_status=status, enrollment_date=self.days_ago(self.random.randint(30, 540)),
+                graduation_date=self.days_ago(self.random.randint(0, 30)) if status == 'graduated' else None,
+            ))
+        program_ids = bulk_insert(HouseholdProgram, programs, self.batch_size)
+
+        milestones = []
+        for household_program_id in program_ids:
+            done = self.random.randint(0, len(MILESTONES))
+            for index, milestone in enumerate(MILESTONES):
+                milestones.append(UPGMilestone(
+                    household_program_id=household_program_id, milestone=milestone,
+                    status='completed' if index < done else 'in_progress' if index == done else 'not_started',
+                    target_date=self.days_ago(180 - index * 30),
+                    completion_date=self.days_ago(180 - index * 30) if index < done else None,
+                ))
+        UPGMilestone.objects.bulk_create(milestones, batch_size=self.batch_size)
+        self.count('enrollments', len(program_ids))
+        self.count('milestones', len(milestones))
+
+    def create_savings(self, enrolled):
+        from savings_groups.models import BSGLoan, BSGMember, BusinessSavingsGroup, SavingsRecord
+
+        chunks = [enrolled[i:i + SAVINGS_GROUP_SIZE] for i in range(0, len(enrolled), SAVINGS_GROUP_SIZE)]
+        group_ids = bulk_insert(BusinessSavingsGroup, [
+            BusinessSavingsGroup(
+                name=f'Bench {self.seed} Savings Group {self.counts.get("savings_groups", 0) + i + 1}',
+                formation_date=self.days_ago(self.random.randint(60, 500)), members_count=len(chunk),
+            )
+            for i, chunk in enumerate(chunks)
+        ], self.batch_size)
+        self.count('savings_groups', len(group_ids))
+
+        members = [
+            BSGMember(bsg_id=group_id, household_id=household_id, role='chairperson' if index == 0 else 'member',
+                      joined_date=self.days_ago(self.random.randint(30, 400)))
+            for group_id, chunk in zip(group_ids, chunks)
+            for index, (household_id, _) in enumerate(chunk)
+        ]
+        member_ids = bulk_insert(BSGMember, members, self.batch_size)
+        self.count('savings_members', len(member_ids))
+
+        records, loans = [], []
+        for member, member_id in zip(members, member_ids):
+            for _ in range(SAVINGS_PER_MEMBER):
+                records.append(SavingsRecord(
+                    bsg_id=member.bsg_id, member_id=member_id, amount=Decimal(self.random.randint(50, 1000)),
+                    savings_date=self.days_ago(self.random.randint(0, 365)),
+                ))
+            if self.random.random() < LOAN_SHARE:
+                amount = Decimal(self.random.randint(10, 200) * 100)
+                total_due = amount * Decimal('1.10')
+                repaid = (total_due * Decimal(self.random.randint(0, 100)) / 100).quantize(Decimal('0.01'))
+                loan_date = self.days_ago(self.random.randint(30, 300))
+                loans.append(BSGLoan(
+                    bsg_id=member.bsg_id, member_id=member_id, loan_amount=amount, total_due=total_due,
+                    amount_repaid=repaid, balance=total_due - repaid, loan_date=loan_date,
+                    due_date=loan_date + timedelta(days=90), status=self.random.choice(LOAN_STATUSES),
+                ))
+        SavingsRecord.objects.bulk_create(records, batch_size=self.batch_size)
+        BSGLoan.objects.bulk_create(loans, batch_size=self.batch_size)
+        self.count('savings_records', len(records))
+        self.count('loans', len(loans))
+
+    def create_activity(self, enrolled):
+        from training.models import MentoringVisit, PhoneNudge
+
+        visits, calls = [], []
+        for household_id, village_id in enrolled:
+            mentor_id = self.mentor_of_village[village_id]
+            for _ in range(VISITS_PER_HOUSEHOLD):
+                visits.append(MentoringVisit(
+                    name='Home visit', household_id=household_id, mentor_id=mentor_id, topic='Business progress',
+                    visit_type=self.random.choice(VISIT_TYPES), visit_date=self.recent_datetime(),
+                    duration_minutes=self.random.randint(15, 90), completed=True,
+                ))
+            for _ in range(CALLS_PER_HOUSEHOLD):
+                calls.append(PhoneNudge(
+                    household_id=household_id, mentor_id=mentor_id, nudge_type=self.random.choice(NUDGE_TYPES),
+                    call_date=self.recent_datetime(), duration_minutes=self.random.randint(2, 20),
+                    successful_contact=self.random.random() < 0.8,
+                ))
+        MentoringVisit.objects.bulk_create(visits, batch_size=self.batch_size)
+        PhoneNudge.objects.bulk_create(calls, batch_size=self.batch_size)
+        self.count('visits', len(visits))
+        self.count('calls', len(calls))
+
+    def create_grants(self, enrolled):
+        from upg_grants.models import HouseholdGrantApplication
+
+        applications = []
+        for household_id, village_id in enrolled:
+            if self.random.random() >= GRANT_SHARE:
+                continue
+            status = self.random.choice(GRANT_STATUSES)
+            requested = Decimal(self.random.randint(50, 300) * 100)
+            applications.append(HouseholdGrantApplication(
+                household_id=household_id, submitted_by_id=self.mentor_of_village[village_id],
+                grant_type=self.random.choice(['seed_business', 'performance_recognition']),
+                requested_amount=requested, title='Business grant', purpose='Grow the household business',
+                expected_outcomes='Higher monthly income', status=status,
+                submission_date=self.recent_datetime(),
+                approved_amount=requested if status in ('approved', 'disbursed') else None,
+                disbursed_amount=requested if status == 'disbursed' else 0,
+            ))
+        HouseholdGrantApplication.objects.bulk_create(applications, batch_size=self.batch_size)
+        self.count('grant_applications', len(applications))
+
+    def create_submissions(self, household_ids):
+        from forms.models import FormSubmission
+
+        submissions = [
+            FormSubmission(
+                form_template=self.form_template, submitted_by_id=self.random.choice(self.mentor_ids),
+                household_id=household_id, submission_date=self.recent_datetime(), status='submitted',
+                form_data={
+                    'water_source': self.random.choice(['borehole', 'river', 'tap']),
+                    'meals_per_day': self.random.randint(1, 3),
+                },
+            )
+            for household_id in household_ids if self.random.random() < SUBMISSION_SHARE
+        ]
+        FormSubmission.objects.bulk_create(submissions, batch_size=self.batch_size)
+        self.count('submissions', len(submissions))
+
+    def rebuild_derived(self):
+        """Rows that save signals maintain and bulk_create skipped"""
+        from forms.response_tallies import rebuild_tallies
+        from forms.submission_values import backfill_values
+
+        rebuild_tallies(self.form_template)
+        backfill_values(self.form_template)
@@ -0,0 +1,312 @@
+"""
+View Benchmark Runner
+
+Requests each dashboard, widget, list, report, export and API view as a user
+of each role with the Django test client, and records per (view, role):
+the response status, SQL query count, median wall time over several runs,
+peak Python memory (tracemalloc) and response size. Streaming responses are
+read to the end, so exports are timed in full.
+
+Timed runs and the measured run are separate: tracemalloc slows Python code
+several times over, so it only wraps the one run that counts queries and
+memory. Views run against a private in-memory cache that is cleared before
+every run unless warm=True, so cached widgets report their real cost without
+the live cache other processes use ever being cleared.
+
+compare_results() checks a run against a saved baseline and lists the views
+that became slower, made more queries, used more memory or started failing.
+"""
+
+from statistics import median
+from time import perf_counter
+import tracemalloc
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+# Staff roles requested by default; 'api' uses a VE reporting API key instead of a login
+STAFF_ROLES = ['ict_admin', 'program_manager', 'me_staff', 'county_executive', 'field_associate', 'mentor']
+API_ROLE = 'api'
+
+DEFAULT_REPEAT = 3
+
+# Replaces the default cache while views are benchmarked
+BENCHMARK_CACHE = {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    'LOCATION': 'upg-benchmark',
+}
+
+# Regression thresholds for compare_results
+DEFAULT_MAX_SLOWDOWN = 0.25
+DEFAULT_MIN_SLOWDOWN_MS = 20
+DEFAULT_MAX_EXTRA_QUERIES = 0
+DEFAULT_MAX_MEMORY_GROWTH = 0.5
+# Smaller differences are noise (template caches, lazily imported modules)
+MIN_MEMORY_GROWTH_KB = 256
+
+
+class BenchmarkView:
+    """One URL to benchmark. `roles` limits it to some roles (default: all staff roles)."""
+
+    def __init__(self, name, kind, params=None, roles=None, args=()):
+        self.name = name
+        self.kind = kind
+        self.params = params or {}
+        self.roles = roles
+        self.args = args
+
+    def applies_to(self, role, user=None):
+        if self.roles is not None:
+            return role in self.roles
+        return role != API_ROLE
+
+    @property
+    def url(self):
+        return reverse(self.name, args=self.args)
+
+
+class WidgetView(BenchmarkView):
+    """A dashboard widget, requested only by roles whose dashboard shows it"""
+
+    def __init__(self, widget):
+        super().__init__('dashboard:widget', 'widget', args=(widget.name,))
+        self.widget = widget
+
+    def applies_to(self, role, user=None):
+        from dashboard.widgets import dashboard_role
+        return user is not None and dashboard_role(user) in self.widget.roles
+
+    @property
+    def label(self):
+        return f'dashboard:widget:{self.widget.name}'
+
+
+DASHBOARDS = [
+    'dashboard:dashboard', 'dashboard:activity_logs', 'households:graduation_dashboard',
+    'households:eligibility_dashboard', 'training:mentoring_dashboard', 'training:mentoring_analytics',
+    'reports:performance_dashboard', 'reports:mentoring_activities_dashboard', 'grants:grants_dashboard',
+    'enrollment:dashboard', 'forms:dashboard',
+]
+LISTS = [
+    'households:household_list', 'business_groups:group_list', 'savings_groups:savings_list',
+    'savings_groups:all_active_loans', 'training:training_list', 'training:visit_list',
+    'training:phone_nudge_list', 'upg_grants:application_list', 'upg_grants:pending_reviews',
+    'enrollment:application_list', 'programs:program_list',
+]
+REPORTS = [
+    'reports:report_list', 'reports:comparative_report', 'households:graduation_reports',
+    'households:batch_eligibility_report', 'training:mentoring_reports',
+]
+EXPORTS = [
+    'households:export_graduation_reports', 'training:export_mentoring_reports',
+    'reports:download_household_report', 'reports:download_ppi_report',
+    'reports:download_program_participation_report', 'reports:download_business_groups_report',
+    'reports:download_savings_groups_report', 'reports:download_grants_report', 'reports:download_training_report',
+    'reports:download_mentoring_report', 'reports:download_geographic_report',
+    'reports:download_households_excel', 'reports:download_business_groups_excel',
+    'reports:download_savings_groups_excel', 'reports:download_grants_excel', 'reports:download_training_excel',
+    'reports:download_comprehensive_excel', 'reports:download_mentoring_pdf_report',
+    'reports:download_comprehensive_pdf_report', 'reports:download_household_pdf_report',
+    'reports:download_business_groups_pdf_report', 'reports:download_savings_groups_pdf_report',
+    'reports:download_grants_pdf_report', 'reports:download_training_pdf_report',
+    'reports:download_geographic_pdf_report', 'reports:download_custom_report',
+    'reports:download_comparative_report', 'core:kobo_export_households', 'core:kobo_export_villages',
+    'core:kobo_export_mentors', 'core:kobo_export_business_groups', 'core:kobo_export_bm_cycles',
+]
+APIS = ['forms:forms_stats_api', 'core:api_mentors', 'core:api_bm_cycles', 'programs:notification_count']
+VE_REPORTING_APIS = [
+    've_reporting:health', 've_reporting:metadata', 've_reporting:summary', 've_reporting:enrollment',
+    've_reporting:beneficiaries', 've_reporting:graduation', 've_reporting:savings', 've_reporting:training',
+    've_reporting:disbursements', 've_reporting:milestones',
+]
+
+
+def benchmark_views():
+    """Every benchmarked view, in report order"""
+    from dashboard.widgets import WIDGETS
+
+    views = [BenchmarkView(name, 'dashboard') for name in DASHBOARDS]
+    views += [WidgetView(widget) for widget in WIDGETS.values()]
+    views += [BenchmarkView(name, 'list') for name in LISTS]
+    views += [BenchmarkView(name, 'report') for name in REPORTS]
+    views += [
+        BenchmarkView('dashboard:export_activity_logs', 'export', {'period': '12'}),
+    ] + [BenchmarkView(name, 'export') for name in EXPORTS]
+    views += [
+        BenchmarkView('households:household_search_api', 'api', {'q': 'a'}),
+    ] + [BenchmarkView(name, 'api') for name in APIS]
+    views += [BenchmarkView(name, 'api', roles=[API_ROLE]) for name in VE_REPORTING_APIS]
+    views += [BenchmarkView('ve_reporting:timeseries', 'api', {'metric': 'enrollment'}, roles=[API_ROLE])]
+    return views
+
+
+def request_host():
+    """A host ALLOWED_HOSTS accepts (the test client's 'testserver' usually is not)"""
+    for host in settings.ALLOWED_HOSTS:
+        if host and host != '*' and not host.startswith('.'):
+            return host
+    return 'localhost'
+
+
+def view_label(view):
+    return getattr(view, 'label', view.name)
+
+
+def benchmark_users(roles):
+    """
+    A user per staff role, preferring the generated benchmark staff; for
+    mentors and Field Associates one with villages or mentors to look after.
+    """
+    from accounts.models import User
+    from core.benchmark.dataset import USERNAME_PREFIX
+
+    users = {}
+    for role in roles:
+        if role == API_ROLE:
+            continue
+        candidates = User.objects.filter(role=role, is_active=True).order_by('id')
+        if role == 'mentor':
+            candidates = candidates.filter(profile__assigned_villages__isnull=False).distinct()
+        elif role == 'field_associate':
+            candidates = candidates.filter(supervised_profiles__isnull=False).distinct()
+        user = candidates.filter(username__startswith=f'{USERNAME_PREFIX}_').first() or candidates.first()
+        if user:
+            users[role] = user
+    return users
+
+
+class ViewRunner:
+    """Runs benchmark views for a set of roles; see measure() for the recorded fields"""
+
+    def __init__(self, repeat=DEFAULT_REPEAT, warm=False, log=None):
+        self.repeat = max(1, repeat)
+        self.warm = warm
+        self.log = log or (lambda message: None)
+
+    def run(self, views, roles):
+        users = benchmark_users(roles)
+        for role in roles:
+            if role != API_ROLE and role not in users:
+                self.log(f'No active {role} user; skipped')
+
+        api_key = self.create_api_key() if API_ROLE in roles else None
+        try:
+            with override_settings(CACHES=dict(settings.CACHES, default=BENCHMARK_CACHE)):
+                return self.run_roles(views, roles, users, api_key)
+        finally:
+            if api_key:
+                api_key[1].delete()
+
+    def run_roles(self, views, roles, users, api_key):
+        results = []
+        for role in roles:
+            client = Client(raise_request_exception=False, HTTP_HOST=request_host())
+            headers = {}
+            if role == API_ROLE:
+                headers['HTTP_X_VE_API_KEY'] = api_key[0]
+            elif role in users:
+                client.force_login(users[role])
+            else:
+                continue
+            for view in views:
+                if view.applies_to(role, users.get(role)):
+                    result = self.measure(client, view, headers)
+                    result['role'] = role
+                    results.append(result)
+                    self.log(format_result(result))
+        return results
+
+    def create_api_key(self):
+        from ve_reporting.models import VEApiKey
+
+        full_key, key_hash, key_prefix = VEApiKey.generate_key()
+        record = VEApiKey.objects.create(
+            name='Benchmark run', key_hash=key_hash, key_prefix=key_prefix[:12], scopes=['ve-reporting:read'],
+            rate_limit_per_minute=1000000,
+        )
+        return full_key, record
+
+    def request(self, client, view, headers):
+        if not self.warm:
+            cache.clear()
+        response = client.get(view.url, view.params, **headers)
+        if response.streaming:
+            size = sum(len(chunk) for chunk in response.streaming_content)
+        else:
+            size = len(response.content)
+        return response.status_code, size
+
+    def measure(self, client, view, headers):
+        """
+        Returns:
+            dict: {'view', 'kind', 'status', 'queries', 'time_ms', 'peak_kb', 'bytes'}
+        """
+        timings = []
+        for _ in range(self.repeat):
+            start = perf_counter()
+            self.request(client, view, headers)
+            timings.append((perf_counter() - start) * 1000)
+
+        tracemalloc.start()
+        try:
+            with CaptureQueriesContext(connection) as queries:
+                status, size = self.request(client, view, headers)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        return {
+            'view': view_label(view),
+            'kind': view.kind,
+            'status': status,
+            'queries': len(queries),
+            'time_ms': round(median(timings), 1),
+            'peak_kb': round(peak / 1024),
+            'bytes': size,
+        }
+
+
+def format_result(result):
+    return (
+        f"{result['view']:<50} {result['role']:<17} {result['status']:>3} "
+        f"{result['queries']:>6} q {result['time_ms']:>9.1f} ms {result['peak_kb']:>8} KB"
+    )
+
+
+def compare_results(baseline, current, max_slowdown=DEFAULT_MAX_SLOWDOWN, min_slowdown_ms=DEFAULT_MIN_SLOWDOWN_MS,
+                    max_extra_queries=DEFAULT_MAX_EXTRA_QUERIES, max_memory_growth=DEFAULT_MAX_MEMORY_GROWTH):
+    """
+    Regressions of current results against baseline results, matched on
+    (view, role). A view regresses when it now fails (5xx) where it did not,
+    makes more than max_extra_queries extra queries, is more than
+    max_slowdown (a fraction) slower and at least min_slowdown_ms slower, or
+    peaks more than max_memory_growth (a fraction) and MIN_MEMORY_GROWTH_KB
+    higher.
+
+    Returns:
+        list of str: one description per regression
+    """
+    previous = {(result['view'], result['role']): result for result in baseline}
+    regressions = []
+    for result in current:
+        before = previous.get((result['view'], result['role']))
+        if before is None:
+            continue
+        label = f"{result['view']} as {result['role']}"
+
+        if result['status'] >= 500 and before['status'] < 500:
+            regressions.append(f"{label}: now fails with {result['status']} (was {before['status']})")
+            continue
+        if result['queries'] > before['queries'] + max_extra_queries:
+            regressions.append(f"{label}: {result['queries']} queries (was {before['queries']})")
+        slower_ms = result['time_ms'] - before['time_ms']
+        if slower_ms >= min_slowdown_ms and result['time_ms'] > before['time_ms'] * (1 + max_slowdown):
+            regressions.append(f"{label}: {result['time_ms']} ms (was {before['time_ms']} ms)")
+        grown_kb = result['peak_kb'] - before['peak_kb']
+        if grown_kb >= MIN_MEMORY_GROWTH_KB and result['peak_kb'] > before['peak_kb'] * (1 + max_memory_growth):
+            regressions.append(f"{label}: peak {result['peak_kb']} KB (was {before['peak_kb']} KB)")
+    return regressions
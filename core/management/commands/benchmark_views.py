@@ -0,0 +1,101 @@
+"""
+Management command to benchmark dashboard, report, export and API views.
+
+Requests every view (core.benchmark.runner) as a user of each role and
+reports status, query count, median wall time and peak memory. Save a run
+with --output, and check a later run against it with --baseline: the command
+fails when any view regresses beyond the thresholds, so it can gate a
+deployment or CI job.
+
+Usage:
+    python manage.py generate_benchmark_data --households 50000
+    python manage.py benchmark_views --output baseline.json
+    python manage.py benchmark_views --baseline baseline.json --output current.json
+    python manage.py benchmark_views --roles mentor field_associate --kind dashboard widget
+"""
+
+from datetime import datetime
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.benchmark.runner import (
+    API_ROLE, DEFAULT_MAX_EXTRA_QUERIES, DEFAULT_MAX_MEMORY_GROWTH, DEFAULT_MAX_SLOWDOWN, DEFAULT_MIN_SLOWDOWN_MS,
+    DEFAULT_REPEAT, STAFF_ROLES, ViewRunner, benchmark_views, compare_results, view_label,
+)
+from households.models import Household
+
+KINDS = ['dashboard', 'widget', 'list', 'report', 'export', 'api']
+
+
+class Command(BaseCommand):
+    help = 'Measure query counts, latency and memory of views per role, optionally against a baseline'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--roles', nargs='+', default=STAFF_ROLES + [API_ROLE],
+                            choices=STAFF_ROLES + [API_ROLE], help='Roles to run as')
+        parser.add_argument('--kind', nargs='+', choices=KINDS, help='Only these kinds of view')
+        parser.add_argument('--view', action='append', default=[],
+                            help='Only views whose name contains this text (repeatable)')
+        parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help='Timed runs per view')
+        parser.add_argument('--warm', action='store_true', help='Keep the cache between runs')
+        parser.add_argument('--output', metavar='FILE', help='Save results as JSON')
+        parser.add_argument('--baseline', metavar='FILE', help='Fail on regressions against these saved results')
+        parser.add_argument('--max-slowdown', type=float, default=DEFAULT_MAX_SLOWDOWN,
+                            help='Allowed slowdown as a fraction (0.25 = 25%%)')
+        parser.add_argument('--min-slowdown-ms', type=float, default=DEFAULT_MIN_SLOWDOWN_MS,
+                            help='Ignore slowdowns smaller than this')
+        parser.add_argument('--max-extra-queries', type=int, default=DEFAULT_MAX_EXTRA_QUERIES)
+        parser.add_argument('--max-memory-growth', type=float, default=DEFAULT_MAX_MEMORY_GROWTH,
+                            help='Allowed peak memory growth as a fraction')
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['baseline']:
+            try:
+                with open(options['baseline'], encoding='utf-8') as f:
+                    baseline = json.load(f)['results']
+            except (OSError, ValueError, KeyError) as e:
+                raise CommandError(f"Cannot read baseline {options['baseline']}: {e}")
+
+        views = [
+            view for view in benchmark_views()
+            if (not options['kind'] or view.kind in options['kind'])
+            and (not options['view'] or any(text in view_label(view) for text in options['view']))
+        ]
+        if not views:
+            raise CommandError('No views match the filters')
+
+        runner = ViewRunner(repeat=options['repeat'], warm=options['warm'], log=self.stdout.write)
+        results = runner.run(views, options['roles'])
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump({
+                    'created': datetime.now().isoformat(timespec='seconds'),
+                    'households': Household.objects.count(),
+                    'repeat': options['repeat'],
+                    'warm': options['warm'],
+                    'results': results,
+                }, f, indent=2)
+            self.stdout.write(f"Saved {len(results)} results to {options['output']}")
+
+        failures = [result for result in results if result['status'] >= 500]
+        for result in failures:
+            self.stdout.write(self.style.WARNING(f"{result['view']} as {result['role']} returned {result['status']}"))
+
+        if baseline is None:
+            return
+
+        regressions = compare_results(
+            baseline, results,
+            max_slowdown=options['max_slowdown'],
+            min_slowdown_ms=options['min_slowdown_ms'],
+            max_extra_queries=options['max_extra_queries'],
+            max_memory_growth=options['max_memory_growth'],
+        )
+        if regressions:
+            for regression in regressions:
+                self.stdout.write(self.style.ERROR(regression))
+            raise CommandError(f'{len(regressions)} regression(s) against {options["baseline"]}')
+        self.stdout.write(self.style.SUCCESS(f'No regressions against {options["baseline"]}'))
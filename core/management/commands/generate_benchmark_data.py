@@ -0,0 +1,71 @@
+"""
+Management command to fill a database with a synthetic benchmark programme.
+
+Creates counties, sub-counties, villages, staff in every role and N
+households with members, PPI, enrollments, milestones, savings groups,
+savings, loans, visits, calls, grant applications and form submissions,
+using bulk inserts (see core.benchmark.dataset). Staff get unusable
+passwords. Run it against a throwaway database: it refuses to run unless
+DEBUG is on or --i-know-this-is-not-production is passed.
+
+Usage:
+    python manage.py generate_benchmark_data --households 10000
+    python manage.py generate_benchmark_data --households 200000 --counties 4 --villages-per-subcounty 25
+    python manage.py generate_benchmark_data --households 50000 --i-know-this-is-not-production
+"""
+
+from time import perf_counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.benchmark.dataset import DatasetGenerator
+
+
+class Command(BaseCommand):
+    help = 'Generate a synthetic county-scale dataset for benchmarking views'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--households', type=int, default=10000, help='Households to create')
+        parser.add_argument('--counties', type=int, default=2, help='Counties to create')
+        parser.add_argument('--subcounties-per-county', type=int, default=3)
+        parser.add_argument('--villages-per-subcounty', type=int, default=10)
+        parser.add_argument('--villages-per-mentor', type=int, default=3)
+        parser.add_argument('--mentors-per-fa', type=int, default=8, help='Mentors supervised by each Field Associate')
+        parser.add_argument('--batch-size', type=int, default=2000, help='Households per insert batch')
+        parser.add_argument('--seed', type=int, default=1, help='Random seed; also tags the generated names')
+        parser.add_argument('--i-know-this-is-not-production', action='store_true', dest='not_production',
+                            help='Run with DEBUG off (the database must still be a throwaway one)')
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG and not options['not_production']:
+            raise CommandError(
+                'Refusing to generate benchmark data with DEBUG off. '
+                'Pass --i-know-this-is-not-production if this database is a throwaway one.'
+            )
+
+        for option in ('households', 'counties', 'subcounties_per_county', 'villages_per_subcounty',
+                       'villages_per_mentor', 'mentors_per_fa', 'batch_size'):
+            if options[option] < 1:
+                raise CommandError(f"--{option.replace('_', '-')} must be at least 1")
+
+        generator = DatasetGenerator(
+            households=options['households'],
+            counties=options['counties'],
+            subcounties_per_county=options['subcounties_per_county'],
+            villages_per_subcounty=options['villages_per_subcounty'],
+            villages_per_mentor=options['villages_per_mentor'],
+            mentors_per_fa=options['mentors_per_fa'],
+            batch_size=options['batch_size'],
+            seed=options['seed'],
+            log=self.stdout.write,
+        )
+        start = perf_counter()
+        try:
+            counts = generator.generate()
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        for name, count in counts.items():
+            self.stdout.write(f'{name:<20} {count:>10}')
+        self.stdout.write(self.style.SUCCESS(f'Benchmark data generated in {perf_counter() - start:.1f} s'))
@@ -0,0 +1,89 @@
+"""
+Management command to send scheduled SMS from the outbox.
+
+Sends every due SMSOutbox message at SMS_OUTBOX_RATE messages per second
+(or --rate), batching recipients per provider, then prints delivery stats
+for each campaign it touched. Run it from cron, or with --loop as a
+long-lived worker.
+
+Usage:
+    python manage.py process_sms_outbox                        # Send what is due and exit
+    python manage.py process_sms_outbox --loan-alerts 3        # Queue loans due in 3 days first
+    python manage.py process_sms_outbox --training-reminders 1 # Queue reminders for tomorrow's trainings
+    python manage.py process_sms_outbox --mentoring-nudges 14  # Nudge households last visited 14 days ago
+    python manage.py process_sms_outbox --loop --interval 30   # Keep polling every 30 seconds
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.models import SMSCampaign
+from core.services.sms_outbox import (
+    DEFAULT_BATCH_SIZE, drain_outbox, enqueue_loan_due_alerts, enqueue_overdue_mentoring_nudges,
+    enqueue_upcoming_training_reminders, get_outbox_rate,
+)
+
+
+class Command(BaseCommand):
+    help = 'Send due SMS from the outbox at a throttled rate'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rate', type=float, help='Messages per second (defaults to SMS_OUTBOX_RATE)')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='Messages claimed per batch')
+        parser.add_argument('--limit', type=int, help='Stop after this many messages')
+        parser.add_argument('--loan-alerts', type=int, metavar='DAYS', help='Queue alerts for BSG loans due within DAYS first')
+        parser.add_argument(
+            '--training-reminders', type=int, metavar='DAYS',
+            help='Queue reminders for trainings starting in DAYS days first',
+        )
+        parser.add_argument(
+            '--mentoring-nudges', type=int, metavar='DAYS',
+            help='Queue nudges for households whose last mentor visit was DAYS days ago first',
+        )
+        parser.add_argument('--loop', action='store_true', help='Keep polling for due messages')
+        parser.add_argument('--interval', type=int, default=60, help='Seconds between polls with --loop')
+
+    def handle(self, *args, **options):
+        rate = options['rate'] or get_outbox_rate()
+
+        if options['loan_alerts'] is not None:
+            campaign = enqueue_loan_due_alerts(days_before=options['loan_alerts'])
+            if campaign:
+                self.stdout.write(f'Queued {campaign.total_messages} loan due alerts')
+            else:
+                self.stdout.write('No new loan due alerts')
+
+        if options['training_reminders'] is not None:
+            campaigns = enqueue_upcoming_training_reminders(days_before=options['training_reminders'])
+            queued = sum(campaign.total_messages for campaign in campaigns)
+            self.stdout.write(f'Queued {queued} training reminders for {len(campaigns)} trainings')
+
+        if options['mentoring_nudges'] is not None:
+            campaigns = enqueue_overdue_mentoring_nudges(days_since=options['mentoring_nudges'])
+            queued = sum(campaign.total_messages for campaign in campaigns)
+            self.stdout.write(f'Queued {queued} mentoring nudges from {len(campaigns)} mentors')
+
+        while True:
+            result = drain_outbox(rate=rate, batch_size=options['batch_size'], max_messages=options['limit'])
+            if result['campaign_ids']:
+                self.report(result)
+            if not options['loop']:
+                if not result['campaign_ids']:
+                    self.stdout.write('No messages due')
+                break
+            time.sleep(options['interval'])
+
+    def report(self, result):
+        self.stdout.write(self.style.SUCCESS(
+            f"Sent {result['sent']}, failed {result['failed']}, retrying {result['retried']} "
+            f"in {result['elapsed']:.1f}s"
+        ))
+        for provider, count in sorted(result['by_provider'].items()):
+            self.stdout.write(f'  {provider:<30} {count}')
+
+        for campaign in SMSCampaign.objects.filter(pk__in=result['campaign_ids']).order_by('pk'):
+            self.stdout.write(
+                f'  Campaign {campaign.pk} {campaign.name} [{campaign.get_status_display()}]: '
+                f'{campaign.sent_count}/{campaign.total_messages} sent, {campaign.failure_rate}% failed, '
+                f'{campaign.throughput} msg/s, avg latency {campaign.average_latency_seconds}s'
+            )
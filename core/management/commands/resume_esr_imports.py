@@ -0,0 +1,54 @@
+"""
+Management command to resume interrupted ESR imports.
+
+Imports run on a background thread inside the web process, so a restart
+leaves them in 'pending' or 'processing'. This command resumes them from
+their last committed row. Only use --interrupted when no web process is
+still running the import.
+
+Usage:
+    python manage.py resume_esr_imports --interrupted   # Resume every import left in 'pending' or 'processing'
+    python manage.py resume_esr_imports 12 15           # Resume specific imports
+"""
+from django.core.management.base import BaseCommand, CommandError
+from core.models import ESRImport
+from core.services.esr_import import CLAIMABLE_STATUSES, RESUMABLE_STATUSES, ESRImportEngine
+
+INTERRUPTED_STATUSES = CLAIMABLE_STATUSES + ('processing',)
+
+
+class Command(BaseCommand):
+    help = 'Resume ESR imports from their last committed row'
+
+    def add_arguments(self, parser):
+        parser.add_argument('import_ids', nargs='*', type=int, help='IDs of ESR imports to resume')
+        parser.add_argument(
+            '--interrupted',
+            action='store_true',
+            help="Resume all imports left in 'pending' or 'processing' (e.g. after a restart)",
+        )
+
+    def handle(self, *args, **options):
+        if options['import_ids']:
+            imports = ESRImport.objects.filter(pk__in=options['import_ids'])
+        elif options['interrupted']:
+            imports = ESRImport.objects.filter(status__in=INTERRUPTED_STATUSES)
+        else:
+            raise CommandError('Specify import IDs or --interrupted')
+
+        for esr_import in imports.order_by('started_at'):
+            if esr_import.status == 'completed':
+                self.stdout.write(f'Import {esr_import.pk} already completed, skipping')
+                continue
+            self.stdout.write(f'Resuming import {esr_import.pk} ({esr_import.file_name}) from row {esr_import.last_committed_row + 1}...')
+            try:
+                esr_import = ESRImportEngine(esr_import).run(
+                    resume=True, claim_from=INTERRUPTED_STATUSES + RESUMABLE_STATUSES
+                )
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(f'  Failed: {str(e)}'))
+                continue
+            self.stdout.write(self.style.SUCCESS(
+                f'  {esr_import.get_status_display()}: {esr_import.successful_imports} successful, '
+                f'{esr_import.failed_imports} failed of {esr_import.processed_records}'
+            ))
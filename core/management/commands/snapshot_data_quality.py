@@ -0,0 +1,35 @@
+"""
+Management command to save the daily data-quality snapshot.
+
+Evaluates every data-quality check for all villages in one grouped query and
+saves the per-village and system-wide counts that the dashboards read.
+Schedule it (e.g. nightly and hourly) so dashboards never compute it inline.
+
+Usage:
+    python manage.py snapshot_data_quality
+    python manage.py snapshot_data_quality --worst 10    # Also list the 10 lowest-scoring villages
+"""
+from django.core.management.base import BaseCommand
+
+from core.services.data_quality import DataQualityService
+
+
+class Command(BaseCommand):
+    help = "Save today's data-quality snapshot for every village"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--worst', type=int, default=0, help='List this many lowest-scoring villages')
+
+    def handle(self, *args, **options):
+        village_counts = DataQualityService.take_snapshot()
+        report = DataQualityService.get_quality_report()
+        self.stdout.write(self.style.SUCCESS(
+            f"Saved data-quality snapshot for {len(village_counts)} villages: "
+            f"{report['quality_score']}% over {report['total_records']} households"
+        ))
+
+        for card in DataQualityService.get_village_scorecards()[:options['worst']]:
+            self.stdout.write(
+                f"  {card['village_name']:<30} {card['quality_score']:>5}%  "
+                f"{card['total_records']} households, {card['issues_count']} issues"
+            )
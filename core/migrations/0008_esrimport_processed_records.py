@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_systemsettings'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='esrimport',
+            name='processed_records',
+            field=models.IntegerField(default=0),
+        ),
+    ]
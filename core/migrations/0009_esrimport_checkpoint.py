@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_esrimport_processed_records'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='esrimport',
+            name='last_committed_row',
+            field=models.IntegerField(default=0, help_text='Data rows committed so far; a resumed import starts here'),
+        ),
+        migrations.AlterField(
+            model_name='esrimport',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('completed', 'Completed'), ('failed', 'Failed'), ('cancelled', 'Cancelled')], default='pending', max_length=20),
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:36
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_esrimport_checkpoint'),
+        ('households', '0006_household_head_gender_and_more'),
+        ('training', '0007_alter_trainingattendance_unique_together_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SMSCampaign',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200)),
+                ('campaign_type', models.CharField(choices=[('training_reminder', 'Training Reminder'), ('mentoring_nudge', 'Mentoring Nudge'), ('loan_due', 'Loan Due Alert'), ('custom', 'Custom')], default='custom', max_length=30)),
+                ('status', models.CharField(choices=[('scheduled', 'Scheduled'), ('sending', 'Sending'), ('completed', 'Completed'), ('cancelled', 'Cancelled')], default='scheduled', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('total_messages', models.IntegerField(default=0)),
+                ('sent_count', models.IntegerField(default=0)),
+                ('failed_count', models.IntegerField(default=0)),
+                ('retry_count', models.IntegerField(default=0)),
+                ('send_seconds', models.FloatField(default=0, help_text="Worker time spent sending this campaign's messages")),
+                ('total_latency_seconds', models.FloatField(default=0, help_text='Sum of (sent at - send after) over sent messages')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='sms_campaigns', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'upg_sms_campaigns',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='SMSOutbox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('phone_number', models.CharField(max_length=20)),
+                ('message', models.TextField()),
+                ('send_after', models.DateTimeField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('sending', 'Sending'), ('sent', 'Sent'), ('failed', 'Failed'), ('cancelled', 'Cancelled')], default='pending', max_length=20)),
+                ('dedup_key', models.CharField(blank=True, help_text='Stops the same alert being queued twice (e.g. loan_due:<loan id>:<due date>)', max_length=100, null=True, unique=True)),
+                ('attempts', models.IntegerField(default=0)),
+                ('provider', models.CharField(blank=True, max_length=50)),
+                ('error_message', models.TextField(blank=True)),
+                ('claimed_at', models.DateTimeField(blank=True, null=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('campaign', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='messages', to='core.smscampaign')),
+                ('household', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='households.household')),
+                ('mentor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('training', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='training.training')),
+            ],
+            options={
+                'db_table': 'upg_sms_outbox',
+                'ordering': ['send_after', 'id'],
+                'indexes': [models.Index(fields=['status', 'send_after'], name='upg_sms_out_status_839d60_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_sms_campaigns'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DataQualitySnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('snapshot_date', models.DateField(db_index=True)),
+                ('total_records', models.IntegerField(default=0)),
+                ('quality_score', models.FloatField(default=100)),
+                ('check_counts', models.JSONField(default=dict, help_text='Records failing each check, keyed by check')),
+                ('computed_at', models.DateTimeField()),
+                ('village', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='quality_snapshots', to='core.village')),
+            ],
+            options={
+                'db_table': 'upg_data_quality_snapshots',
+                'ordering': ['-snapshot_date'],
+                'unique_together': {('snapshot_date', 'village')},
+            },
+        ),
+    ]
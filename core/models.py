@@ -185,6 +185,7 @@ class ESRImport(models.Model):
         ('processing', 'Processing'),
         ('completed', 'Completed'),
         ('failed', 'Failed'),
+        ('cancelled', 'Cancelled'),
     ]
 
     IMPORT_TYPE_CHOICES = [
@@ -201,6 +202,8 @@ class ESRImport(models.Model):
     imported_by = models.ForeignKey(User, on_delete=models.CASCADE)
     status = models.CharField(max_length=20, choices=IMPORT_STATUS_CHOICES, default='pending')
     total_records = models.IntegerField(default=0)
+    processed_records = models.IntegerField(default=0)
+    last_committed_row = models.IntegerField(default=0, help_text="Data rows committed so far; a resumed import starts here")
     successful_imports = models.IntegerField(default=0)
     failed_imports = models.IntegerField(default=0)
     error_log = models.TextField(blank=True)
@@ -217,6 +220,18 @@ class ESRImport(models.Model):
             return 0
         return (self.successful_imports / self.total_records) * 100
 
+    @property
+    def progress_percent(self):
+        if self.status == 'completed':
+            return 100
+        if self.total_records == 0:
+            return 0
+        return min(int((self.processed_records / self.total_records) * 100), 100)
+
+    @property
+    def can_resume(self):
+        return self.status in ('failed', 'cancelled')
+
     class Meta:
         db_table = 'upg_esr_imports'
         ordering = ['-started_at']
@@ -276,6 +291,129 @@ class SMSLog(models.Model):
         ordering = ['-sent_at']
 
 
+class SMSCampaign(models.Model):
+    """
+    A batch of scheduled SMS (see core.services.sms_outbox), with delivery
+    accounting kept up to date by the outbox worker
+    """
+    CAMPAIGN_TYPE_CHOICES = [
+        ('training_reminder', 'Training Reminder'),
+        ('mentoring_nudge', 'Mentoring Nudge'),
+        ('loan_due', 'Loan Due Alert'),
+        ('custom', 'Custom'),
+    ]
+
+    STATUS_CHOICES = [
+        ('scheduled', 'Scheduled'),
+        ('sending', 'Sending'),
+        ('completed', 'Completed'),
+        ('cancelled', 'Cancelled'),
+    ]
+
+    name = models.CharField(max_length=200)
+    campaign_type = models.CharField(max_length=30, choices=CAMPAIGN_TYPE_CHOICES, default='custom')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='scheduled')
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='sms_campaigns')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    # Delivery accounting
+    total_messages = models.IntegerField(default=0)
+    sent_count = models.IntegerField(default=0)
+    failed_count = models.IntegerField(default=0)
+    retry_count = models.IntegerField(default=0)
+    send_seconds = models.FloatField(default=0, help_text="Worker time spent sending this campaign's messages")
+    total_latency_seconds = models.FloatField(default=0, help_text="Sum of (sent at - send after) over sent messages")
+
+    def __str__(self):
+        return f"{self.name} ({self.get_status_display()})"
+
+    @property
+    def throughput(self):
+        """Messages sent per second of worker time"""
+        return round(self.sent_count / self.send_seconds, 2) if self.send_seconds else 0
+
+    @property
+    def failure_rate(self):
+        finished = self.sent_count + self.failed_count
+        return round((self.failed_count / finished) * 100, 1) if finished else 0
+
+    @property
+    def average_latency_seconds(self):
+        return round(self.total_latency_seconds / self.sent_count, 1) if self.sent_count else 0
+
+    class Meta:
+        db_table = 'upg_sms_campaigns'
+        ordering = ['-created_at']
+
+
+class SMSOutbox(models.Model):
+    """
+    One queued SMS, sent by the outbox worker once send_after has passed
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+        ('cancelled', 'Cancelled'),
+    ]
+
+    campaign = models.ForeignKey(SMSCampaign, on_delete=models.CASCADE, related_name='messages')
+    phone_number = models.CharField(max_length=20)
+    message = models.TextField()
+    send_after = models.DateTimeField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    dedup_key = models.CharField(
+        max_length=100, null=True, blank=True, unique=True,
+        help_text="Stops the same alert being queued twice (e.g. loan_due:<loan id>:<due date>)"
+    )
+    attempts = models.IntegerField(default=0)
+    provider = models.CharField(max_length=50, blank=True)
+    error_message = models.TextField(blank=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    # Optional relationships, copied to the SMSLog
+    household = models.ForeignKey('households.Household', on_delete=models.SET_NULL, null=True, blank=True)
+    training = models.ForeignKey('training.Training', on_delete=models.SET_NULL, null=True, blank=True)
+    mentor = models.ForeignKey('accounts.User', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+
+    def __str__(self):
+        return f"SMS to {self.phone_number} after {self.send_after:%Y-%m-%d %H:%M} ({self.get_status_display()})"
+
+    class Meta:
+        db_table = 'upg_sms_outbox'
+        ordering = ['send_after', 'id']
+        indexes = [
+            models.Index(fields=['status', 'send_after']),
+        ]
+
+
+class DataQualitySnapshot(models.Model):
+    """
+    Daily data-quality counts per village (village=None is the whole system),
+    written by core.services.data_quality so dashboards read rows instead of
+    scanning households
+    """
+    snapshot_date = models.DateField(db_index=True)
+    village = models.ForeignKey(Village, on_delete=models.CASCADE, null=True, blank=True, related_name='quality_snapshots')
+    total_records = models.IntegerField(default=0)
+    quality_score = models.FloatField(default=100)
+    check_counts = models.JSONField(default=dict, help_text="Records failing each check, keyed by check")
+    computed_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"Data quality {self.snapshot_date} - {self.village or 'All villages'}: {self.quality_score}%"
+
+    class Meta:
+        db_table = 'upg_data_quality_snapshots'
+        ordering = ['-snapshot_date']
+        unique_together = ['snapshot_date', 'village']
+
+
 class SystemSettings(models.Model):
     """
     System-wide configuration settings (singleton pattern)
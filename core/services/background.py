@@ -0,0 +1,40 @@
+"""
+Background Job Runner for UPG System
+
+Long-running work (imports, backups) is handed to a daemon thread so the web
+request returns immediately; the job records its own status and progress on a
+model row that the UI polls. There is no task queue in this deployment, so
+jobs that need to survive a restart should also be runnable from a
+management command.
+"""
+
+from django.db import connection, transaction
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def _run_job(job, args, kwargs):
+    try:
+        job(*args, **kwargs)
+    except Exception as e:
+        # Jobs record failures on their own status rows; log for operators
+        logger.error(f"Background job {getattr(job, '__name__', job)} failed: {str(e)}")
+    finally:
+        connection.close()
+
+
+def run_in_background(job, *args, name=None, **kwargs):
+    """
+    Run job(*args, **kwargs) on a daemon thread once the current transaction
+    commits, so the job can see any rows the caller just created.
+    """
+    worker = threading.Thread(
+        target=_run_job,
+        args=(job, args, kwargs),
+        name=name or f'upg-job-{getattr(job, "__name__", "task")}',
+        daemon=True,
+    )
+    transaction.on_commit(worker.start)
+    return worker
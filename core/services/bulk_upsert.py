@@ -0,0 +1,30 @@
+"""
+Backend-aware Bulk Upsert for UPG System
+
+bulk_create(update_conflicts=True) needs the conflict target (unique_fields)
+on SQLite and PostgreSQL, but MySQL cannot name one: its backend raises
+NotSupportedError when unique_fields is given and instead updates through
+ON DUPLICATE KEY UPDATE against any unique key of the table. bulk_upsert()
+passes unique_fields only where the backend supports it, so the rows'
+unique_fields must be backed by a unique constraint for MySQL to match.
+"""
+
+from django.db import connections, router
+
+
+def bulk_upsert(model, objs, unique_fields, update_fields, batch_size=None):
+    """
+    Insert objs, updating update_fields of rows that already exist with the
+    same unique_fields.
+
+    Returns:
+        list: objs, as bulk_create
+    """
+    connection = connections[router.db_for_write(model)]
+    return model.objects.bulk_create(
+        objs,
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=unique_fields if connection.features.supports_update_conflicts_with_target else None,
+        update_fields=update_fields,
+    )
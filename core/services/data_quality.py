@@ -2,11 +2,66 @@
 Data Quality Service for UPG System
 Provides automated data quality checks and scoring
 Borrowed from UPG Kaduna MIS patterns
+
+All checks are evaluated in one conditional-aggregation query grouped by
+village, so per-village scorecards come with the overall report. Results are
+saved as daily DataQualitySnapshot rows by manage.py snapshot_data_quality.
+Dashboards only read the latest snapshot; one older than
+DATA_QUALITY_SNAPSHOT_MAX_AGE seconds is still served while a refresh runs
+in the background. Extra checks (e.g. for another app's data) can be added
+with DataQualityService.register_check.
 """
 
-from django.db.models import Q, Count
+from datetime import timedelta
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Exists, OuterRef, Q, Subquery
+from django.utils import timezone
+from core.services import background
+from core.services.cache_service import CACHE_PREFIX
 from households.models import Household, HouseholdMember
 
+logger = logging.getLogger(__name__)
+
+# Snapshots older than this (seconds) are refreshed in the background
+DEFAULT_SNAPSHOT_MAX_AGE = 3600
+
+# Per-process guard so concurrent dashboard requests start one refresh
+REFRESH_LOCK_KEY = f'{CACHE_PREFIX}data_quality_refresh'
+REFRESH_LOCK_TIMEOUT = 600
+
+
+class QualityCheck:
+    """
+    One data-quality rule. Households matching `condition` (a Q, or a
+    callable returning one so other apps' models load lazily) have the issue.
+    """
+
+    def __init__(self, key, field, severity, condition, recommendation, issue_type='missing_value'):
+        self.key = key
+        self.field = field
+        self.severity = severity
+        self.condition = condition
+        self.recommendation = recommendation
+        self.issue_type = issue_type
+
+    def get_condition(self):
+        return self.condition() if callable(self.condition) else self.condition
+
+
+def _adult_member_missing_id():
+    return Exists(HouseholdMember.objects.filter(household=OuterRef('pk'), age__gte=18, id_number=''))
+
+
+def _disbursed_grant_missing_date():
+    from upg_grants.models import HouseholdGrantApplication
+    return Exists(HouseholdGrantApplication.objects.filter(
+        household=OuterRef('pk'), status='disbursed', disbursement_date__isnull=True
+    ))
+
 
 class DataQualityService:
     """
@@ -26,23 +81,101 @@ class DataQualityService:
         'low': 1
     }
 
+    CHECKS = [
+        QualityCheck(
+            'missing_national_id', 'National ID', 'high',
+            Q(national_id__isnull=True) | Q(national_id=''),
+            'Update household records with valid ID numbers during mentoring visits',
+        ),
+        QualityCheck(
+            'missing_phone', 'Phone Number', 'medium',
+            Q(phone_number__isnull=True) | Q(phone_number=''),
+            'Collect phone numbers to enable SMS communication',
+        ),
+        QualityCheck(
+            'no_members', 'Household Members', 'high',
+            lambda: ~Exists(HouseholdMember.objects.filter(household=OuterRef('pk'))),
+            'Add household member information for complete profiles',
+            issue_type='missing_data',
+        ),
+        QualityCheck(
+            'missing_village', 'Village', 'medium',
+            Q(village__isnull=True),
+            'Assign households to their respective villages',
+        ),
+        QualityCheck(
+            'missing_head_name', 'Head Name', 'medium',
+            Q(head_first_name__isnull=True) | Q(head_first_name='') |
+            Q(head_last_name__isnull=True) | Q(head_last_name=''),
+            'Complete household head name information',
+        ),
+        QualityCheck(
+            'missing_gps', 'GPS Coordinates', 'low',
+            Q(gps_latitude__isnull=True) | Q(gps_longitude__isnull=True),
+            'Collect GPS coordinates during field visits',
+        ),
+        QualityCheck(
+            'member_missing_id', 'Member ID Numbers', 'low',
+            _adult_member_missing_id,
+            'Record ID numbers for adult household members',
+            issue_type='missing_data',
+        ),
+        QualityCheck(
+            'grant_missing_disbursement_date', 'Grant Disbursement Date', 'medium',
+            _disbursed_grant_missing_date,
+            'Record the disbursement date on disbursed grants',
+            issue_type='inconsistent_data',
+        ),
+    ]
+
     @classmethod
-    def get_quality_report(cls, village_ids=None):
-        """
-        Generate comprehensive data quality report.
+    def register_check(cls, check):
+        """Add a check, replacing any existing check with the same key"""
+        cls.CHECKS = [c for c in cls.CHECKS if c.key != check.key] + [check]
 
-        Args:
-            village_ids: Optional list of village IDs to filter by (for mentor view)
+    # =========================================================================
+    # Counting
+    # =========================================================================
+
+    @classmethod
+    def compute_village_counts(cls, village_ids=None):
+        """
+        Evaluate every check in a single grouped query.
 
         Returns:
-            dict: Quality report with score, issues, and recommendations
+            dict: village_id -> {'total': int, <check key>: int, ...}
         """
-        # Build base queryset
         queryset = Household.objects.all()
         if village_ids:
             queryset = queryset.filter(village_id__in=village_ids)
 
-        total = queryset.count()
+        rows = queryset.order_by().values('village_id').annotate(
+            total=Count('pk'),
+            **{check.key: Count('pk', filter=check.get_condition()) for check in cls.CHECKS}
+        )
+        return {row.pop('village_id'): row for row in rows}
+
+    @classmethod
+    def _merge_counts(cls, counts_list):
+        merged = {'total': 0}
+        merged.update({check.key: 0 for check in cls.CHECKS})
+        for counts in counts_list:
+            for key in merged:
+                merged[key] += counts.get(key, 0)
+        return merged
+
+    @classmethod
+    def build_report(cls, counts):
+        """
+        Turn check counts into a quality report.
+
+        Args:
+            counts: {'total': int, <check key>: int, ...}
+
+        Returns:
+            dict: Quality report with score, issues, and recommendations
+        """
+        total = counts.get('total', 0)
         if total == 0:
             return {
                 'quality_score': 100,
@@ -56,96 +189,18 @@ class DataQualityService:
                 }
             }
 
-        issues = []
-
-        # Check 1: Missing National ID (HIGH severity)
-        missing_id = queryset.filter(
-            Q(national_id__isnull=True) | Q(national_id='')
-        ).count()
-        if missing_id > 0:
-            issues.append({
-                'field': 'National ID',
-                'issue_type': 'missing_value',
-                'count': missing_id,
-                'severity': 'high',
-                'percentage': round(missing_id / total * 100, 1),
-                'recommendation': 'Update household records with valid ID numbers during mentoring visits'
-            })
-
-        # Check 2: Missing Phone Number (MEDIUM severity)
-        missing_phone = queryset.filter(
-            Q(phone_number__isnull=True) | Q(phone_number='')
-        ).count()
-        if missing_phone > 0:
-            issues.append({
-                'field': 'Phone Number',
-                'issue_type': 'missing_value',
-                'count': missing_phone,
-                'severity': 'medium',
-                'percentage': round(missing_phone / total * 100, 1),
-                'recommendation': 'Collect phone numbers to enable SMS communication'
-            })
-
-        # Check 3: Households without members (HIGH severity)
-        no_members = queryset.annotate(
-            member_count=Count('members')
-        ).filter(member_count=0).count()
-        if no_members > 0:
-            issues.append({
-                'field': 'Household Members',
-                'issue_type': 'missing_data',
-                'count': no_members,
-                'severity': 'high',
-                'percentage': round(no_members / total * 100, 1),
-                'recommendation': 'Add household member information for complete profiles'
-            })
-
-        # Check 4: Missing Village assignment (MEDIUM severity)
-        no_village = queryset.filter(
-            Q(village__isnull=True)
-        ).count()
-        if no_village > 0:
-            issues.append({
-                'field': 'Village',
-                'issue_type': 'missing_value',
-                'count': no_village,
-                'severity': 'medium',
-                'percentage': round(no_village / total * 100, 1),
-                'recommendation': 'Assign households to their respective villages'
-            })
-
-        # Check 5: Missing head name (MEDIUM severity)
-        missing_head_name = queryset.filter(
-            Q(head_first_name__isnull=True) | Q(head_first_name='') |
-            Q(head_last_name__isnull=True) | Q(head_last_name='')
-        ).count()
-        if missing_head_name > 0:
-            issues.append({
-                'field': 'Head Name',
-                'issue_type': 'missing_value',
-                'count': missing_head_name,
-                'severity': 'medium',
-                'percentage': round(missing_head_name / total * 100, 1),
-                'recommendation': 'Complete household head name information'
-            })
-
-        # Check 6: Missing GPS coordinates (LOW severity) - if the field exists
-        try:
-            if hasattr(Household, 'latitude') and hasattr(Household, 'longitude'):
-                no_gps = queryset.filter(
-                    Q(latitude__isnull=True) | Q(longitude__isnull=True)
-                ).count()
-                if no_gps > 0:
-                    issues.append({
-                        'field': 'GPS Coordinates',
-                        'issue_type': 'missing_value',
-                        'count': no_gps,
-                        'severity': 'low',
-                        'percentage': round(no_gps / total * 100, 1),
-                        'recommendation': 'Collect GPS coordinates during field visits'
-                    })
-        except Exception:
-            pass  # GPS fields may not exist
+        issues = [
+            {
+                'field': check.field,
+                'issue_type': check.issue_type,
+                'count': counts.get(check.key, 0),
+                'severity': check.severity,
+                'percentage': round(counts.get(check.key, 0) / total * 100, 1),
+                'recommendation': check.recommendation,
+            }
+            for check in cls.CHECKS
+            if counts.get(check.key, 0) > 0
+        ]
 
         # Calculate weighted quality score
         issue_score = sum(
@@ -154,7 +209,7 @@ class DataQualityService:
         )
 
         # Normalize score (cap at 100%)
-        normalized_score = min(100, issue_score / total * 100) if total > 0 else 0
+        normalized_score = min(100, issue_score / total * 100)
         quality_score = max(0, round(100 - normalized_score, 1))
 
         # Sort issues by severity (high first)
@@ -176,16 +231,178 @@ class DataQualityService:
             }
         }
 
+    # =========================================================================
+    # Snapshots
+    # =========================================================================
+
+    @classmethod
+    def take_snapshot(cls, snapshot_date=None):
+        """
+        Compute counts for every village and save them as the day's
+        snapshot (replacing any earlier snapshot for that day).
+
+        Returns:
+            dict: village_id -> counts, as compute_village_counts
+        """
+        from core.models import DataQualitySnapshot
+
+        snapshot_date = snapshot_date or timezone.localdate()
+        now = timezone.now()
+        village_counts = cls.compute_village_counts()
+        overall = cls._merge_counts(village_counts.values())
+
+        def snapshot_row(village_id, counts):
+            return DataQualitySnapshot(
+                snapshot_date=snapshot_date,
+                village_id=village_id,
+                total_records=counts['total'],
+                quality_score=cls.build_report(counts)['quality_score'],
+                check_counts={key: value for key, value in counts.items() if key != 'total'},
+                computed_at=now,
+            )
+
+        rows = [snapshot_row(None, overall)] + [
+            snapshot_row(village_id, counts)
+            for village_id, counts in village_counts.items()
+            if village_id is not None
+        ]
+        try:
+            with transaction.atomic():
+                DataQualitySnapshot.objects.filter(snapshot_date=snapshot_date).delete()
+                DataQualitySnapshot.objects.bulk_create(rows, batch_size=500)
+        except IntegrityError:
+            # Another request saved the same day's snapshot concurrently
+            logger.info(f"Data quality snapshot for {snapshot_date} already being written")
+        return village_counts
+
+    @classmethod
+    def read_snapshot(cls, village_ids=None, per_village=False):
+        """
+        Counts from the latest snapshot keyed by village_id, with the time it
+        was computed, in one query; (None, None) if no snapshot exists. The
+        time is None for a snapshot predating a registered check. Without
+        village_ids or per_village only the whole-system row (key None) is
+        read.
+        """
+        from core.models import DataQualitySnapshot
+
+        latest = DataQualitySnapshot.objects.filter(village__isnull=True).order_by('-snapshot_date')
+        snapshots = DataQualitySnapshot.objects.filter(
+            snapshot_date=Subquery(latest.values('snapshot_date')[:1])
+        )
+        if village_ids:
+            snapshots = snapshots.filter(Q(village__isnull=True) | Q(village_id__in=village_ids))
+        elif not per_village:
+            snapshots = snapshots.filter(village__isnull=True)
+
+        counts = {
+            row['village_id']: (dict(row['check_counts'], total=row['total_records']), row['computed_at'])
+            for row in snapshots.values('village_id', 'total_records', 'check_counts', 'computed_at')
+        }
+        # The whole-system row marks a complete snapshot
+        if None not in counts:
+            return None, None
+        overall, computed_at = counts[None]
+        if any(check.key not in overall for check in cls.CHECKS):
+            computed_at = None
+        if village_ids or per_village:
+            del counts[None]
+        return {village_id: village_counts for village_id, (village_counts, _) in counts.items()}, computed_at
+
+    @classmethod
+    def snapshot_is_stale(cls, computed_at, max_age=None):
+        """True if a snapshot computed at computed_at (None = missing or incomplete) should be refreshed"""
+        if computed_at is None:
+            return True
+        if max_age is None:
+            max_age = getattr(settings, 'DATA_QUALITY_SNAPSHOT_MAX_AGE', DEFAULT_SNAPSHOT_MAX_AGE)
+        return computed_at < timezone.now() - timedelta(seconds=max_age)
+
+    @classmethod
+    def refresh_snapshot_in_background(cls):
+        """
+        Take a snapshot on a background thread, at most once per
+        REFRESH_LOCK_TIMEOUT per process. Returns True if one was started.
+        """
+        if not cache.add(REFRESH_LOCK_KEY, True, REFRESH_LOCK_TIMEOUT):
+            return False
+        background.run_in_background(cls.take_snapshot, name='data-quality-snapshot')
+        return True
+
+    @classmethod
+    def _current_counts(cls, village_ids=None, per_village=False):
+        """
+        Counts by village from the latest snapshot, even if it is stale, or
+        None if no snapshot exists yet. A missing, stale or incomplete
+        snapshot (one predating a registered check) is refreshed in the
+        background; the scan never runs inline.
+        """
+        counts, computed_at = cls.read_snapshot(village_ids, per_village)
+        if cls.snapshot_is_stale(computed_at):
+            cls.refresh_snapshot_in_background()
+        return counts
+
+    # =========================================================================
+    # Reports
+    # =========================================================================
+
+    @classmethod
+    def pending_report(cls):
+        """Report shown until the first snapshot is taken: no score rather than a perfect one"""
+        report = cls.build_report({'total': 0})
+        report.update({'quality_score': None, 'pending': True})
+        return report
+
+    @classmethod
+    def get_quality_report(cls, village_ids=None):
+        """
+        Generate comprehensive data quality report.
+
+        Args:
+            village_ids: Optional list of village IDs to filter by (for mentor view)
+
+        Returns:
+            dict: Quality report with score, issues, and recommendations;
+            pending_report() until the first snapshot is taken
+        """
+        counts = cls._current_counts(village_ids)
+        if counts is None:
+            return cls.pending_report()
+        return cls.build_report(cls._merge_counts(counts.values()))
+
     @classmethod
     def get_quality_score_only(cls, village_ids=None):
         """
         Get just the quality score (faster for dashboard cards).
 
         Returns:
-            float: Quality score from 0-100
+            float: Quality score from 0-100, or None until the first snapshot is taken
+        """
+        return cls.get_quality_report(village_ids)['quality_score']
+
+    @classmethod
+    def get_village_scorecards(cls, village_ids=None):
+        """
+        Per-village quality reports, worst first.
+
+        Returns:
+            list of dicts: village_id, village_name, status and the report
+            fields; empty until the first snapshot is taken
         """
-        report = cls.get_quality_report(village_ids)
-        return report['quality_score']
+        from core.models import Village
+
+        village_counts = cls._current_counts(village_ids, per_village=True) or {}
+        names = dict(Village.objects.filter(pk__in=[v for v in village_counts if v]).values_list('id', 'name'))
+        scorecards = []
+        for village_id, counts in village_counts.items():
+            report = cls.build_report(counts)
+            report.update({
+                'village_id': village_id,
+                'village_name': names.get(village_id, 'No village'),
+                'status': cls.get_status_from_score(report['quality_score']),
+            })
+            scorecards.append(report)
+        return sorted(scorecards, key=lambda card: card['quality_score'])
 
     @classmethod
     def get_status_from_score(cls, score):
@@ -193,11 +410,13 @@ class DataQualityService:
         Get status label from quality score.
 
         Args:
-            score: Quality score (0-100)
+            score: Quality score (0-100), or None while no snapshot exists
 
         Returns:
-            str: Status label ('excellent', 'good', 'needs_attention', 'critical')
+            str: Status label ('excellent', 'good', 'needs_attention', 'critical', 'pending')
         """
+        if score is None:
+            return 'pending'
         if score >= 90:
             return 'excellent'
         elif score >= 75:
@@ -0,0 +1,609 @@
+"""
+ESR Import Engine for UPG System
+
+Imports ESR (External Service Record) files in bulk. Columns are normalized
+and mapped to UPG fields with vectorized pandas operations, existing
+households/groups and villages/programs are resolved with set-based lookups,
+and both the domain rows and the ESRImportRecord audit rows are written with
+bulk_create in fixed-size chunks, each inside its own transaction. Files are
+read chunk by chunk (pandas chunksize for CSV, openpyxl read-only streaming for
+XLSX) so memory stays bounded, and progress plus a resume checkpoint are
+recorded on the ESRImport as each chunk commits.
+"""
+
+from django.db import transaction
+from django.utils import timezone
+from itertools import islice
+import json
+import pandas as pd
+import logging
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1000  # rows per transaction
+LOOKUP_BATCH_SIZE = 1000  # values per IN (...) lookup
+BULK_BATCH_SIZE = 500
+
+# Statuses an import can be resumed from, and those run() claims by default
+RESUMABLE_STATUSES = ('failed', 'cancelled')
+CLAIMABLE_STATUSES = ('pending',)
+
+TRUTHY_VALUES = ['1', 'true', 'yes', 'y', '1.0']
+
+
+# =============================================================================
+# Vectorized normalization helpers
+# =============================================================================
+
+def normalize_columns(df):
+    """Lower-case column names and collapse spaces/dashes to underscores"""
+    df = df.copy()
+    df.columns = (
+        pd.Index(df.columns).astype(str)
+        .str.strip().str.lower()
+        .str.replace(r'[\s\-]+', '_', regex=True)
+    )
+    return df.loc[:, ~df.columns.duplicated()]
+
+
+def clean_text(series):
+    """Strip strings, turn blanks into NA and whole floats (12345678.0) into digits"""
+    if pd.api.types.is_float_dtype(series):
+        whole = series.dropna()
+        if (whole == whole.round()).all():
+            series = series.round().astype('Int64')
+    cleaned = series.astype('string').str.strip()
+    return cleaned.mask(cleaned == '')
+
+
+def clean_int(series):
+    return pd.to_numeric(series, errors='coerce').round().astype('Int64')
+
+
+def clean_bool(series):
+    return series.astype('string').str.strip().str.lower().isin(TRUTHY_VALUES)
+
+
+def clean_date(series):
+    return pd.to_datetime(series, errors='coerce').dt.date
+
+
+def map_columns(df, mapping):
+    """
+    Build a frame of UPG fields from ESR columns. mapping is a list of
+    (upg_field, [source columns in priority order]); the first non-null
+    source wins for each row.
+    """
+    mapped = pd.DataFrame(index=df.index)
+    for upg_field, sources in mapping:
+        present = [col for col in sources if col in df.columns]
+        if not present:
+            continue
+        values = df[present[0]]
+        for col in present[1:]:
+            values = values.combine_first(df[col])
+        mapped[upg_field] = values
+    return mapped
+
+
+def frame_to_json_records(df):
+    """JSON-safe list of row dicts (NaN -> null, timestamps -> ISO strings)"""
+    if df.empty or len(df.columns) == 0:
+        return [{} for _ in range(len(df))]
+    return json.loads(df.to_json(orient='records', date_format='iso', default_handler=str))
+
+
+def _batched(values, size=LOOKUP_BATCH_SIZE):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+# =============================================================================
+# Entity importers
+# =============================================================================
+
+class _EntityImporter:
+    """
+    Maps ESR rows to one model that is matched on 'name' (get-or-create
+    semantics). Subclasses declare the column mapping, vectorized cleaning,
+    creation requirements and how to build an unsaved instance.
+    """
+    model = None
+    object_type = ''
+    mapping = []
+
+    def clean(self, mapped):
+        return mapped
+
+    def prepare(self, mapped):
+        """Resolve reference data (villages, programs) used while creating rows"""
+
+    def creation_errors(self, chunk):
+        """Series of error messages (or NA) for rows that would need creating"""
+        return pd.Series(pd.NA, index=chunk.index, dtype='string')
+
+    def build(self, row):
+        raise NotImplementedError
+
+    def lookup_existing(self, names):
+        """Map name -> id for existing rows; the oldest row wins on duplicates"""
+        found = {}
+        for batch in _batched(names):
+            rows = self.model.objects.filter(name__in=batch).order_by('-id').values_list('name', 'id')
+            found.update(rows)
+        return found
+
+
+class HouseholdImporter(_EntityImporter):
+    object_type = 'Household'
+    mapping = [
+        ('name', ['name', 'household_head', 'household_name']),
+        ('national_id', ['national_id']),
+        ('phone_number', ['phone_number', 'phone']),
+        ('disability', ['disability']),
+        ('village_name', ['village_name', 'village']),
+    ]
+
+    def __init__(self):
+        from households.models import Household
+        self.model = Household
+        self.village_ids = None
+
+    def clean(self, mapped):
+        for field in ('name', 'national_id', 'phone_number', 'village_name'):
+            if field in mapped:
+                mapped[field] = clean_text(mapped[field])
+        if 'phone_number' in mapped:
+            mapped['phone_number'] = mapped['phone_number'].str.replace(r'[\s\-()]', '', regex=True)
+        mapped['disability'] = clean_bool(mapped['disability']) if 'disability' in mapped else False
+        return mapped
+
+    def prepare(self, mapped):
+        # Villages are a small reference table: one query per file, case-insensitive match
+        from core.models import Village
+        if 'village_name' in mapped:
+            if self.village_ids is None:
+                self.village_ids = {
+                    name.strip().lower(): village_id
+                    for village_id, name in Village.objects.order_by('-id').values_list('id', 'name')
+                }
+            mapped['village_id'] = mapped['village_name'].str.lower().map(self.village_ids).astype('Int64')
+        else:
+            mapped['village_id'] = pd.Series(pd.NA, index=mapped.index, dtype='Int64')
+
+    def creation_errors(self, chunk):
+        errors = pd.Series(pd.NA, index=chunk.index, dtype='string')
+        village_name = chunk['village_name'] if 'village_name' in chunk else pd.Series(pd.NA, index=chunk.index, dtype='string')
+        errors = errors.mask(village_name.isna(), 'Village is required to create a new household')
+        unknown = village_name.notna() & chunk['village_id'].isna()
+        errors = errors.mask(unknown, 'Unknown village: ' + village_name.fillna(''))
+        return errors
+
+    def build(self, row):
+        from households.search import build_search_document
+        household = self.model(
+            name=row['name'],
+            national_id=row.get('national_id') or '',
+            phone_number=row.get('phone_number') or '',
+            disability=bool(row.get('disability')),
+            village_id=int(row['village_id']),
+        )
+        # bulk_create skips save(), which normally maintains the search document
+        household.search_document = build_search_document(household)
+        return household
+
+
+class BusinessGroupImporter(_EntityImporter):
+    object_type = 'BusinessGroup'
+    mapping = [
+        ('name', ['name', 'business_group_name', 'group_name']),
+        ('business_type', ['business_type']),
+        ('formation_date', ['formation_date']),
+        ('group_size', ['group_size']),
+        ('program_name', ['program_name', 'program']),
+    ]
+
+    def __init__(self):
+        from business_groups.models import BusinessGroup
+        self.model = BusinessGroup
+        self.business_types = {value for value, _ in BusinessGroup.BUSINESS_TYPE_CHOICES}
+        self.program_ids = None
+
+    def clean(self, mapped):
+        for field in ('name', 'business_type', 'program_name'):
+            if field in mapped:
+                mapped[field] = clean_text(mapped[field])
+        if 'business_type' in mapped:
+            business_type = mapped['business_type'].str.lower()
+            mapped['business_type'] = business_type.where(business_type.isin(self.business_types), 'crop')
+        if 'formation_date' in mapped:
+            mapped['formation_date'] = clean_date(mapped['formation_date'])
+        if 'group_size' in mapped:
+            mapped['group_size'] = clean_int(mapped['group_size'])
+        return mapped
+
+    def prepare(self, mapped):
+        from core.models import Program
+        if 'program_name' in mapped:
+            if self.program_ids is None:
+                self.program_ids = {
+                    name.strip().lower(): program_id
+                    for program_id, name in Program.objects.order_by('-id').values_list('id', 'name')
+                }
+            mapped['program_id'] = mapped['program_name'].str.lower().map(self.program_ids).astype('Int64')
+        else:
+            mapped['program_id'] = pd.Series(pd.NA, index=mapped.index, dtype='Int64')
+
+    def creation_errors(self, chunk):
+        errors = pd.Series(pd.NA, index=chunk.index, dtype='string')
+        if 'formation_date' in chunk:
+            errors = errors.mask(chunk['formation_date'].isna(), 'formation_date is required to create a business group')
+        else:
+            errors[:] = 'formation_date is required to create a business group'
+        errors = errors.mask(chunk['program_id'].isna(), 'A known program is required to create a business group')
+        return errors
+
+    def build(self, row):
+        return self.model(
+            name=row['name'],
+            program_id=int(row['program_id']),
+            business_type=row.get('business_type') or 'crop',
+            group_size=int(row['group_size']) if pd.notna(row.get('group_size')) else 2,
+            formation_date=row['formation_date'],
+        )
+
+
+class SavingsGroupImporter(_EntityImporter):
+    object_type = 'BusinessSavingsGroup'
+    mapping = [
+        ('name', ['name', 'savings_group_name', 'group_name']),
+        ('formation_date', ['formation_date']),
+        ('target_members', ['target_members']),
+        ('total_savings', ['total_savings']),
+    ]
+
+    def __init__(self):
+        from savings_groups.models import BusinessSavingsGroup
+        self.model = BusinessSavingsGroup
+
+    def clean(self, mapped):
+        if 'name' in mapped:
+            mapped['name'] = clean_text(mapped['name'])
+        if 'formation_date' in mapped:
+            mapped['formation_date'] = clean_date(mapped['formation_date'])
+        if 'target_members' in mapped:
+            mapped['target_members'] = clean_int(mapped['target_members'])
+        if 'total_savings' in mapped:
+            mapped['total_savings'] = pd.to_numeric(mapped['total_savings'], errors='coerce')
+        return mapped
+
+    def creation_errors(self, chunk):
+        errors = pd.Series(pd.NA, index=chunk.index, dtype='string')
+        if 'formation_date' in chunk:
+            return errors.mask(chunk['formation_date'].isna(), 'formation_date is required to create a savings group')
+        errors[:] = 'formation_date is required to create a savings group'
+        return errors
+
+    def build(self, row):
+        return self.model(
+            name=row['name'],
+            target_members=int(row['target_members']) if pd.notna(row.get('target_members')) else 20,
+            formation_date=row['formation_date'],
+        )
+
+
+IMPORTERS = {
+    'household': HouseholdImporter,
+    'business_group': BusinessGroupImporter,
+    'savings_group': SavingsGroupImporter,
+}
+
+
+def detect_import_type(columns):
+    """Auto-detect the entity type of a mixed/survey file from its columns"""
+    columns = set(columns)
+    if columns & {'household_name', 'household_head'}:
+        return 'household'
+    if columns & {'business_group_name', 'group_name', 'savings_group_name'}:
+        if columns & {'savings', 'total_savings', 'savings_group_name'}:
+            return 'savings_group'
+        return 'business_group'
+    return 'household'
+
+
+# =============================================================================
+# Streaming readers
+# =============================================================================
+
+def _iter_xlsx_rows(file_path):
+    """Stream an .xlsx worksheet row by row (openpyxl read-only mode)"""
+    from openpyxl import load_workbook
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        yield from workbook.active.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def iter_esr_chunks(file_path, chunk_size=CHUNK_SIZE, start_row=0):
+    """
+    Yield DataFrames of at most chunk_size data rows without loading the
+    whole file. Each frame is indexed by its 0-based data row position so
+    row numbers and checkpoints stay stable across resumes; rows before
+    start_row are skipped.
+    """
+    if file_path.endswith('.csv'):
+        offset = 0
+        for chunk in pd.read_csv(file_path, chunksize=chunk_size):
+            chunk.index = pd.RangeIndex(offset, offset + len(chunk))
+            offset += len(chunk)
+            if offset > start_row:
+                yield chunk[chunk.index >= start_row]
+
+    elif file_path.endswith('.xlsx'):
+        rows = _iter_xlsx_rows(file_path)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(name) if name is not None else f'column_{i + 1}' for i, name in enumerate(header)]
+        width = len(columns)
+        offset = start_row
+        rows = islice(rows, start_row, None)
+        while True:
+            batch = list(islice(rows, chunk_size))
+            if not batch:
+                break
+            chunk = pd.DataFrame(
+                [tuple(row[:width]) + (None,) * (width - len(row)) for row in batch],
+                columns=columns,
+                index=pd.RangeIndex(offset, offset + len(batch)),
+            )
+            offset += len(batch)
+            # Formatted-but-empty rows at the end of a sheet are common
+            chunk = chunk.dropna(how='all')
+            if not chunk.empty:
+                yield chunk
+
+    else:
+        # Legacy .xls has no streaming reader; read it whole
+        df = pd.read_excel(file_path)
+        for start in range(start_row, len(df), chunk_size):
+            yield df.iloc[start:start + chunk_size]
+
+
+def count_esr_rows(file_path):
+    """Number of data rows, counted without holding the file in memory"""
+    if file_path.endswith('.csv'):
+        return sum(len(chunk) for chunk in pd.read_csv(file_path, chunksize=50000, usecols=[0]))
+    if file_path.endswith('.xlsx'):
+        return max(sum(1 for _ in _iter_xlsx_rows(file_path)) - 1, 0)
+    return len(pd.read_excel(file_path))
+
+
+# =============================================================================
+# Engine
+# =============================================================================
+
+class ImportCancelled(Exception):
+    """The ESRImport was cancelled while a chunk was being written"""
+
+
+class ESRImportEngine:
+    """
+    Bulk, chunked import of one ESRImport.
+
+    After each chunk commits, the position of the next unread row is stored
+    on ESRImport.last_committed_row in the same transaction, so an import
+    that crashed or was cancelled can resume (run(resume=True)) without
+    re-importing or double-counting rows.
+    """
+
+    def __init__(self, esr_import, chunk_size=CHUNK_SIZE):
+        from core.models import ESRImport, ESRImportRecord
+        self.esr_import = esr_import
+        self.chunk_size = chunk_size
+        self.ESRImport = ESRImport
+        self.ESRImportRecord = ESRImportRecord
+        self.known_ids = {}
+        self.import_type = None
+        self.counts = {'processed': 0, 'successful': 0, 'failed': 0, 'skipped': 0, 'created': 0}
+
+    def run(self, resume=False, claim_from=None):
+        """
+        Import (or with resume=True, continue) the file.
+
+        The import is claimed by moving it from one of claim_from (default:
+        'pending', plus the resumable statuses when resuming) to 'processing'
+        in a single UPDATE, so two runners never import the same rows and an
+        import cancelled before it started stays cancelled. Returns the
+        import unchanged when the claim fails.
+        """
+        esr_import = self.esr_import
+        if claim_from is None:
+            claim_from = CLAIMABLE_STATUSES + (RESUMABLE_STATUSES if resume else ())
+        claim = {'status': 'processing', 'error_log': '', 'completed_at': None}
+        if not resume:
+            claim['last_committed_row'] = 0
+        claimed = self.ESRImport.objects.filter(pk=esr_import.pk, status__in=claim_from).update(**claim)
+        if claimed and not resume:
+            for field, value in claim.items():
+                setattr(esr_import, field, value)
+        else:
+            # Resume from the committed checkpoint, not from what the caller loaded
+            esr_import.refresh_from_db()
+        if not claimed:
+            logger.info(f"ESR import {esr_import.pk} not started: status is {esr_import.status}")
+            return esr_import
+
+        start_row = 0
+        if resume:
+            start_row = esr_import.last_committed_row
+            summary = esr_import.import_summary or {}
+            self.counts.update({
+                'processed': esr_import.processed_records,
+                'successful': esr_import.successful_imports,
+                'failed': esr_import.failed_imports,
+                'skipped': summary.get('skipped', 0),
+                'created': summary.get('created', 0),
+            })
+            self.import_type = summary.get('detected_type')
+
+        try:
+            file_path = esr_import.file_path.path
+            if not resume or not esr_import.total_records:
+                esr_import.total_records = count_esr_rows(file_path)
+                esr_import.save(update_fields=['total_records'])
+
+            importer = None
+            for chunk in iter_esr_chunks(file_path, self.chunk_size, start_row):
+                df = normalize_columns(chunk)
+                if importer is None:
+                    importer = self._importer_for(df.columns)
+
+                mapped = importer.clean(map_columns(df, importer.mapping))
+                if 'name' not in mapped:
+                    mapped['name'] = pd.Series(pd.NA, index=df.index, dtype='string')
+                importer.prepare(mapped)
+
+                if not self._import_chunk(importer, df, mapped):
+                    logger.info(f"ESR import {esr_import.pk} cancelled at row {df.index[0] + 1}")
+                    esr_import.refresh_from_db()
+                    return esr_import
+
+            esr_import.refresh_from_db()
+            esr_import.status = 'completed'
+            esr_import.completed_at = timezone.now()
+            esr_import.total_records = self.counts['processed']
+            esr_import.import_summary = self._summary()
+            esr_import.save()
+
+        except Exception as e:
+            esr_import.refresh_from_db()
+            esr_import.status = 'failed'
+            esr_import.error_log = str(e)
+            esr_import.completed_at = timezone.now()
+            esr_import.save()
+            raise
+
+        return esr_import
+
+    def _importer_for(self, columns):
+        import_type = self.import_type or self.esr_import.import_type
+        if import_type not in IMPORTERS:
+            import_type = detect_import_type(columns)
+        self.import_type = import_type
+        return IMPORTERS[import_type]()
+
+    def _summary(self, counts=None):
+        counts = counts or self.counts
+        total = counts['processed']
+        return {
+            'total': total,
+            'successful': counts['successful'],
+            'failed': counts['failed'],
+            'skipped': counts['skipped'],
+            'created': counts['created'],
+            'detected_type': self.import_type,
+            'success_rate': (counts['successful'] / total) * 100 if total > 0 else 0
+        }
+
+    def _checkpoint(self, chunk, chunk_counts):
+        """Record progress and the resume position; returns the new totals"""
+        counts = {key: self.counts[key] + chunk_counts.get(key, 0) for key in self.counts}
+        updated = self.ESRImport.objects.filter(pk=self.esr_import.pk, status='processing').update(
+            last_committed_row=int(chunk.index[-1]) + 1,
+            processed_records=counts['processed'],
+            successful_imports=counts['successful'],
+            failed_imports=counts['failed'],
+            import_summary=self._summary(counts),
+        )
+        if not updated:
+            raise ImportCancelled()
+        return counts
+
+    def _import_chunk(self, importer, raw_chunk, chunk):
+        """Import one chunk atomically; returns False if the import was cancelled"""
+        raw_records = frame_to_json_records(raw_chunk)
+        mapped_records = frame_to_json_records(chunk.drop(columns=['village_id', 'program_id'], errors='ignore'))
+        try:
+            with transaction.atomic():
+                object_ids, errors, known_ids, created = self._resolve_and_create(importer, chunk)
+                chunk_counts = self._write_records(importer, chunk, raw_records, mapped_records, object_ids, errors)
+                chunk_counts['created'] = created
+                counts = self._checkpoint(chunk, chunk_counts)
+            # Only remember ids once the chunk that created them has committed
+            self.known_ids = known_ids
+        except ImportCancelled:
+            return False
+        except Exception as e:
+            # Whole chunk rolled back: record every row as failed and carry on
+            logger.error(f"ESR import {self.esr_import.pk} chunk at row {chunk.index[0] + 1} failed: {str(e)}")
+            failed = pd.Series(f'Chunk failed: {str(e)}', index=chunk.index, dtype='string')
+            none_ids = pd.Series(pd.NA, index=chunk.index, dtype='Int64')
+            try:
+                with transaction.atomic():
+                    chunk_counts = self._write_records(importer, chunk, raw_records, mapped_records, none_ids, failed)
+                    counts = self._checkpoint(chunk, chunk_counts)
+            except ImportCancelled:
+                return False
+        self.counts = counts
+        return True
+
+    def _resolve_and_create(self, importer, chunk):
+        names = chunk['name']
+        unresolved = set(names.dropna()) - set(self.known_ids)
+        known_ids = dict(self.known_ids)
+        known_ids.update(importer.lookup_existing(unresolved))
+
+        object_ids = names.map(known_ids).astype('Int64')
+        needs_create = names.notna() & object_ids.isna()
+        errors = importer.creation_errors(chunk).where(needs_create, pd.NA)
+
+        new_rows = chunk[needs_create & errors.isna()].drop_duplicates('name')
+        instances = []
+        if not new_rows.empty:
+            instances = [importer.build(row) for row in new_rows.to_dict('records')]
+            importer.model.objects.bulk_create(instances, batch_size=BULK_BATCH_SIZE)
+            created = {obj.name: obj.pk for obj in instances if obj.pk is not None}
+            if len(created) < len(instances):
+                # Backends without RETURNING (MySQL) leave pks unset; look them up by name
+                created = importer.lookup_existing([obj.name for obj in instances])
+            known_ids.update(created)
+            object_ids = names.map(known_ids).astype('Int64')
+
+        return object_ids, errors, known_ids, len(instances)
+
+    def _write_records(self, importer, chunk, raw_records, mapped_records, object_ids, errors):
+        now = timezone.now()
+        counts = {'processed': 0, 'successful': 0, 'failed': 0, 'skipped': 0}
+        records = []
+        for row_index, raw, mapped, name, object_id, error in zip(
+                chunk.index, raw_records, mapped_records, chunk['name'], object_ids, errors):
+            if pd.notna(error):
+                status, message = 'failed', str(error)
+            elif pd.isna(name):
+                status, message = 'skipped', 'No name value to match or create a record'
+            else:
+                status, message = 'processed', ''
+            records.append(self.ESRImportRecord(
+                esr_import=self.esr_import,
+                row_number=int(row_index) + 1,
+                raw_data=raw,
+                mapped_data=mapped,
+                status=status,
+                error_message=message,
+                created_object_type=importer.object_type if status == 'processed' else '',
+                created_object_id=str(object_id) if status == 'processed' else '',
+                processed_at=now,
+            ))
+            counts[status if status != 'processed' else 'successful'] += 1
+        self.ESRImportRecord.objects.bulk_create(records, batch_size=BULK_BATCH_SIZE)
+        counts['processed'] = len(records)
+        return counts
+
+
+def run_esr_import(import_id, resume=False):
+    """Background entry point: process (or resume) a pending ESRImport by id"""
+    from core.models import ESRImport
+    return ESRImportEngine(ESRImport.objects.get(pk=import_id)).run(resume=resume, claim_from=CLAIMABLE_STATUSES)
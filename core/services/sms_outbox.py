@@ -0,0 +1,389 @@
+"""
+Scheduled SMS Campaigns for UPG System
+
+Reminders and alerts are queued as SMSOutbox rows under an SMSCampaign with a
+send_after time instead of being sent inside the request that creates them.
+The process_sms_outbox management command drains due rows at a configured
+messages-per-second, batching recipients per provider through
+SMSService.dispatch, retrying failures with backoff and keeping each
+campaign's sent/failed counts, send time and delivery latency up to date.
+"""
+
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from time import perf_counter
+import logging
+
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils import timezone
+
+from core.models import SMSCampaign, SMSOutbox
+from core.sms import RateLimiter, sms_service
+
+logger = logging.getLogger(__name__)
+
+# Attempts before a message is marked failed, and the wait before each retry
+MAX_ATTEMPTS = 3
+RETRY_BACKOFF = timedelta(minutes=5)
+
+# Rows left in 'sending' this long (worker died mid-batch) are claimed again
+STALE_CLAIM_AFTER = timedelta(minutes=10)
+
+DEFAULT_RATE = 10
+DEFAULT_BATCH_SIZE = 200
+
+ACTIVE_LOAN_STATUSES = ['active', 'partially_repaid']
+UPCOMING_TRAINING_STATUSES = ['planned', 'active']
+
+
+def get_outbox_rate():
+    """Messages per second the outbox worker sends at (settings.SMS_OUTBOX_RATE)"""
+    return getattr(settings, 'SMS_OUTBOX_RATE', DEFAULT_RATE)
+
+
+# =============================================================================
+# Enqueueing
+# =============================================================================
+
+def create_campaign(name, campaign_type, messages, send_after=None, created_by=None):
+    """
+    Queue messages under a new campaign.
+
+    Args:
+        messages: list of dicts with phone_number and message, plus optional
+            household_id, training_id, mentor_id and dedup_key
+        send_after: Earliest send time (defaults to now)
+
+    Returns:
+        SMSCampaign, or None if every message was already queued
+    """
+    send_after = send_after or timezone.now()
+    campaign = SMSCampaign.objects.create(name=name, campaign_type=campaign_type, created_by=created_by)
+    SMSOutbox.objects.bulk_create([
+        SMSOutbox(campaign=campaign, send_after=send_after, **message)
+        for message in messages
+    ], batch_size=500, ignore_conflicts=True)
+
+    # ignore_conflicts drops duplicates silently, so count what was stored
+    total = campaign.messages.count()
+    if not total:
+        campaign.delete()
+        return None
+    campaign.total_messages = total
+    campaign.save(update_fields=['total_messages'])
+    return campaign
+
+
+def enqueue_training_reminders(training, send_after=None, created_by=None, service=None):
+    """Queue the shared reminder for every enrolled household of a training with a phone number"""
+    service = service or sms_service
+    send_after = send_after or timezone.now()
+    households = [
+        enrollment.household for enrollment in training.enrolled_households.filter(
+            enrollment_status='enrolled'
+        ).select_related('household')
+    ]
+    reachable = [hh for hh in households if hh.head_phone_number or hh.phone_number]
+    text = service.training_reminder_text(training)
+    return create_campaign(
+        f'Training reminder: {training.name}',
+        'training_reminder',
+        [
+            {
+                'phone_number': household.head_phone_number or household.phone_number,
+                'message': text,
+                'household_id': household.id,
+                'training_id': training.id,
+                'dedup_key': f'training_reminder:{training.id}:{household.id}:{send_after:%Y%m%d}',
+            }
+            for household in reachable
+        ],
+        send_after=send_after,
+        created_by=created_by,
+    )
+
+
+def enqueue_mentoring_nudges(mentor, households, send_after=None, created_by=None, service=None):
+    """Queue a check-in nudge from a mentor (User) to each of the given households"""
+    service = service or sms_service
+    send_after = send_after or timezone.now()
+    reachable = [hh for hh in households if hh.head_phone_number or hh.phone_number]
+    mentor_context = {
+        'name': mentor.get_full_name() or mentor.username,
+        'phone_number': mentor.phone_number,
+    }
+    texts = service.render_bulk('mentoring_nudge.txt', [
+        {'household': {'head_name': household.head_first_name or household.name}, 'mentor': mentor_context}
+        for household in reachable
+    ])
+    return create_campaign(
+        f'Mentoring nudge: {mentor_context["name"]}',
+        'mentoring_nudge',
+        [
+            {
+                'phone_number': household.head_phone_number or household.phone_number,
+                'message': text,
+                'household_id': household.id,
+                'mentor_id': mentor.id,
+                'dedup_key': f'mentoring_nudge:{mentor.id}:{household.id}:{send_after:%Y%m%d}',
+            }
+            for household, text in zip(reachable, texts)
+        ],
+        send_after=send_after,
+        created_by=created_by,
+    )
+
+
+def enqueue_upcoming_training_reminders(days_before=1, today=None, send_after=None):
+    """
+    Queue reminders for every planned or active training starting in exactly
+    days_before days, so running this daily reminds each training once.
+
+    Returns:
+        list of SMSCampaign (trainings with nothing new to queue are left out)
+    """
+    from training.models import Training
+
+    today = today or timezone.localdate()
+    trainings = Training.objects.filter(
+        status__in=UPCOMING_TRAINING_STATUSES, start_date=today + timedelta(days=days_before)
+    ).order_by('pk')
+    campaigns = [enqueue_training_reminders(training, send_after=send_after) for training in trainings]
+    return [campaign for campaign in campaigns if campaign]
+
+
+def enqueue_overdue_mentoring_nudges(days_since=14, today=None, send_after=None):
+    """
+    Queue a nudge for every household whose latest visit from a mentor was
+    exactly days_since days ago, from that mentor, so running this daily
+    nudges each gap in visits once.
+
+    Returns:
+        list of SMSCampaign, one per mentor with households to nudge
+    """
+    from django.contrib.auth import get_user_model
+    from django.db.models import Max
+    from households.models import Household
+    from training.models import MentoringVisit
+
+    today = today or timezone.localdate()
+    day = today - timedelta(days=days_since)
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    last_visits = MentoringVisit.objects.filter(visit_date__isnull=False).values('mentor_id', 'household_id').annotate(
+        last_visit=Max('visit_date')
+    ).filter(last_visit__gte=start, last_visit__lt=start + timedelta(days=1)).order_by()
+
+    households_by_mentor = defaultdict(list)
+    for row in last_visits:
+        households_by_mentor[row['mentor_id']].append(row['household_id'])
+    mentors = get_user_model().objects.in_bulk(list(households_by_mentor))
+    households = Household.objects.in_bulk([pk for pks in households_by_mentor.values() for pk in pks])
+
+    campaigns = []
+    for mentor_id in sorted(households_by_mentor):
+        campaign = enqueue_mentoring_nudges(
+            mentors[mentor_id], [households[pk] for pk in sorted(households_by_mentor[mentor_id])],
+            send_after=send_after,
+        )
+        if campaign:
+            campaigns.append(campaign)
+    return campaigns
+
+
+def enqueue_loan_due_alerts(days_before=3, today=None, send_after=None, service=None):
+    """
+    Queue an alert for every unpaid BSG loan due within days_before days.
+
+    Each loan is alerted once per due date, so this is safe to run daily.
+    """
+    from savings_groups.models import BSGLoan
+
+    service = service or sms_service
+    today = today or timezone.localdate()
+    loans = [
+        loan for loan in BSGLoan.objects.filter(
+            status__in=ACTIVE_LOAN_STATUSES,
+            balance__gt=0,
+            due_date__gte=today,
+            due_date__lte=today + timedelta(days=days_before),
+        ).select_related('bsg', 'member__household')
+        if loan.member.household.head_phone_number or loan.member.household.phone_number
+    ]
+    texts = service.render_bulk('loan_due_reminder.txt', [
+        {
+            'household': {'head_name': loan.member.household.head_first_name or loan.member.household.name},
+            'group': loan.bsg.name,
+            'balance': f'{loan.balance:,.0f}',
+            'due_date': loan.due_date,
+        }
+        for loan in loans
+    ])
+    return create_campaign(
+        f'Loan due alerts {today:%Y-%m-%d}',
+        'loan_due',
+        [
+            {
+                'phone_number': loan.member.household.head_phone_number or loan.member.household.phone_number,
+                'message': text,
+                'household_id': loan.member.household_id,
+                'dedup_key': f'loan_due:{loan.id}:{loan.due_date:%Y%m%d}',
+            }
+            for loan, text in zip(loans, texts)
+        ],
+        send_after=send_after,
+    )
+
+
+def cancel_campaign(campaign):
+    """Stop a campaign; messages already sent are unaffected"""
+    cancelled = campaign.messages.filter(status='pending').update(status='cancelled')
+    campaign.status = 'cancelled'
+    campaign.completed_at = timezone.now()
+    campaign.save(update_fields=['status', 'completed_at'])
+    return cancelled
+
+
+# =============================================================================
+# Draining
+# =============================================================================
+
+def _due(now):
+    return (
+        Q(status='pending', send_after__lte=now)
+        | Q(status='sending', claimed_at__lt=now - STALE_CLAIM_AFTER)
+    )
+
+
+def claim_due_messages(batch_size=DEFAULT_BATCH_SIZE, now=None):
+    """
+    Claim up to batch_size due messages for this worker with a conditional
+    update, so concurrent workers never send the same row.
+    """
+    now = now or timezone.now()
+    ids = list(SMSOutbox.objects.filter(_due(now)).exclude(
+        campaign__status='cancelled'
+    ).order_by('send_after', 'id').values_list('id', flat=True)[:batch_size])
+    if not ids:
+        return []
+    SMSOutbox.objects.filter(_due(now), id__in=ids).update(
+        status='sending', claimed_at=now, attempts=F('attempts') + 1
+    )
+    return list(SMSOutbox.objects.filter(id__in=ids, status='sending', claimed_at=now))
+
+
+def send_messages(rows, service=None):
+    """
+    Send claimed rows and record each outcome.
+
+    Returns:
+        dict: {'sent', 'failed', 'retried', 'by_provider'}
+    """
+    service = service or sms_service
+
+    # The dispatcher keys recipients by (number, message), so rows that
+    # would collapse into one send travel together as its tag
+    grouped = defaultdict(list)
+    for row in rows:
+        grouped[(service._format_kenyan_number(row.phone_number), service._truncate(row.message))].append(row)
+
+    start = perf_counter()
+    results = service.dispatch([(number, message, group) for (number, message), group in grouped.items()])
+    elapsed = perf_counter() - start
+
+    now = timezone.now()
+    totals = {'sent': 0, 'failed': 0, 'retried': 0, 'by_provider': {}}
+    # campaign id -> accumulated stat increments
+    campaign_stats = defaultdict(lambda: {'sent_count': 0, 'failed_count': 0, 'retry_count': 0, 'total_latency_seconds': 0.0})
+    log_results = []
+    for number, message, success, provider, group in results:
+        for row in group:
+            stats = campaign_stats[row.campaign_id]
+            row.provider = provider
+            row.claimed_at = None
+            if success:
+                row.status = 'sent'
+                row.sent_at = now
+                row.error_message = ''
+                stats['sent_count'] += 1
+                stats['total_latency_seconds'] += max((now - row.send_after).total_seconds(), 0)
+                totals['sent'] += 1
+                totals['by_provider'][provider] = totals['by_provider'].get(provider, 0) + 1
+            elif row.attempts >= MAX_ATTEMPTS:
+                row.status = 'failed'
+                row.error_message = f'{provider} after {row.attempts} attempts'
+                stats['failed_count'] += 1
+                totals['failed'] += 1
+            else:
+                row.status = 'pending'
+                row.send_after = now + RETRY_BACKOFF * row.attempts
+                row.error_message = provider
+                stats['retry_count'] += 1
+                totals['retried'] += 1
+            log_results.append((number, message, success, provider, {
+                'household_id': row.household_id, 'training_id': row.training_id, 'mentor_id': row.mentor_id,
+            }))
+
+    SMSOutbox.objects.bulk_update(
+        rows, ['status', 'provider', 'sent_at', 'send_after', 'error_message', 'claimed_at'], batch_size=500
+    )
+    service._bulk_log_sms(log_results)
+
+    # Worker time is shared across campaigns in proportion to their messages
+    for campaign_id, stats in campaign_stats.items():
+        handled = stats['sent_count'] + stats['failed_count'] + stats['retry_count']
+        SMSCampaign.objects.filter(pk=campaign_id).update(
+            sent_count=F('sent_count') + stats['sent_count'],
+            failed_count=F('failed_count') + stats['failed_count'],
+            retry_count=F('retry_count') + stats['retry_count'],
+            total_latency_seconds=F('total_latency_seconds') + stats['total_latency_seconds'],
+            send_seconds=F('send_seconds') + elapsed * handled / len(rows),
+        )
+    return totals
+
+
+def drain_outbox(rate=None, batch_size=DEFAULT_BATCH_SIZE, max_messages=None, service=None):
+    """
+    Send every due message, at most `rate` messages per second overall.
+
+    Each claimed batch is sent in one-second slices of `rate` messages so
+    provider batches stay full without exceeding the throughput cap.
+
+    Returns:
+        dict: {'sent', 'failed', 'retried', 'by_provider', 'campaign_ids', 'elapsed'}
+    """
+    rate = rate or get_outbox_rate()
+    limiter = RateLimiter(rate)
+    slice_size = max(1, int(rate))
+    totals = {'sent': 0, 'failed': 0, 'retried': 0, 'by_provider': {}, 'campaign_ids': set()}
+    handled = 0
+    start = perf_counter()
+
+    while max_messages is None or handled < max_messages:
+        limit = batch_size if max_messages is None else min(batch_size, max_messages - handled)
+        rows = claim_due_messages(limit)
+        if not rows:
+            break
+
+        campaign_ids = {row.campaign_id for row in rows}
+        SMSCampaign.objects.filter(pk__in=campaign_ids, started_at__isnull=True).update(started_at=timezone.now())
+        SMSCampaign.objects.filter(pk__in=campaign_ids, status='scheduled').update(status='sending')
+        totals['campaign_ids'] |= campaign_ids
+
+        for i in range(0, len(rows), slice_size):
+            chunk = rows[i:i + slice_size]
+            limiter.acquire(len(chunk))
+            result = send_messages(chunk, service=service)
+            for key in ('sent', 'failed', 'retried'):
+                totals[key] += result[key]
+            for provider, count in result['by_provider'].items():
+                totals['by_provider'][provider] = totals['by_provider'].get(provider, 0) + count
+        handled += len(rows)
+
+    if totals['campaign_ids']:
+        SMSCampaign.objects.filter(pk__in=totals['campaign_ids'], status='sending').exclude(
+            messages__status__in=['pending', 'sending']
+        ).update(status='completed', completed_at=timezone.now())
+
+    totals['elapsed'] = perf_counter() - start
+    return totals
@@ -4,28 +4,88 @@ Supports multiple SMS providers with fallback capabilities
 """
 
 import logging
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from django.conf import settings
-from django.template.loader import render_to_string
+from django.template.base import TextNode, Variable, VariableDoesNotExist, VariableNode
+from django.template.loader import get_template, render_to_string
 from django.utils import timezone
 from datetime import timedelta
 import requests
 import json
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
+# SMS limit is usually 160 chars
+MAX_SMS_LENGTH = 160
+
+# Worker threads used by SMSService.send_bulk
+BULK_SMS_WORKERS = 4
+
+
+class RateLimiter:
+    """Thread-safe limiter spacing sends to at most `rate` messages per second"""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self, count=1):
+        if not self.rate:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_slot)
+            self._next_slot = start + count / self.rate
+        if start > now:
+            time.sleep(start - now)
+
 
 class SMSProvider:
     """Base SMS provider class"""
 
+    # Recipients per send_bulk call and default messages per second (None = unlimited)
+    max_batch_size = 1
+    rate_limit = None
+
+    def __init__(self):
+        rate = getattr(settings, 'SMS_RATE_LIMITS', {}).get(self.__class__.__name__, self.rate_limit)
+        self.limiter = RateLimiter(rate)
+
     def send_sms(self, phone_number, message):
         """Send SMS message to phone number"""
         raise NotImplementedError
 
+    def send_bulk(self, phone_numbers, message):
+        """
+        Send the same message to several numbers.
+
+        Returns:
+            set: Numbers that were not sent
+        """
+        failed = set()
+        for phone_number in phone_numbers:
+            try:
+                if not self.send_sms(phone_number, message):
+                    failed.add(phone_number)
+            except Exception as e:
+                logger.error(f"Provider {self.__class__.__name__} failed for {phone_number}: {e}")
+                failed.add(phone_number)
+        return failed
+
 
 class AfricasTalkingSMSProvider(SMSProvider):
     """Africa's Talking SMS provider for Kenya"""
 
+    # The messaging endpoint accepts comma-separated recipients
+    max_batch_size = 100
+    rate_limit = 50
+
     def __init__(self):
+        super().__init__()
         self.api_key = getattr(settings, 'AFRICAS_TALKING_API_KEY', '')
         self.username = getattr(settings, 'AFRICAS_TALKING_USERNAME', 'sandbox')
         self.base_url = 'https://api.africastalking.com/version1/messaging'
@@ -65,11 +125,48 @@ class AfricasTalkingSMSProvider(SMSProvider):
             logger.error(f"SMS sending error: {e}")
             return False
 
+    def send_bulk(self, phone_numbers, message):
+        """Send one message to up to max_batch_size recipients in a single request"""
+        phone_numbers = list(phone_numbers)
+        if not self.api_key:
+            logger.warning("Africa's Talking API key not configured")
+            return set(phone_numbers)
+
+        headers = {
+            'apiKey': self.api_key,
+            'Content-Type': 'application/x-www-form-urlencoded',
+            'Accept': 'application/json'
+        }
+
+        data = {
+            'username': self.username,
+            'to': ','.join(phone_numbers),
+            'message': message,
+            'from': getattr(settings, 'SMS_SENDER_ID', 'UPG_SYS')
+        }
+
+        try:
+            response = requests.post(self.base_url, headers=headers, data=data, timeout=30)
+            response.raise_for_status()
+            recipients = response.json().get('SMSMessageData', {}).get('Recipients', [])
+        except Exception as e:
+            logger.error(f"Bulk SMS sending error: {e}")
+            return set(phone_numbers)
+
+        sent = {r.get('number') for r in recipients if r.get('status') == 'Success'}
+        failed = set(phone_numbers) - sent
+        if failed:
+            logger.error(f"Bulk SMS failed for {len(failed)} of {len(phone_numbers)} recipients")
+        return failed
+
 
 class TwilioSMSProvider(SMSProvider):
     """Twilio SMS provider as fallback"""
 
+    rate_limit = 10
+
     def __init__(self):
+        super().__init__()
         self.account_sid = getattr(settings, 'TWILIO_ACCOUNT_SID', '')
         self.auth_token = getattr(settings, 'TWILIO_AUTH_TOKEN', '')
         self.from_number = getattr(settings, 'TWILIO_PHONE_NUMBER', '')
@@ -104,6 +201,8 @@ class TwilioSMSProvider(SMSProvider):
 class ConsoleSMSProvider(SMSProvider):
     """Console SMS provider for development/testing"""
 
+    max_batch_size = 1000
+
     def send_sms(self, phone_number, message):
         """Print SMS to console instead of sending"""
         print(f"\n--- SMS NOTIFICATION ---")
@@ -113,13 +212,25 @@ class ConsoleSMSProvider(SMSProvider):
         print(f"--- END SMS ---\n")
         return True
 
+    def send_bulk(self, phone_numbers, message):
+        """Print one bulk SMS to console instead of sending"""
+        phone_numbers = list(phone_numbers)
+        print(f"\n--- BULK SMS NOTIFICATION ---")
+        print(f"To ({len(phone_numbers)}): {', '.join(phone_numbers)}")
+        print(f"Message: {message}")
+        print(f"--- END SMS ---\n")
+        return set()
+
 
 class SMSService:
     """Main SMS service with provider management"""
 
-    def __init__(self):
+    def __init__(self, providers=None):
         self.providers = []
-        self._setup_providers()
+        if providers is not None:
+            self.providers = list(providers)
+        else:
+            self._setup_providers()
 
     def _setup_providers(self):
         """Setup SMS providers based on settings"""
@@ -143,8 +254,7 @@ class SMSService:
             message = render_to_string(f'sms/{template_name}', context)
 
         # Truncate message if too long (SMS limit is usually 160 chars)
-        if len(message) > 160:
-            message = message[:157] + '...'
+        message = self._truncate(message)
 
         # Try each provider until one succeeds
         for provider in self.providers:
@@ -176,6 +286,11 @@ class SMSService:
         else:
             return f'+{clean_number}'
 
+    def _truncate(self, message):
+        if len(message) > MAX_SMS_LENGTH:
+            return message[:MAX_SMS_LENGTH - 3] + '...'
+        return message
+
     def _log_sms(self, phone_number, message, success, provider):
         """Log SMS attempt"""
         try:
@@ -190,33 +305,195 @@ class SMSService:
         except Exception as e:
             logger.error(f"Failed to log SMS: {e}")
 
-    def send_training_reminder(self, household, training):
-        """Send training reminder SMS"""
-        context = {
-            'household': household,
-            'training': training,
+    def render_bulk(self, template_name, contexts):
+        """
+        Render an SMS template for many contexts, loading the template once
+        and rendering each distinct set of the values it uses only once.
+
+        Args:
+            template_name: Template under templates/sms/
+            contexts: list of plain (JSON-serialisable) context dicts
+
+        Returns:
+            list of rendered messages, in input order
+        """
+        template = get_template(f'sms/{template_name}')
+        variables = self._template_variables(template)
+        rendered = {}
+        messages = []
+        for context in contexts:
+            if variables is None:
+                key = json.dumps(context, sort_keys=True, default=str)
+            else:
+                key = json.dumps([self._resolve(variable, context) for variable in variables], default=str)
+            if key not in rendered:
+                rendered[key] = self._truncate(template.render(context).strip())
+            messages.append(rendered[key])
+        return messages
+
+    def _template_variables(self, template):
+        """
+        Variables (including filter arguments) a plain SMS template reads, or
+        None if it uses tags, whose inputs can't be listed this way.
+        """
+        variables = []
+        for node in template.template.nodelist:
+            if isinstance(node, TextNode):
+                continue
+            if not isinstance(node, VariableNode):
+                return None
+            expression = node.filter_expression
+            for variable in [expression.var] + [arg for _, args in expression.filters for _, arg in args]:
+                if isinstance(variable, Variable) and variable.lookups:
+                    variables.append(variable)
+        return variables
+
+    def _resolve(self, variable, context):
+        try:
+            return variable.resolve(context)
+        except VariableDoesNotExist:
+            return None
+
+    def send_bulk(self, messages, workers=BULK_SMS_WORKERS):
+        """
+        Send many SMS through provider batch endpoints.
+
+        Recipients sharing a message are grouped into batches of each
+        provider's max_batch_size and sent on a thread pool, respecting the
+        provider's rate limit. Recipients a provider fails for are retried
+        with the next provider. One SMSLog row per recipient is written with
+        a single bulk insert at the end.
+
+        Args:
+            messages: list of (phone_number, message, log_fields) where
+                log_fields are extra SMSLog fields (e.g. household_id)
+            workers: Thread pool size
+
+        Returns:
+            dict: {'sent': int, 'failed': int, 'by_provider': {provider name: sent}}
+        """
+        results = self.dispatch(messages, workers=workers)
+        self._bulk_log_sms(results)
+        return self.summarize(results)
+
+    def dispatch(self, messages, workers=BULK_SMS_WORKERS):
+        """
+        Send like send_bulk without logging, returning one result per recipient.
+
+        Args:
+            messages: list of (phone_number, message, tag); the tag is passed
+                back untouched with the recipient's result
+            workers: Thread pool size
+
+        Returns:
+            list of (formatted number, message, success, provider name, tag)
+        """
+        # message text -> {formatted number: tag}
+        pending = defaultdict(dict)
+        for phone_number, message, tag in messages:
+            pending[self._truncate(message)][self._format_kenyan_number(phone_number)] = tag or {}
+
+        results = []
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='upg-sms') as executor:
+            for provider in self.providers:
+                if not pending:
+                    break
+                provider_name = provider.__class__.__name__
+
+                def send_batch(message, numbers, provider=provider):
+                    provider.limiter.acquire(len(numbers))
+                    try:
+                        return message, numbers, provider.send_bulk(numbers, message)
+                    except Exception as e:
+                        logger.error(f"Provider {provider.__class__.__name__} failed: {e}")
+                        return message, numbers, set(numbers)
+
+                futures = []
+                for message, recipients in pending.items():
+                    numbers = list(recipients)
+                    for i in range(0, len(numbers), provider.max_batch_size):
+                        futures.append(executor.submit(send_batch, message, numbers[i:i + provider.max_batch_size]))
+
+                still_pending = defaultdict(dict)
+                for future in futures:
+                    message, numbers, failed = future.result()
+                    for number in numbers:
+                        if number in failed:
+                            still_pending[message][number] = pending[message][number]
+                        else:
+                            results.append((number, message, True, provider_name, pending[message][number]))
+                pending = still_pending
+
+        for message, recipients in pending.items():
+            for number, tag in recipients.items():
+                results.append((number, message, False, 'All providers failed', tag))
+        return results
+
+    def summarize(self, results):
+        by_provider = {}
+        for _, _, success, provider, _ in results:
+            if success:
+                by_provider[provider] = by_provider.get(provider, 0) + 1
+        sent = sum(by_provider.values())
+        return {'sent': sent, 'failed': len(results) - sent, 'by_provider': by_provider}
+
+    def _bulk_log_sms(self, results):
+        """Log many SMS attempts with one bulk insert"""
+        try:
+            from .models import SMSLog
+            SMSLog.objects.bulk_create([
+                SMSLog(phone_number=number, message=message, success=success, provider=provider, **log_fields)
+                for number, message, success, provider, log_fields in results
+            ], batch_size=500)
+        except Exception as e:
+            logger.error(f"Failed to log SMS: {e}")
+
+    def _training_reminder_context(self, household, training):
+        return {
+            'household': {
+                'head_name': household.head_first_name or household.name,
+            },
+            'training': {'name': training.name},
             'date': training.start_date,
             'location': training.location,
         }
 
+    def send_training_reminder(self, household, training):
+        """Send training reminder SMS"""
         return self.send_sms(
-            household.primary_contact_phone,
+            household.head_phone_number or household.phone_number,
             template_name='training_reminder.txt',
-            context=context
+            context=self._training_reminder_context(household, training)
         )
 
-    def send_bulk_training_reminders(self, training):
-        """Send training reminders to all enrolled households"""
-        success_count = 0
-        enrolled_households = training.enrolled_households.filter(
-            enrollment_status='enrolled'
-        ).select_related('household')
-
-        for enrollment in enrolled_households:
-            if self.send_training_reminder(enrollment.household, training):
-                success_count += 1
+    def training_reminder_text(self, training):
+        """
+        The shared (non-personalised) reminder sent to every enrolled
+        household, so recipients go out in provider-sized batches.
+        """
+        return self.render_bulk('training_reminder_bulk.txt', [{
+            'training': {'name': training.name},
+            'date': training.start_date,
+            'location': training.location,
+        }])[0]
 
-        return success_count, enrolled_households.count()
+    def send_bulk_training_reminders(self, training):
+        """Send one shared training reminder to all enrolled households"""
+        households = [
+            enrollment.household for enrollment in training.enrolled_households.filter(
+                enrollment_status='enrolled'
+            ).select_related('household')
+        ]
+        reachable = [hh for hh in households if hh.head_phone_number or hh.phone_number]
+
+        message = self.training_reminder_text(training)
+        result = self.send_bulk([
+            (household.head_phone_number or household.phone_number, message,
+             {'household_id': household.id, 'training_id': training.id})
+            for household in reachable
+        ])
+
+        return result['sent'], len(households)
 
 
 # Global SMS service instance
@@ -0,0 +1,594 @@
+"""
+Tests for Core App - ESR Import, Bulk SMS, the SMS outbox and data quality
+"""
+
+from django.test import TestCase
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from openpyxl import Workbook
+from datetime import date, datetime, timedelta
+from unittest.mock import patch
+import io
+import shutil
+import tempfile
+import uuid
+
+from .models import ESRImport, Village, SubCounty, County, SMSLog, SMSOutbox, DataQualitySnapshot
+from .services.esr_import import ESRImportEngine, iter_esr_chunks, run_esr_import
+from .sms import SMSProvider, ConsoleSMSProvider, SMSService
+from .services import sms_outbox
+from .services.data_quality import REFRESH_LOCK_KEY, DataQualityService
+from households.models import Household, HouseholdMember
+from training.models import Training, HouseholdTrainingEnrollment, MentoringVisit
+from savings_groups.models import BusinessSavingsGroup, BSGMember, BSGLoan
+
+User = get_user_model()
+
+
+def unique_id():
+    """Generate unique ID for test data"""
+    return str(uuid.uuid4())[:8]
+
+
+class ESRImportEngineTests(TestCase):
+    """Tests for the bulk ESR import engine"""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        county = County.objects.create(name=f'Test County {unique_id()}')
+        subcounty = SubCounty.objects.create(name=f'Test SubCounty {unique_id()}', county=county)
+        self.village = Village.objects.create(name=f'Village {unique_id()}', subcounty_obj=subcounty)
+        uid = unique_id()
+        self.user = User.objects.create_user(
+            username=f'ict_{uid}', email=f'ict_{uid}@test.com',
+            password='testpass123', role='ict_admin'
+        )
+
+    def _import(self, content, import_type='household', chunk_size=1000):
+        esr_import = ESRImport.objects.create(
+            file_name='esr.csv',
+            file_path=SimpleUploadedFile('esr.csv', content.encode()),
+            import_type=import_type,
+            imported_by=self.user,
+        )
+        return ESRImportEngine(esr_import, chunk_size=chunk_size).run()
+
+    def test_household_import_across_chunks(self):
+        """Rows are mapped, matched by name and created in bulk chunk by chunk"""
+        existing = Household.objects.create(name='Existing Home', village=self.village)
+        village = self.village.name.upper()
+        content = (
+            'Household Head,National ID,Phone,Disability,Village\n'
+            f'Existing Home,,,no,{village}\n'
+            f'New Home A,12345678,0712 345 678,yes,{village}\n'
+            f'New Home B,87654321,,0,{village}\n'
+            'New Home C,,,,Unknown Village\n'
+            f',,,,{village}\n'
+            f'New Home A,12345678,,yes,{village}\n'
+        )
+
+        with self.assertNumQueries(22):
+            esr_import = self._import(content, chunk_size=2)
+
+        self.assertEqual(esr_import.status, 'completed')
+        self.assertEqual(esr_import.total_records, 6)
+        self.assertEqual(esr_import.processed_records, 6)
+        self.assertEqual(esr_import.successful_imports, 4)
+        self.assertEqual(esr_import.failed_imports, 1)
+        self.assertEqual(esr_import.import_summary['created'], 2)
+
+        home_a = Household.objects.get(name='New Home A')
+        self.assertEqual(home_a.national_id, '12345678')
+        self.assertEqual(home_a.phone_number, '0712345678')
+        self.assertTrue(home_a.disability)
+        self.assertEqual(home_a.village, self.village)
+
+        records = {record.row_number: record for record in esr_import.records.all()}
+        self.assertEqual(records[1].created_object_id, str(existing.id))
+        self.assertEqual(records[6].created_object_id, str(home_a.id))
+        self.assertEqual(records[4].status, 'failed')
+        self.assertIn('Unknown village', records[4].error_message)
+        self.assertEqual(records[5].status, 'skipped')
+        self.assertEqual(records[2].raw_data['national_id'], 12345678)
+
+    def test_business_group_requires_program_and_formation_date(self):
+        """Groups that cannot satisfy required fields fail with a clear message"""
+        esr_import = self._import(
+            'Group Name,Business Type,Formation Date\nRetail Stars,retail,2024-01-15\n',
+            import_type='business_group'
+        )
+        record = esr_import.records.get()
+        self.assertEqual(record.status, 'failed')
+        self.assertIn('program', record.error_message)
+
+    def test_resume_continues_from_checkpoint(self):
+        """A cancelled import resumes at the last committed row without duplicates"""
+        rows = ''.join(f'Home {i},{self.village.name}\n' for i in range(5))
+        esr_import = self._import('household_name,village\n' + rows, chunk_size=2)
+        self.assertEqual(esr_import.last_committed_row, 5)
+
+        # Simulate a crash after the first chunk: drop everything past row 2
+        esr_import.records.filter(row_number__gt=2).delete()
+        Household.objects.filter(name__in=['Home 2', 'Home 3', 'Home 4']).delete()
+        ESRImport.objects.filter(pk=esr_import.pk).update(
+            status='cancelled', last_committed_row=2, processed_records=2, successful_imports=2,
+            import_summary={'created': 2, 'detected_type': 'household'}
+        )
+        esr_import.refresh_from_db()
+
+        esr_import = ESRImportEngine(esr_import, chunk_size=2).run(resume=True)
+
+        self.assertEqual(esr_import.status, 'completed')
+        self.assertEqual(esr_import.processed_records, 5)
+        self.assertEqual(esr_import.successful_imports, 5)
+        self.assertEqual(esr_import.import_summary['created'], 5)
+        self.assertEqual(
+            list(esr_import.records.order_by('row_number').values_list('row_number', flat=True)), [1, 2, 3, 4, 5]
+        )
+        self.assertEqual(Household.objects.filter(name__startswith='Home ').count(), 5)
+
+    def test_run_claims_the_import_once(self):
+        """A cancelled-while-pending import is not run, and a claimed import is not run twice"""
+        esr_import = ESRImport.objects.create(
+            file_name='esr.csv',
+            file_path=SimpleUploadedFile('esr.csv', f'household_name,village\nHome,{self.village.name}\n'.encode()),
+            import_type='household', imported_by=self.user, status='cancelled',
+        )
+        esr_import = run_esr_import(esr_import.pk)
+        self.assertEqual(esr_import.status, 'cancelled')
+        self.assertFalse(Household.objects.filter(name='Home').exists())
+
+        ESRImport.objects.filter(pk=esr_import.pk).update(status='processing')
+        self.assertEqual(ESRImportEngine(esr_import).run(resume=True).status, 'processing')
+        self.assertFalse(esr_import.records.exists())
+
+    def test_resume_view_queues_once(self):
+        """Only the first of two resume requests starts a background import"""
+        esr_import = ESRImport.objects.create(
+            file_name='esr.csv', file_path=SimpleUploadedFile('esr.csv', b'household_name\n'),
+            imported_by=self.user, status='failed',
+        )
+        self.client.force_login(self.user)
+        url = reverse('core:esr_import_resume', args=[esr_import.pk])
+        with patch('core.views.background.run_in_background') as run_in_background:
+            self.client.post(url)
+            self.client.post(url)
+        self.assertEqual(run_in_background.call_count, 1)
+        esr_import.refresh_from_db()
+        self.assertEqual(esr_import.status, 'pending')
+
+    def test_xlsx_streams_in_chunks(self):
+        """XLSX files are read in row chunks indexed by data row, skipping blank rows"""
+        workbook = Workbook()
+        sheet = workbook.active
+        sheet.append(['Household Name', 'Village'])
+        for i in range(5):
+            sheet.append([f'Home {i}', self.village.name])
+        sheet.append([None, None])
+        path = f'{tempfile.mkdtemp()}/esr.xlsx'
+        self.addCleanup(shutil.rmtree, path.rsplit('/', 1)[0], ignore_errors=True)
+        workbook.save(path)
+
+        chunks = list(iter_esr_chunks(path, chunk_size=2, start_row=1))
+
+        self.assertEqual([list(chunk.index) for chunk in chunks], [[1, 2], [3, 4]])
+        self.assertEqual(chunks[0].iloc[0]['Household Name'], 'Home 1')
+
+
+class FlakySMSProvider(SMSProvider):
+    """Fake provider that fails for chosen numbers and records its batches"""
+
+    max_batch_size = 2
+
+    def __init__(self, failing=()):
+        super().__init__()
+        self.failing = set(failing)
+        self.batches = []
+
+    def send_bulk(self, phone_numbers, message):
+        self.batches.append((list(phone_numbers), message))
+        return set(phone_numbers) & self.failing
+
+
+class BulkSMSTests(TestCase):
+    """Tests for batched SMS dispatch"""
+
+    def setUp(self):
+        county = County.objects.create(name=f'County {unique_id()}')
+        subcounty = SubCounty.objects.create(name=f'SubCounty {unique_id()}', county=county)
+        self.village = Village.objects.create(name=f'Village {unique_id()}', subcounty_obj=subcounty)
+        self.training = Training.objects.create(
+            name='Savings Basics', module_id='M1', location='Chief Camp', start_date=date(2025, 3, 4)
+        )
+
+    def enroll(self, first_name, phone):
+        household = Household.objects.create(
+            name=f'{first_name} household', village=self.village, head_first_name=first_name, phone_number=phone
+        )
+        HouseholdTrainingEnrollment.objects.create(household=household, training=self.training, enrolled_date=date(2025, 3, 1))
+        return household
+
+    def test_batches_by_message_and_falls_back(self):
+        """Shared messages go out in provider-sized batches; failed recipients retry on the next provider"""
+        primary = FlakySMSProvider(failing={'+254700000002'})
+        service = SMSService(providers=[primary, ConsoleSMSProvider()])
+        messages = [(f'070000000{i}', 'Meeting tomorrow', {}) for i in range(1, 4)] + [('0711111111', 'Other', {})]
+
+        with patch('builtins.print'):
+            result = service.send_bulk(messages)
+
+        self.assertEqual(sorted(len(numbers) for numbers, _ in primary.batches), [1, 1, 2])
+        self.assertEqual(result, {
+            'sent': 4, 'failed': 0,
+            'by_provider': {'FlakySMSProvider': 3, 'ConsoleSMSProvider': 1},
+        })
+        self.assertEqual(
+            SMSLog.objects.get(phone_number='+254700000002').provider, 'ConsoleSMSProvider'
+        )
+
+    def test_bulk_training_reminders(self):
+        """One shared reminder is rendered once and sent in provider-sized batches"""
+        first = self.enroll('Mary', '0722000001')
+        self.enroll('Jane', '0722000002')
+        self.enroll('John', '0722000003')
+        self.enroll('Ruth', '0722000004')
+        self.enroll('Peter', '0722000005')
+        self.enroll('Nophone', '')
+        provider = FlakySMSProvider(failing={'+254722000003'})
+
+        with patch('django.template.base.Template.render', autospec=True, side_effect=lambda self, context: 'Hi') as render:
+            sent, total = SMSService(providers=[provider]).send_bulk_training_reminders(self.training)
+
+        self.assertEqual((sent, total), (4, 6))
+        self.assertEqual(render.call_count, 1)
+        # Five recipients share the message, so FlakySMSProvider (max_batch_size=2) is called three times
+        self.assertEqual(len(provider.batches), 3)
+        log = SMSLog.objects.get(phone_number='+254722000001')
+        self.assertEqual((log.household, log.training, log.success), (first, self.training, True))
+        self.assertFalse(SMSLog.objects.get(phone_number='+254722000003').success)
+
+    def test_render_dedup_keys_on_used_values(self):
+        """Contexts differing only in values the template ignores render once"""
+        mentor = {'name': 'Ann', 'phone_number': '0700000000'}
+        contexts = [
+            {'household': {'head_name': 'Mary', 'id': household_id}, 'mentor': mentor} for household_id in (1, 2)
+        ] + [{'household': {'head_name': 'John', 'id': 3}, 'mentor': mentor}]
+
+        with patch('django.template.base.Template.render', autospec=True, side_effect=lambda self, context: 'Hi') as render:
+            messages = SMSService(providers=[ConsoleSMSProvider()]).render_bulk('mentoring_nudge.txt', contexts)
+
+        self.assertEqual(messages, ['Hi', 'Hi', 'Hi'])
+        self.assertEqual(render.call_count, 2)
+
+
+class SMSOutboxTests(TestCase):
+    """Tests for scheduled SMS campaigns"""
+
+    def setUp(self):
+        county = County.objects.create(name=f'County {unique_id()}')
+        subcounty = SubCounty.objects.create(name=f'SubCounty {unique_id()}', county=county)
+        self.village = Village.objects.create(name=f'Village {unique_id()}', subcounty_obj=subcounty)
+        self.bsg = BusinessSavingsGroup.objects.create(name='Tumaini BSG', formation_date=date(2024, 1, 1))
+        self.today = date(2025, 6, 10)
+
+    def loan(self, phone, due_in_days, status='active'):
+        household = Household.objects.create(
+            name=f'Household {unique_id()}', village=self.village, head_first_name='Grace', phone_number=phone
+        )
+        member = BSGMember.objects.create(bsg=self.bsg, household=household, joined_date=date(2024, 1, 1))
+        return BSGLoan.objects.create(
+            bsg=self.bsg, member=member, loan_amount=1000, loan_date=date(2025, 5, 1),
+            due_date=self.today + timedelta(days=due_in_days), status=status,
+        )
+
+    def test_loan_due_alerts_are_queued_once(self):
+        """Only unpaid loans due within the window are alerted, once per due date"""
+        due = self.loan('0733000001', 2)
+        self.loan('0733000002', 10)
+        self.loan('0733000003', 1, status='fully_repaid')
+
+        campaign = sms_outbox.enqueue_loan_due_alerts(days_before=3, today=self.today)
+
+        self.assertEqual(campaign.total_messages, 1)
+        message = campaign.messages.get()
+        self.assertEqual(message.household_id, due.member.household_id)
+        self.assertIn('KES 1,100', message.message)
+        self.assertIsNone(sms_outbox.enqueue_loan_due_alerts(days_before=3, today=self.today))
+        self.assertEqual(SMSOutbox.objects.count(), 1)
+
+    def household(self, first_name, phone):
+        return Household.objects.create(
+            name=f'{first_name} {unique_id()}', village=self.village, head_first_name=first_name, phone_number=phone
+        )
+
+    def test_training_reminders_are_queued_for_upcoming_trainings(self):
+        """Trainings starting in the window get one shared reminder per reachable household"""
+        tomorrow = Training.objects.create(
+            name='Savings Basics', module_id='M1', location='Chief Camp', start_date=self.today + timedelta(days=1)
+        )
+        Training.objects.create(name='Later', module_id='M2', start_date=self.today + timedelta(days=5))
+        Training.objects.create(
+            name='Dropped', module_id='M3', status='cancelled', start_date=self.today + timedelta(days=1)
+        )
+        for first_name, phone in [('Mary', '0755000001'), ('John', '0755000002'), ('Nophone', '')]:
+            HouseholdTrainingEnrollment.objects.create(
+                household=self.household(first_name, phone), training=tomorrow, enrolled_date=self.today
+            )
+
+        campaigns = sms_outbox.enqueue_upcoming_training_reminders(days_before=1, today=self.today)
+
+        self.assertEqual([(campaign.total_messages, campaign.campaign_type) for campaign in campaigns], [
+            (2, 'training_reminder'),
+        ])
+        messages = list(SMSOutbox.objects.values_list('phone_number', 'message'))
+        self.assertEqual({number for number, _ in messages}, {'0755000001', '0755000002'})
+        self.assertEqual(len({text for _, text in messages}), 1)
+        self.assertIn('Savings Basics', messages[0][1])
+
+    def test_mentoring_nudges_are_queued_for_visit_gaps(self):
+        """Households whose last visit from a mentor was days_since days ago are nudged by that mentor"""
+        mentor = User.objects.create_user(
+            username=f'mentor_{unique_id()}', password='testpass123', role='mentor', first_name='Ann',
+        )
+        overdue = self.household('Mary', '0766000001')
+        recent = self.household('John', '0766000002')
+        last_visit = timezone.make_aware(datetime.combine(self.today - timedelta(days=14), datetime.min.time()))
+        for household, visit_date in [
+            (overdue, last_visit - timedelta(days=30)), (overdue, last_visit + timedelta(hours=10)),
+            (recent, last_visit), (recent, last_visit + timedelta(days=10)),
+        ]:
+            MentoringVisit.objects.create(
+                name='Visit', household=household, mentor=mentor, topic='Business', visit_date=visit_date
+            )
+
+        campaigns = sms_outbox.enqueue_overdue_mentoring_nudges(days_since=14, today=self.today)
+
+        self.assertEqual(len(campaigns), 1)
+        message = campaigns[0].messages.get()
+        self.assertEqual((message.household_id, message.mentor_id), (overdue.id, mentor.id))
+        self.assertIn('Ann', message.message)
+
+    def test_command_queues_requested_campaigns(self):
+        """process_sms_outbox --training-reminders/--mentoring-nudges enqueue before draining"""
+        out = io.StringIO()
+        with patch('core.management.commands.process_sms_outbox.enqueue_upcoming_training_reminders',
+                   return_value=[]) as reminders, \
+                patch('core.management.commands.process_sms_outbox.enqueue_overdue_mentoring_nudges',
+                      return_value=[]) as nudges:
+            call_command('process_sms_outbox', training_reminders=2, mentoring_nudges=7, stdout=out)
+
+        reminders.assert_called_once_with(days_before=2)
+        nudges.assert_called_once_with(days_since=7)
+        self.assertIn('Queued 0 training reminders', out.getvalue())
+
+    def test_drain_sends_due_messages_and_records_stats(self):
+        """Due messages are sent through the providers, failures retried, and campaign stats kept"""
+        now = timezone.now()
+        campaign = sms_outbox.create_campaign('Notice', 'custom', [
+            {'phone_number': '0744000001', 'message': 'Meeting today'},
+            {'phone_number': '0744000002', 'message': 'Meeting today'},
+        ], send_after=now - timedelta(minutes=1))
+        later = sms_outbox.create_campaign('Later', 'custom', [
+            {'phone_number': '0744000003', 'message': 'Meeting next week'},
+        ], send_after=now + timedelta(days=1))
+        service = SMSService(providers=[FlakySMSProvider(failing={'+254744000002'})])
+
+        result = sms_outbox.drain_outbox(rate=100, service=service)
+
+        self.assertEqual((result['sent'], result['retried'], result['failed']), (1, 1, 0))
+        self.assertEqual(result['by_provider'], {'FlakySMSProvider': 1})
+        self.assertEqual(later.messages.get().status, 'pending')
+        retry = SMSOutbox.objects.get(phone_number='0744000002')
+        self.assertEqual((retry.status, retry.attempts), ('pending', 1))
+        self.assertGreater(retry.send_after, now)
+        campaign.refresh_from_db()
+        self.assertEqual((campaign.status, campaign.sent_count, campaign.retry_count), ('sending', 1, 1))
+        self.assertIsNotNone(campaign.started_at)
+
+        # The retry succeeds on a working provider once its backoff has passed
+        SMSOutbox.objects.filter(pk=retry.pk).update(send_after=now)
+        with patch('builtins.print'):
+            sms_outbox.drain_outbox(rate=100, service=SMSService(providers=[ConsoleSMSProvider()]))
+
+        campaign.refresh_from_db()
+        self.assertEqual((campaign.status, campaign.sent_count, campaign.failed_count), ('completed', 2, 0))
+        self.assertEqual(SMSOutbox.objects.get(pk=retry.pk).provider, 'ConsoleSMSProvider')
+        self.assertEqual(SMSLog.objects.filter(phone_number='+254744000002').count(), 2)
+
+
+class DataQualityServiceTests(TestCase):
+    """Tests for single-pass data quality checks and snapshots"""
+
+    def setUp(self):
+        county = County.objects.create(name=f'County {unique_id()}')
+        subcounty = SubCounty.objects.create(name=f'SubCounty {unique_id()}', county=county)
+        self.village = Village.objects.create(name=f'Village {unique_id()}', subcounty_obj=subcounty)
+        self.other_village = Village.objects.create(name=f'Village {unique_id()}', subcounty_obj=subcounty)
+
+        complete = Household.objects.create(
+            name='Complete', village=self.village, national_id='12345678', phone_number='0712345678',
+            head_first_name='Mary', head_last_name='Wanjiku', gps_latitude=1.2, gps_longitude=35.1,
+        )
+        HouseholdMember.objects.create(household=complete, name='Mary', gender='female', age=30,
+                                       id_number='12345678', relationship_to_head='head')
+        incomplete = Household.objects.create(name='Incomplete', village=self.village, national_id='', phone_number='0700000000')
+        HouseholdMember.objects.create(household=incomplete, name='John', gender='male', age=40, relationship_to_head='head')
+        Household.objects.create(name='Elsewhere', village=self.other_village, national_id='', phone_number='')
+
+    def test_all_checks_in_one_query_per_village(self):
+        with self.assertNumQueries(1):
+            counts = DataQualityService.compute_village_counts()
+
+        self.assertEqual(counts[self.village.pk]['total'], 2)
+        self.assertEqual(counts[self.village.pk]['missing_national_id'], 1)
+        self.assertEqual(counts[self.village.pk]['no_members'], 0)
+        self.assertEqual(counts[self.village.pk]['member_missing_id'], 1)
+        self.assertEqual(counts[self.other_village.pk]['missing_phone'], 1)
+        self.assertEqual(counts[self.other_village.pk]['no_members'], 1)
+
+    def test_reports_read_the_daily_snapshot(self):
+        """Reports read the saved snapshot instead of scanning households"""
+        DataQualityService.take_snapshot()
+        self.assertEqual(DataQualitySnapshot.objects.count(), 3)  # Two villages plus the system row
+
+        with self.assertNumQueries(1):
+            report = DataQualityService.get_quality_report()
+        self.assertEqual(report['total_records'], 3)
+        with self.assertNumQueries(1):
+            village_report = DataQualityService.get_quality_report([self.village.pk])
+        self.assertEqual(village_report['total_records'], 2)
+        self.assertEqual(
+            {issue['field']: issue['count'] for issue in village_report['issues']}['National ID'], 1
+        )
+        with self.assertNumQueries(1):
+            self.assertEqual(DataQualityService.get_quality_score_only(), report['quality_score'])
+
+        scorecards = DataQualityService.get_village_scorecards()
+        names = {card['village_id']: card['village_name'] for card in scorecards}
+        self.assertEqual(names, {self.village.pk: self.village.name, self.other_village.pk: self.other_village.name})
+        self.assertLessEqual(scorecards[0]['quality_score'], scorecards[1]['quality_score'])
+
+    def test_stale_or_missing_snapshot_is_refreshed_in_the_background(self):
+        """Requests never scan inline: they serve what exists and start one background refresh"""
+        cache.delete(REFRESH_LOCK_KEY)
+        with patch('core.services.data_quality.background.run_in_background') as run_in_background:
+            with self.assertNumQueries(1):
+                report = DataQualityService.get_quality_report()
+            self.assertTrue(report['pending'])
+            self.assertIsNone(report['quality_score'])
+            self.assertEqual(DataQualityService.get_status_from_score(report['quality_score']), 'pending')
+            self.assertEqual(DataQualityService.get_village_scorecards(), [])
+            self.assertEqual(run_in_background.call_count, 1)
+
+            DataQualityService.take_snapshot(snapshot_date=timezone.localdate() - timedelta(days=1))
+            DataQualitySnapshot.objects.update(computed_at=timezone.now() - timedelta(days=1))
+            cache.delete(REFRESH_LOCK_KEY)
+            self.assertEqual(DataQualityService.get_quality_report()['total_records'], 3)
+            self.assertEqual(DataQualityService.get_quality_report()['total_records'], 3)
+            self.assertEqual(run_in_background.call_count, 2)
+
+
+class MonthlyTimeseriesTests(TestCase):
+    """Tests for the grouped monthly counts behind dashboard and VE trends"""
+
+    def setUp(self):
+        uid = unique_id()
+        county = County.objects.create(name=f'County {uid}')
+        subcounty = SubCounty.objects.create(name=f'SubCounty {uid}', county=county)
+        self.village = Village.objects.create(name=f'Village {uid}', subcounty_obj=subcounty)
+
+        # Two households before the window, one in each of its first two months
+        for index, created in enumerate([
+            (2025, 12, 15, 12), (2025, 12, 31, 23), (2026, 2, 1, 0), (2026, 3, 20, 10),
+        ]):
+            household = Household.objects.create(name=f'Household {index}', village=self.village)
+            Household.objects.filter(pk=household.pk).update(
+                created_at=timezone.make_aware(datetime(*created))
+            )
+
+    def test_cumulative_counts_in_one_query(self):
+        from .services.timeseries import cumulative_monthly_counts
+
+        with self.assertNumQueries(1):
+            series = cumulative_monthly_counts(Household.objects.all(), 'created_at', 4, today=date(2026, 4, 10))
+
+        self.assertEqual(series, [
+            (date(2026, 1, 1), 2), (date(2026, 2, 1), 3), (date(2026, 3, 1), 4), (date(2026, 4, 1), 4),
+        ])
+
+    def test_monthly_counts_use_local_day_bounds(self):
+        """Inclusive dates in the current time zone, including a late-evening row on the last day"""
+        from .services.timeseries import monthly_counts
+
+        counts = monthly_counts(Household.objects.all(), 'created_at', date(2025, 12, 31), date(2026, 2, 1))
+        self.assertEqual(counts, {date(2025, 12, 1): 1, date(2026, 2, 1): 1})
+
+
+class BenchmarkHarnessTests(TestCase):
+    """Tests for the synthetic dataset, the view runner and baseline comparison"""
+
+    def test_generator_builds_a_linked_programme(self):
+        from accounts.models import User
+        from households.models import HouseholdStats
+        from training.models import MentoringVisit
+        from .benchmark.dataset import DatasetGenerator
+
+        counts = DatasetGenerator(
+            households=25, counties=1, subcounties_per_county=1, villages_per_subcounty=4, villages_per_mentor=2,
+            mentors_per_fa=1, batch_size=10, seed=7,
+        ).generate()
+
+        self.assertEqual(counts['households'], 25)
+        self.assertEqual(Household.objects.count(), 25)
+        self.assertEqual(HouseholdStats.objects.count(), 25)
+        self.assertEqual(HouseholdMember.objects.count(), counts['members'])
+        self.assertEqual(MentoringVisit.objects.count(), counts['visits'])
+
+        mentor = User.objects.filter(role='mentor').first()
+        self.assertEqual(mentor.profile.assigned_villages.count(), 2)
+        self.assertEqual(mentor.profile.supervisor.role, 'field_associate')
+        self.assertFalse(mentor.has_usable_password())
+        # Batches are registered in different months for trend charts
+        self.assertGreater(Household.objects.dates('created_at', 'month').count(), 1)
+
+    def test_generate_command_refuses_without_debug(self):
+        with self.assertRaisesMessage(CommandError, '--i-know-this-is-not-production'):
+            call_command('generate_benchmark_data', households=1, stdout=io.StringIO())
+        self.assertFalse(Household.objects.exists())
+
+    def test_runner_leaves_the_live_cache_alone(self):
+        from .benchmark.runner import BenchmarkView, ViewRunner
+
+        cache.set('live_entry', 'kept')
+        User.objects.create_user(
+            username=f'pm_{unique_id()}', email=f'{unique_id()}@test.com', password='testpass123',
+            role='program_manager',
+        )
+        ViewRunner(repeat=1).run([BenchmarkView('dashboard:dashboard', 'dashboard')], ['program_manager'])
+        self.assertEqual(cache.get('live_entry'), 'kept')
+
+    def test_runner_and_comparison(self):
+        from accounts.models import User
+        from .benchmark.runner import BenchmarkView, ViewRunner, compare_results
+
+        manager = User.objects.create_user(
+            username=f'pm_{unique_id()}', email=f'{unique_id()}@test.com', password='testpass123',
+            role='program_manager',
+        )
+        views = [
+            BenchmarkView('dashboard:dashboard', 'dashboard'),
+            BenchmarkView('dashboard:export_activity_logs', 'export', {'period': '12'}),
+        ]
+        results = ViewRunner(repeat=1).run(views, ['program_manager', 'mentor'])
+
+        self.assertEqual([(r['view'], r['role'], r['status']) for r in results], [
+            ('dashboard:dashboard', 'program_manager', 200),
+            ('dashboard:export_activity_logs', 'program_manager', 200),
+        ])
+        self.assertTrue(all(r['queries'] > 0 and r['bytes'] > 0 for r in results))
+        self.assertTrue(manager.is_active)
+
+        baseline = [dict(result, time_ms=100.0, queries=5, peak_kb=1000) for result in results]
+        current = [
+            dict(baseline[0], time_ms=110.0, queries=5, peak_kb=1100),  # Within thresholds
+            dict(baseline[1], time_ms=200.0, queries=7, status=500),
+        ]
+        self.assertEqual(compare_results(baseline, current), [
+            'dashboard:export_activity_logs as program_manager: now fails with 500 (was 200)',
+        ])
+        current[1]['status'] = 200
+        self.assertEqual(compare_results(baseline, current), [
+            'dashboard:export_activity_logs as program_manager: 7 queries (was 5)',
+            'dashboard:export_activity_logs as program_manager: 200.0 ms (was 100.0 ms)',
+        ])
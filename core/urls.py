@@ -8,6 +8,9 @@ urlpatterns = [
     path('esr-imports/', views.esr_import_list, name='esr_import_list'),
     path('esr-imports/create/', views.esr_import_create, name='esr_import_create'),
     path('esr-imports/<int:pk>/', views.esr_import_detail, name='esr_import_detail'),
+    path('esr-imports/<int:pk>/status/', views.esr_import_status, name='esr_import_status'),
+    path('esr-imports/<int:pk>/cancel/', views.esr_import_cancel, name='esr_import_cancel'),
+    path('esr-imports/<int:pk>/resume/', views.esr_import_resume, name='esr_import_resume'),
 
     # Mentor-Village Assignment
     path('assign-mentor/', views.assign_mentor_to_village, name='assign_mentor_to_village'),
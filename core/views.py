@@ -3,7 +3,6 @@ Core views for UPG System
 Includes ESR import functionality and system utilities
 """
 
-import pandas as pd
 import json
 from datetime import datetime
 from django.shortcuts import render, redirect, get_object_or_404
@@ -11,11 +10,9 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.http import JsonResponse
 from django.core.paginator import Paginator
-from django.utils import timezone
-from .models import ESRImport, ESRImportRecord, BusinessMentorCycle
-from households.models import Household
-from business_groups.models import BusinessGroup
-from savings_groups.models import BusinessSavingsGroup
+from .models import ESRImport, BusinessMentorCycle
+from .services import background
+from .services.esr_import import RESUMABLE_STATUSES, ESRImportEngine, run_esr_import
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
@@ -71,15 +68,9 @@ def esr_import_create(request):
             status='pending'
         )
 
-        # Process the file
-        try:
-            process_esr_file(esr_import)
-            messages.success(request, f'ESR file "{uploaded_file.name}" uploaded and processed successfully!')
-        except Exception as e:
-            esr_import.status = 'failed'
-            esr_import.error_log = str(e)
-            esr_import.save()
-            messages.error(request, f'Error processing file: {str(e)}')
+        # Process the file in the background; the detail page polls progress
+        background.run_in_background(run_esr_import, esr_import.pk, name=f'esr-import-{esr_import.pk}')
+        messages.success(request, f'ESR file "{uploaded_file.name}" uploaded. Processing has started in the background.')
 
         return redirect('core:esr_import_detail', pk=esr_import.pk)
 
@@ -113,201 +104,62 @@ def esr_import_detail(request, pk):
     return render(request, 'core/esr_import_detail.html', context)
 
 def process_esr_file(esr_import):
-    """Process uploaded ESR file and import data"""
-    esr_import.status = 'processing'
-    esr_import.save()
-
-    try:
-        # Read the file
-        file_path = esr_import.file_path.path
-        if file_path.endswith('.csv'):
-            df = pd.read_csv(file_path)
-        else:
-            df = pd.read_excel(file_path)
-
-        esr_import.total_records = len(df)
-        esr_import.save()
-
-        successful = 0
-        failed = 0
-
-        # Process each row
-        for index, row in df.iterrows():
-            try:
-                # Create import record
-                import_record = ESRImportRecord.objects.create(
-                    esr_import=esr_import,
-                    row_number=index + 1,
-                    raw_data=row.to_dict(),
-                    status='pending'
-                )
-
-                # Process based on import type
-                if esr_import.import_type == 'household':
-                    process_household_record(import_record, row)
-                elif esr_import.import_type == 'business_group':
-                    process_business_group_record(import_record, row)
-                elif esr_import.import_type == 'savings_group':
-                    process_savings_group_record(import_record, row)
-                else:
-                    # Try to auto-detect and process
-                    auto_process_record(import_record, row)
-
-                import_record.status = 'processed'
-                import_record.processed_at = timezone.now()
-                import_record.save()
-                successful += 1
-
-            except Exception as e:
-                import_record.status = 'failed'
-                import_record.error_message = str(e)
-                import_record.save()
-                failed += 1
-
-        # Update import status
-        esr_import.successful_imports = successful
-        esr_import.failed_imports = failed
-        esr_import.status = 'completed'
-        esr_import.completed_at = timezone.now()
-        esr_import.import_summary = {
-            'total': esr_import.total_records,
-            'successful': successful,
-            'failed': failed,
-            'success_rate': (successful / esr_import.total_records) * 100 if esr_import.total_records > 0 else 0
-        }
-        esr_import.save()
+    """Process uploaded ESR file and import data (bulk, chunked; see core.services.esr_import)"""
+    return ESRImportEngine(esr_import).run()
 
-    except Exception as e:
-        esr_import.status = 'failed'
-        esr_import.error_log = str(e)
-        esr_import.completed_at = timezone.now()
-        esr_import.save()
-        raise
-
-def process_household_record(import_record, row):
-    """Process household data from ESR"""
-    # Map ESR fields to UPG Household fields
-    mapped_data = {}
-
-    # Common ESR field mappings
-    field_mapping = {
-        'household_name': 'name',
-        'household_head': 'name',
-        'name': 'name',
-        'national_id': 'national_id',
-        'phone': 'phone_number',
-        'phone_number': 'phone_number',
-        'disability': 'disability',
-        'village': 'village_name',
-        'village_name': 'village_name',
-    }
-
-    for esr_field, upg_field in field_mapping.items():
-        if esr_field in row.index and pd.notna(row[esr_field]):
-            mapped_data[upg_field] = row[esr_field]
-
-    import_record.mapped_data = mapped_data
-    import_record.save()
-
-    # Create household if doesn't exist
-    if 'name' in mapped_data:
-        household, created = Household.objects.get_or_create(
-            name=mapped_data['name'],
-            defaults={
-                'national_id': mapped_data.get('national_id', ''),
-                'phone_number': mapped_data.get('phone_number', ''),
-                'disability': mapped_data.get('disability', False),
-            }
-        )
 
-        import_record.created_object_type = 'Household'
-        import_record.created_object_id = str(household.id)
-        import_record.save()
-
-def process_business_group_record(import_record, row):
-    """Process business group data from ESR"""
-    mapped_data = {}
-
-    # Business group field mappings
-    field_mapping = {
-        'group_name': 'name',
-        'business_group_name': 'name',
-        'name': 'name',
-        'business_type': 'business_type',
-        'formation_date': 'formation_date',
-        'group_size': 'group_size',
-    }
-
-    for esr_field, upg_field in field_mapping.items():
-        if esr_field in row.index and pd.notna(row[esr_field]):
-            mapped_data[upg_field] = row[esr_field]
-
-    import_record.mapped_data = mapped_data
-    import_record.save()
-
-    # Create business group if doesn't exist
-    if 'name' in mapped_data:
-        business_group, created = BusinessGroup.objects.get_or_create(
-            name=mapped_data['name'],
-            defaults={
-                'business_type': mapped_data.get('business_type', 'crop'),
-                'group_size': mapped_data.get('group_size', 2),
-            }
-        )
-
-        import_record.created_object_type = 'BusinessGroup'
-        import_record.created_object_id = str(business_group.id)
-        import_record.save()
-
-def process_savings_group_record(import_record, row):
-    """Process savings group data from ESR"""
-    mapped_data = {}
-
-    # Savings group field mappings
-    field_mapping = {
-        'group_name': 'name',
-        'savings_group_name': 'name',
-        'name': 'name',
-        'formation_date': 'formation_date',
-        'target_members': 'target_members',
-        'total_savings': 'total_savings',
-    }
-
-    for esr_field, upg_field in field_mapping.items():
-        if esr_field in row.index and pd.notna(row[esr_field]):
-            mapped_data[upg_field] = row[esr_field]
-
-    import_record.mapped_data = mapped_data
-    import_record.save()
+@login_required
+def esr_import_status(request, pk):
+    """JSON progress of an ESR import, polled by the detail page"""
+    user_role = getattr(request.user, 'role', None)
+    if not (request.user.is_superuser or user_role == 'ict_admin'):
+        return JsonResponse({'error': 'Permission denied'}, status=403)
+    esr_import = get_object_or_404(ESRImport, pk=pk)
+    return JsonResponse({
+        'status': esr_import.status,
+        'total_records': esr_import.total_records,
+        'processed_records': esr_import.processed_records,
+        'last_committed_row': esr_import.last_committed_row,
+        'successful_imports': esr_import.successful_imports,
+        'failed_imports': esr_import.failed_imports,
+        'progress_percent': esr_import.progress_percent,
+        'error_log': esr_import.error_log,
+    })
 
-    # Create savings group if doesn't exist
-    if 'name' in mapped_data:
-        savings_group, created = BusinessSavingsGroup.objects.get_or_create(
-            name=mapped_data['name'],
-            defaults={
-                'target_members': mapped_data.get('target_members', 20),
-            }
-        )
 
-        import_record.created_object_type = 'BusinessSavingsGroup'
-        import_record.created_object_id = str(savings_group.id)
-        import_record.save()
+@login_required
+def esr_import_cancel(request, pk):
+    """Cancel a running ESR import; the current chunk is rolled back"""
+    user_role = getattr(request.user, 'role', None)
+    if not (request.user.is_superuser or user_role == 'ict_admin'):
+        messages.error(request, 'You do not have permission to access ESR import functionality. System administrator access required.')
+        return redirect('dashboard:dashboard')
+    if request.method == 'POST':
+        cancelled = ESRImport.objects.filter(pk=pk, status__in=['pending', 'processing']).update(status='cancelled')
+        if cancelled:
+            messages.success(request, 'Import cancelled. It can be resumed from the last committed row.')
+        else:
+            messages.warning(request, 'This import is not running.')
+    return redirect('core:esr_import_detail', pk=pk)
 
-def auto_process_record(import_record, row):
-    """Auto-detect and process mixed ESR data"""
-    # Try to determine what type of data this is based on columns
-    columns = [col.lower() for col in row.index]
 
-    if any(col in columns for col in ['household_name', 'household_head']):
-        process_household_record(import_record, row)
-    elif any(col in columns for col in ['business_group_name', 'group_name']):
-        if any(col in columns for col in ['savings', 'total_savings']):
-            process_savings_group_record(import_record, row)
+@login_required
+def esr_import_resume(request, pk):
+    """Resume a failed or cancelled ESR import from its last committed row"""
+    user_role = getattr(request.user, 'role', None)
+    if not (request.user.is_superuser or user_role == 'ict_admin'):
+        messages.error(request, 'You do not have permission to access ESR import functionality. System administrator access required.')
+        return redirect('dashboard:dashboard')
+    esr_import = get_object_or_404(ESRImport, pk=pk)
+    if request.method == 'POST':
+        # Queue atomically, so a double submit or two admins start one resume between them
+        queued = ESRImport.objects.filter(pk=pk, status__in=RESUMABLE_STATUSES).update(status='pending')
+        if queued:
+            background.run_in_background(run_esr_import, esr_import.pk, resume=True, name=f'esr-import-{esr_import.pk}')
+            messages.success(request, f'Resuming import from row {esr_import.last_committed_row + 1}.')
         else:
-            process_business_group_record(import_record, row)
-    else:
-        # Default to household
-        process_household_record(import_record, row)
+            messages.warning(request, 'Only failed or cancelled imports can be resumed.')
+    return redirect('core:esr_import_detail', pk=pk)
 
 
 # API Endpoints for AJAX calls
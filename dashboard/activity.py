@@ -0,0 +1,345 @@
+"""
+Mentor Activity Logs for UPG System
+
+Mentoring visits and phone calls are read as one stream, newest first. Each
+page takes the next limit + 1 rows of both tables by keyset on (date, id),
+merges them and keeps the first `limit`, so a page costs the same however
+far back it is. The cursor carries the last row's (date, kind, id); visits
+sort before calls made at the same instant.
+
+Totals and the per-mentor and per-month summaries are grouped queries. The
+CSV export reads each table in keyset-paged chunks on the same (date, id)
+order as the stream, so a year of organisation-wide activity is written in
+constant memory even on MySQL, where .iterator() buffers the whole result
+client-side.
+"""
+
+from calendar import monthrange
+from datetime import datetime, timedelta
+import base64
+import csv
+import json
+
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from core.services.timeseries import add_months, first_instant, last_months, monthly_counts
+from households.search import InvalidCursor
+from training.models import MentoringVisit, PhoneNudge
+
+PAGE_SIZE = 50
+EXPORT_CHUNK_SIZE = 2000
+
+EXPORT_ROLES = ['me_staff', 'program_manager', 'ict_admin', 'field_associate']
+
+VISIT = 'visit'
+CALL = 'call'
+
+VISIT_TYPES = dict(MentoringVisit.VISIT_TYPE_CHOICES)
+NUDGE_TYPES = dict(PhoneNudge.NUDGE_TYPE_CHOICES)
+
+_MENTOR_FIELDS = ('mentor__first_name', 'mentor__last_name', 'mentor__username')
+
+
+def activity_period(period, today=None):
+    """
+    Date range of a period filter: '1' (current month, the default), '6' or '12' months.
+
+    Returns:
+        tuple: (start_date, end_date, label), inclusive dates
+    """
+    today = today or timezone.localdate()
+    if period in ('6', '12'):
+        # Same day N months back, clamped to the end of a shorter month
+        month = add_months(today, -int(period))
+        start_date = month.replace(day=min(today.day, monthrange(month.year, month.month)[1]))
+        label = f"Last {period} Months ({start_date.strftime('%b %Y')} - {today.strftime('%b %Y')})"
+        return start_date, today, label
+
+    start_date = today.replace(day=1)
+    end_date = today.replace(day=monthrange(today.year, today.month)[1])
+    return start_date, end_date, today.strftime('%B %Y')
+
+
+def activity_mentors(user, mentor_id=''):
+    """
+    Mentors a user may pick from and the mentor filter for their activity.
+
+    Returns:
+        tuple: (available_mentors queryset, mentor filter queryset or None for all activity)
+    """
+    from accounts.models import User
+
+    mentor_filter = None
+    available_mentors = User.objects.none()
+
+    if user.role == 'field_associate':
+        available_mentors = mentor_filter = User.objects.filter(
+            role='mentor', is_active=True, profile__supervisor=user
+        )
+    elif user.role in ['me_staff', 'program_manager', 'ict_admin']:
+        available_mentors = mentor_filter = User.objects.filter(role='mentor', is_active=True)
+    elif user.role == 'mentor':
+        available_mentors = mentor_filter = User.objects.filter(pk=user.pk)
+
+    if mentor_id and mentor_filter is not None:
+        try:
+            mentor_filter = mentor_filter.filter(pk=int(mentor_id))
+        except (ValueError, TypeError):
+            pass
+
+    return available_mentors, mentor_filter
+
+
+def activity_querysets(start_date, end_date, mentor_filter=None):
+    """
+    Visits and calls between two inclusive dates (local time), as
+    index-friendly datetime ranges.
+
+    Returns:
+        tuple: (visits, calls) querysets
+    """
+    start, end = first_instant(start_date), first_instant(end_date + timedelta(days=1))
+    visits = MentoringVisit.objects.filter(visit_date__gte=start, visit_date__lt=end)
+    calls = PhoneNudge.objects.filter(call_date__gte=start, call_date__lt=end)
+    if mentor_filter is not None:
+        visits = visits.filter(mentor__in=mentor_filter)
+        calls = calls.filter(mentor__in=mentor_filter)
+    return visits, calls
+
+
+def _mentor_name(row):
+    return ' '.join(
+        part for part in (row['mentor__first_name'], row['mentor__last_name']) if part
+    ) or row['mentor__username']
+
+
+def mentor_summary(visits, calls):
+    """
+    Visit and call counts and minutes per mentor, most active first.
+
+    Returns:
+        list of dict: {'id', 'name', 'visits', 'calls', 'visit_minutes', 'call_minutes', 'total', 'minutes'}
+    """
+    rows = {}
+    for queryset, count_key, minutes_key in ((visits, 'visits', 'visit_minutes'), (calls, 'calls', 'call_minutes')):
+        for row in queryset.order_by().values('mentor_id', *_MENTOR_FIELDS).annotate(
+            count=Count('id'), minutes=Sum('duration_minutes')
+        ):
+            summary = rows.setdefault(row['mentor_id'], {
+                'id': row['mentor_id'], 'name': _mentor_name(row),
+                'visits': 0, 'calls': 0, 'visit_minutes': 0, 'call_minutes': 0,
+            })
+            summary[count_key] = row['count']
+            summary[minutes_key] = row['minutes'] or 0
+
+    for summary in rows.values():
+        summary['total'] = summary['visits'] + summary['calls']
+        summary['minutes'] = summary['visit_minutes'] + summary['call_minutes']
+    return sorted(rows.values(), key=lambda summary: (-summary['total'], summary['name']))
+
+
+def activity_totals(mentor_rows):
+    """Overall counts and minutes, from the mentor_summary rows"""
+    totals = {key: sum(row[key] for row in mentor_rows)
+              for key in ('visits', 'calls', 'visit_minutes', 'call_minutes')}
+    totals['total'] = totals['visits'] + totals['calls']
+    totals['minutes'] = totals['visit_minutes'] + totals['call_minutes']
+    return totals
+
+
+def monthly_breakdown(visits, calls, months, today=None):
+    """
+    Visit and call counts for each of the last N months, oldest first.
+
+    Returns:
+        list of dict: {'month', 'visits', 'calls', 'total'}
+    """
+    visit_counts = monthly_counts(visits, 'visit_date')
+    call_counts = monthly_counts(calls, 'call_date')
+    breakdown = []
+    for month in last_months(months, today):
+        month_visits, month_calls = visit_counts.get(month, 0), call_counts.get(month, 0)
+        breakdown.append({
+            'month': month.strftime('%b %Y'),
+            'visits': month_visits,
+            'calls': month_calls,
+            'total': month_visits + month_calls,
+        })
+    return breakdown
+
+
+def encode_cursor(when, kind, pk):
+    return base64.urlsafe_b64encode(json.dumps([when.isoformat(), kind, pk]).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        when, kind, pk = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if kind not in (VISIT, CALL):
+            raise ValueError(kind)
+        return datetime.fromisoformat(when), kind, int(pk)
+    except (ValueError, TypeError):
+        raise InvalidCursor(f'Invalid cursor: {cursor!r}')
+
+
+def _after(kind, date_field, cursor):
+    """Rows of `kind` that come after the cursor in (date, kind, id) descending order"""
+    when, cursor_kind, pk = cursor
+    if kind == cursor_kind:
+        return Q(**{f'{date_field}__lt': when}) | Q(**{date_field: when, 'id__lt': pk})
+    if kind < cursor_kind:
+        return Q(**{f'{date_field}__lte': when})
+    return Q(**{f'{date_field}__lt': when})
+
+
+def _visit_entries(visits, cursor, limit):
+    if cursor:
+        visits = visits.filter(_after(VISIT, 'visit_date', cursor))
+    for row in visits.order_by('-visit_date', '-id').values(
+        'id', 'visit_date', 'visit_type', 'duration_minutes', 'topic', 'household__name', *_MENTOR_FIELDS
+    )[:limit]:
+        yield {
+            'kind': VISIT,
+            'id': row['id'],
+            'date': row['visit_date'],
+            'household': row['household__name'],
+            'mentor': _mentor_name(row),
+            'type': VISIT_TYPES.get(row['visit_type'], row['visit_type']),
+            'duration_minutes': row['duration_minutes'],
+            'detail': row['topic'],
+            'successful_contact': None,
+        }
+
+
+def _call_entries(calls, cursor, limit):
+    if cursor:
+        calls = calls.filter(_after(CALL, 'call_date', cursor))
+    for row in calls.order_by('-call_date', '-id').values(
+        'id', 'call_date', 'nudge_type', 'duration_minutes', 'notes', 'successful_contact', 'household__name',
+        *_MENTOR_FIELDS
+    )[:limit]:
+        yield {
+            'kind': CALL,
+            'id': row['id'],
+            'date': row['call_date'],
+            'household': row['household__name'],
+            'mentor': _mentor_name(row),
+            'type': NUDGE_TYPES.get(row['nudge_type'], row['nudge_type']),
+            'duration_minutes': row['duration_minutes'],
+            'detail': row['notes'],
+            'successful_contact': row['successful_contact'],
+        }
+
+
+def activity_page(visits=None, calls=None, cursor=None, limit=PAGE_SIZE):
+    """
+    One page of visits and calls, newest first. Pass None for either
+    queryset to leave that kind out.
+
+    Returns:
+        dict: {'activities': [{'kind', 'id', 'date', 'household', 'mentor', 'type',
+                               'duration_minutes', 'detail', 'successful_contact'}],
+               'next_cursor': str or None}
+    Raises:
+        InvalidCursor: for a cursor that cannot be decoded
+    """
+    position = decode_cursor(cursor) if cursor else None
+    entries = []
+    if visits is not None:
+        entries.extend(_visit_entries(visits, position, limit + 1))
+    if calls is not None:
+        entries.extend(_call_entries(calls, position, limit + 1))
+    entries.sort(key=lambda entry: (entry['date'], entry['kind'], entry['id']), reverse=True)
+
+    next_cursor = None
+    if len(entries) > limit:
+        last = entries[limit - 1]
+        next_cursor = encode_cursor(last['date'], last['kind'], last['id'])
+    return {'activities': entries[:limit], 'next_cursor': next_cursor}
+
+
+def _format_date(value):
+    if timezone.is_aware(value):
+        value = timezone.localtime(value)
+    return value.strftime('%Y-%m-%d %H:%M')
+
+
+def _keyset_chunks(queryset, kind, date_field, fields, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Rows of queryset.values(*fields), newest first, read chunk_size at a
+    time by keyset on (date_field, id) as in activity_page.
+    """
+    position = None
+    while True:
+        page = queryset.filter(_after(kind, date_field, position)) if position else queryset
+        rows = list(page.order_by(f'-{date_field}', '-id').values('id', date_field, *fields)[:chunk_size])
+        yield from rows
+        if len(rows) < chunk_size:
+            return
+        position = (rows[-1][date_field], kind, rows[-1]['id'])
+
+
+def activity_csv_rows(visits=None, calls=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Rows of the activity log CSV: a VISITS section and a PHONE CALLS section,
+    each with its own totals. Pass None for either queryset to leave it out.
+    Rows are read in keyset-paged chunks and totals are summed as they go.
+    """
+    if visits is not None:
+        yield ['VISITS']
+        yield ['Date', 'Mentor', 'Household', 'Visit Type', 'Duration (min)', 'Topic', 'Notes']
+        count = minutes = 0
+        for row in _keyset_chunks(visits, VISIT, 'visit_date', (
+            'household__name', 'visit_type', 'duration_minutes', 'topic', 'observations', *_MENTOR_FIELDS
+        ), chunk_size):
+            count += 1
+            minutes += row['duration_minutes'] or 0
+            yield [
+                _format_date(row['visit_date']),
+                _mentor_name(row),
+                row['household__name'] or 'N/A',
+                VISIT_TYPES.get(row['visit_type'], row['visit_type']),
+                row['duration_minutes'] or 0,
+                row['topic'] or '',
+                row['observations'] or '',
+            ]
+        yield []
+        yield ['Total Visits:', count, '', '', f'{minutes} min']
+        yield []
+
+    if calls is not None:
+        yield ['PHONE CALLS']
+        yield ['Date', 'Mentor', 'Household', 'Call Type', 'Duration (min)', 'Contact Success', 'Notes']
+        count = minutes = 0
+        for row in _keyset_chunks(calls, CALL, 'call_date', (
+            'household__name', 'nudge_type', 'duration_minutes', 'successful_contact', 'notes', *_MENTOR_FIELDS
+        ), chunk_size):
+            count += 1
+            minutes += row['duration_minutes'] or 0
+            yield [
+                _format_date(row['call_date']),
+                _mentor_name(row),
+                row['household__name'] or 'N/A',
+                NUDGE_TYPES.get(row['nudge_type'], row['nudge_type']),
+                row['duration_minutes'] or 0,
+                'Yes' if row['successful_contact'] else 'No',
+                row['notes'] or '',
+            ]
+        yield []
+        yield ['Total Calls:', count, '', '', f'{minutes} min']
+
+
+class _Echo:
+    """File-like object whose write() returns the line, for csv.writer in a streaming response"""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(rows):
+    """Encode rows as CSV lines one at a time"""
+    writer = csv.writer(_Echo())
+    for row in rows:
+        yield writer.writerow(row)
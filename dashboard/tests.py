@@ -0,0 +1,249 @@
+"""
+Tests for Dashboard App - Lazily Loaded Widgets
+"""
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from datetime import datetime, timedelta
+import uuid
+
+from core.models import County, SubCounty, Village
+from households.models import Household
+from training.models import MentoringVisit, PhoneNudge
+
+User = get_user_model()
+
+
+def unique_id():
+    """Generate unique ID for test data"""
+    return str(uuid.uuid4())[:8]
+
+
+class DashboardWidgetTests(TestCase):
+    """Tests for dashboard shells and their JSON widget endpoints"""
+
+    def setUp(self):
+        cache.clear()
+        uid = unique_id()
+        county = County.objects.create(name=f'County {uid}')
+        subcounty = SubCounty.objects.create(name=f'SubCounty {uid}', county=county)
+        self.village = Village.objects.create(name=f'Village A {uid}', subcounty_obj=subcounty)
+        self.other_village = Village.objects.create(name=f'Village B {uid}', subcounty_obj=subcounty)
+
+        def user(role, **kwargs):
+            name = f'{role}_{unique_id()}'
+            return User.objects.create_user(
+                username=name, email=f'{name}@test.com', password='testpass123', role=role, **kwargs
+            )
+
+        self.pm = user('program_manager')
+        self.fa = user('field_associate', first_name='Faith')
+        self.mentor = user('mentor', first_name='Moses')
+        self.mentor.profile.assigned_villages.add(self.village)
+        self.mentor.profile.supervisor = self.fa
+        self.mentor.profile.save()
+
+        self.households = [
+            Household.objects.create(name=f'Household {i}', village=self.village, phone_number=f'07000000{i:02d}')
+            for i in range(3)
+        ]
+        Household.objects.create(name='Elsewhere', village=self.other_village)
+
+        now = timezone.now()
+        for household in self.households[:2]:
+            MentoringVisit.objects.create(
+                name='Visit', household=household, mentor=self.mentor, topic='Business', visit_date=now,
+                duration_minutes=30,
+            )
+        PhoneNudge.objects.create(
+            household=self.households[0], mentor=self.mentor, nudge_type='reminder', call_date=now,
+            duration_minutes=5,
+        )
+
+    def widget(self, user, name, status=200, **params):
+        self.client.force_login(user)
+        response = self.client.get(reverse('dashboard:widget', args=[name]), params)
+        self.assertEqual(response.status_code, status)
+        return response
+
+    def test_shells_defer_widgets(self):
+        """Dashboards render placeholders for their widgets instead of computing them"""
+        for user, widgets in (
+            (self.pm, ['kpis', 'alerts', 'enrollment_trend', 'team_performance', 'grant_distribution']),
+            (self.fa, ['data_quality_summary', 'mentor_performance']),
+            (self.mentor, ['mentor_households']),
+        ):
+            self.client.force_login(user)
+            response = self.client.get(reverse('dashboard:dashboard'))
+            self.assertEqual(response.status_code, 200)
+            for name in widgets:
+                self.assertContains(response, reverse('dashboard:widget', args=[name]))
+
+    def test_widget_is_cached_and_timed(self):
+        """The second load comes from cache without queries; timing is reported"""
+        response = self.widget(self.pm, 'geographic_distribution')
+        payload = response.json()
+        self.assertFalse(payload['cached'])
+        self.assertEqual(payload['data']['values'], [4])
+        self.assertIn('dur=', response['Server-Timing'])
+
+        self.client.force_login(self.pm)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('dashboard:widget', args=['geographic_distribution']))
+        self.assertTrue(response.json()['cached'])
+        # Only the session and user lookups of the request itself
+        self.assertLessEqual(len(queries), 2)
+
+    def test_widgets_follow_scope_and_roles(self):
+        """Mentors get their villages' data and cannot load other roles' widgets"""
+        self.assertEqual(self.widget(self.mentor, 'geographic_distribution').json()['data']['values'], [3])
+        self.widget(self.mentor, 'team_performance', status=404)
+        self.widget(self.mentor, 'no_such_widget', status=404)
+
+        kpis = self.widget(self.mentor, 'kpis').json()
+        self.assertEqual(kpis['data']['enrollment']['value'], 3)
+        self.assertIn('Total Enrollment', kpis['html'])
+
+    def test_team_and_mentor_performance(self):
+        """Team tables are aggregated per mentor and per Field Associate"""
+        rows = self.widget(self.pm, 'team_performance').json()['data']['rows']
+        self.assertEqual(rows, [{
+            'id': self.fa.id, 'name': self.fa.get_full_name() or self.fa.username, 'mentors': 1, 'households': 3,
+            'villages': 1, 'visits_this_month': 2, 'calls_this_month': 1, 'total_activity': 3,
+        }])
+
+        data = self.widget(self.fa, 'mentor_performance').json()['data']
+        self.assertEqual([(r['id'], r['visits_30d'], r['calls_30d'], r['total_duration']) for r in data['rows']],
+                         [(self.mentor.id, 2, 1, 65)])
+        self.assertEqual((data['totals']['activity'], data['totals']['hours'], data['totals']['minutes']), (3, 1, 5))
+
+    def test_mentor_households_are_paged(self):
+        """The mentor's household list pages by cursor; a bad cursor is a 400"""
+        page = self.widget(self.mentor, 'mentor_households').json()['data']
+        self.assertEqual([h['name'] for h in page['households']], ['Household 0', 'Household 1', 'Household 2'])
+        self.assertIsNone(page['next_cursor'])
+
+        page = self.widget(self.mentor, 'mentor_households', q='household 1').json()['data']
+        self.assertEqual([h['id'] for h in page['households']], [self.households[1].id])
+
+        self.widget(self.mentor, 'mentor_households', status=400, cursor='not-a-cursor')
+
+    def test_enrollment_trend_is_one_query(self):
+        """The cumulative trend is one grouped query however many months are requested"""
+        from .views import get_enrollment_trend
+
+        with self.assertNumQueries(1):
+            trend = get_enrollment_trend(months=24, village_ids=[self.village.id])
+        self.assertEqual(len(trend['labels']), 24)
+        self.assertEqual(trend['values'][-1], 3)
+        self.assertEqual(trend['labels'][-1], timezone.localdate().strftime('%b %Y'))
+
+
+class ActivityLogTests(TestCase):
+    """Tests for the merged activity stream, its summaries and the streaming export"""
+
+    def setUp(self):
+        uid = unique_id()
+        county = County.objects.create(name=f'County {uid}')
+        subcounty = SubCounty.objects.create(name=f'SubCounty {uid}', county=county)
+        village = Village.objects.create(name=f'Village {uid}', subcounty_obj=subcounty)
+        self.household = Household.objects.create(name='Wanjiku Household', village=village)
+
+        def user(role, **kwargs):
+            name = f'{role}_{unique_id()}'
+            return User.objects.create_user(
+                username=name, email=f'{name}@test.com', password='testpass123', role=role, **kwargs
+            )
+
+        self.pm = user('program_manager')
+        self.fa = user('field_associate')
+        self.mentor = user('mentor', first_name='Moses', last_name='Ekal')
+        self.mentor.profile.supervisor = self.fa
+        self.mentor.profile.save()
+        self.other_mentor = user('mentor', first_name='Ann')
+
+        # Two calls share a timestamp with the first visit
+        today = timezone.localdate()
+        self.same_time = timezone.make_aware(datetime(today.year, today.month, 1, 9, 0))
+        self.visits = [
+            MentoringVisit.objects.create(
+                name='Visit', household=self.household, mentor=self.mentor, topic=f'Topic {i}',
+                visit_date=self.same_time + timedelta(hours=i), duration_minutes=30,
+            )
+            for i in range(3)
+        ]
+        self.calls = [
+            PhoneNudge.objects.create(
+                household=self.household, mentor=mentor, nudge_type='check_in', call_date=self.same_time,
+                duration_minutes=10, notes='Checked in',
+            )
+            for mentor in (self.mentor, self.other_mentor)
+        ]
+
+    def test_stream_pages_merge_visits_and_calls(self):
+        """Walking every page returns each activity once, newest first"""
+        from .activity import activity_page
+
+        visits, calls = MentoringVisit.objects.all(), PhoneNudge.objects.all()
+        seen, cursor = [], None
+        while True:
+            with self.assertNumQueries(2):
+                page = activity_page(visits, calls, cursor=cursor, limit=2)
+            seen.extend((entry['kind'], entry['id']) for entry in page['activities'])
+            cursor = page['next_cursor']
+            if not cursor:
+                break
+
+        self.assertEqual(seen, [
+            ('visit', self.visits[2].id), ('visit', self.visits[1].id), ('visit', self.visits[0].id),
+            ('call', self.calls[1].id), ('call', self.calls[0].id),
+        ])
+
+    def test_export_pages_by_keyset(self):
+        """Export chunks follow the (date, id) keyset, so rows sharing a timestamp are written once"""
+        from .activity import activity_csv_rows
+
+        with self.assertNumQueries(3):
+            rows = list(activity_csv_rows(calls=PhoneNudge.objects.all(), chunk_size=1))
+        self.assertEqual([row[1] for row in rows[2:4]], ['Ann', 'Moses Ekal'])
+        self.assertEqual(rows[-1][:2], ['Total Calls:', 2])
+
+        rows = list(activity_csv_rows(visits=MentoringVisit.objects.all(), chunk_size=2))
+        self.assertEqual([row[5] for row in rows[2:5]], ['Topic 2', 'Topic 1', 'Topic 0'])
+
+    def test_view_summarizes_per_mentor(self):
+        """Totals come from grouped per-mentor rows; FAs see their mentors only"""
+        self.client.force_login(self.pm)
+        response = self.client.get(reverse('dashboard:activity_logs'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['total_visits'], 3)
+        self.assertEqual(response.context['total_calls'], 2)
+        self.assertEqual(response.context['total_duration'], 110)
+        self.assertEqual(
+            [(row['name'], row['visits'], row['calls'], row['minutes']) for row in response.context['mentor_summary']],
+            [('Moses Ekal', 3, 1, 100), ('Ann', 0, 1, 10)],
+        )
+
+        self.client.force_login(self.fa)
+        response = self.client.get(reverse('dashboard:activity_logs'), {'type': 'calls', 'cursor': 'bogus'})
+        self.assertEqual(response.context['total_activities'], 4)
+        self.assertEqual([entry['id'] for entry in response.context['activities']], [self.calls[0].id])
+
+    def test_export_streams_csv(self):
+        """The export is a streaming response with both sections and their totals"""
+        self.client.force_login(self.fa)
+        response = self.client.get(reverse('dashboard:export_activity_logs'), {'period': '6'})
+        self.assertTrue(response.streaming)
+        content = b''.join(response.streaming_content).decode()
+        self.assertIn('VISITS', content)
+        self.assertIn('Moses Ekal,Wanjiku Household,Scheduled Visit,30,Topic 2', content)
+        self.assertIn('Total Visits:,3,,,90 min', content)
+        self.assertIn('Total Calls:,1,,,10 min', content)
+
+        self.client.force_login(self.mentor)
+        self.assertEqual(self.client.get(reverse('dashboard:export_activity_logs')).status_code, 403)
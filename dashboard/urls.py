@@ -9,6 +9,7 @@ app_name = 'dashboard'
 
 urlpatterns = [
     path('', views.dashboard_view, name='dashboard'),
+    path('widgets/<slug:name>/', views.dashboard_widget, name='widget'),
     path('activity-logs/', views.activity_logs_view, name='activity_logs'),
     path('activity-logs/export/', views.export_activity_logs, name='export_activity_logs'),
 ]
\ No newline at end of file
@@ -3,33 +3,16 @@ Dashboard Views for UPG System
 Enhanced with visualizations borrowed from UPG Kaduna MIS
 """
 
-import json
+from collections import defaultdict
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
 from django.db.models import Count, Sum, Q
+from django.http import HttpResponseForbidden, JsonResponse, StreamingHttpResponse
 from django.db.models.functions import TruncMonth
 from django.utils import timezone
 from django.urls import reverse
 from datetime import timedelta
 
-# Try to import dateutil, fall back to manual calculation if not available
-try:
-    from dateutil.relativedelta import relativedelta
-except ImportError:
-    # Simple fallback for relativedelta
-    class relativedelta:
-        def __init__(self, months=0):
-            self.months = months
-
-        def __rsub__(self, other):
-            # Approximate month subtraction
-            year = other.year
-            month = other.month - self.months
-            while month <= 0:
-                month += 12
-                year -= 1
-            day = min(other.day, 28)  # Safe day for all months
-            return other.replace(year=year, month=month, day=day)
 from households.models import Household, HouseholdProgram
 from business_groups.models import BusinessGroup
 from upg_grants.models import SBGrant, PRGrant, HouseholdGrantApplication
@@ -37,6 +20,15 @@ from savings_groups.models import BusinessSavingsGroup
 from training.models import Training, MentoringVisit, PhoneNudge, MentoringReport, HouseholdTrainingEnrollment
 from core.models import BusinessMentorCycle
 from core.services import DataQualityService
+from core.permissions import get_user_accessible_villages
+from core.services.cache_service import SHORT_CACHE
+from core.services.timeseries import cumulative_monthly_counts
+from households.search import MAX_LIMIT, InvalidCursor, search_households
+from .activity import (
+    EXPORT_ROLES, activity_csv_rows, activity_mentors, activity_page, activity_period, activity_querysets,
+    activity_totals, monthly_breakdown, mentor_summary, stream_csv,
+)
+from .widgets import GLOBAL_ROLES, WIDGETS, dashboard_role, load_widget, register_widget
 
 
 # =============================================================================
@@ -45,41 +37,27 @@ from core.services import DataQualityService
 
 def get_enrollment_trend(months=6, village_ids=None):
     """
-    Get enrollment trend for the last N months.
-    Returns data formatted for Chart.js line chart.
+    Get enrollment trend (households registered by the end of each of the last N months).
+    Returns labels and values lists for a Chart.js line chart.
     """
-    labels = []
-    values = []
-
-    # Get data for the last N months
-    for i in range(months - 1, -1, -1):
-        month_date = timezone.now().date() - relativedelta(months=i)
-        month_start = month_date.replace(day=1)
-        month_end = (month_start + relativedelta(months=1)) - timedelta(days=1)
-
-        queryset = Household.objects.filter(
-            created_at__date__lte=month_end
-        )
-        if village_ids:
-            queryset = queryset.filter(village_id__in=village_ids)
-
-        count = queryset.count()
-        labels.append(month_date.strftime('%b %Y'))
-        values.append(count)
+    queryset = Household.objects.all()
+    if village_ids is not None:
+        queryset = queryset.filter(village_id__in=village_ids)
 
+    series = cumulative_monthly_counts(queryset, 'created_at', months)
     return {
-        'labels': json.dumps(labels),
-        'values': json.dumps(values)
+        'labels': [month.strftime('%b %Y') for month, _ in series],
+        'values': [total for _, total in series]
     }
 
 
 def get_status_distribution(village_ids=None):
     """
     Get household participation status distribution.
-    Returns data formatted for Chart.js doughnut chart.
+    Returns labels, values and colors lists for a Chart.js doughnut chart.
     """
     queryset = HouseholdProgram.objects.all()
-    if village_ids:
+    if village_ids is not None:
         queryset = queryset.filter(household__village_id__in=village_ids)
 
     status_counts = queryset.values('participation_status').annotate(
@@ -114,19 +92,19 @@ def get_status_distribution(village_ids=None):
         colors.append(color_map.get(status, 'rgba(54, 162, 235, 0.8)'))
 
     return {
-        'labels': json.dumps(labels),
-        'values': json.dumps(values),
-        'colors': json.dumps(colors)
+        'labels': labels,
+        'values': values,
+        'colors': colors
     }
 
 
 def get_geographic_distribution(village_ids=None):
     """
     Get household distribution by subcounty/village.
-    Returns data formatted for Chart.js horizontal bar chart.
+    Returns labels and values lists for a Chart.js horizontal bar chart.
     """
     queryset = Household.objects.all()
-    if village_ids:
+    if village_ids is not None:
         queryset = queryset.filter(village_id__in=village_ids)
 
     # Group by subcounty
@@ -145,8 +123,8 @@ def get_geographic_distribution(village_ids=None):
         values.append(item['count'])
 
     return {
-        'labels': json.dumps(labels),
-        'values': json.dumps(values)
+        'labels': labels,
+        'values': values
     }
 
 
@@ -160,13 +138,13 @@ def get_grant_distribution():
     household_count = HouseholdGrantApplication.objects.filter(status='disbursed').count()
 
     return {
-        'labels': json.dumps(['SB Grants', 'PR Grants', 'Household Grants']),
-        'values': json.dumps([sb_count, pr_count, household_count]),
-        'colors': json.dumps([
+        'labels': ['SB Grants', 'PR Grants', 'Household Grants'],
+        'values': [sb_count, pr_count, household_count],
+        'colors': [
             'rgba(54, 162, 235, 0.8)',
             'rgba(255, 99, 132, 0.8)',
             'rgba(75, 192, 192, 0.8)'
-        ])
+        ]
     }
 
 
@@ -182,7 +160,7 @@ def get_dashboard_alerts(user=None, village_ids=None):
     pending_grants_query = HouseholdGrantApplication.objects.filter(
         status__in=['submitted', 'under_review']
     )
-    if village_ids:
+    if village_ids is not None:
         pending_grants_query = pending_grants_query.filter(
             household__village_id__in=village_ids
         )
@@ -204,7 +182,7 @@ def get_dashboard_alerts(user=None, village_ids=None):
     no_program_query = Household.objects.filter(
         program_participations__isnull=True
     )
-    if village_ids:
+    if village_ids is not None:
         no_program_query = no_program_query.filter(village_id__in=village_ids)
     no_program = no_program_query.count()
 
@@ -255,7 +233,7 @@ def calculate_kpis(village_ids=None):
     queryset = Household.objects.all()
     program_queryset = HouseholdProgram.objects.all()
 
-    if village_ids:
+    if village_ids is not None:
         queryset = queryset.filter(village_id__in=village_ids)
         program_queryset = program_queryset.filter(household__village_id__in=village_ids)
 
@@ -307,28 +285,255 @@ def calculate_kpis(village_ids=None):
     }
 
 
+# =============================================================================
+# Dashboard Widgets (loaded as JSON after the dashboard shell renders)
+# =============================================================================
+
+def _activity_by_mentor(mentor_ids, since):
+    """
+    This period's visit and call counts and minutes per mentor, with one
+    grouped query per activity type.
+
+    Returns:
+        dict: mentor_id -> {'visits', 'calls', 'visit_duration', 'call_duration'}
+    """
+    activity = defaultdict(lambda: {'visits': 0, 'calls': 0, 'visit_duration': 0, 'call_duration': 0})
+    visits = MentoringVisit.objects.filter(visit_date__gte=since)
+    calls = PhoneNudge.objects.filter(call_date__gte=since)
+    if mentor_ids is not None:
+        visits = visits.filter(mentor_id__in=mentor_ids)
+        calls = calls.filter(mentor_id__in=mentor_ids)
+
+    for row in visits.order_by().values('mentor_id').annotate(count=Count('id'), minutes=Sum('duration_minutes')):
+        activity[row['mentor_id']].update(visits=row['count'], visit_duration=row['minutes'] or 0)
+    for row in calls.order_by().values('mentor_id').annotate(count=Count('id'), minutes=Sum('duration_minutes')):
+        activity[row['mentor_id']].update(calls=row['count'], call_duration=row['minutes'] or 0)
+    return activity
+
+
+def _mentor_villages(mentor_ids):
+    """mentor_id -> set of assigned village IDs, in one query"""
+    from accounts.models import UserProfile
+
+    villages = defaultdict(set)
+    for mentor_id, village_id in UserProfile.assigned_villages.through.objects.filter(
+        userprofile__user_id__in=mentor_ids
+    ).values_list('userprofile__user_id', 'village_id'):
+        villages[mentor_id].add(village_id)
+    return villages
+
+
+def get_mentor_households(user, village_ids):
+    """Households in the mentor's assigned villages, else in the mentor's trainings"""
+    if village_ids:
+        return Household.objects.filter(village_id__in=village_ids)
+    # Fallback to households in mentor's trainings
+    return Household.objects.filter(current_training_enrollment__training__assigned_mentor=user)
+
+
+def _households_by_village(village_ids):
+    return dict(
+        Household.objects.filter(village_id__in=village_ids).order_by().values('village_id').annotate(
+            count=Count('id')
+        ).values_list('village_id', 'count')
+    )
+
+
+@register_widget('enrollment_trend')
+def enrollment_trend_widget(user, village_ids, params):
+    return get_enrollment_trend(months=6, village_ids=village_ids)
+
+
+@register_widget('status_distribution')
+def status_distribution_widget(user, village_ids, params):
+    return get_status_distribution(village_ids)
+
+
+@register_widget('geographic_distribution')
+def geographic_distribution_widget(user, village_ids, params):
+    return get_geographic_distribution(village_ids)
+
+
+@register_widget('grant_distribution', roles=GLOBAL_ROLES)
+def grant_distribution_widget(user, village_ids, params):
+    return get_grant_distribution()
+
+
+@register_widget('kpis', template='dashboard/widgets/kpis.html')
+def kpis_widget(user, village_ids, params):
+    return calculate_kpis(village_ids)
+
+
+@register_widget('alerts', template='dashboard/widgets/alerts.html')
+def alerts_widget(user, village_ids, params):
+    return get_dashboard_alerts(user=user, village_ids=village_ids)
+
+
+def _data_quality(user, village_ids, params):
+    if village_ids == []:
+        # No villages assigned: nothing to report on
+        return DataQualityService.build_report({'total': 0})
+    return DataQualityService.get_quality_report(village_ids)
+
+
+register_widget('data_quality', template='dashboard/widgets/data_quality.html')(_data_quality)
+register_widget('data_quality_summary', template='dashboard/widgets/data_quality_summary.html')(_data_quality)
+
+
+@register_widget('team_performance', roles=('program_manager',), template='dashboard/widgets/team_performance.html')
+def team_performance_widget(user, village_ids, params):
+    """Field Associate performance this month: their mentors, villages, households and activity"""
+    from accounts.models import User
+
+    month_start = timezone.now().date().replace(day=1)
+    field_associates = list(User.objects.filter(role='field_associate', is_active=True))
+    supervisor_of = dict(User.objects.filter(
+        role='mentor', is_active=True, profile__supervisor__in=field_associates
+    ).values_list('id', 'profile__supervisor_id'))
+
+    mentor_villages = _mentor_villages(list(supervisor_of))
+    fa_mentors = defaultdict(list)
+    fa_villages = defaultdict(set)
+    for mentor_id, fa_id in supervisor_of.items():
+        fa_mentors[fa_id].append(mentor_id)
+        fa_villages[fa_id].update(mentor_villages[mentor_id])
+
+    households = _households_by_village(set().union(*fa_villages.values()))
+    activity = _activity_by_mentor(list(supervisor_of), month_start)
+
+    fa_performance = []
+    for fa in field_associates:
+        visits = sum(activity[m]['visits'] for m in fa_mentors[fa.id])
+        calls = sum(activity[m]['calls'] for m in fa_mentors[fa.id])
+        fa_performance.append({
+            'id': fa.id,
+            'name': fa.get_full_name() or fa.username,
+            'mentors': len(fa_mentors[fa.id]),
+            'households': sum(households.get(v, 0) for v in fa_villages[fa.id]),
+            'villages': len(fa_villages[fa.id]),
+            'visits_this_month': visits,
+            'calls_this_month': calls,
+            'total_activity': visits + calls,
+        })
+
+    # Most active first, top 10
+    fa_performance.sort(key=lambda x: x['total_activity'], reverse=True)
+    return {'field_associates': len(field_associates), 'rows': fa_performance[:10]}
+
+
+@register_widget('mentor_performance', roles=('field_associate',),
+                 template='dashboard/widgets/mentor_performance.html', per_user=True)
+def mentor_performance_widget(user, village_ids, params):
+    """This month's activity of the Field Associate and each supervised mentor"""
+    from accounts.models import User
+
+    month_start = timezone.now().date().replace(day=1)
+    mentors = list(User.objects.filter(role='mentor', is_active=True, profile__supervisor=user))
+    mentor_villages = _mentor_villages([m.id for m in mentors])
+    households = _households_by_village(village_ids)
+    activity = _activity_by_mentor([m.id for m in mentors] + [user.id], month_start)
+
+    def row(person, name, villages):
+        counts = activity[person.id]
+        return {
+            'id': person.id,
+            'name': name,
+            'households': sum(households.get(v, 0) for v in villages),
+            'villages': len(villages),
+            'visits_30d': counts['visits'],
+            'calls_30d': counts['calls'],
+            'visit_duration': counts['visit_duration'],
+            'call_duration': counts['call_duration'],
+            'total_activity': counts['visits'] + counts['calls'],
+            'total_duration': counts['visit_duration'] + counts['call_duration'],
+        }
+
+    rows = []
+    own = row(user, (user.get_full_name() or user.username) + ' (You)', village_ids)
+    if own['total_activity']:
+        rows.append(dict(own, is_fa=True))
+    rows.extend(row(m, m.get_full_name() or m.username, mentor_villages[m.id]) for m in mentors)
+
+    # Most active first, the FA's own row on top
+    rows.sort(key=lambda x: (not x.get('is_fa', False), -x['total_activity']))
+
+    total_duration = sum(r['total_duration'] for r in rows)
+    return {
+        'rows': rows,
+        'totals': {
+            'visits': sum(r['visits_30d'] for r in rows),
+            'calls': sum(r['calls_30d'] for r in rows),
+            'activity': sum(r['total_activity'] for r in rows),
+            'hours': total_duration // 60,
+            'minutes': total_duration % 60,
+        },
+    }
+
+
+@register_widget('staff_activity', roles=('me',), template='dashboard/widgets/staff_activity.html')
+def staff_activity_widget(user, village_ids, params):
+    """Staff (mentors, FAs, PMs) with visits or calls this month, most active first"""
+    from accounts.models import User
+
+    month_start = timezone.now().date().replace(day=1)
+    activity = _activity_by_mentor(None, month_start)
+    staff_activity = []
+    for staff in User.objects.filter(id__in=list(activity), is_active=True):
+        counts = activity[staff.id]
+        staff_activity.append({
+            'id': staff.id,
+            'name': staff.get_full_name() or staff.username,
+            'role': staff.get_role_display() if hasattr(staff, 'get_role_display') else staff.role,
+            'visits': counts['visits'],
+            'calls': counts['calls'],
+            'total': counts['visits'] + counts['calls'],
+        })
+    staff_activity.sort(key=lambda x: x['total'], reverse=True)
+    return {'rows': staff_activity[:10]}
+
+
+@register_widget('mentor_households', roles=('mentor',), timeout=SHORT_CACHE, params=('q', 'cursor'),
+                 per_user=True)
+def mentor_households_widget(user, village_ids, params):
+    """One page of the mentor's households (see households.search.search_households)"""
+    return search_households(
+        get_mentor_households(user, village_ids), query=params.get('q', ''), cursor=params.get('cursor'),
+        limit=MAX_LIMIT,
+    )
+
+
+@login_required
+def dashboard_widget(request, name):
+    """JSON for one dashboard widget, with its compute time in a Server-Timing header"""
+    widget = WIDGETS.get(name)
+    if widget is None or dashboard_role(request.user) not in widget.roles:
+        return JsonResponse({'success': False, 'error': 'Widget not found'}, status=404)
+
+    try:
+        payload = load_widget(widget, request.user, request.GET)
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+
+    response = JsonResponse({'success': True, **payload})
+    source = 'cache' if payload['cached'] else 'db'
+    response['Server-Timing'] = f'{name};desc="{source}";dur={payload["elapsed_ms"]}'
+    return response
+
+
 @login_required
 def dashboard_view(request):
     """Role-based dashboard routing"""
-    user = request.user
-    user_role = getattr(user, 'role', None)
-
     # Route to specific dashboard based on role
     # Hierarchy: Admin/ICT -> PM -> M&E -> Field Associate -> Mentor
-    if user.is_superuser or user_role == 'ict_admin':
-        return admin_dashboard_view(request)
-    elif user_role == 'program_manager':
-        return pm_dashboard_view(request)
-    elif user_role == 'mentor':
-        return mentor_dashboard_view(request)
-    elif user_role in ['county_executive', 'county_assembly']:
-        return executive_dashboard_view(request)
-    elif user_role in ['me_staff', 'cco_director']:
-        return me_dashboard_view(request)
-    elif user_role == 'field_associate':
-        return field_associate_dashboard_view(request)
-    else:
-        return general_dashboard_view(request)
+    views = {
+        'admin': admin_dashboard_view,
+        'program_manager': pm_dashboard_view,
+        'mentor': mentor_dashboard_view,
+        'executive': executive_dashboard_view,
+        'me': me_dashboard_view,
+        'field_associate': field_associate_dashboard_view,
+    }
+    return views.get(dashboard_role(request.user), general_dashboard_view)(request)
 
 
 @login_required
@@ -435,25 +640,7 @@ def admin_dashboard_view(request):
         # M&E and directors see all data
         pass
 
-    # =========================================================================
-    # NEW: Enhanced Dashboard Data (Borrowed from UPG Kaduna MIS)
-    # =========================================================================
-
-    # Chart Data
-    enrollment_trend = get_enrollment_trend(months=6)
-    status_distribution = get_status_distribution()
-    geographic_distribution = get_geographic_distribution()
-    grant_distribution = get_grant_distribution()
-
-    # KPIs with targets
-    kpis = calculate_kpis()
-
-    # Alerts
-    alerts = get_dashboard_alerts(user=user)
-
-    # Data Quality
-    data_quality = DataQualityService.get_quality_report()
-
+    # Charts, KPIs, alerts and data quality load as widgets (dashboard_widget)
     context = {
         'user': user,
         'stats': stats,
@@ -461,14 +648,6 @@ def admin_dashboard_view(request):
         'geographic_coverage': geographic_coverage,
         'financial_metrics': financial_metrics,
         'training_progress': training_progress,
-        # New enhanced data
-        'enrollment_trend': enrollment_trend,
-        'status_distribution': status_distribution,
-        'geographic_distribution': geographic_distribution,
-        'grant_distribution': grant_distribution,
-        'kpis': kpis,
-        'alerts': alerts,
-        'data_quality': data_quality,
     }
 
     return render(request, 'dashboard/admin_dashboard.html', context)
@@ -483,7 +662,6 @@ def mentor_dashboard_view(request):
     assigned_trainings = Training.objects.filter(assigned_mentor=user).order_by('-start_date')
 
     # Get current/active trainings (includes trainings without end_date)
-    from django.db.models import Q
     current_date = timezone.now().date()
     current_trainings = assigned_trainings.filter(
         Q(status__in=['planned', 'active']) &
@@ -491,73 +669,38 @@ def mentor_dashboard_view(request):
         (Q(end_date__gte=current_date) | Q(end_date__isnull=True))
     )
 
-    # Get households in mentor's assigned villages (more comprehensive)
-    # Ensure profile exists (defensive coding for edge cases)
-    from accounts.models import UserProfile
-    try:
-        profile = user.profile
-    except (AttributeError, UserProfile.DoesNotExist):
-        # Create profile if it doesn't exist
-        profile, _ = UserProfile.objects.get_or_create(user=user)
-
-    assigned_villages = []
-    if profile:
-        try:
-            assigned_villages = profile.assigned_villages.all()
-        except (AttributeError, TypeError):
-            # Handle case where assigned_villages might be a list instead of QuerySet
-            assigned_villages = getattr(profile, 'assigned_villages', [])
-            if not hasattr(assigned_villages, 'all'):
-                assigned_villages = list(assigned_villages) if assigned_villages else []
-
-    if assigned_villages:
-        mentor_households = Household.objects.filter(village__in=assigned_villages).distinct()
-    else:
-        # Fallback to households in mentor's trainings
-        mentor_households = Household.objects.filter(
-            current_training_enrollment__training__assigned_mentor=user
-        ).distinct()
+    # The household list itself loads as the mentor_households widget
+    mentor_households = get_mentor_households(user, get_user_accessible_villages(user))
 
     # Date ranges - Current month for accurate "this month" counts
     today = timezone.now().date()
     month_start = today.replace(day=1)
     thirty_days_ago = today - timedelta(days=30)
 
-    # Current month activities for stats
-    month_visits = MentoringVisit.objects.filter(
-        mentor=user,
-        visit_date__gte=month_start
-    ).order_by('-visit_date')
-
-    month_nudges = PhoneNudge.objects.filter(
-        mentor=user,
-        call_date__gte=month_start
-    ).order_by('-call_date')
-
     # Recent activities (last 30 days) for display
     recent_visits = MentoringVisit.objects.filter(
         mentor=user,
         visit_date__gte=thirty_days_ago
-    ).order_by('-visit_date')
+    ).select_related('household').order_by('-visit_date')
 
     recent_nudges = PhoneNudge.objects.filter(
         mentor=user,
         call_date__gte=thirty_days_ago
-    ).order_by('-call_date')
+    ).select_related('household').order_by('-call_date')
 
     # Grant statistics for mentor's households
     mentor_grant_applications = HouseholdGrantApplication.objects.filter(
         household__in=mentor_households
     ).select_related('household', 'program')
 
-    grant_stats = {
-        'total_applications': mentor_grant_applications.count(),
-        'applied': mentor_grant_applications.filter(status__in=['submitted', 'draft']).count(),
-        'under_review': mentor_grant_applications.filter(status='under_review').count(),
-        'approved': mentor_grant_applications.filter(status='approved').count(),
-        'disbursed': mentor_grant_applications.filter(status='disbursed').count(),
-        'rejected': mentor_grant_applications.filter(status='rejected').count(),
-    }
+    grant_stats = mentor_grant_applications.aggregate(
+        total_applications=Count('id'),
+        applied=Count('id', filter=Q(status__in=['submitted', 'draft'])),
+        under_review=Count('id', filter=Q(status='under_review')),
+        approved=Count('id', filter=Q(status='approved')),
+        disbursed=Count('id', filter=Q(status='disbursed')),
+        rejected=Count('id', filter=Q(status='rejected')),
+    )
 
     # Recent grant applications (last 5)
     recent_grants = mentor_grant_applications.order_by('-created_at')[:5]
@@ -567,66 +710,29 @@ def mentor_dashboard_view(request):
         'assigned_trainings': assigned_trainings.count(),
         'active_trainings': current_trainings.count(),
         'total_households': mentor_households.count(),
-        'visits_this_month': month_visits.count(),
-        'nudges_this_month': month_nudges.count(),
+        'visits_this_month': MentoringVisit.objects.filter(mentor=user, visit_date__gte=month_start).count(),
+        'nudges_this_month': PhoneNudge.objects.filter(mentor=user, call_date__gte=month_start).count(),
         'pending_reports': 0,  # Can be calculated based on reporting schedule
         'total_grant_applications': grant_stats['total_applications'],
     }
 
     # Upcoming activities (next 7 days)
     upcoming_trainings = assigned_trainings.filter(
-        start_date__gte=timezone.now().date(),
-        start_date__lte=timezone.now().date() + timedelta(days=7)
+        start_date__gte=today,
+        start_date__lte=today + timedelta(days=7)
     )
 
-    # Get village IDs for the mentor
-    village_ids = None
-    if assigned_villages:
-        if hasattr(assigned_villages, 'values_list'):
-            village_ids = list(assigned_villages.values_list('id', flat=True))
-        else:
-            village_ids = [v.id for v in assigned_villages] if assigned_villages else None
-
-    # Enhanced: Data quality for mentor's villages
-    data_quality = DataQualityService.get_quality_report(village_ids)
-
-    # Enhanced: Alerts for mentor
-    alerts = get_dashboard_alerts(user=user, village_ids=village_ids)
-
-    # Enhanced: Progress indicators
-    total_households_count = mentor_households.count() if mentor_households else 0
-    visited_this_month = month_visits.count()
-    visit_target = max(total_households_count, 1)  # At least visit each household once
-
-    progress_indicators = {
-        'household_visits': {
-            'label': 'Household Visits This Month',
-            'current': visited_this_month,
-            'target': visit_target,
-        },
-        'grant_applications': {
-            'label': 'Grant Applications',
-            'current': grant_stats['disbursed'],
-            'target': grant_stats['total_applications'] or 1,
-        }
-    }
-
     context = {
         'user': user,
         'stats': stats,
         'assigned_trainings': assigned_trainings[:5],  # Latest 5
         'current_trainings': current_trainings,
-        'mentor_households': mentor_households,  # All assigned households
         'recent_visits': recent_visits[:5],
         'recent_nudges': recent_nudges[:5],
         'upcoming_trainings': upcoming_trainings,
         'grant_stats': grant_stats,
         'recent_grants': recent_grants,
         'dashboard_type': 'mentor',
-        # Enhanced data
-        'data_quality': data_quality,
-        'alerts': alerts,
-        'progress_indicators': progress_indicators,
     }
 
     return render(request, 'dashboard/mentor_dashboard.html', context)
@@ -663,25 +769,11 @@ def executive_dashboard_view(request):
         'active_business_groups': BusinessGroup.objects.filter(participation_status='active').count(),
     }
 
-    # Enhanced: KPIs for executive view
-    kpis = calculate_kpis()
-
-    # Enhanced: Chart data
-    enrollment_trend = get_enrollment_trend(months=6)
-    status_distribution = get_status_distribution()
-    geographic_distribution = get_geographic_distribution()
-    grant_distribution = get_grant_distribution()
-
+    # KPIs and charts load as widgets (dashboard_widget)
     context = {
         'user': user,
         'stats': stats,
         'dashboard_type': 'executive',
-        # Enhanced data
-        'kpis': kpis,
-        'enrollment_trend': enrollment_trend,
-        'status_distribution': status_distribution,
-        'geographic_distribution': geographic_distribution,
-        'grant_distribution': grant_distribution,
     }
 
     return render(request, 'dashboard/executive_dashboard.html', context)
@@ -729,62 +821,13 @@ def me_dashboard_view(request):
         call_date__gte=month_start
     ).select_related('household', 'mentor', 'household__village').order_by('-call_date')[:10]
 
-    # Staff activity summary - Include all users who recorded visits (Mentors, FAs, PMs)
-    from django.db.models import Count
-    staff_activity = []
-    from accounts.models import User
-
-    # Get all users who have recorded any visits or calls this month
-    users_with_visits = MentoringVisit.objects.filter(
-        visit_date__gte=month_start
-    ).values_list('mentor_id', flat=True).distinct()
-
-    users_with_calls = PhoneNudge.objects.filter(
-        call_date__gte=month_start
-    ).values_list('mentor_id', flat=True).distinct()
-
-    active_user_ids = set(users_with_visits) | set(users_with_calls)
-    active_users = User.objects.filter(id__in=active_user_ids, is_active=True)
-
-    for staff in active_users:
-        visit_count = MentoringVisit.objects.filter(
-            mentor=staff,
-            visit_date__gte=month_start
-        ).count()
-        call_count = PhoneNudge.objects.filter(
-            mentor=staff,
-            call_date__gte=month_start
-        ).count()
-        staff_activity.append({
-            'mentor': staff,
-            'visits': visit_count,
-            'calls': call_count,
-            'total': visit_count + call_count,
-            'role': staff.get_role_display() if hasattr(staff, 'get_role_display') else staff.role
-        })
-
-    # Sort by total activity
-    staff_activity.sort(key=lambda x: x['total'], reverse=True)
-    mentor_activity = staff_activity  # Keep variable name for template compatibility
-
-    # Enhanced: Data quality report for M&E
-    data_quality = DataQualityService.get_quality_report()
-
-    # Enhanced: Chart data for M&E
-    enrollment_trend = get_enrollment_trend(months=6)
-    status_distribution = get_status_distribution()
-
+    # Staff activity, data quality and charts load as widgets (dashboard_widget)
     context = {
         'user': user,
         'stats': stats,
         'recent_visits': recent_visits,
         'recent_calls': recent_calls,
-        'mentor_activity': mentor_activity[:10],  # Top 10 most active mentors
         'dashboard_type': 'me',
-        # Enhanced data
-        'data_quality': data_quality,
-        'enrollment_trend': enrollment_trend,
-        'status_distribution': status_distribution,
     }
 
     return render(request, 'dashboard/me_dashboard.html', context)
@@ -853,52 +896,7 @@ def pm_dashboard_view(request):
         'calls_this_month': PhoneNudge.objects.filter(call_date__gte=month_start).count(),
     }
 
-    # Field Associate Performance Summary
-    # FA supervises mentors -> mentors have villages -> villages have households
-    fa_performance = []
-    for fa in field_associates:
-        # Get mentors supervised by this FA
-        fa_mentors = User.objects.filter(
-            role='mentor',
-            is_active=True,
-            profile__supervisor=fa
-        )
-
-        # Get all villages from those mentors
-        fa_village_ids = []
-        for mentor in fa_mentors:
-            if hasattr(mentor, 'profile') and mentor.profile:
-                mentor_villages = list(mentor.profile.assigned_villages.values_list('id', flat=True))
-                fa_village_ids.extend(mentor_villages)
-        fa_village_ids = list(set(fa_village_ids))  # Remove duplicates
-
-        # Count households in those villages
-        fa_households = Household.objects.filter(village_id__in=fa_village_ids).count() if fa_village_ids else 0
-
-        # Count mentoring activities by FA's mentors (this month)
-        fa_visits = MentoringVisit.objects.filter(
-            mentor__in=fa_mentors,
-            visit_date__gte=month_start
-        ).count()
-
-        fa_calls = PhoneNudge.objects.filter(
-            mentor__in=fa_mentors,
-            call_date__gte=month_start
-        ).count()
-
-        fa_performance.append({
-            'user': fa,
-            'name': fa.get_full_name() or fa.username,
-            'mentors': fa_mentors.count(),
-            'households': fa_households,
-            'villages': len(fa_village_ids),
-            'visits_this_month': fa_visits,
-            'calls_this_month': fa_calls,
-            'total_activity': fa_visits + fa_calls,
-        })
-
-    # Sort by total activity (most active first)
-    fa_performance.sort(key=lambda x: x['total_activity'], reverse=True)
+    # Field Associate performance loads as the team_performance widget
 
     # Program Progress - Milestones overview
     from households.models import UPGMilestone
@@ -917,34 +915,15 @@ def pm_dashboard_view(request):
         status__in=['submitted', 'under_review']
     ).select_related('household', 'program').order_by('-created_at')[:5]
 
-    # Chart data
-    enrollment_trend = get_enrollment_trend(months=6)
-    status_distribution = get_status_distribution()
-    geographic_distribution = get_geographic_distribution()
-    grant_distribution = get_grant_distribution()
-
-    # KPIs
-    kpis = calculate_kpis()
-
-    # Alerts for PM
-    alerts = get_dashboard_alerts(user=user)
-
+    # Charts, KPIs and alerts load as widgets (dashboard_widget)
     context = {
         'user': user,
         'stats': stats,
-        'fa_performance': fa_performance[:10],  # Top 10 Field Associates
         'field_associates': field_associates,
         'mentors': mentors,
         'milestone_stats': milestone_stats,
         'pending_grants': pending_grants,
         'dashboard_type': 'program_manager',
-        # Chart data
-        'enrollment_trend': enrollment_trend,
-        'status_distribution': status_distribution,
-        'geographic_distribution': geographic_distribution,
-        'grant_distribution': grant_distribution,
-        'kpis': kpis,
-        'alerts': alerts,
     }
 
     return render(request, 'dashboard/pm_dashboard.html', context)
@@ -973,22 +952,9 @@ def field_associate_dashboard_view(request):
         profile__supervisor=user
     ).select_related('profile')
 
-    # Get ALL villages from supervised mentors (not FA's own villages)
     # Villages are assigned to mentors, FA sees villages through their mentors
-    village_ids = []
-    all_villages = Village.objects.none()
-
-    for mentor in supervised_mentors:
-        if hasattr(mentor, 'profile') and mentor.profile:
-            mentor_village_ids = list(mentor.profile.assigned_villages.values_list('id', flat=True))
-            village_ids.extend(mentor_village_ids)
-
-    # Remove duplicates
-    village_ids = list(set(village_ids))
-
-    # Get all villages for display
-    if village_ids:
-        all_villages = Village.objects.filter(id__in=village_ids)
+    village_ids = get_user_accessible_villages(user)
+    all_villages = Village.objects.filter(id__in=village_ids)
 
     # Get households in all villages from supervised mentors
     fa_households = Household.objects.filter(village_id__in=village_ids) if village_ids else Household.objects.none()
@@ -1054,89 +1020,15 @@ def field_associate_dashboard_view(request):
         'total_minutes': total_month_duration % 60,
     }
 
-    # Mentor performance summary - Use current month for accurate counts
-    # Include FA's own performance first
-    mentor_performance = []
-
-    # Add FA's own activity first
-    fa_month_visits = MentoringVisit.objects.filter(mentor=user, visit_date__gte=month_start)
-    fa_month_calls = PhoneNudge.objects.filter(mentor=user, call_date__gte=month_start)
-    fa_visits_count = fa_month_visits.count()
-    fa_calls_count = fa_month_calls.count()
-    fa_visit_duration = fa_month_visits.aggregate(total=Sum('duration_minutes'))['total'] or 0
-    fa_call_duration = fa_month_calls.aggregate(total=Sum('duration_minutes'))['total'] or 0
-
-    if fa_visits_count > 0 or fa_calls_count > 0:
-        mentor_performance.append({
-            'mentor': user,
-            'name': (user.get_full_name() or user.username) + ' (You)',
-            'households': fa_households.count() if fa_households else 0,
-            'villages': len(village_ids),
-            'visits_30d': fa_visits_count,
-            'calls_30d': fa_calls_count,
-            'visit_duration': fa_visit_duration,
-            'call_duration': fa_call_duration,
-            'total_activity': fa_visits_count + fa_calls_count,
-            'total_duration': fa_visit_duration + fa_call_duration,
-            'is_fa': True,
-        })
-
-    # Add supervised mentors' performance
-    for mentor in supervised_mentors:
-        mentor_villages = []
-        if hasattr(mentor, 'profile') and mentor.profile:
-            mentor_villages = list(mentor.profile.assigned_villages.values_list('id', flat=True))
-
-        mentor_households = Household.objects.filter(village_id__in=mentor_villages).count() if mentor_villages else 0
-
-        # Current month visits and calls
-        mentor_month_visits = MentoringVisit.objects.filter(
-            mentor=mentor,
-            visit_date__gte=month_start
-        )
-        mentor_month_calls = PhoneNudge.objects.filter(
-            mentor=mentor,
-            call_date__gte=month_start
-        )
-
-        mentor_visits_count = mentor_month_visits.count()
-        mentor_calls_count = mentor_month_calls.count()
-        mentor_visit_duration = mentor_month_visits.aggregate(total=Sum('duration_minutes'))['total'] or 0
-        mentor_call_duration = mentor_month_calls.aggregate(total=Sum('duration_minutes'))['total'] or 0
-
-        mentor_performance.append({
-            'mentor': mentor,
-            'name': mentor.get_full_name() or mentor.username,
-            'households': mentor_households,
-            'villages': len(mentor_villages),
-            'visits_30d': mentor_visits_count,
-            'calls_30d': mentor_calls_count,
-            'visit_duration': mentor_visit_duration,
-            'call_duration': mentor_call_duration,
-            'total_activity': mentor_visits_count + mentor_calls_count,
-            'total_duration': mentor_visit_duration + mentor_call_duration,
-        })
-
-    # Sort by total activity (most active first), but keep FA at top if they have activity
-    mentor_performance.sort(key=lambda x: (not x.get('is_fa', False), -x['total_activity']))
-
-    # Enhanced: Alerts for FA (based on villages from their mentors)
-    alerts = get_dashboard_alerts(user=user, village_ids=village_ids)
-
-    # Enhanced: Data quality for FA's villages (from mentors)
-    data_quality = DataQualityService.get_quality_report(village_ids)
-
+    # Mentor performance and data quality load as widgets (dashboard_widget)
     context = {
         'user': user,
         'stats': stats,
         'supervised_mentors': supervised_mentors,
-        'mentor_performance': mentor_performance,
         'all_villages': all_villages,
         'recent_visits': recent_visits[:10],
         'recent_calls': recent_calls[:10],
         'dashboard_type': 'field_associate',
-        'alerts': alerts,
-        'data_quality': data_quality,
     }
 
     return render(request, 'dashboard/field_associate_dashboard.html', context)
@@ -1170,11 +1062,8 @@ def activity_logs_view(request):
     Activity logs view showing visits and calls with filtering options.
     Accessible to FA, M&E, PM, and Admin.
     Shows monthly records by default with options for 1, 6, or 12 month periods.
+    Visits and calls are listed as one stream, newest first, paged by cursor.
     """
-    from accounts.models import User
-    from django.db.models import Sum
-    from calendar import monthrange
-
     user = request.user
 
     # Get filter parameters
@@ -1182,137 +1071,50 @@ def activity_logs_view(request):
     mentor_id = request.GET.get('mentor', '')
     activity_type = request.GET.get('type', 'all')  # 'all', 'visits', 'calls'
 
-    # Calculate date range based on period
-    today = timezone.now().date()
+    start_date, end_date, period_label = activity_period(period)
+    available_mentors, mentor_filter = activity_mentors(user, mentor_id)
+    visits, calls = activity_querysets(start_date, end_date, mentor_filter)
 
-    if period == '1':
-        # Current month
-        start_date = today.replace(day=1)
-        _, last_day = monthrange(today.year, today.month)
-        end_date = today.replace(day=last_day)
-        period_label = today.strftime('%B %Y')
-    elif period == '6':
-        # Last 6 months
-        start_date = today - relativedelta(months=6)
-        end_date = today
-        period_label = f"Last 6 Months ({start_date.strftime('%b %Y')} - {end_date.strftime('%b %Y')})"
-    elif period == '12':
-        # Last 12 months
-        start_date = today - relativedelta(months=12)
-        end_date = today
-        period_label = f"Last 12 Months ({start_date.strftime('%b %Y')} - {end_date.strftime('%b %Y')})"
-    else:
-        # Default to current month
-        start_date = today.replace(day=1)
-        _, last_day = monthrange(today.year, today.month)
-        end_date = today.replace(day=last_day)
-        period_label = today.strftime('%B %Y')
-
-    # Determine which mentors to show based on role
-    mentor_filter = None
-    available_mentors = User.objects.none()
-
-    if user.role == 'field_associate':
-        # FA sees their supervised mentors
-        supervised_mentors = User.objects.filter(
-            role='mentor',
-            is_active=True,
-            profile__supervisor=user
-        )
-        available_mentors = supervised_mentors
-        mentor_filter = supervised_mentors
-    elif user.role in ['me_staff', 'program_manager', 'ict_admin']:
-        # M&E, PM, and Admin see all mentors
-        available_mentors = User.objects.filter(role='mentor', is_active=True)
-        mentor_filter = available_mentors
-    elif user.role == 'mentor':
-        # Mentors see only their own data
-        mentor_filter = User.objects.filter(pk=user.pk)
-        available_mentors = mentor_filter
-
-    # Filter by specific mentor if selected
-    if mentor_id and mentor_filter:
-        try:
-            mentor_filter = mentor_filter.filter(pk=int(mentor_id))
-        except (ValueError, TypeError):
-            pass
-
-    # Get visits
-    visits = MentoringVisit.objects.filter(
-        visit_date__gte=start_date,
-        visit_date__lte=end_date
-    ).select_related('mentor', 'household').order_by('-visit_date', '-created_at')
-
-    if mentor_filter is not None:
-        visits = visits.filter(mentor__in=mentor_filter)
-
-    # Get calls
-    calls = PhoneNudge.objects.filter(
-        call_date__gte=start_date,
-        call_date__lte=end_date
-    ).select_related('mentor', 'household').order_by('-call_date', '-created_at')
-
-    if mentor_filter is not None:
-        calls = calls.filter(mentor__in=mentor_filter)
-
-    # Calculate totals
-    total_visits = visits.count()
-    total_calls = calls.count()
-    total_visit_duration = visits.aggregate(total=Sum('duration_minutes'))['total'] or 0
-    total_call_duration = calls.aggregate(total=Sum('duration_minutes'))['total'] or 0
-    total_duration = total_visit_duration + total_call_duration
-
-    # Convert duration to hours and minutes
-    total_hours = total_duration // 60
-    total_minutes = total_duration % 60
-
-    # Format durations for display
-    visit_hours = total_visit_duration // 60
-    visit_minutes = total_visit_duration % 60
-    call_hours = total_call_duration // 60
-    call_minutes = total_call_duration % 60
-
-    # Monthly breakdown for charts
-    monthly_data = []
-    if period in ['6', '12']:
-        months_count = int(period)
-        for i in range(months_count):
-            month_date = today - relativedelta(months=i)
-            month_start = month_date.replace(day=1)
-            _, last_day = monthrange(month_date.year, month_date.month)
-            month_end = month_date.replace(day=last_day)
-
-            month_visits = visits.filter(visit_date__gte=month_start, visit_date__lte=month_end).count()
-            month_calls = calls.filter(call_date__gte=month_start, call_date__lte=month_end).count()
-
-            monthly_data.insert(0, {
-                'month': month_date.strftime('%b %Y'),
-                'visits': month_visits,
-                'calls': month_calls,
-                'total': month_visits + month_calls
-            })
+    # Totals per mentor (and overall) in one grouped query per activity type
+    mentor_rows = mentor_summary(visits, calls)
+    totals = activity_totals(mentor_rows)
+
+    # Monthly breakdown for 6 or 12 month views
+    monthly_data = monthly_breakdown(visits, calls, int(period)) if period in ['6', '12'] else []
 
     # Apply type filter for display
-    if activity_type == 'visits':
-        calls = PhoneNudge.objects.none()
-    elif activity_type == 'calls':
-        visits = MentoringVisit.objects.none()
+    listed_visits = visits if activity_type != 'calls' else None
+    listed_calls = calls if activity_type != 'visits' else None
+    try:
+        page = activity_page(listed_visits, listed_calls, cursor=request.GET.get('cursor') or None)
+    except InvalidCursor:
+        # A stale or mangled link starts again from the newest activity
+        page = activity_page(listed_visits, listed_calls)
+
+    next_page_url = None
+    if page['next_cursor']:
+        params = request.GET.copy()
+        params['cursor'] = page['next_cursor']
+        next_page_url = f"{request.path}?{params.urlencode()}"
 
     context = {
         'user': user,
-        'visits': visits[:100],  # Limit for performance
-        'calls': calls[:100],
-        'total_visits': total_visits,
-        'total_calls': total_calls,
-        'total_visit_duration': total_visit_duration,
-        'total_call_duration': total_call_duration,
-        'total_duration': total_duration,
-        'total_hours': total_hours,
-        'total_minutes': total_minutes,
-        'visit_hours': visit_hours,
-        'visit_minutes': visit_minutes,
-        'call_hours': call_hours,
-        'call_minutes': call_minutes,
+        'activities': page['activities'],
+        'next_page_url': next_page_url,
+        'is_first_page': not request.GET.get('cursor'),
+        'mentor_summary': mentor_rows,
+        'total_visits': totals['visits'],
+        'total_calls': totals['calls'],
+        'total_activities': totals['total'],
+        'total_visit_duration': totals['visit_minutes'],
+        'total_call_duration': totals['call_minutes'],
+        'total_duration': totals['minutes'],
+        'total_hours': totals['minutes'] // 60,
+        'total_minutes': totals['minutes'] % 60,
+        'visit_hours': totals['visit_minutes'] // 60,
+        'visit_minutes': totals['visit_minutes'] % 60,
+        'call_hours': totals['call_minutes'] // 60,
+        'call_minutes': totals['call_minutes'] % 60,
         'period': period,
         'period_label': period_label,
         'start_date': start_date,
@@ -1321,7 +1123,7 @@ def activity_logs_view(request):
         'activity_type': activity_type,
         'available_mentors': available_mentors,
         'monthly_data': monthly_data,
-        'can_export': user.role in ['me_staff', 'program_manager', 'ict_admin', 'field_associate'],
+        'can_export': user.role in EXPORT_ROLES,
     }
 
     return render(request, 'dashboard/activity_logs.html', context)
@@ -1330,19 +1132,12 @@ def activity_logs_view(request):
 @login_required
 def export_activity_logs(request):
     """
-    Export activity logs to CSV
+    Export activity logs to CSV, streamed row by row
     """
-    import csv
-    from django.http import HttpResponse
-    from accounts.models import User
-    from django.db.models import Sum
-    from calendar import monthrange
-
     user = request.user
 
     # Only allow certain roles to export
-    if user.role not in ['me_staff', 'program_manager', 'ict_admin', 'field_associate']:
-        from django.http import HttpResponseForbidden
+    if user.role not in EXPORT_ROLES:
         return HttpResponseForbidden("You don't have permission to export data.")
 
     # Get filter parameters
@@ -1350,98 +1145,14 @@ def export_activity_logs(request):
     mentor_id = request.GET.get('mentor', '')
     activity_type = request.GET.get('type', 'all')
 
-    # Calculate date range
-    today = timezone.now().date()
+    start_date, end_date, _ = activity_period(period)
+    _, mentor_filter = activity_mentors(user, mentor_id)
+    visits, calls = activity_querysets(start_date, end_date, mentor_filter)
 
-    if period == '1':
-        start_date = today.replace(day=1)
-        _, last_day = monthrange(today.year, today.month)
-        end_date = today.replace(day=last_day)
-    elif period == '6':
-        start_date = today - relativedelta(months=6)
-        end_date = today
-    elif period == '12':
-        start_date = today - relativedelta(months=12)
-        end_date = today
-    else:
-        start_date = today.replace(day=1)
-        _, last_day = monthrange(today.year, today.month)
-        end_date = today.replace(day=last_day)
-
-    # Determine mentor filter based on role
-    mentor_filter = None
-
-    if user.role == 'field_associate':
-        mentor_filter = User.objects.filter(role='mentor', is_active=True, profile__supervisor=user)
-    elif user.role in ['me_staff', 'program_manager', 'ict_admin']:
-        mentor_filter = User.objects.filter(role='mentor', is_active=True)
-
-    if mentor_id and mentor_filter:
-        try:
-            mentor_filter = mentor_filter.filter(pk=int(mentor_id))
-        except (ValueError, TypeError):
-            pass
-
-    # Create response
-    response = HttpResponse(content_type='text/csv')
+    rows = activity_csv_rows(
+        visits if activity_type in ['all', 'visits'] else None,
+        calls if activity_type in ['all', 'calls'] else None,
+    )
+    response = StreamingHttpResponse(stream_csv(rows), content_type='text/csv')
     response['Content-Disposition'] = f'attachment; filename="activity_logs_{start_date}_{end_date}.csv"'
-
-    writer = csv.writer(response)
-
-    # Get data
-    if activity_type in ['all', 'visits']:
-        visits = MentoringVisit.objects.filter(
-            visit_date__gte=start_date,
-            visit_date__lte=end_date
-        ).select_related('mentor', 'household').order_by('-visit_date')
-
-        if mentor_filter is not None:
-            visits = visits.filter(mentor__in=mentor_filter)
-
-        writer.writerow(['VISITS'])
-        writer.writerow(['Date', 'Mentor', 'Household', 'Visit Type', 'Duration (min)', 'Topic', 'Notes'])
-
-        for visit in visits:
-            writer.writerow([
-                visit.visit_date.strftime('%Y-%m-%d %H:%M'),
-                visit.mentor.get_full_name() or visit.mentor.username,
-                visit.household.name if visit.household else 'N/A',
-                visit.get_visit_type_display(),
-                visit.duration_minutes or 0,
-                visit.topic or '',
-                visit.observations or ''
-            ])
-
-        total_visit_duration = visits.aggregate(total=Sum('duration_minutes'))['total'] or 0
-        writer.writerow([])
-        writer.writerow(['Total Visits:', visits.count(), '', '', f'{total_visit_duration} min'])
-        writer.writerow([])
-
-    if activity_type in ['all', 'calls']:
-        calls = PhoneNudge.objects.filter(
-            call_date__gte=start_date,
-            call_date__lte=end_date
-        ).select_related('mentor', 'household').order_by('-call_date')
-
-        if mentor_filter is not None:
-            calls = calls.filter(mentor__in=mentor_filter)
-
-        writer.writerow(['PHONE CALLS'])
-        writer.writerow(['Date', 'Mentor', 'Household', 'Call Type', 'Duration (min)', 'Contact Success', 'Notes'])
-
-        for call in calls:
-            writer.writerow([
-                call.call_date.strftime('%Y-%m-%d %H:%M'),
-                call.mentor.get_full_name() or call.mentor.username,
-                call.household.name if call.household else 'N/A',
-                call.get_nudge_type_display(),
-                call.duration_minutes or 0,
-                'Yes' if call.successful_contact else 'No',
-                call.notes or ''
-            ])
-
-        total_call_duration = calls.aggregate(total=Sum('duration_minutes'))['total'] or 0
-        writer.writerow([])
-        writer.writerow(['Total Calls:', calls.count(), '', '', f'{total_call_duration} min'])
-
     return response
\ No newline at end of file
@@ -0,0 +1,150 @@
+"""
+Dashboard Widgets for UPG System
+
+Role dashboards render a shell with the cheap counts and one placeholder per
+widget (charts, KPI cards, alerts, data quality, team tables, the mentor's
+household list). static/js/dashboard_widgets.js fetches every placeholder's
+JSON endpoint in parallel, so a slow widget only delays its own card.
+
+Each widget is a function registered with @register_widget that returns
+JSON-serializable data for a user's village scope; an optional template
+renders that data to HTML with the existing includes. Results are cached per
+(widget, role, scope, parameters) and every computation is timed: the
+duration is returned with the widget, sent as a Server-Timing header and
+logged, at WARNING above DASHBOARD_SLOW_WIDGET_MS.
+"""
+
+from time import perf_counter
+import hashlib
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+
+from core.permissions import get_user_accessible_villages
+from core.services.cache_service import DASHBOARD_PREFIX, MEDIUM_CACHE, cache_key
+
+logger = logging.getLogger(__name__)
+
+WIDGET_CACHE_PREFIX = f'{DASHBOARD_PREFIX}widget_'
+
+# Widgets slower than this (milliseconds) are logged as warnings
+DEFAULT_SLOW_WIDGET_MS = 1000
+
+# Dashboard each role is routed to (see dashboard_role)
+ALL_ROLES = ('admin', 'program_manager', 'mentor', 'executive', 'me', 'field_associate')
+GLOBAL_ROLES = ('admin', 'program_manager', 'executive', 'me')
+
+
+class Widget:
+    """
+    One lazily loaded dashboard card. `compute(user, village_ids, params)`
+    returns its data; village_ids is None for unrestricted users.
+    """
+
+    def __init__(self, name, compute, roles=ALL_ROLES, template=None, timeout=MEDIUM_CACHE, params=(),
+                 per_user=False):
+        self.name = name
+        self.compute = compute
+        self.roles = roles
+        self.template = template
+        self.timeout = timeout
+        self.params = params
+        self.per_user = per_user
+
+
+WIDGETS = {}
+
+
+def register_widget(name, roles=ALL_ROLES, template=None, timeout=MEDIUM_CACHE, params=(), per_user=False):
+    """
+    Decorator registering a widget function.
+
+    Args:
+        name: URL name of the widget (dashboard/widgets/<name>/)
+        roles: Dashboards (dashboard_role values) allowed to load it
+        template: Optional template rendering {'data': ..., 'user': ...} to HTML
+        timeout: Cache timeout in seconds
+        params: GET parameters passed to the function (and part of the cache key)
+        per_user: Cache per user rather than per village scope
+    """
+    def decorator(func):
+        WIDGETS[name] = Widget(
+            name, func, roles=roles, template=template, timeout=timeout, params=params, per_user=per_user
+        )
+        return func
+    return decorator
+
+
+def dashboard_role(user):
+    """The dashboard a user is routed to by dashboard_view"""
+    user_role = getattr(user, 'role', None)
+    if user.is_superuser or user_role == 'ict_admin':
+        return 'admin'
+    if user_role == 'program_manager':
+        return 'program_manager'
+    if user_role == 'mentor':
+        return 'mentor'
+    if user_role in ['county_executive', 'county_assembly']:
+        return 'executive'
+    if user_role in ['me_staff', 'cco_director']:
+        return 'me'
+    if user_role == 'field_associate':
+        return 'field_associate'
+    return 'general'
+
+
+def widget_scope(user, role):
+    """Village IDs the user's widgets cover, or None for the whole system"""
+    if role in GLOBAL_ROLES:
+        return None
+    return get_user_accessible_villages(user) or []
+
+
+def widget_cache_key(widget, user, role, village_ids, params):
+    if widget.per_user:
+        scope = f'user{user.pk}'
+    else:
+        scope = 'all' if village_ids is None else ','.join(str(v) for v in sorted(village_ids))
+    param_key = '&'.join(f'{key}={params[key]}' for key in sorted(params))
+    if param_key:
+        # Search terms may hold spaces and other characters memcached rejects
+        param_key = hashlib.md5(param_key.encode()).hexdigest()
+    # cache_key hashes long keys; keep the prefix for invalidate_dashboard_cache
+    return f'{WIDGET_CACHE_PREFIX}{cache_key(widget.name, role, scope, param_key)}'
+
+
+def slow_widget_ms():
+    return getattr(settings, 'DASHBOARD_SLOW_WIDGET_MS', DEFAULT_SLOW_WIDGET_MS)
+
+
+def load_widget(widget, user, params=None):
+    """
+    Widget payload for a user, from cache when possible.
+
+    Returns:
+        dict: {'widget', 'data', 'html', 'cached', 'elapsed_ms'}
+    """
+    start = perf_counter()
+    role = dashboard_role(user)
+    village_ids = widget_scope(user, role)
+    params = {key: value for key, value in (params or {}).items() if key in widget.params and value}
+    key = widget_cache_key(widget, user, role, village_ids, params)
+
+    payload = cache.get(key) if widget.timeout else None
+    cached = payload is not None
+    if payload is None:
+        data = widget.compute(user, village_ids, params)
+        html = render_to_string(widget.template, {'data': data, 'user': user}) if widget.template else None
+        payload = {'data': data, 'html': html}
+        if widget.timeout:
+            cache.set(key, payload, widget.timeout)
+
+    elapsed_ms = round((perf_counter() - start) * 1000, 1)
+    if not cached:
+        log = logger.warning if elapsed_ms > slow_widget_ms() else logger.info
+        log(f"Dashboard widget {widget.name} ({role}) computed in {elapsed_ms} ms")
+
+    return {'widget': widget.name, 'cached': cached, 'elapsed_ms': elapsed_ms, **payload}
+
@@ -1,6 +1,6 @@
 from django.contrib import admin
 from .models import (
-    TargetingRuleGroup, TargetingRule, EnrollmentApplication, Verification
+    TargetingRuleGroup, TargetingRule, EnrollmentApplication, Verification, TargetingResult
 )
 
 
@@ -70,3 +70,12 @@ class VerificationAdmin(admin.ModelAdmin):
     search_fields = ['application__application_id', 'application__first_name', 'application__last_name']
     readonly_fields = ['created_at', 'updated_at']
     ordering = ['-created_at']
+
+
+@admin.register(TargetingResult)
+class TargetingResultAdmin(admin.ModelAdmin):
+    list_display = ['program', 'application', 'household', 'score', 'passed', 'evaluated_at']
+    list_filter = ['program', 'passed']
+    search_fields = ['application__application_id', 'household__name']
+    raw_id_fields = ['application', 'household']
+    ordering = ['-score']
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_sms_campaigns'),
+        ('enrollment', '0001_initial'),
+        ('households', '0006_household_head_gender_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TargetingResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField(default=0)),
+                ('passed', models.BooleanField(default=False)),
+                ('failed_reasons', models.JSONField(blank=True, default=list)),
+                ('rule_results', models.JSONField(blank=True, default=dict)),
+                ('evaluated_at', models.DateTimeField()),
+                ('application', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='targeting_results', to='enrollment.enrollmentapplication')),
+                ('household', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='targeting_results', to='households.household')),
+                ('program', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='targeting_results', to='core.program')),
+            ],
+            options={
+                'db_table': 'upg_targeting_results',
+                'ordering': ['-score'],
+                'indexes': [models.Index(fields=['program', 'passed', 'score'], name='upg_targeti_program_0b20a5_idx')],
+                'unique_together': {('program', 'application'), ('program', 'household')},
+            },
+        ),
+    ]
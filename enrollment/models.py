@@ -247,3 +247,31 @@ class Verification(models.Model):
     class Meta:
         db_table = 'upg_verifications'
         ordering = ['-created_at']
+
+
+class TargetingResult(models.Model):
+    """
+    Outcome of evaluating a program's targeting rules against one application
+    or household (see enrollment.rule_engine)
+    """
+    program = models.ForeignKey(Program, on_delete=models.CASCADE, related_name='targeting_results')
+    application = models.ForeignKey(EnrollmentApplication, on_delete=models.CASCADE, null=True, blank=True, related_name='targeting_results')
+    household = models.ForeignKey(Household, on_delete=models.CASCADE, null=True, blank=True, related_name='targeting_results')
+
+    score = models.FloatField(default=0)
+    passed = models.BooleanField(default=False)
+    failed_reasons = models.JSONField(default=list, blank=True)  # Messages of failed mandatory rules/groups, by priority
+    rule_results = models.JSONField(default=dict, blank=True)  # {rule id: passed}
+    evaluated_at = models.DateTimeField()
+
+    def __str__(self):
+        subject = self.application or self.household
+        return f"{subject} - {self.score} ({'passed' if self.passed else 'failed'})"
+
+    class Meta:
+        db_table = 'upg_targeting_results'
+        ordering = ['-score']
+        unique_together = [['program', 'application'], ['program', 'household']]
+        indexes = [
+            models.Index(fields=['program', 'passed', 'score']),
+        ]
@@ -0,0 +1,427 @@
+"""
+Targeting Rule Engine for UPG Kenya
+
+Compiles a program's active TargetingRules (respecting effective_from/to,
+priority, is_mandatory and rule groups) into a vectorized pipeline: every
+rule becomes a boolean mask over a pandas frame holding all the applications
+or households being screened, loaded with a single query. Scores, pass/fail
+and the reasons for failing are computed for the whole frame at once and
+saved as TargetingResult rows with one bulk upsert, so a village intake is
+screened in one pass instead of rule-by-rule, row-by-row.
+
+Rules read the column named by field_path (or rule_type when field_path is
+blank). Common rule types are aliased to the real columns below; any other
+name is looked up as a key of EnrollmentApplication.application_data or
+Household.assets (dotted paths reach nested keys).
+"""
+
+from time import perf_counter
+import logging
+
+import numpy as np
+import pandas as pd
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.utils import timezone
+
+from core.services.bulk_upsert import bulk_upsert
+from core.services.esr_import import TRUTHY_VALUES, clean_text
+from households.models import Household, HouseholdMember, PPI
+from .models import EnrollmentApplication, RuleOperator, TargetingResult, TargetingRule
+
+logger = logging.getLogger(__name__)
+
+BULK_BATCH_SIZE = 500
+
+APPLICATION = 'application'
+HOUSEHOLD = 'household'
+
+APPLICATION_COLUMNS = [
+    'id', 'first_name', 'last_name', 'id_number', 'phone_number', 'status', 'poverty_score',
+    'id_validated', 'phone_validated', 'household_id', 'village_id',
+    'village__subcounty_obj_id', 'village__subcounty_obj__county_id', 'application_data',
+]
+
+HOUSEHOLD_COLUMNS = [
+    'id', 'name', 'national_id', 'phone_number', 'head_gender', 'head_date_of_birth', 'disability',
+    'monthly_income', 'has_electricity', 'has_clean_water', 'location', 'consent_given', 'village_id',
+    'village__subcounty_obj_id', 'village__subcounty_obj__county_id', 'assets',
+    'member_count', 'head_member_age', 'latest_ppi_score',
+]
+
+# JSON columns flattened into '<column>.<key>' frame columns
+JSON_COLUMNS = {
+    APPLICATION: 'application_data',
+    HOUSEHOLD: 'assets',
+}
+
+# rule_type / field_path -> frame column
+FIELD_ALIASES = {
+    APPLICATION: {
+        'age': 'application_data.age',
+        'gender': 'application_data.gender',
+        'household_size': 'application_data.household_size',
+        'income': 'application_data.monthly_income',
+        'village': 'village_id',
+        'subcounty': 'village__subcounty_obj_id',
+        'sub_county': 'village__subcounty_obj_id',
+        'county': 'village__subcounty_obj__county_id',
+    },
+    HOUSEHOLD: {
+        'age': 'head_age',
+        'gender': 'head_gender',
+        'household_size': 'member_count',
+        'income': 'monthly_income',
+        'poverty_score': 'latest_ppi_score',
+        'ppi_score': 'latest_ppi_score',
+        'village': 'village_id',
+        'subcounty': 'village__subcounty_obj_id',
+        'sub_county': 'village__subcounty_obj_id',
+        'county': 'village__subcounty_obj__county_id',
+    },
+}
+
+
+class RuleCompileError(ValueError):
+    """A targeting rule whose operator or value cannot be evaluated"""
+
+
+# =============================================================================
+# Frame loading
+# =============================================================================
+
+def _flatten_json(frame, column):
+    """Expand a JSON column into '<column>.<key>' columns"""
+    records = [value if isinstance(value, dict) else {} for value in frame[column]]
+    expanded = pd.json_normalize(records, sep='.')
+    if expanded.empty:
+        return frame
+    expanded.columns = [f'{column}.{key}' for key in expanded.columns]
+    expanded.index = frame.index
+    return pd.concat([frame, expanded], axis=1)
+
+
+def load_application_frame(applications):
+    frame = pd.DataFrame.from_records(list(applications.values(*APPLICATION_COLUMNS)), columns=APPLICATION_COLUMNS)
+    return _flatten_json(frame, JSON_COLUMNS[APPLICATION])
+
+
+def load_household_frame(households, as_of):
+    households = households.annotate(
+        member_count=Count('members'),
+        head_member_age=Subquery(
+            HouseholdMember.objects.filter(household=OuterRef('pk'), relationship_to_head='head').values('age')[:1]
+        ),
+        latest_ppi_score=Subquery(
+            PPI.objects.filter(household=OuterRef('pk')).order_by('-assessment_date').values('eligibility_score')[:1]
+        ),
+    )
+    frame = pd.DataFrame.from_records(list(households.values(*HOUSEHOLD_COLUMNS)), columns=HOUSEHOLD_COLUMNS)
+
+    # Head age from the head member record, else from the head's date of birth
+    birth_dates = pd.to_datetime(frame['head_date_of_birth'], errors='coerce')
+    age_from_birth = (pd.Timestamp(as_of) - birth_dates).dt.days // 365
+    frame['head_age'] = pd.to_numeric(frame['head_member_age'], errors='coerce').fillna(age_from_birth)
+    return _flatten_json(frame, JSON_COLUMNS[HOUSEHOLD])
+
+
+# =============================================================================
+# Rule compilation
+# =============================================================================
+
+def _as_list(value):
+    return list(value) if isinstance(value, (list, tuple)) else [value]
+
+
+def _coerce_series(series, value_type):
+    if value_type == 'number':
+        return pd.to_numeric(series, errors='coerce')
+    if value_type == 'date':
+        return pd.to_datetime(series, errors='coerce')
+    if value_type == 'boolean':
+        text = clean_text(series).str.lower()
+        return text.isin(TRUTHY_VALUES).mask(text.isna())
+    return clean_text(series).str.lower()
+
+
+def _coerce_value(value, value_type):
+    if value is None:
+        return None
+    if value_type == 'number':
+        return float(value)
+    if value_type == 'date':
+        return pd.Timestamp(value)
+    if value_type == 'boolean':
+        return str(value).strip().lower() in TRUTHY_VALUES
+    return str(value).strip().lower()
+
+
+def _contains_item(items, value):
+    return isinstance(items, (list, tuple)) and value in {str(item).strip().lower() for item in items}
+
+
+def compile_predicate(rule):
+    """
+    Turn a rule's operator and value into a function of the raw column
+    Series returning a boolean mask (missing values never pass a comparison).
+    """
+    operator, value_type = rule.operator, rule.value_type
+    try:
+        if operator in (RuleOperator.IS_NULL, RuleOperator.IS_NOT_NULL):
+            def predicate(series):
+                present = _coerce_series(series, value_type).notna()
+                return ~present if operator == RuleOperator.IS_NULL else present
+            return predicate
+
+        if operator in (RuleOperator.IN, RuleOperator.NOT_IN):
+            values = [_coerce_value(v, value_type) for v in _as_list(rule.value)]
+
+            def predicate(series):
+                coerced = _coerce_series(series, value_type)
+                matches = coerced.isin(values)
+                return matches if operator == RuleOperator.IN else ~matches & coerced.notna()
+            return predicate
+
+        if operator == RuleOperator.BETWEEN:
+            low, high = (_coerce_value(v, value_type) for v in rule.value)
+            return lambda series: _coerce_series(series, value_type).between(low, high)
+
+        if operator == RuleOperator.CONTAINS:
+            needle = _coerce_value(rule.value, 'string')
+            if value_type == 'array':
+                return lambda series: series.map(lambda items: _contains_item(items, needle))
+            return lambda series: _coerce_series(series, 'string').str.contains(needle, regex=False)
+
+        value = _coerce_value(rule.value, value_type)
+        comparisons = {
+            RuleOperator.EQUALS: lambda s: s == value,
+            RuleOperator.NOT_EQUALS: lambda s: (s != value) & s.notna(),
+            RuleOperator.GREATER_THAN: lambda s: s > value,
+            RuleOperator.GREATER_THAN_OR_EQUAL: lambda s: s >= value,
+            RuleOperator.LESS_THAN: lambda s: s < value,
+            RuleOperator.LESS_THAN_OR_EQUAL: lambda s: s <= value,
+        }
+        compare = comparisons[operator]
+    except (KeyError, TypeError, ValueError) as e:
+        raise RuleCompileError(f"Rule '{rule.name}' cannot be evaluated ({operator} {rule.value!r}): {e}")
+
+    return lambda series: compare(_coerce_series(series, value_type))
+
+
+class CompiledRule:
+    """One TargetingRule bound to a frame column and a vectorized predicate"""
+
+    def __init__(self, rule, subject):
+        self.id = rule.pk
+        self.name = rule.name
+        self.group_id = rule.rule_group_id
+        self.priority = rule.priority
+        self.is_mandatory = rule.is_mandatory
+        self.reason = rule.error_message or f'Failed: {rule.name}'
+        self.pass_points = rule.weight * rule.score_on_pass
+        self.fail_points = rule.weight * rule.score_on_fail
+        self.field = (rule.field_path or rule.rule_type or '').strip()
+        self.subject = subject
+        self.predicate = compile_predicate(rule)
+
+    def column(self, frame):
+        name = FIELD_ALIASES[self.subject].get(self.field, self.field)
+        for candidate in (name, f'{JSON_COLUMNS[self.subject]}.{name}'):
+            if candidate in frame.columns:
+                return frame[candidate]
+        return pd.Series(None, index=frame.index, dtype='object')
+
+    def evaluate(self, frame):
+        mask = self.predicate(self.column(frame))
+        return pd.Series(mask, index=frame.index).fillna(False).astype(bool)
+
+
+class CompiledGroup:
+    """A TargetingRuleGroup's AND/OR logic over its rules' masks"""
+
+    def __init__(self, group, rules):
+        self.id = group.pk
+        self.priority = group.priority
+        self.is_mandatory = group.is_mandatory
+        self.weight = group.group_weight
+        self.reason = f'Failed rule group: {group.name}'
+        self.rule_ids = [rule.id for rule in rules]
+        if group.logic_operator == 'OR':
+            self.required = min(group.min_rules_to_pass or 1, len(rules))
+        else:
+            self.required = len(rules)
+
+    def evaluate(self, masks):
+        return masks[self.rule_ids].sum(axis=1) >= self.required
+
+
+class CompiledRuleSet:
+    """
+    A program's rules compiled for one subject (applications or households).
+
+    Scoring: each rule adds weight * score_on_pass (or score_on_fail), times
+    the group weight for grouped rules. Eligibility: every mandatory ungrouped
+    rule and every mandatory group must pass; a grouped rule only counts
+    through its group's AND/OR logic.
+    """
+
+    def __init__(self, rules, subject):
+        self.rules = [CompiledRule(rule, subject) for rule in rules]
+        groups = {}
+        for rule in rules:
+            if rule.rule_group_id:
+                groups.setdefault(rule.rule_group_id, (rule.rule_group, []))
+        self.groups = [
+            CompiledGroup(group, [r for r in self.rules if r.group_id == group_id])
+            for group_id, (group, _) in groups.items()
+        ]
+        group_weights = {group.id: group.weight for group in self.groups}
+        self.rule_weights = {rule.id: group_weights.get(rule.group_id, 1.0) for rule in self.rules}
+
+        # (priority, reason, id) of everything that gates eligibility
+        self.gates = sorted(
+            [(r.priority, r.reason, ('rule', r.id)) for r in self.rules if r.is_mandatory and not r.group_id]
+            + [(g.priority, g.reason, ('group', g.id)) for g in self.groups if g.is_mandatory],
+            key=lambda gate: gate[0],
+        )
+
+    def evaluate(self, frame):
+        """
+        Returns:
+            DataFrame indexed like frame with score, passed, failed_reasons
+            and rule_results columns
+        """
+        masks = pd.DataFrame({rule.id: rule.evaluate(frame) for rule in self.rules}, index=frame.index)
+        group_masks = {group.id: group.evaluate(masks) for group in self.groups}
+
+        score = pd.Series(0.0, index=frame.index)
+        for rule in self.rules:
+            points = np.where(masks[rule.id], rule.pass_points, rule.fail_points)
+            score += points * self.rule_weights[rule.id]
+
+        passed = pd.Series(True, index=frame.index)
+        reasons = [[] for _ in range(len(frame))]
+        for _, reason, (kind, gate_id) in self.gates:
+            gate_mask = masks[gate_id] if kind == 'rule' else group_masks[gate_id]
+            passed &= gate_mask
+            for position in np.flatnonzero(~gate_mask.to_numpy()):
+                reasons[position].append(reason)
+
+        rule_results = masks.rename(columns=str).to_dict('records') if self.rules else [{} for _ in range(len(frame))]
+        return pd.DataFrame({
+            'score': score.round(2),
+            'passed': passed,
+            'failed_reasons': reasons,
+            'rule_results': rule_results,
+        }, index=frame.index)
+
+
+# =============================================================================
+# Engine
+# =============================================================================
+
+def active_rules(program, as_of):
+    """Active rules for a program on a date, in priority order"""
+    return list(TargetingRule.objects.filter(
+        Q(program=program) | Q(rule_group__program=program),
+        Q(rule_group__isnull=True) | Q(rule_group__is_active=True),
+        Q(effective_from__isnull=True) | Q(effective_from__lte=as_of),
+        Q(effective_to__isnull=True) | Q(effective_to__gte=as_of),
+        is_active=True,
+    ).select_related('rule_group').order_by('priority', 'id'))
+
+
+class TargetingRuleEngine:
+    """
+    Evaluates a program's targeting rules against applications or households
+    in bulk.
+
+    Usage:
+        engine = TargetingRuleEngine(program)
+        engine.screen_applications(EnrollmentApplication.objects.filter(village=village))
+    """
+
+    def __init__(self, program, as_of=None):
+        self.program = program
+        self.as_of = as_of or timezone.localdate()
+        self.rules = active_rules(program, self.as_of)
+        self._compiled = {}
+
+    def compiled(self, subject):
+        if subject not in self._compiled:
+            self._compiled[subject] = CompiledRuleSet(self.rules, subject)
+        return self._compiled[subject]
+
+    def evaluate_applications(self, applications=None):
+        """Results frame (with an 'id' column) for the program's applications"""
+        if applications is None:
+            applications = EnrollmentApplication.objects.filter(program=self.program)
+        frame = load_application_frame(applications)
+        return self.compiled(APPLICATION).evaluate(frame).assign(id=frame['id'])
+
+    def evaluate_households(self, households=None):
+        """Results frame (with an 'id' column) for households (all by default)"""
+        if households is None:
+            households = Household.objects.all()
+        frame = load_household_frame(households, self.as_of)
+        return self.compiled(HOUSEHOLD).evaluate(frame).assign(id=frame['id'])
+
+    def screen_applications(self, applications=None):
+        """
+        Evaluate and save results, copying score/pass/reasons onto each
+        application's screening fields.
+
+        Returns:
+            dict: {'evaluated', 'passed', 'failed', 'elapsed'}
+        """
+        start = perf_counter()
+        results = self.evaluate_applications(applications)
+        now = timezone.now()
+        self._save_results(results, 'application', now)
+
+        EnrollmentApplication.objects.bulk_update([
+            EnrollmentApplication(
+                id=row.id,
+                screening_score=row.score,
+                screening_passed=bool(row.passed),
+                screening_date=now,
+                screening_notes='; '.join(row.failed_reasons) or 'All mandatory targeting rules passed',
+            )
+            for row in results.itertuples(index=False)
+        ], ['screening_score', 'screening_passed', 'screening_date', 'screening_notes'], batch_size=BULK_BATCH_SIZE)
+        return self._summary(results, start)
+
+    def screen_households(self, households=None):
+        """Evaluate households and save their results; returns a summary like screen_applications"""
+        start = perf_counter()
+        results = self.evaluate_households(households)
+        self._save_results(results, 'household', timezone.now())
+        return self._summary(results, start)
+
+    def _save_results(self, results, subject_field, evaluated_at):
+        bulk_upsert(
+            TargetingResult,
+            [
+                TargetingResult(
+                    program=self.program,
+                    score=row.score,
+                    passed=bool(row.passed),
+                    failed_reasons=row.failed_reasons,
+                    rule_results=row.rule_results,
+                    evaluated_at=evaluated_at,
+                    **{f'{subject_field}_id': row.id},
+                )
+                for row in results.itertuples(index=False)
+            ],
+            unique_fields=['program', subject_field],
+            update_fields=['score', 'passed', 'failed_reasons', 'rule_results', 'evaluated_at'],
+            batch_size=BULK_BATCH_SIZE,
+        )
+
+    def _summary(self, results, start):
+        passed = int(results['passed'].sum())
+        return {
+            'evaluated': len(results),
+            'passed': passed,
+            'failed': len(results) - passed,
+            'elapsed': perf_counter() - start,
+        }
@@ -0,0 +1,121 @@
+"""
+Tests for Enrollment App - Targeting Rule Engine
+"""
+
+from django.test import TestCase
+from datetime import date
+import uuid
+
+from core.models import County, SubCounty, Village, Program
+from households.models import Household, HouseholdMember, PPI
+from .models import (
+    EnrollmentApplication, TargetingResult, TargetingRule, TargetingRuleGroup, RuleOperator,
+)
+from .rule_engine import RuleCompileError, TargetingRuleEngine
+
+
+def unique_id():
+    """Generate unique ID for test data"""
+    return str(uuid.uuid4())[:8]
+
+
+class TargetingRuleEngineTests(TestCase):
+    """Tests for bulk evaluation of targeting rules"""
+
+    def setUp(self):
+        county = County.objects.create(name=f'County {unique_id()}')
+        subcounty = SubCounty.objects.create(name=f'SubCounty {unique_id()}', county=county)
+        self.village = Village.objects.create(name=f'Village {unique_id()}', subcounty_obj=subcounty)
+        self.other_village = Village.objects.create(name=f'Village {unique_id()}', subcounty_obj=subcounty)
+        self.program = Program.objects.create(
+            name='UPG', cycle='FY25C1', office='Kapenguria', start_date=date(2025, 1, 1), end_date=date(2025, 12, 31)
+        )
+
+    def rule(self, name, rule_type, operator, value, **kwargs):
+        kwargs.setdefault('program', None if kwargs.get('rule_group') else self.program)
+        return TargetingRule.objects.create(
+            name=name, rule_type=rule_type, operator=operator, value=value, **kwargs
+        )
+
+    def apply(self, village=None, **data):
+        return EnrollmentApplication.objects.create(
+            application_id=f'APP-{unique_id()}', first_name='Jane', last_name='Doe', id_number=unique_id(),
+            phone_number='0712345678', village=village or self.village, program=self.program,
+            application_data=data,
+        )
+
+    def test_screens_applications_in_bulk(self):
+        """Scores, mandatory gates, OR groups and effective dates are applied and saved"""
+        self.rule('Adult', 'age', RuleOperator.GREATER_THAN_OR_EQUAL, 18, value_type='number',
+                  score_on_pass=20, error_message='Applicant must be an adult')
+        self.rule('In village', 'village', RuleOperator.IN, [self.village.pk], priority=0)
+        self.rule('Large household', 'household_size', RuleOperator.GREATER_THAN, 5, value_type='number',
+                  is_mandatory=False, score_on_pass=10, weight=2)
+        self.rule('Expired', 'age', RuleOperator.LESS_THAN, 0, value_type='number',
+                  effective_to=date(2020, 1, 1))
+        group = TargetingRuleGroup.objects.create(
+            name='Vulnerability', program=self.program, logic_operator='OR', group_weight=0.5, priority=2
+        )
+        self.rule('Female headed', 'gender', RuleOperator.EQUALS, 'Female', rule_group=group)
+        self.rule('Has disability', 'disability', RuleOperator.EQUALS, True, value_type='boolean', rule_group=group)
+
+        eligible = self.apply(age='34', household_size=7, gender='female')
+        minor = self.apply(age=16, household_size=3, disability='yes')
+        outsider = self.apply(village=self.other_village, age=40, gender='male')
+
+        summary = TargetingRuleEngine(self.program, as_of=date(2025, 6, 1)).screen_applications()
+
+        self.assertEqual((summary['evaluated'], summary['passed']), (3, 1))
+        eligible.refresh_from_db()
+        # 20 (adult) + 10 (village) + 2 * 10 (large household) + 0.5 * 10 (female headed)
+        self.assertEqual((eligible.screening_score, eligible.screening_passed), (55, True))
+        minor.refresh_from_db()
+        self.assertFalse(minor.screening_passed)
+        self.assertEqual(minor.screening_notes, 'Applicant must be an adult')
+        result = TargetingResult.objects.get(application=outsider)
+        self.assertEqual(result.failed_reasons, ['Failed: In village', 'Failed rule group: Vulnerability'])
+
+        # Re-screening updates the stored results in place
+        TargetingRuleEngine(self.program, as_of=date(2025, 6, 1)).screen_applications()
+        self.assertEqual(TargetingResult.objects.filter(program=self.program).count(), 3)
+
+    def test_screens_households(self):
+        """Household rules read member counts, head age and the latest PPI score"""
+        self.rule('Poor', 'poverty_score', RuleOperator.LESS_THAN_OR_EQUAL, 40, value_type='number')
+        self.rule('Working-age head', 'age', RuleOperator.BETWEEN, [18, 60], value_type='number')
+        poor = Household.objects.create(name='Poor', village=self.village, national_id='1', phone_number='0700000001',
+                                        head_date_of_birth=date(1980, 1, 1))
+        better_off = Household.objects.create(name='Better off', village=self.village, national_id='2',
+                                              phone_number='0700000002')
+        HouseholdMember.objects.create(household=better_off, name='Head', gender='male', age=70,
+                                       relationship_to_head='head')
+        PPI.objects.create(household=poor, name='Baseline', eligibility_score=70, assessment_date=date(2024, 1, 1))
+        PPI.objects.create(household=poor, name='Endline', eligibility_score=30, assessment_date=date(2025, 1, 1))
+        PPI.objects.create(household=better_off, name='Baseline', eligibility_score=35, assessment_date=date(2025, 1, 1))
+
+        TargetingRuleEngine(self.program, as_of=date(2025, 6, 1)).screen_households(
+            Household.objects.filter(village=self.village)
+        )
+
+        self.assertTrue(TargetingResult.objects.get(household=poor).passed)
+        self.assertEqual(TargetingResult.objects.get(household=better_off).failed_reasons, ['Failed: Working-age head'])
+
+    def test_results_upsert_without_conflict_target(self):
+        """Backends that can't name a conflict target (MySQL) save results without unique_fields"""
+        from unittest.mock import patch
+        from django.db import connection
+
+        self.rule('Adult', 'age', RuleOperator.GREATER_THAN_OR_EQUAL, 18, value_type='number')
+        self.apply(age=30)
+        with patch.object(connection.features, 'supports_update_conflicts_with_target', False), \
+                patch.object(TargetingResult.objects, 'bulk_create') as bulk_create:
+            TargetingRuleEngine(self.program).screen_applications()
+
+        kwargs = bulk_create.call_args.kwargs
+        self.assertTrue(kwargs['update_conflicts'])
+        self.assertIsNone(kwargs['unique_fields'])
+
+    def test_invalid_rule_is_reported(self):
+        self.rule('Broken range', 'age', RuleOperator.BETWEEN, 18, value_type='number')
+        with self.assertRaises(RuleCompileError):
+            TargetingRuleEngine(self.program).evaluate_applications()
@@ -7,7 +7,8 @@ from django.contrib import messages
 from django.db.models import Q, Count
 from django.http import JsonResponse
 from django.utils import timezone
-from .models import EnrollmentApplication, TargetingRule, Verification, ApplicationStatus
+from .models import EnrollmentApplication, Verification, ApplicationStatus
+from .rule_engine import RuleCompileError, TargetingRuleEngine
 from households.models import Household
 from core.models import Village, Program
 import json
@@ -168,17 +169,25 @@ def application_screen(request, application_id):
         messages.success(request, 'Application screening completed!')
         return redirect('enrollment:application_detail', application_id=application.id)
 
-    # Get targeting rules for program
+    # Evaluate the program's targeting rules to suggest a score and result
     targeting_rules = []
+    evaluation = None
     if application.program:
-        targeting_rules = TargetingRule.objects.filter(
-            program=application.program,
-            is_active=True
-        ).order_by('priority')
+        engine = TargetingRuleEngine(application.program)
+        targeting_rules = engine.rules
+        if targeting_rules:
+            try:
+                results = engine.evaluate_applications(EnrollmentApplication.objects.filter(pk=application.pk))
+                evaluation = results.iloc[0].to_dict()
+                for rule in targeting_rules:
+                    rule.evaluation_passed = evaluation['rule_results'].get(str(rule.pk))
+            except RuleCompileError as e:
+                messages.warning(request, str(e))
 
     context = {
         'application': application,
         'targeting_rules': targeting_rules,
+        'evaluation': evaluation,
     }
     return render(request, 'enrollment/application_screen.html', context)
 
@@ -1,3 +1,28 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 
-# Register your models here.
+from core.services import background
+from .models import KoboWebhookLog
+from .webhook_replay import error_class_counts, replay_logs
+
+
+@admin.register(KoboWebhookLog)
+class KoboWebhookLogAdmin(admin.ModelAdmin):
+    list_display = ['submission_uuid', 'kobo_asset_uid', 'status', 'error_class', 'replay_count', 'received_at', 'processed_at']
+    list_filter = ['status', 'error_class', 'received_at']
+    search_fields = ['submission_uuid', 'kobo_asset_uid', 'error_message']
+    readonly_fields = ['form_template', 'form_submission', 'received_at', 'processed_at']
+    ordering = ['-received_at']
+    actions = ['replay_webhooks']
+
+    @admin.action(description='Replay selected webhooks through the submission processor')
+    def replay_webhooks(self, request, queryset):
+        replayable = queryset.exclude(status__in=['processed', 'duplicate'])
+        counts = error_class_counts(replayable)
+        log_ids = list(replayable.order_by('received_at').values_list('id', flat=True))
+        if not log_ids:
+            self.message_user(request, 'No failed or stuck webhooks selected.', messages.WARNING)
+            return
+
+        background.run_in_background(replay_logs, log_ids, name='kobo-webhook-replay')
+        summary = ', '.join(f'{error_class}: {count}' for error_class, count in sorted(counts.items()))
+        self.message_user(request, f'Replaying {len(log_ids)} webhooks in the background ({summary}).')
@@ -5,10 +5,17 @@ This service validates Kobo form submissions against existing MIS data
 and handles different form purposes (registration, enrollment, surveys, updates).
 """
 
-from django.db.models import Q
+from functools import reduce
+from operator import or_
+from django.db.models import Count, Q
+from django.utils import timezone
 from households.models import Household, HouseholdMember
+from households.search import build_search_document
 from core.models import Village
 
+# Submission values per query when matching a batch; each adds an OR term per
+# field, and SQLite rejects expression trees deeper than 1000
+LOOKUP_CHUNK_SIZE = 200
 
 # Common form field names that map to MIS fields
 COMMON_FIELD_MAPPINGS = {
@@ -74,7 +81,7 @@ def find_household_by_identifiers(id_number=None, phone_number=None, village_nam
     # Priority 1: Match by ID number (highest confidence)
     if id_number:
         # Clean the ID number
-        clean_id = id_number.replace(' ', '').replace('-', '')
+        clean_id = clean_id_number(id_number)
 
         # Try exact match first on head_id_number
         hh = households.filter(
@@ -97,11 +104,7 @@ def find_household_by_identifiers(id_number=None, phone_number=None, village_nam
     # Priority 2: Match by phone number
     if phone_number:
         # Clean the phone number (remove spaces, dashes, country code prefix)
-        clean_phone = phone_number.replace(' ', '').replace('-', '').replace('+', '')
-        if clean_phone.startswith('254'):
-            clean_phone = clean_phone[3:]
-        elif clean_phone.startswith('0'):
-            clean_phone = clean_phone[1:]
+        clean_phone = clean_phone_number(phone_number)
 
         # Try matching various phone formats
         hh = households.filter(
@@ -149,17 +152,13 @@ def find_member_by_identifiers(id_number=None, phone_number=None):
     members = HouseholdMember.objects.all()
 
     if id_number:
-        clean_id = id_number.replace(' ', '').replace('-', '')
+        clean_id = clean_id_number(id_number)
         member = members.filter(id_number__iexact=clean_id).first()
         if member:
             return member
 
     if phone_number:
-        clean_phone = phone_number.replace(' ', '').replace('-', '').replace('+', '')
-        if clean_phone.startswith('254'):
-            clean_phone = clean_phone[3:]
-        elif clean_phone.startswith('0'):
-            clean_phone = clean_phone[1:]
+        clean_phone = clean_phone_number(phone_number)
 
         member = members.filter(phone_number__icontains=clean_phone).first()
         if member:
@@ -199,7 +198,7 @@ def get_beneficiary_data_for_form(household, field_mapping=None):
         'county': household.village.subcounty_obj.county.name if household.village and hasattr(household.village, 'subcounty_obj') and household.village.subcounty_obj and household.village.subcounty_obj.county else '',
         'gps_latitude': str(household.gps_latitude) if household.gps_latitude else '',
         'gps_longitude': str(household.gps_longitude) if household.gps_longitude else '',
-        'total_members': household.members.count() if hasattr(household, 'members') else 0,
+        'total_members': household.member_total if hasattr(household, 'member_total') else household.members.count(),
     }
 
     return data
@@ -224,22 +223,172 @@ def validate_submission_for_purpose(form_template, form_data):
             'should_update': bool - whether to update existing record
         }
     """
-    form_purpose = form_template.form_purpose
-    field_mapping = form_template.field_mapping or {}
+    return validate_submissions_for_purpose(form_template, [form_data])[0]
 
-    # Extract identifiers from form data
-    id_number = extract_identifier_from_form_data(form_data, field_mapping, 'id_number')
-    phone_number = extract_identifier_from_form_data(form_data, field_mapping, 'phone_number')
-    village_name = extract_identifier_from_form_data(form_data, field_mapping, 'village')
 
-    # Find matching household
-    household, match_type, confidence = find_household_by_identifiers(
-        id_number=id_number,
-        phone_number=phone_number,
-        village_name=village_name
+def clean_id_number(id_number):
+    """Strip spaces and dashes from an ID number"""
+    return (id_number or '').replace(' ', '').replace('-', '')
+
+
+def clean_phone_number(phone_number):
+    """Strip formatting and the 254/0 prefix so numbers match stored variants"""
+    clean_phone = (phone_number or '').replace(' ', '').replace('-', '').replace('+', '')
+    if clean_phone.startswith('254'):
+        clean_phone = clean_phone[3:]
+    elif clean_phone.startswith('0'):
+        clean_phone = clean_phone[1:]
+    return clean_phone
+
+
+def _rows_matching_any(queryset, field_names, lookup, values, columns):
+    """
+    values_list(*columns) rows of queryset where any of field_names matches
+    any of values with lookup, in order of the first column (the pk).
+
+    Values are queried LOOKUP_CHUNK_SIZE at a time: one OR over a whole
+    backlog exceeds SQLite's expression depth limit.
+    """
+    values = sorted(values)
+    rows = {}
+    for start in range(0, len(values), LOOKUP_CHUNK_SIZE):
+        chunk = values[start:start + LOOKUP_CHUNK_SIZE]
+        condition = reduce(or_, (Q(**{f'{field_name}__{lookup}': value})
+                                 for value in chunk for field_name in field_names))
+        for row in queryset.filter(condition).values_list(*columns):
+            rows[row[0]] = row
+    return [rows[pk] for pk in sorted(rows)]
+
+
+def _index_containing(candidates, values):
+    """
+    Map each of values (lowercased) to the first candidate (id, *field values)
+    with a field containing it, case-insensitively. Each field is split into
+    substrings of the wanted lengths, so the cost doesn't grow with len(values).
+    """
+    values = {value.lower() for value in values}
+    lengths = {len(value) for value in values}
+    index = {}
+    for candidate_id, *field_values in candidates:
+        for field_value in field_values:
+            field_value = (field_value or '').lower()
+            for length in lengths:
+                for start in range(len(field_value) - length + 1):
+                    part = field_value[start:start + length]
+                    if part in values:
+                        index.setdefault(part, candidate_id)
+    return index
+
+
+def match_households(identifiers):
+    """
+    Batch version of find_household_by_identifiers.
+
+    Resolves many (id_number, phone_number, village_name) tuples with one
+    query per match strategy (per LOOKUP_CHUNK_SIZE values) instead of one
+    search per submission: exact ID, partial ID, phone, household member ID,
+    then village. ID and village comparisons are case-insensitive.
+
+    Returns:
+        list of (household or None, match_type, confidence), in input order
+    """
+    wanted = [
+        (clean_id_number(id_number) or None, clean_phone_number(phone_number) or None, village_name)
+        for id_number, phone_number, village_name in identifiers
+    ]
+    matches = [None] * len(wanted)
+
+    def unmatched(position):
+        return [i for i, match in enumerate(matches) if match is None and wanted[i][position]]
+
+    # Priority 1: exact ID number (highest confidence)
+    pending = unmatched(0)
+    if pending:
+        exact = {}
+        rows = _rows_matching_any(Household.objects, ['head_id_number', 'national_id'], 'iexact',
+                                  {wanted[i][0] for i in pending}, ['id', 'head_id_number', 'national_id'])
+        for household_id, head_id_number, national_id in rows:
+            for value in (head_id_number, national_id):
+                if value:
+                    exact.setdefault(value.lower(), household_id)
+        for i in pending:
+            household_id = exact.get(wanted[i][0].lower())
+            if household_id:
+                matches[i] = (household_id, 'id_number', 'high')
+
+    # Priority 1b: partial ID number
+    pending = unmatched(0)
+    if pending:
+        values = {wanted[i][0] for i in pending}
+        partial = _index_containing(_rows_matching_any(
+            Household.objects, ['head_id_number', 'national_id'], 'icontains', values,
+            ['id', 'head_id_number', 'national_id'],
+        ), values)
+        for i in pending:
+            household_id = partial.get(wanted[i][0].lower())
+            if household_id:
+                matches[i] = (household_id, 'id_number_partial', 'medium')
+
+    # Priority 2: phone number
+    pending = unmatched(1)
+    if pending:
+        values = {wanted[i][1] for i in pending}
+        by_phone = _index_containing(_rows_matching_any(
+            Household.objects, ['head_phone_number', 'phone_number'], 'icontains', values,
+            ['id', 'head_phone_number', 'phone_number'],
+        ), values)
+        for i in pending:
+            household_id = by_phone.get(wanted[i][1].lower())
+            if household_id:
+                matches[i] = (household_id, 'phone_number', 'medium')
+
+    # Priority 3: ID number of a household member
+    pending = unmatched(0)
+    if pending:
+        member_households = {}
+        rows = _rows_matching_any(HouseholdMember.objects, ['id_number'], 'iexact',
+                                  {wanted[i][0] for i in pending}, ['id', 'id_number', 'household_id'])
+        for _, id_number, household_id in rows:
+            member_households.setdefault(id_number.lower(), household_id)
+        for i in pending:
+            household_id = member_households.get(wanted[i][0].lower())
+            if household_id:
+                matches[i] = (household_id, 'member_id_number', 'medium')
+
+    households = Household.objects.select_related(
+        'village__subcounty_obj__county', 'subcounty'
+    ).annotate(member_total=Count('members')).in_bulk(
+        {match[0] for match in matches if match}
     )
 
-    # Default result
+    # Village only (low confidence, no specific household)
+    village_names = {wanted[i][2].lower() for i in unmatched(2)}
+    known_villages = set()
+    if village_names:
+        known_villages = {
+            name.lower() for _, name in _rows_matching_any(Village.objects, ['name'], 'iexact', village_names, ['id', 'name'])
+        }
+
+    results = []
+    for (id_number, phone_number, village_name), match in zip(wanted, matches):
+        if match:
+            household = households[match[0]]
+            match_type, confidence = match[1], match[2]
+            if match_type == 'phone_number' and village_name and household.village and \
+                    household.village.name.lower() == village_name.lower():
+                match_type, confidence = 'phone_and_village', 'high'
+            results.append((household, match_type, confidence))
+        elif not (id_number or phone_number):
+            results.append((None, 'no_identifiers', 'none'))
+        elif village_name and village_name.lower() in known_villages:
+            results.append((None, 'village_only', 'low'))
+        else:
+            results.append((None, 'not_found', 'none'))
+    return results
+
+
+def _purpose_result(form_purpose, household, match_type, confidence, beneficiary_data):
+    """Validation result for one submission given its household match"""
     result = {
         'status': 'not_validated',
         'message': '',
@@ -250,65 +399,134 @@ def validate_submission_for_purpose(form_template, form_data):
         'should_update': False,
     }
 
-    # Handle based on form purpose
     if form_purpose == 'general':
         # No validation needed
-        result['status'] = 'not_validated'
         result['message'] = 'Form does not require MIS validation'
         return result
 
-    elif form_purpose == 'new_registration':
+    if household:
+        result['household'] = household
+        result['beneficiary_data'] = beneficiary_data
+
+    if form_purpose == 'new_registration':
         # For new registration, existing beneficiary is a problem (duplicate)
         if household:
             result['status'] = 'duplicate_detected'
             result['message'] = f'Beneficiary already exists in MIS: {household.head_full_name} (ID: {household.id}). Match confidence: {confidence}'
-            result['household'] = household
-            result['beneficiary_data'] = get_beneficiary_data_for_form(household)
         else:
             result['status'] = 'beneficiary_not_found'
             result['message'] = 'No existing beneficiary found - ready for new registration'
-        return result
 
     elif form_purpose == 'program_enrollment':
         # For enrollment, we need to find the existing beneficiary
         if household:
             result['status'] = 'beneficiary_found'
             result['message'] = f'Beneficiary found: {household.head_full_name} (ID: {household.id}). Ready for program enrollment.'
-            result['household'] = household
-            result['beneficiary_data'] = get_beneficiary_data_for_form(household)
         else:
             result['status'] = 'beneficiary_not_found'
             result['message'] = 'No matching beneficiary found in MIS. Beneficiary needs to be registered first.'
-        return result
 
     elif form_purpose == 'survey':
         # For surveys, we should ideally link to existing beneficiary
         if household:
             result['status'] = 'beneficiary_found'
             result['message'] = f'Survey linked to: {household.head_full_name} (ID: {household.id})'
-            result['household'] = household
-            result['beneficiary_data'] = get_beneficiary_data_for_form(household)
         else:
             result['status'] = 'beneficiary_not_found'
             result['message'] = 'Could not link survey to existing beneficiary'
-        return result
 
     elif form_purpose == 'update_details':
         # For updates, we must find existing beneficiary
         if household:
             result['status'] = 'beneficiary_found'
             result['message'] = f'Beneficiary found: {household.head_full_name}. Data will be updated.'
-            result['household'] = household
-            result['beneficiary_data'] = get_beneficiary_data_for_form(household)
             result['should_update'] = True
         else:
             result['status'] = 'beneficiary_not_found'
             result['message'] = 'Cannot update - no matching beneficiary found in MIS'
-        return result
 
     return result
 
 
+def validate_submissions_for_purpose(form_template, form_data_list):
+    """
+    Validate a batch of submissions for one FormTemplate against MIS.
+
+    Identifiers are extracted from every submission up front and resolved
+    together by match_households(), so a backlog of N submissions costs a
+    handful of queries rather than N searches.
+
+    Args:
+        form_template: FormTemplate instance
+        form_data_list: list of submitted form_data dicts
+
+    Returns:
+        list of result dicts (see validate_submission_for_purpose), in input order
+    """
+    field_mapping = form_template.field_mapping or {}
+
+    if form_template.form_purpose == 'general':
+        matches = [(None, 'not_validated', 'none')] * len(form_data_list)
+    else:
+        matches = match_households([
+            (
+                extract_identifier_from_form_data(form_data, field_mapping, 'id_number'),
+                extract_identifier_from_form_data(form_data, field_mapping, 'phone_number'),
+                extract_identifier_from_form_data(form_data, field_mapping, 'village'),
+            )
+            for form_data in form_data_list
+        ])
+
+    beneficiary_data = {}
+    results = []
+    for household, match_type, confidence in matches:
+        if household and household.pk not in beneficiary_data:
+            beneficiary_data[household.pk] = get_beneficiary_data_for_form(household)
+        results.append(_purpose_result(
+            form_template.form_purpose, household, match_type, confidence,
+            beneficiary_data.get(household.pk) if household else {},
+        ))
+    return results
+
+
+# Household fields that update_details forms may change, and their form equivalents
+HOUSEHOLD_UPDATE_MAP = {
+    'head_first_name': ['first_name', 'firstname', 'head_first_name'],
+    'head_middle_name': ['middle_name', 'middlename', 'head_middle_name'],
+    'head_last_name': ['last_name', 'lastname', 'surname', 'head_last_name'],
+    'head_phone_number': ['phone_number', 'phone', 'mobile', 'head_phone_number'],
+    'head_id_number': ['id_number', 'national_id', 'head_id_number'],
+    'head_gender': ['gender', 'sex', 'head_gender'],
+}
+
+
+def apply_submission_to_household(household, form_data, field_mapping=None):
+    """
+    Set changed household fields from form data without saving.
+
+    Returns:
+        list of updated field names
+    """
+    field_mapping = field_mapping or {}
+    updated_fields = []
+
+    for hh_field, form_fields in HOUSEHOLD_UPDATE_MAP.items():
+        # Custom mapping takes precedence over common field names
+        if hh_field in field_mapping:
+            form_fields = [field_mapping[hh_field]] + form_fields
+
+        for form_field in form_fields:
+            if form_field in form_data and form_data[form_field]:
+                new_value = str(form_data[form_field]).strip()
+                old_value = getattr(household, hh_field, '')
+                if new_value and new_value != old_value:
+                    setattr(household, hh_field, new_value)
+                    updated_fields.append(hh_field)
+                break
+
+    return updated_fields
+
+
 def update_household_from_submission(household, form_data, field_mapping=None):
     """
     Update household details from form submission data.
@@ -321,53 +539,57 @@ def update_household_from_submission(household, form_data, field_mapping=None):
     Returns:
         tuple: (success: bool, updated_fields: list, message: str)
     """
-    if not household:
-        return False, [], 'No household to update'
+    return update_households_from_submissions([(household, form_data)], field_mapping)[0]
 
-    field_mapping = field_mapping or {}
-    updated_fields = []
 
-    # Define updateable fields and their form equivalents
-    update_map = {
-        'head_first_name': ['first_name', 'firstname', 'head_first_name'],
-        'head_middle_name': ['middle_name', 'middlename', 'head_middle_name'],
-        'head_last_name': ['last_name', 'lastname', 'surname', 'head_last_name'],
-        'head_phone_number': ['phone_number', 'phone', 'mobile', 'head_phone_number'],
-        'head_id_number': ['id_number', 'national_id', 'head_id_number'],
-        'head_gender': ['gender', 'sex', 'head_gender'],
-    }
+def update_households_from_submissions(updates, field_mapping=None):
+    """
+    Apply update_details submissions to their households with one bulk_update.
 
-    try:
-        for hh_field, form_fields in update_map.items():
-            # Check custom mapping first
-            if hh_field in field_mapping:
-                form_field = field_mapping[hh_field]
-                if form_field in form_data and form_data[form_field]:
-                    new_value = str(form_data[form_field]).strip()
-                    old_value = getattr(household, hh_field, '')
-                    if new_value and new_value != old_value:
-                        setattr(household, hh_field, new_value)
-                        updated_fields.append(hh_field)
-                    continue
-
-            # Try common field names
-            for form_field in form_fields:
-                if form_field in form_data and form_data[form_field]:
-                    new_value = str(form_data[form_field]).strip()
-                    old_value = getattr(household, hh_field, '')
-                    if new_value and new_value != old_value:
-                        setattr(household, hh_field, new_value)
-                        updated_fields.append(hh_field)
-                    break
+    Submissions for the same household are applied in order, so the latest
+    answer wins.
+
+    Args:
+        updates: list of (household, form_data) pairs
+        field_mapping: dict - Field mapping from FormTemplate
 
+    Returns:
+        list of (success: bool, updated_fields: list, message: str), in input order
+    """
+    results = []
+    changed = {}
+    changed_fields = set()
+
+    for household, form_data in updates:
+        if not household:
+            results.append((False, [], 'No household to update'))
+            continue
+        # Reuse one instance per household so repeated updates stack
+        household = changed.get(household.pk, household)
+        updated_fields = apply_submission_to_household(household, form_data, field_mapping)
         if updated_fields:
-            household.save()
-            return True, updated_fields, f'Updated fields: {", ".join(updated_fields)}'
+            changed[household.pk] = household
+            changed_fields.update(updated_fields)
+            results.append((True, updated_fields, f'Updated fields: {", ".join(updated_fields)}'))
         else:
-            return True, [], 'No fields needed updating'
+            results.append((True, [], 'No fields needed updating'))
 
-    except Exception as e:
-        return False, [], f'Error updating household: {str(e)}'
+    if changed:
+        now = timezone.now()
+        for household in changed.values():
+            household.updated_at = now
+            household.search_document = build_search_document(household)
+        try:
+            Household.objects.bulk_update(
+                list(changed.values()), sorted(changed_fields) + ['search_document', 'updated_at'], batch_size=500
+            )
+        except Exception as e:
+            results = [
+                (False, [], f'Error updating household: {str(e)}') if updated_fields else (success, updated_fields, message)
+                for success, updated_fields, message in results
+            ]
+
+    return results
 
 
 def create_household_from_submission(form_data, field_mapping=None, gps_latitude=None, gps_longitude=None, created_by=None):
@@ -1,12 +1,14 @@
 """
 Form Import Service
-Handles importing forms from JSON, XML (XLSForm), and KoboToolbox formats.
-Preserves the original structure including sections and groups.
+Handles importing forms from JSON, XML (XLSForm), XLSForm spreadsheets and
+KoboToolbox formats. Preserves the original structure including sections and groups.
+Uploaded files can be passed as file objects so they are parsed straight from
+disk instead of being read and decoded into one string first.
 """
 
 import json
 import xml.etree.ElementTree as ET
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, List, Tuple, Optional, Union, IO
 import re
 
 
@@ -17,6 +19,7 @@ class FormImporter:
     - JSON (UPG internal format)
     - XLSForm JSON (KoboToolbox format)
     - XML (ODK/XLSForm XML format)
+    - XLSForm spreadsheets (.xlsx with survey/choices/settings sheets)
     """
 
     # Reverse mapping from XLSForm types to UPG types
@@ -46,13 +49,13 @@ class FormImporter:
         self.errors = []
         self.warnings = []
 
-    def import_from_json(self, json_data: str) -> Tuple[Dict, List[Dict]]:
+    def import_from_json(self, json_data: Union[str, IO]) -> Tuple[Dict, List[Dict]]:
         """
         Import form from JSON format.
         Supports both UPG internal format and XLSForm JSON format.
 
         Args:
-            json_data: JSON string
+            json_data: JSON string or file object
 
         Returns:
             tuple: (form_metadata, fields_list)
@@ -61,8 +64,11 @@ class FormImporter:
         self.warnings = []
 
         try:
-            data = json.loads(json_data)
-        except json.JSONDecodeError as e:
+            if hasattr(json_data, 'read'):
+                data = json.load(json_data)
+            else:
+                data = json.loads(json_data)
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
             self.errors.append(f"Invalid JSON format: {str(e)}")
             return None, []
 
@@ -77,12 +83,12 @@ class FormImporter:
             # Try to parse as generic form definition
             return self._parse_generic_json(data)
 
-    def import_from_xml(self, xml_data: str) -> Tuple[Dict, List[Dict]]:
+    def import_from_xml(self, xml_data: Union[str, IO]) -> Tuple[Dict, List[Dict]]:
         """
         Import form from XML format (ODK/XLSForm XML).
 
         Args:
-            xml_data: XML string
+            xml_data: XML string or binary file object
 
         Returns:
             tuple: (form_metadata, fields_list)
@@ -91,15 +97,84 @@ class FormImporter:
         self.warnings = []
 
         try:
-            # Remove BOM if present
-            xml_data = xml_data.lstrip('\ufeff')
-            root = ET.fromstring(xml_data)
+            if hasattr(xml_data, 'read'):
+                # The parser reads the file incrementally and handles a UTF-8 BOM
+                root = ET.parse(xml_data).getroot()
+            else:
+                # Remove BOM if present
+                xml_data = xml_data.lstrip('\ufeff')
+                root = ET.fromstring(xml_data)
         except ET.ParseError as e:
             self.errors.append(f"Invalid XML format: {str(e)}")
             return None, []
 
         return self._parse_xform_xml(root)
 
+    def import_from_xlsx(self, xlsx_file: Union[str, IO]) -> Tuple[Dict, List[Dict]]:
+        """
+        Import form from an XLSForm spreadsheet.
+
+        Sheets are streamed with openpyxl in read-only mode and converted to
+        the same survey/choices/settings structure KoboToolbox returns as JSON.
+
+        Args:
+            xlsx_file: Path or binary file object
+
+        Returns:
+            tuple: (form_metadata, fields_list)
+        """
+        from openpyxl import load_workbook
+
+        self.errors = []
+        self.warnings = []
+
+        try:
+            workbook = load_workbook(xlsx_file, read_only=True, data_only=True)
+        except Exception as e:
+            self.errors.append(f"Invalid XLSX file: {str(e)}")
+            return None, []
+
+        try:
+            sheets = {name.strip().lower(): workbook[name] for name in workbook.sheetnames}
+            if 'survey' not in sheets:
+                self.errors.append("XLSForm must contain a 'survey' sheet")
+                return None, []
+
+            data = {
+                'survey': list(self._iter_sheet_rows(sheets['survey'])),
+                'choices': list(self._iter_sheet_rows(sheets['choices'])) if 'choices' in sheets else [],
+            }
+            if 'settings' in sheets:
+                data['settings'] = next(self._iter_sheet_rows(sheets['settings']), {})
+        finally:
+            workbook.close()
+
+        return self._parse_xlsform_json(data)
+
+    def _iter_sheet_rows(self, worksheet):
+        """Yield each non-empty row of an XLSForm sheet as a dict of header -> text"""
+        rows = worksheet.iter_rows(values_only=True)
+        header = next(rows, None)
+        if not header:
+            return
+        columns = [str(name).strip() if name is not None else '' for name in header]
+
+        # Translated sheets use 'label::English (en)'; keep the first as the label
+        for base in ('label', 'hint'):
+            if base not in columns:
+                translated = next((i for i, name in enumerate(columns) if name.startswith(f'{base}::')), None)
+                if translated is not None:
+                    columns[translated] = base
+
+        for row in rows:
+            item = {
+                column: str(value).strip()
+                for column, value in zip(columns, row)
+                if column and value is not None and str(value).strip() != ''
+            }
+            if item:
+                yield item
+
     def import_from_kobo_asset(self, asset_data: Dict) -> Tuple[Dict, List[Dict]]:
         """
         Import form directly from KoboToolbox asset API response.
@@ -604,13 +679,13 @@ class FormImporter:
         }
 
 
-def import_form_from_file(file_content: str, file_type: str) -> Tuple[Optional[Dict], List[Dict], List[str], List[str]]:
+def import_form_from_file(file_content: Union[str, IO], file_type: str) -> Tuple[Optional[Dict], List[Dict], List[str], List[str]]:
     """
     Convenience function to import form from file content.
 
     Args:
-        file_content: File content as string
-        file_type: 'json' or 'xml'
+        file_content: File content as string, or a binary file object
+        file_type: 'json', 'xml' or 'xlsx'
 
     Returns:
         tuple: (metadata, fields, errors, warnings)
@@ -621,6 +696,8 @@ def import_form_from_file(file_content: str, file_type: str) -> Tuple[Optional[D
         metadata, fields = importer.import_from_json(file_content)
     elif file_type.lower() in ['xml', 'xform']:
         metadata, fields = importer.import_from_xml(file_content)
+    elif file_type.lower() == 'xlsx':
+        metadata, fields = importer.import_from_xlsx(file_content)
     else:
         importer.errors.append(f"Unsupported file type: {file_type}")
         return None, [], importer.errors, importer.warnings
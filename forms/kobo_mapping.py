@@ -0,0 +1,209 @@
+"""
+Compiled Kobo Payload Mapping
+
+KoboSubmissionProcessor used to re-derive the field mapping from the
+FormTemplate's fields for every webhook. This module compiles a
+per-template KoboMappingPlan (grouped-path flattening, type coercers, GPS
+keys) and caches it under a key versioned on the template's and its fields'
+change stamps, so the per-submission path is dict work.
+
+The template, user and assignment lookups are single indexed queries and
+are not cached: the default cache is per process, so a cached row (or a
+cached miss) would go stale in the other workers.
+"""
+
+from django.core.cache import cache
+from django.contrib.auth import get_user_model
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+import re
+
+from core.services.cache_service import CACHE_PREFIX, MEDIUM_CACHE
+
+# Kobo geopoint keys checked before the template's own location fields
+DEFAULT_GPS_KEYS = ['household_gps', 'gps_location', 'location', 'geopoint']
+
+ACTIVE_ASSIGNMENT_STATUSES = ['pending', 'accepted', 'in_progress']
+LINKED_ASSIGNMENT_STATUSES = ACTIVE_ASSIGNMENT_STATUSES + ['completed']
+
+
+def clean_phone_number(phone):
+    """
+    Clean and validate Kenya phone number
+
+    Args:
+        phone: Phone number string
+
+    Returns:
+        str: Cleaned phone number or original if invalid
+    """
+    if not phone:
+        return ''
+
+    # Remove non-numeric characters
+    phone = re.sub(r'\D', '', str(phone))
+
+    # Kenya formats: 07XXXXXXXX or 01XXXXXXXX
+    if re.match(r'^(07|01)\d{8}$', phone):
+        return phone
+
+    # International format: +254... -> 0...
+    if phone.startswith('254') and len(phone) == 12:
+        return f"0{phone[3:]}"
+
+    # Return original if no match
+    return phone
+
+
+def coerce_number(value):
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return None
+
+
+def coerce_boolean(value):
+    return value in ['yes', 'true', '1', True]
+
+
+FIELD_COERCERS = {
+    'phone': clean_phone_number,
+    'number': coerce_number,
+    'boolean': coerce_boolean,
+}
+
+
+def flatten_payload(kobo_data):
+    """
+    Map Kobo keys to bare field names: 'group/sub_group/field' -> 'field'.
+    Top-level keys win over grouped ones with the same name.
+    """
+    flat = {}
+    for key, value in kobo_data.items():
+        if '/' in key:
+            flat.setdefault(key.rsplit('/', 1)[1], value)
+        else:
+            flat[key] = value
+    return flat
+
+
+class KoboMappingPlan:
+    """
+    Field mapping for one FormTemplate, compiled once and reused for every
+    submission until the template changes.
+    """
+
+    def __init__(self, fields):
+        # (field_name, coercer or None) in template order
+        self.fields = [
+            (field.field_name, FIELD_COERCERS.get(field.field_type))
+            for field in fields
+        ]
+        location_fields = [field.field_name for field in fields if field.field_type == 'location']
+        self.gps_keys = DEFAULT_GPS_KEYS + [name for name in location_fields if name not in DEFAULT_GPS_KEYS]
+
+    @classmethod
+    def for_template(cls, form_template):
+        return cls(list(form_template.fields.all().order_by('order')))
+
+    def map(self, kobo_data, flat=None):
+        """Kobo payload -> UPG form_data"""
+        flat = flatten_payload(kobo_data) if flat is None else flat
+        form_data = {}
+        for field_name, coercer in self.fields:
+            value = flat.get(field_name)
+            if value is not None:
+                form_data[field_name] = coercer(value) if coercer else value
+
+        # Also include any extra fields from Kobo that aren't in form template
+        # This helps preserve all submission data
+        for key, value in kobo_data.items():
+            if not key.startswith('_') and key not in form_data:
+                form_data[key] = value
+        return form_data
+
+    def extract_gps(self, kobo_data, flat=None):
+        """(latitude, longitude, location_name) from the first geopoint key present"""
+        flat = flatten_payload(kobo_data) if flat is None else flat
+        latitude = longitude = None
+        for key in self.gps_keys:
+            if key in flat:
+                # Kobo geopoint format: "latitude longitude altitude accuracy"
+                parts = str(flat[key]).split()
+                if len(parts) >= 2:
+                    try:
+                        latitude, longitude = float(parts[0]), float(parts[1])
+                    except ValueError:
+                        pass
+                break
+        return latitude, longitude, kobo_data.get('location_name', '')
+
+
+# =============================================================================
+# Resolvers
+# =============================================================================
+
+def _plan_key(form_template):
+    """
+    Plan cache key versioned on the template's and its fields' change stamps,
+    so an edit in any worker produces a new key instead of relying on a
+    per-process invalidation.
+    """
+    fields_changed = form_template.fields_changed.timestamp() if form_template.fields_changed else 0
+    return (
+        f'{CACHE_PREFIX}kobo_plan_{form_template.pk}_{form_template.updated_at.timestamp()}_'
+        f'{fields_changed}_{form_template.field_count}'
+    )
+
+
+def get_mapping_plan(form_template):
+    """Compiled plan for a template loaded by resolve_form_template()"""
+    if not hasattr(form_template, 'fields_changed'):
+        return KoboMappingPlan.for_template(form_template)
+    key = _plan_key(form_template)
+    plan = cache.get(key)
+    if plan is None:
+        plan = KoboMappingPlan.for_template(form_template)
+        cache.set(key, plan, MEDIUM_CACHE)
+    return plan
+
+
+def resolve_form_template(asset_uid):
+    """
+    FormTemplate (with created_by loaded) for a Kobo asset UID, or None.
+    Read on every submission; the field change stamps annotated here version
+    the cached mapping plan.
+    """
+    from .models import FormField, FormTemplate
+
+    if not asset_uid:
+        return None
+    fields = FormField.objects.filter(form_template=OuterRef('pk')).order_by().values('form_template')
+    return FormTemplate.objects.select_related('created_by').filter(kobo_asset_uid=asset_uid).annotate(
+        fields_changed=Subquery(fields.annotate(changed=Max('updated_at')).values('changed')),
+        field_count=Coalesce(Subquery(fields.annotate(total=Count('pk')).values('total')), 0),
+    ).first()
+
+
+def resolve_user(username):
+    if not username:
+        return None
+    return get_user_model().objects.filter(username=username).first()
+
+
+def resolve_assignment(form_template):
+    """
+    (assignment_id, fallback_user) for a template: the assignment new
+    submissions are linked to, and the assignee of the first active
+    assignment for submissions whose user is unknown.
+    """
+    from .models import FormAssignment
+
+    assignments = list(FormAssignment.objects.filter(
+        form_template=form_template, status__in=LINKED_ASSIGNMENT_STATUSES
+    ).select_related('mentor', 'field_associate'))
+    active = next((a for a in assignments if a.status in ACTIVE_ASSIGNMENT_STATUSES), None)
+    return (
+        assignments[0].pk if assignments else None,
+        (active.mentor or active.field_associate) if active else None,
+    )
@@ -4,13 +4,18 @@ Handles bi-directional sync between UPG FormTemplates and KoboToolbox forms
 """
 
 import requests
+import hashlib
 import json
+import re
 import time
 from datetime import datetime, timezone
 from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max
 from django.utils import timezone as django_timezone
 from django.db import transaction
 from .models import FormTemplate, KoboSyncLog
+from core.services.cache_service import CACHE_PREFIX
 from core.kobo_export import (
     export_households_csv,
     export_villages_csv,
@@ -272,6 +277,37 @@ class KoboAPIClient:
         return response.json()
 
 
+# Form purposes that always get beneficiary lookup fields
+LOOKUP_FORM_PURPOSES = ['program_enrollment', 'survey', 'update_details']
+
+# Field name/label fragments that mark beneficiary identifier fields
+ID_FIELD_PATTERNS = ['id_number', 'national_id', 'id_no', 'idnumber', 'nationalid', 'head_id_number', 'identification']
+PHONE_FIELD_PATTERNS = ['phone', 'phone_number', 'phonenumber', 'mobile', 'telephone', 'head_phone', 'contact_phone']
+VILLAGE_FIELD_PATTERNS = ['village', 'village_name', 'villagename', 'village_id']
+
+
+def _compile_patterns(patterns):
+    """One case-insensitive regex matching any of the substrings"""
+    return re.compile('|'.join(re.escape(pattern) for pattern in sorted(patterns, key=len, reverse=True)), re.IGNORECASE)
+
+
+ID_FIELD_RE = _compile_patterns(ID_FIELD_PATTERNS)
+PHONE_FIELD_RE = _compile_patterns(PHONE_FIELD_PATTERNS)
+VILLAGE_FIELD_RE = _compile_patterns(VILLAGE_FIELD_PATTERNS)
+
+# The converter also treats any 'id' or 'tel' fragment as an identifier
+LOOKUP_TRIGGER_RE = _compile_patterns(ID_FIELD_PATTERNS + PHONE_FIELD_PATTERNS + VILLAGE_FIELD_PATTERNS + ['id', 'tel'])
+
+# Bump when the conversion output changes so cached XLSForms are rebuilt
+XLSFORM_CONVERTER_VERSION = 1
+XLSFORM_CACHE_TIMEOUT = 86400  # 24 hours
+
+
+def xlsform_content_hash(xlsform):
+    """Stable hash of XLSForm content, used to skip no-op Kobo updates"""
+    return hashlib.sha256(json.dumps(xlsform, sort_keys=True, default=str).encode()).hexdigest()
+
+
 class XLSFormConverter:
     """
     Convert UPG FormTemplate to XLSForm JSON format
@@ -324,14 +360,51 @@ class XLSFormConverter:
 
     def __init__(self, form_template):
         self.form_template = form_template
+        self._fields = None
+
+    @property
+    def fields(self):
+        """The template's fields, loaded once per converter"""
+        if self._fields is None:
+            self._fields = list(self.form_template.fields.all().order_by('order'))
+        return self._fields
 
-    def convert_to_xlsform(self):
+    def fingerprint(self):
         """
-        Convert FormTemplate to XLSForm JSON
+        Hash of everything the XLSForm is built from. Field changes are
+        detected from one aggregate query (count, newest id, last update)
+        rather than by loading the fields.
+        """
+        template = self.form_template
+        field_stats = template.fields.aggregate(
+            count=Count('id'), max_id=Max('id'), last_updated=Max('updated_at')
+        )
+        parts = [
+            XLSFORM_CONVERTER_VERSION, template.id, template.name, template.kobo_version,
+            template.form_purpose, json.dumps(template.field_mapping, sort_keys=True, default=str),
+            field_stats['count'], field_stats['max_id'], field_stats['last_updated'],
+        ]
+        return hashlib.sha256('|'.join(str(part) for part in parts).encode()).hexdigest()
+
+    def convert_to_xlsform(self, use_cache=True):
+        """
+        Convert FormTemplate to XLSForm JSON, reusing the cached result while
+        the template's fingerprint is unchanged
 
         Returns:
             dict: XLSForm structure with 'survey', 'choices', 'settings'
         """
+        if not use_cache or not self.form_template.pk:
+            return self._build_xlsform()
+
+        key = f'{CACHE_PREFIX}xlsform_{self.form_template.pk}_{self.fingerprint()}'
+        xlsform = cache.get(key)
+        if xlsform is None:
+            xlsform = self._build_xlsform()
+            cache.set(key, xlsform, XLSFORM_CACHE_TIMEOUT)
+        return xlsform
+
+    def _build_xlsform(self):
         xlsform = {
             'survey': [],
             'choices': [],
@@ -351,7 +424,7 @@ class XLSFormConverter:
             self._add_beneficiary_lookup_fields(xlsform)
 
         # Add form fields
-        for field in self.form_template.fields.all().order_by('order'):
+        for field in self.fields:
             self._add_field_to_survey(field, xlsform)
 
         return xlsform
@@ -365,47 +438,16 @@ class XLSFormConverter:
         2. Form has mandatory fields for phone number, ID number, or village
         """
         # Check form purpose
-        if self.form_template.form_purpose in ['program_enrollment', 'survey', 'update_details']:
+        if self.form_template.form_purpose in LOOKUP_FORM_PURPOSES:
             return True
 
-        # Field name patterns that indicate beneficiary identifier fields
-        id_patterns = [
-            'id_number', 'national_id', 'id_no', 'idnumber', 'nationalid',
-            'head_id_number', 'identification', 'id'
-        ]
-        phone_patterns = [
-            'phone', 'phone_number', 'phonenumber', 'mobile', 'telephone',
-            'head_phone', 'contact_phone', 'tel'
-        ]
-        village_patterns = [
-            'village', 'village_name', 'villagename', 'village_id'
-        ]
-
-        # Check all form fields for mandatory identifier fields
-        for field in self.form_template.fields.all():
+        # Check mandatory fields for identifier names/labels or phone type
+        for field in self.fields:
             if not field.required:
                 continue  # Only check mandatory fields
-
-            field_name_lower = field.field_name.lower()
-            field_label_lower = field.field_label.lower() if field.field_label else ''
-
-            # Check for ID number field
-            for pattern in id_patterns:
-                if pattern in field_name_lower or pattern in field_label_lower:
-                    return True
-
-            # Check for phone field
-            for pattern in phone_patterns:
-                if pattern in field_name_lower or pattern in field_label_lower:
-                    return True
-
-            # Check for village field
-            for pattern in village_patterns:
-                if pattern in field_name_lower or pattern in field_label_lower:
-                    return True
-
-            # Also check field type - phone type fields
-            if field.field_type == 'phone' and field.required:
+            if field.field_type == 'phone':
+                return True
+            if LOOKUP_TRIGGER_RE.search(field.field_name) or LOOKUP_TRIGGER_RE.search(field.field_label or ''):
                 return True
 
         return False
@@ -673,44 +715,24 @@ def check_form_has_beneficiary_lookup(form_template):
     }
 
     # Check form purpose first
-    if form_template.form_purpose in ['program_enrollment', 'survey', 'update_details']:
+    if form_template.form_purpose in LOOKUP_FORM_PURPOSES:
         result['enabled'] = True
         result['reason'] = f"Form purpose is '{form_template.get_form_purpose_display()}'"
         return result
 
-    # Field name patterns
-    id_patterns = ['id_number', 'national_id', 'id_no', 'idnumber', 'nationalid', 'head_id_number', 'identification']
-    phone_patterns = ['phone', 'phone_number', 'phonenumber', 'mobile', 'telephone', 'head_phone', 'contact_phone']
-    village_patterns = ['village', 'village_name', 'villagename', 'village_id']
-
     detected = []
+    field_checks = [(ID_FIELD_RE, 'ID field'), (PHONE_FIELD_RE, 'Phone field'), (VILLAGE_FIELD_RE, 'Village field')]
 
-    for field in form_template.fields.all():
-        if not field.required:
-            continue
-
-        field_name_lower = field.field_name.lower()
-        field_label_lower = (field.field_label or '').lower()
+    for field in form_template.fields.filter(required=True):
+        field_label = field.field_label or ''
+        matched = False
+        for pattern, kind in field_checks:
+            if pattern.search(field.field_name) or pattern.search(field_label):
+                detected.append(f"{field.field_label} ({kind})")
+                matched = True
 
-        # Check patterns
-        for pattern in id_patterns:
-            if pattern in field_name_lower or pattern in field_label_lower:
-                detected.append(f"{field.field_label} (ID field)")
-                break
-
-        for pattern in phone_patterns:
-            if pattern in field_name_lower or pattern in field_label_lower:
-                detected.append(f"{field.field_label} (Phone field)")
-                break
-
-        for pattern in village_patterns:
-            if pattern in field_name_lower or pattern in field_label_lower:
-                detected.append(f"{field.field_label} (Village field)")
-                break
-
-        if field.field_type == 'phone' and field.required:
-            if field.field_label not in [d.split(' (')[0] for d in detected]:
-                detected.append(f"{field.field_label} (Phone type)")
+        if field.field_type == 'phone' and not matched:
+            detected.append(f"{field.field_label} (Phone type)")
 
     if detected:
         result['enabled'] = True
@@ -720,7 +742,7 @@ def check_form_has_beneficiary_lookup(form_template):
     return result
 
 
-def sync_form_to_kobo(form_template, user=None, force=False):
+def sync_form_to_kobo(form_template, user=None, force=False, skip_unchanged=True):
     """
     Main function to sync FormTemplate to KoboToolbox
 
@@ -728,6 +750,8 @@ def sync_form_to_kobo(form_template, user=None, force=False):
         form_template: FormTemplate instance
         user: User initiating the sync (optional)
         force: Force re-sync even if already synced (default: False)
+        skip_unchanged: Skip pushing the form when its content matches the
+            last successful sync (default: True)
 
     Returns:
         tuple: (success: bool, message: str, asset_uid: str)
@@ -758,9 +782,35 @@ def sync_form_to_kobo(form_template, user=None, force=False):
             converter = XLSFormConverter(form_template)
             xlsform_content = converter.convert_to_xlsform()
 
+            content_hash = xlsform_content_hash(xlsform_content)
+
             sync_log.request_data = xlsform_content
             sync_log.save()
 
+            # Nothing changed since the last successful sync: only refresh reference data
+            if (
+                skip_unchanged and form_template.kobo_asset_uid and
+                form_template.kobo_sync_status == 'synced' and
+                form_template.kobo_content_hash == content_hash
+            ):
+                asset_uid = form_template.kobo_asset_uid
+                try:
+                    push_reference_data(client, asset_uid)
+                except Exception as e:
+                    sync_log.error_message = f"Warning: Failed to push reference data: {str(e)}"
+
+                form_template.last_synced_at = django_timezone.now()
+                form_template.save(update_fields=['last_synced_at'])
+
+                sync_log.kobo_asset_uid = asset_uid
+                sync_log.response_data = {'skipped': True, 'reason': 'Form content unchanged'}
+                sync_log.status = 'success'
+                sync_log.completed_at = django_timezone.now()
+                sync_log.duration_seconds = (sync_log.completed_at - sync_log.started_at).total_seconds()
+                sync_log.save()
+
+                return (True, "Form is already up to date in KoboToolbox", asset_uid)
+
             # Create or update asset
             if form_template.kobo_asset_uid:
                 # Update existing asset
@@ -841,6 +891,7 @@ def sync_form_to_kobo(form_template, user=None, force=False):
 
             # Update form template status
             form_template.kobo_sync_status = 'synced'
+            form_template.kobo_content_hash = content_hash
             form_template.last_synced_at = django_timezone.now()
             form_template.last_sync_error = ''
             form_template.save()
@@ -891,7 +942,7 @@ def fetch_kobo_submissions(form_template, user=None):
         tuple: (success: bool, message: str, count: int)
     """
     from .models import FormSubmission, KoboWebhookLog
-    from .beneficiary_lookup import validate_submission_for_purpose, update_household_from_submission
+    from .beneficiary_lookup import validate_submissions_for_purpose, update_households_from_submissions
     from django.contrib.auth import get_user_model
     User = get_user_model()
 
@@ -911,18 +962,28 @@ def fetch_kobo_submissions(form_template, user=None):
         submissions = data.get('results', [])
 
         new_count = 0
-        skipped_count = 0
         duplicates_found = 0
         updates_made = 0
 
+        # Skip submissions already imported (one lookup for the whole page)
+        existing_uuids = set(FormSubmission.objects.filter(
+            kobo_submission_uuid__in=[sub.get('_uuid') for sub in submissions if sub.get('_uuid')]
+        ).values_list('kobo_submission_uuid', flat=True))
+        new_submissions = []
         for sub in submissions:
-            submission_uuid = sub.get('_uuid')
-
-            # Skip if already imported
-            if FormSubmission.objects.filter(kobo_submission_uuid=submission_uuid).exists():
-                skipped_count += 1
+            if sub.get('_uuid') in existing_uuids:
                 continue
+            if sub.get('_uuid'):
+                existing_uuids.add(sub['_uuid'])
+            new_submissions.append(sub)
+        skipped_count = len(submissions) - len(new_submissions)
+        submissions = new_submissions
+
+        kobo_usernames = {sub['_submitted_by'] for sub in submissions if sub.get('_submitted_by')}
+        users_by_username = User.objects.in_bulk(kobo_usernames, field_name='username') if kobo_usernames else {}
 
+        pending = []
+        for sub in submissions:
             # Parse submission time (ensure timezone-aware)
             submission_time = None
             if sub.get('_submission_time'):
@@ -939,12 +1000,7 @@ def fetch_kobo_submissions(form_template, user=None):
                     submission_time = django_timezone.now()
 
             # Find submitter
-            submitted_by = user or form_template.created_by
-            kobo_username = sub.get('_submitted_by')
-            if kobo_username:
-                found_user = User.objects.filter(username=kobo_username).first()
-                if found_user:
-                    submitted_by = found_user
+            submitted_by = users_by_username.get(sub.get('_submitted_by')) or user or form_template.created_by
 
             # Extract GPS data
             gps_lat, gps_lng = None, None
@@ -961,20 +1017,29 @@ def fetch_kobo_submissions(form_template, user=None):
 
             # Build form_data (exclude internal Kobo fields)
             form_data = {k: v for k, v in sub.items() if not k.startswith('_')}
+            pending.append((sub.get('_uuid'), submission_time, submitted_by, gps_lat, gps_lng, form_data))
+
+        # MIS Validation based on form purpose, for the whole batch at once
+        validation_results = validate_submissions_for_purpose(form_template, [item[5] for item in pending])
 
-            # MIS Validation based on form purpose
-            validation_result = validate_submission_for_purpose(form_template, form_data)
+        # Apply updates for update_details forms in one bulk update
+        to_update = [
+            i for i, result in enumerate(validation_results)
+            if result['should_update'] and result['household']
+        ]
+        update_results = dict(zip(to_update, update_households_from_submissions(
+            [(validation_results[i]['household'], pending[i][5]) for i in to_update],
+            form_template.field_mapping
+        )))
+
+        for i, (submission_uuid, submission_time, submitted_by, gps_lat, gps_lng, form_data) in enumerate(pending):
+            validation_result = validation_results[i]
             validation_status = validation_result['status']
             validation_message = validation_result['message']
             matched_household = validation_result['household']
 
-            # Handle updates for update_details forms
-            if validation_result['should_update'] and matched_household:
-                success, updated_fields, update_msg = update_household_from_submission(
-                    matched_household,
-                    form_data,
-                    form_template.field_mapping
-                )
+            if i in update_results:
+                success, updated_fields, update_msg = update_results[i]
                 if success and updated_fields:
                     validation_status = 'data_updated'
                     validation_message = f'{validation_message}. {update_msg}'
@@ -4,7 +4,6 @@ Receives and processes form submissions from KoboToolbox
 """
 
 import json
-import re
 import hmac
 import hashlib
 import logging
@@ -13,15 +12,30 @@ from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST
 from django.utils import timezone
-from django.db import transaction
+from django.db import connection, transaction, IntegrityError
 from django.conf import settings
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+from core.services import background
+
 from .models import (
-    FormTemplate,
     FormSubmission,
-    FormAssignment,
     KoboWebhookLog,
 )
+from .kobo_mapping import (
+    KoboMappingPlan,
+    clean_phone_number,
+    flatten_payload,
+    get_mapping_plan,
+    resolve_assignment,
+    resolve_form_template,
+    resolve_user,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -62,12 +76,56 @@ def verify_kobo_signature(request):
         if signature.startswith('sha256='):
             signature = signature[7:]
 
-        return hmac.compare_digest(signature.lower(), expected.lower())
+        return hmac.compare_digest(signature.lower().encode('utf-8'), expected.encode('ascii'))
     except Exception as e:
         logger.error(f"Error verifying webhook signature: {e}")
         return False
 
 
+def parse_json_body(body):
+    """
+    Parse a webhook body, using orjson when installed.
+
+    Raises:
+        ValueError: If the body is not valid JSON
+    """
+    if ORJSON_AVAILABLE:
+        return orjson.loads(body)
+    return json.loads(body)
+
+
+def create_webhook_log(**fields):
+    """
+    Insert a KoboWebhookLog, relying on the unique submission_uuid for
+    deduplication. Returns None if the submission was already received;
+    any other integrity error is raised.
+    """
+    try:
+        if connection.in_atomic_block:
+            # Keep a failed insert from breaking the caller's transaction
+            with transaction.atomic():
+                return KoboWebhookLog.objects.create(**fields)
+        return KoboWebhookLog.objects.create(**fields)
+    except IntegrityError:
+        if KoboWebhookLog.objects.filter(submission_uuid=fields.get('submission_uuid')).exists():
+            return None
+        raise
+
+
+def process_received_log(webhook_log_id):
+    """
+    Background job for a newly received webhook. The log is claimed by moving
+    it from 'received' to 'retrying', so a replay that already picked it up
+    as stuck (manage.py replay_kobo_webhooks) is not processed twice.
+    """
+    claimed = KoboWebhookLog.objects.filter(pk=webhook_log_id, status='received').update(
+        status='retrying', processed_at=timezone.now()
+    )
+    if not claimed:
+        return None
+    return KoboSubmissionProcessor().process_submission(webhook_log_id)
+
+
 @csrf_exempt
 @require_POST
 def kobo_webhook_receiver(request):
@@ -75,7 +133,9 @@ def kobo_webhook_receiver(request):
     Webhook endpoint for KoboToolbox submissions
     URL: /forms/kobo/webhook/
 
-    Receives submissions and queues them for processing.
+    Receives submissions and queues them for processing on a background
+    thread once the log is committed. Logs whose processing fails or never
+    finishes are picked up by manage.py replay_kobo_webhooks.
     Validates webhook signature if KOBO_WEBHOOK_SECRET is configured.
 
     Returns:
@@ -96,8 +156,10 @@ def kobo_webhook_receiver(request):
 
         # Parse JSON payload
         try:
-            payload = json.loads(request.body)
-        except json.JSONDecodeError:
+            payload = parse_json_body(request.body)
+        except ValueError:
+            return JsonResponse({'status': 'error', 'message': 'Invalid JSON'}, status=400)
+        if not isinstance(payload, dict):
             return JsonResponse({'status': 'error', 'message': 'Invalid JSON'}, status=400)
 
         # Extract submission UUID and asset UID
@@ -107,15 +169,8 @@ def kobo_webhook_receiver(request):
         if not submission_uuid:
             return JsonResponse({'status': 'error', 'message': 'Missing submission UUID'}, status=400)
 
-        # Check for duplicate
-        if KoboWebhookLog.objects.filter(submission_uuid=submission_uuid).exists():
-            return JsonResponse({
-                'status': 'duplicate',
-                'message': 'Submission already processed'
-            }, status=200)
-
-        # Create webhook log
-        webhook_log = KoboWebhookLog.objects.create(
+        # Create webhook log; the unique submission_uuid rejects duplicates
+        webhook_log = create_webhook_log(
             kobo_asset_uid=asset_uid or '',
             submission_uuid=submission_uuid,
             raw_payload=payload,
@@ -123,21 +178,20 @@ def kobo_webhook_receiver(request):
             ip_address=ip_address,
             user_agent=user_agent,
         )
+        if webhook_log is None:
+            return JsonResponse({
+                'status': 'duplicate',
+                'message': 'Submission already processed'
+            }, status=200)
 
-        # Process submission immediately (or queue for async processing)
-        # For now, process synchronously
-        try:
-            processor = KoboSubmissionProcessor()
-            processor.process_submission(webhook_log.id)
-        except Exception as e:
-            # Log error but still return 200 to prevent Kobo from retrying
-            webhook_log.status = 'failed'
-            webhook_log.error_message = str(e)
-            webhook_log.save()
+        # Process after the response; the processor records failures on the log
+        background.run_in_background(
+            process_received_log, webhook_log.id, name=f'kobo-webhook-{webhook_log.id}'
+        )
 
         return JsonResponse({
             'status': 'success',
-            'message': 'Submission received and processed',
+            'message': 'Submission received and queued for processing',
             'webhook_log_id': webhook_log.id
         }, status=200)
 
@@ -154,17 +208,19 @@ class KoboSubmissionProcessor:
     Maps Kobo submission data to UPG FormSubmission
     """
 
-    def process_submission(self, webhook_log_id):
+    def process_submission(self, webhook_log_id, webhook_log=None):
         """
         Main processing function
 
         Args:
             webhook_log_id: ID of KoboWebhookLog to process
+            webhook_log: The KoboWebhookLog itself, if already loaded
 
         Returns:
             FormSubmission: Created submission instance
         """
-        webhook_log = KoboWebhookLog.objects.get(id=webhook_log_id)
+        if webhook_log is None:
+            webhook_log = KoboWebhookLog.objects.get(id=webhook_log_id)
 
         try:
             with transaction.atomic():
@@ -172,9 +228,7 @@ class KoboSubmissionProcessor:
 
                 # Find matching FormTemplate by kobo_asset_uid
                 kobo_asset_uid = webhook_log.kobo_asset_uid
-                form_template = FormTemplate.objects.filter(
-                    kobo_asset_uid=kobo_asset_uid
-                ).first()
+                form_template = resolve_form_template(kobo_asset_uid)
 
                 if not form_template:
                     raise ValueError(f"No FormTemplate found for asset UID: {kobo_asset_uid}")
@@ -185,44 +239,20 @@ class KoboSubmissionProcessor:
                 submission_time = parse_datetime(payload.get('_submission_time'))
                 submitted_by_username = payload.get('_submitted_by') or payload.get('username')
 
-                # Find user (mentor/field associate)
-                from django.contrib.auth import get_user_model
-                User = get_user_model()
-
-                submitted_by = None
-                if submitted_by_username:
-                    submitted_by = User.objects.filter(username=submitted_by_username).first()
-
-                # If no user found, try to get from active assignment
-                if not submitted_by:
-                    # Get any active assignment for this form
-                    assignment = FormAssignment.objects.filter(
-                        form_template=form_template,
-                        status__in=['pending', 'accepted', 'in_progress']
-                    ).first()
-
-                    if assignment:
-                        submitted_by = assignment.mentor or assignment.field_associate
-
-                # Fall back to form creator if still no user found
-                if not submitted_by:
-                    submitted_by = form_template.created_by
-
-                # Find assignment (if applicable)
-                assignment = FormAssignment.objects.filter(
-                    form_template=form_template,
-                    status__in=['pending', 'accepted', 'in_progress', 'completed']
-                ).first()
+                # Find user (mentor/field associate), else the assignee of an
+                # active assignment, else the form creator
+                assignment_id, assignee = resolve_assignment(form_template)
+                submitted_by = resolve_user(submitted_by_username) or assignee or form_template.created_by
 
-                # Map Kobo data to UPG form_data
-                form_data = self.map_kobo_data_to_upg(payload, form_template)
+                # Map Kobo data to UPG form_data and extract GPS location
+                plan = get_mapping_plan(form_template)
+                flat = flatten_payload(payload)
+                form_data = plan.map(payload, flat)
+                gps_latitude, gps_longitude, location_name = plan.extract_gps(payload, flat)
 
                 # Extract related entities
                 household, business_group = self.extract_related_entities(form_data)
 
-                # Extract GPS location
-                gps_latitude, gps_longitude, location_name = self.extract_gps_data(payload)
-
                 # MIS Validation and Household Creation
                 validation_status = 'not_validated'
                 validation_message = ''
@@ -279,7 +309,7 @@ class KoboSubmissionProcessor:
 
                 # Create FormSubmission
                 submission = FormSubmission.objects.create(
-                    assignment=assignment,
+                    assignment_id=assignment_id,
                     form_template=form_template,
                     submitted_by=submitted_by,
                     submission_date=submission_time or timezone.now(),
@@ -302,6 +332,8 @@ class KoboSubmissionProcessor:
                 webhook_log.status = 'processed'
                 webhook_log.processed_at = timezone.now()
                 webhook_log.form_submission = submission
+                webhook_log.error_message = ''
+                webhook_log.error_class = ''
                 webhook_log.processed_data = {
                     'submission_id': submission.id,
                     'household_id': household.id if household else None,
@@ -315,6 +347,7 @@ class KoboSubmissionProcessor:
             # Update webhook log with error
             webhook_log.status = 'failed'
             webhook_log.error_message = str(e)
+            webhook_log.error_class = type(e).__name__
             webhook_log.processed_at = timezone.now()
             webhook_log.save()
 
@@ -331,36 +364,7 @@ class KoboSubmissionProcessor:
         Returns:
             dict: Mapped form_data
         """
-        form_data = {}
-
-        # Get all fields from form template
-        for field in form_template.fields.all():
-            field_name = field.field_name
-
-            # Get value from Kobo data
-            value = kobo_data.get(field_name)
-
-            if value is not None:
-                # Clean and validate value
-                if field.field_type == 'phone':
-                    value = self.clean_phone_number(value)
-                elif field.field_type == 'number':
-                    try:
-                        value = float(value)
-                    except (ValueError, TypeError):
-                        value = None
-                elif field.field_type == 'boolean':
-                    value = value in ['yes', 'true', '1', True]
-
-                form_data[field_name] = value
-
-        # Also include any extra fields from Kobo that aren't in form template
-        # This helps preserve all submission data
-        for key, value in kobo_data.items():
-            if not key.startswith('_') and key not in form_data:
-                form_data[key] = value
-
-        return form_data
+        return get_mapping_plan(form_template).map(kobo_data)
 
     def extract_related_entities(self, form_data):
         """
@@ -410,31 +414,7 @@ class KoboSubmissionProcessor:
         Returns:
             tuple: (latitude, longitude, location_name)
         """
-        latitude = None
-        longitude = None
-        location_name = ''
-
-        # Look for geopoint field (can be named 'location', 'gps', 'household_gps', etc.)
-        gps_field = None
-        for key in ['household_gps', 'gps_location', 'location', 'geopoint']:
-            if key in kobo_data:
-                gps_field = kobo_data[key]
-                break
-
-        if gps_field:
-            # Kobo geopoint format: "latitude longitude altitude accuracy"
-            parts = str(gps_field).split()
-            if len(parts) >= 2:
-                try:
-                    latitude = float(parts[0])
-                    longitude = float(parts[1])
-                except (ValueError, IndexError):
-                    pass
-
-        # Location name
-        location_name = kobo_data.get('location_name', '')
-
-        return latitude, longitude, location_name
+        return KoboMappingPlan([]).extract_gps(kobo_data)
 
     def clean_phone_number(self, phone):
         """
@@ -446,22 +426,7 @@ class KoboSubmissionProcessor:
         Returns:
             str: Cleaned phone number or original if invalid
         """
-        if not phone:
-            return ''
-
-        # Remove non-numeric characters
-        phone = re.sub(r'\D', '', str(phone))
-
-        # Kenya formats: 07XXXXXXXX or 01XXXXXXXX
-        if re.match(r'^(07|01)\d{8}$', phone):
-            return phone
-
-        # International format: +254... -> 0...
-        if phone.startswith('254') and len(phone) == 12:
-            return f"0{phone[3:]}"
-
-        # Return original if no match
-        return phone
+        return clean_phone_number(phone)
 
 
 def parse_datetime(dt_string):
@@ -0,0 +1,37 @@
+"""
+Management command to backfill indexed submission values.
+
+Extracts answers to FormFields flagged as indexed from every submission's
+form_data into FormSubmissionValue rows. Run after marking fields as
+indexed on forms that already have submissions.
+
+Usage:
+    python manage.py backfill_submission_values            # All forms with indexed fields
+    python manage.py backfill_submission_values --form 12  # One form template
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from forms.models import FormTemplate
+from forms.submission_values import backfill_values
+
+
+class Command(BaseCommand):
+    help = 'Backfill FormSubmissionValue rows for indexed form fields'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--form', type=int, help='ID of a single form template to backfill')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per bulk insert')
+
+    def handle(self, *args, **options):
+        if options['form']:
+            templates = FormTemplate.objects.filter(id=options['form'])
+            if not templates.exists():
+                raise CommandError(f"Form template {options['form']} not found")
+        else:
+            templates = FormTemplate.objects.filter(fields__indexed=True).distinct()
+
+        for form_template in templates.order_by('id'):
+            written = backfill_values(form_template, batch_size=options['batch_size'])
+            self.stdout.write(f'{form_template.name}: {written} values')
+
+        self.stdout.write(self.style.SUCCESS('Indexed submission values backfilled'))
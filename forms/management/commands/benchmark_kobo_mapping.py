@@ -0,0 +1,111 @@
+"""
+Microbenchmark for the Kobo webhook mapping hot path.
+
+Times mapping a synthetic grouped Kobo payload through a compiled
+KoboMappingPlan against re-deriving the plan for every submission (the old
+behaviour), and counts the queries each path makes. Without --form a
+synthetic in-memory template is used, so only the compiled mapping is timed.
+
+Usage:
+    python manage.py benchmark_kobo_mapping                      # Synthetic 60-field form
+    python manage.py benchmark_kobo_mapping --form 12 -n 2000    # A real form template
+"""
+
+from time import perf_counter
+from types import SimpleNamespace
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from forms.kobo_mapping import (
+    KoboMappingPlan, flatten_payload, get_mapping_plan, resolve_assignment, resolve_form_template, resolve_user,
+)
+from forms.models import FormTemplate
+
+SAMPLE_VALUES = {
+    'phone': '+254 712 345678',
+    'number': '42',
+    'boolean': 'yes',
+    'location': '-1.2921 36.8219 1650 5',
+}
+SYNTHETIC_TYPES = ['text', 'number', 'phone', 'boolean', 'select', 'date']
+
+
+def sample_payload(fields, username=''):
+    """Kobo-style payload with every field nested in a group"""
+    payload = {
+        '_uuid': 'benchmark',
+        '_submission_time': '2025-01-01T12:00:00Z',
+        '_submitted_by': username,
+        'formhub/uuid': 'benchmark',
+        'meta/instanceID': 'uuid:benchmark',
+    }
+    for field in fields:
+        payload[f'section/{field.field_name}'] = SAMPLE_VALUES.get(field.field_type, 'sample')
+    return payload
+
+
+class Command(BaseCommand):
+    help = 'Benchmark compiled Kobo payload mapping against per-submission plan derivation'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--form', type=int, help='ID of a form template with a Kobo asset UID')
+        parser.add_argument('--fields', type=int, default=60, help='Fields in the synthetic form')
+        parser.add_argument('-n', '--iterations', type=int, default=10000, help='Submissions to map')
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+
+        if options['form']:
+            form_template = FormTemplate.objects.filter(id=options['form']).first()
+            if not form_template or not form_template.kobo_asset_uid:
+                raise CommandError(f"Form template {options['form']} not found or not synced to Kobo")
+            fields = list(form_template.fields.all())
+            payload = sample_payload(fields, username=form_template.created_by.username if form_template.created_by else '')
+        else:
+            form_template = None
+            fields = [
+                SimpleNamespace(field_name=f'field_{i}', field_type=SYNTHETIC_TYPES[i % len(SYNTHETIC_TYPES)])
+                for i in range(options['fields'])
+            ]
+            payload = sample_payload(fields)
+
+        self.stdout.write(f'{len(fields)} fields, {iterations} submissions')
+
+        plan = KoboMappingPlan(fields)
+        self.report('Compiled plan (mapping only)', iterations, lambda: self.map(plan, payload))
+
+        if form_template:
+            asset_uid = form_template.kobo_asset_uid
+            username = payload['_submitted_by']
+
+            def resolved_path():
+                template = resolve_form_template(asset_uid)
+                resolve_assignment(template)
+                resolve_user(username)
+                self.map(get_mapping_plan(template), payload)
+
+            def uncompiled_path():
+                template = FormTemplate.objects.filter(kobo_asset_uid=asset_uid).first()
+                self.map(KoboMappingPlan.for_template(template), payload)
+
+            resolved_path()  # Warm the plan cache
+            self.report('Resolvers + cached plan', iterations, resolved_path)
+            self.report('Plan derived per submission', max(1, iterations // 10), uncompiled_path)
+
+    def map(self, plan, payload):
+        flat = flatten_payload(payload)
+        plan.map(payload, flat)
+        plan.extract_gps(payload, flat)
+
+    def report(self, label, iterations, run):
+        with CaptureQueriesContext(connection) as queries:
+            start = perf_counter()
+            for _ in range(iterations):
+                run()
+            elapsed = perf_counter() - start
+        self.stdout.write(
+            f'{label:<34} {elapsed / iterations * 1e6:>9.1f} us/submission  '
+            f'{len(queries) / iterations:>5.2f} queries/submission'
+        )
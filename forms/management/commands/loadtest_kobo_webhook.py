@@ -0,0 +1,120 @@
+"""
+Load test for the Kobo webhook receiver.
+
+Replays a recorded set of Kobo payloads (one JSON object per line) against a
+running webhook endpoint at high concurrency, signing each body like Kobo
+does when KOBO_WEBHOOK_SECRET is set, and reports throughput, latency
+percentiles and response statuses.
+
+Record payloads from received webhooks first, then point the replay at a
+staging server. By default every request gets a fresh _uuid so each one is
+a new ingest; --keep-uuids replays the originals to exercise deduplication.
+
+Usage:
+    python manage.py loadtest_kobo_webhook --export payloads.jsonl --limit 500
+    python manage.py loadtest_kobo_webhook --payloads payloads.jsonl \\
+        --url https://staging.example.org/forms/kobo/webhook/ --requests 5000 --concurrency 64
+"""
+
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from itertools import cycle, islice
+from time import perf_counter
+import hashlib
+import hmac
+import json
+import uuid
+
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from forms.models import KoboWebhookLog
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+class Command(BaseCommand):
+    help = 'Replay recorded Kobo payloads against the webhook endpoint and report latency'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--export', metavar='FILE', help='Write recorded webhook payloads to FILE and exit')
+        parser.add_argument('--limit', type=int, default=1000, help='Payloads to export')
+        parser.add_argument('--payloads', metavar='FILE', help='JSON-lines file of payloads to replay')
+        parser.add_argument('--url', help='Webhook endpoint URL')
+        parser.add_argument('--requests', type=int, default=1000, help='Total requests to send')
+        parser.add_argument('--concurrency', type=int, default=32, help='Concurrent senders')
+        parser.add_argument('--secret', help='Signing secret (defaults to KOBO_WEBHOOK_SECRET)')
+        parser.add_argument('--keep-uuids', action='store_true', help='Send recorded _uuid values unchanged')
+        parser.add_argument('--timeout', type=float, default=30, help='Per-request timeout in seconds')
+
+    def handle(self, *args, **options):
+        if options['export']:
+            return self.export(options['export'], options['limit'])
+
+        if not options['payloads'] or not options['url']:
+            raise CommandError('--payloads and --url are required (or use --export)')
+
+        with open(options['payloads'], encoding='utf-8') as f:
+            payloads = [json.loads(line) for line in f if line.strip()]
+        if not payloads:
+            raise CommandError('No payloads found')
+
+        secret = options['secret'] if options['secret'] is not None else getattr(settings, 'KOBO_WEBHOOK_SECRET', '')
+        bodies = [
+            self.body(payload, fresh_uuid=not options['keep_uuids'])
+            for payload in islice(cycle(payloads), options['requests'])
+        ]
+        session = requests.Session()
+        session.mount('http', requests.adapters.HTTPAdapter(pool_maxsize=options['concurrency']))
+
+        def send(body):
+            headers = {'Content-Type': 'application/json'}
+            if secret:
+                headers['X-Kobo-Hook-Signature'] = hmac.new(secret.encode('utf-8'), body, hashlib.sha256).hexdigest()
+            start = perf_counter()
+            try:
+                response = session.post(options['url'], data=body, headers=headers, timeout=options['timeout'])
+                outcome = f"{response.status_code} {self.response_status(response)}"
+            except requests.RequestException as e:
+                outcome = type(e).__name__
+            return perf_counter() - start, outcome
+
+        self.stdout.write(f"Sending {len(bodies)} requests to {options['url']} with {options['concurrency']} senders...")
+        start = perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+            results = list(executor.map(send, bodies))
+        elapsed = perf_counter() - start
+
+        latencies = sorted(latency * 1000 for latency, _ in results)
+        self.stdout.write(self.style.SUCCESS(f'{len(results) / elapsed:.1f} requests/s over {elapsed:.1f}s'))
+        self.stdout.write(
+            f'Latency ms: p50 {percentile(latencies, 0.5):.1f}  p95 {percentile(latencies, 0.95):.1f}  '
+            f'p99 {percentile(latencies, 0.99):.1f}  max {latencies[-1]:.1f}'
+        )
+        for outcome, count in Counter(outcome for _, outcome in results).most_common():
+            self.stdout.write(f'  {outcome:<30} {count}')
+
+    def export(self, path, limit):
+        logs = KoboWebhookLog.objects.order_by('-received_at').values_list('raw_payload', flat=True)[:limit]
+        written = 0
+        with open(path, 'w', encoding='utf-8') as f:
+            for payload in logs.iterator():
+                f.write(json.dumps(payload) + '\n')
+                written += 1
+        self.stdout.write(self.style.SUCCESS(f'Exported {written} payloads to {path}'))
+
+    def body(self, payload, fresh_uuid):
+        if fresh_uuid:
+            payload = dict(payload, _uuid=str(uuid.uuid4()))
+        return json.dumps(payload).encode('utf-8')
+
+    def response_status(self, response):
+        try:
+            return response.json().get('status', '')
+        except ValueError:
+            return ''
@@ -0,0 +1,34 @@
+"""
+Management command to rebuild form response tallies from submissions.
+
+Tallies are maintained incrementally as submissions change; run this after
+bulk data fixes, or when a form's choice fields change.
+
+Usage:
+    python manage.py rebuild_response_tallies            # All form templates
+    python manage.py rebuild_response_tallies --form 12  # One form template
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from forms.models import FormTemplate
+from forms.response_tallies import rebuild_tallies
+
+
+class Command(BaseCommand):
+    help = 'Rebuild FormFieldResponseTally rows from form submissions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--form', type=int, help='ID of a single form template to rebuild')
+
+    def handle(self, *args, **options):
+        templates = FormTemplate.objects.order_by('id')
+        if options['form']:
+            templates = templates.filter(id=options['form'])
+            if not templates.exists():
+                raise CommandError(f"Form template {options['form']} not found")
+
+        for form_template in templates:
+            tally_count = rebuild_tallies(form_template)
+            self.stdout.write(f'{form_template.name}: {tally_count} tallies')
+
+        self.stdout.write(self.style.SUCCESS('Response tallies rebuilt'))
@@ -0,0 +1,98 @@
+"""
+Management command to replay failed or stuck Kobo webhook submissions.
+
+Selects KoboWebhookLog rows by asset, time window and error class and
+reprocesses them in parallel batches. Submissions that already exist are
+linked rather than created again, so the command is safe to re-run.
+
+Usage:
+    python manage.py replay_kobo_webhooks --dry-run                       # Counts per error class
+    python manage.py replay_kobo_webhooks                                 # Replay everything failed or stuck
+    python manage.py replay_kobo_webhooks --asset aBc123 --since 2025-01-01 --error-class ValueError
+    python manage.py replay_kobo_webhooks --concurrency 8 --batch-size 200
+"""
+
+from datetime import datetime, timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from forms.webhook_replay import (
+    DEFAULT_BATCH_SIZE, DEFAULT_CONCURRENCY, error_class_counts, replay_logs, select_replayable,
+)
+
+
+def parse_when(value):
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise CommandError(f'Invalid date/time: {value} (use YYYY-MM-DD or YYYY-MM-DDTHH:MM)')
+    return timezone.make_aware(parsed) if timezone.is_naive(parsed) else parsed
+
+
+class Command(BaseCommand):
+    help = 'Replay failed or stuck Kobo webhook submissions through the submission processor'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--asset', help='Only this Kobo asset UID')
+        parser.add_argument('--since', type=parse_when, help='Received at or after (YYYY-MM-DD[THH:MM])')
+        parser.add_argument('--until', type=parse_when, help='Received before (YYYY-MM-DD[THH:MM])')
+        parser.add_argument(
+            '--error-class', action='append', dest='error_classes',
+            help='Only failures of this exception type (repeatable; "Unclassified" for older failures)',
+        )
+        parser.add_argument('--failed-only', action='store_true', help="Skip logs stuck in 'received'")
+        parser.add_argument('--stuck-only', action='store_true', help="Skip logs marked 'failed'")
+        parser.add_argument('--stuck-minutes', type=int, default=15, help='Minutes before an unprocessed log counts as stuck')
+        parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY, help='Parallel worker threads')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='Logs per worker batch')
+        parser.add_argument('--limit', type=int, help='Replay at most this many logs')
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be replayed')
+
+    def handle(self, *args, **options):
+        if options['failed_only'] and options['stuck_only']:
+            raise CommandError('Use at most one of --failed-only and --stuck-only')
+
+        stuck_after = timedelta(minutes=options['stuck_minutes'])
+        logs = select_replayable(
+            asset_uid=options['asset'],
+            since=options['since'],
+            until=options['until'],
+            error_classes=options['error_classes'],
+            include_failed=not options['stuck_only'],
+            include_stuck=not options['failed_only'],
+            stuck_after=stuck_after,
+        )
+
+        self.stdout.write('Selected webhook logs:')
+        self.write_counts(error_class_counts(logs))
+        if options['dry_run']:
+            return
+
+        log_ids = logs.values_list('id', flat=True)
+        if options['limit']:
+            log_ids = log_ids[:options['limit']]
+
+        def progress(done, total):
+            self.stdout.write(f'  {done}/{total} replayed')
+
+        report = replay_logs(
+            log_ids,
+            concurrency=options['concurrency'],
+            batch_size=options['batch_size'],
+            stuck_after=stuck_after,
+            progress=progress,
+        )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Replayed {report['total']}: {report['processed']} processed, "
+            f"{report['already_processed']} already imported, {report['skipped']} skipped"
+        ))
+        if report['failed']:
+            self.stdout.write(self.style.ERROR(f"{sum(report['failed'].values())} still failing:"))
+            self.write_counts(report['failed'])
+
+    def write_counts(self, counts):
+        if not counts:
+            self.stdout.write('  (none)')
+        for error_class, count in sorted(counts.items(), key=lambda item: -item[1]):
+            self.stdout.write(f'  {error_class:<40} {count}')
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forms', '0006_add_form_purpose_and_validation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FormFieldResponseTally',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('field_name', models.CharField(max_length=100)),
+                ('data_source', models.CharField(max_length=20)),
+                ('value', models.CharField(max_length=255)),
+                ('count', models.IntegerField(default=0)),
+                ('form_template', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='response_tallies', to='forms.formtemplate')),
+            ],
+            options={
+                'db_table': 'upg_form_field_response_tallies',
+                'unique_together': {('form_template', 'field_name', 'data_source', 'value')},
+            },
+        ),
+    ]
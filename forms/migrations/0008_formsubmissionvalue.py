@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forms', '0007_formfieldresponsetally'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='formfield',
+            name='indexed',
+            field=models.BooleanField(default=False, help_text='Extract answers into FormSubmissionValue for filtering, cross-tabs and exports'),
+        ),
+        migrations.CreateModel(
+            name='FormSubmissionValue',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('field_name', models.CharField(max_length=100)),
+                ('value_text', models.CharField(blank=True, max_length=255)),
+                ('value_number', models.DecimalField(blank=True, decimal_places=4, max_digits=18, null=True)),
+                ('value_date', models.DateField(blank=True, null=True)),
+                ('form_template', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='forms.formtemplate')),
+                ('submission', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='indexed_values', to='forms.formsubmission')),
+            ],
+            options={
+                'db_table': 'upg_form_submission_values',
+                'indexes': [models.Index(fields=['form_template', 'field_name', 'value_text'], name='upg_form_su_form_te_bfc921_idx'), models.Index(fields=['form_template', 'field_name', 'value_number'], name='upg_form_su_form_te_375054_idx'), models.Index(fields=['form_template', 'field_name', 'value_date'], name='upg_form_su_form_te_c4bfb4_idx'), models.Index(fields=['submission', 'field_name'], name='upg_form_su_submiss_c0e43f_idx')],
+            },
+        ),
+    ]
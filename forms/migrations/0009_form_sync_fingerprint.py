@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forms', '0008_formsubmissionvalue'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='formfield',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='formtemplate',
+            name='kobo_content_hash',
+            field=models.CharField(blank=True, help_text='Hash of the XLSForm content last pushed to Kobo', max_length=64),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forms', '0009_form_sync_fingerprint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='kobowebhooklog',
+            name='error_class',
+            field=models.CharField(blank=True, help_text='Exception type of the last processing failure', max_length=100),
+        ),
+        migrations.AddField(
+            model_name='kobowebhooklog',
+            name='replay_count',
+            field=models.IntegerField(default=0, help_text='Times this submission was reprocessed'),
+        ),
+        migrations.AlterField(
+            model_name='kobowebhooklog',
+            name='status',
+            field=models.CharField(choices=[('received', 'Received'), ('retrying', 'Retrying'), ('processed', 'Processed'), ('failed', 'Failed'), ('duplicate', 'Duplicate')], default='received', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='kobowebhooklog',
+            index=models.Index(fields=['status', 'error_class', 'received_at'], name='upg_kobo_we_status_da7fcd_idx'),
+        ),
+    ]
@@ -100,6 +100,11 @@ class FormTemplate(models.Model):
         default=1,
         help_text="Version counter for tracking form updates"
     )
+    kobo_content_hash = models.CharField(
+        max_length=64,
+        blank=True,
+        help_text="Hash of the XLSForm content last pushed to Kobo"
+    )
 
     # MIS Integration Settings
     form_purpose = models.CharField(
@@ -418,6 +423,13 @@ class FormField(models.Model):
     show_if_field = models.CharField(max_length=100, blank=True, help_text="Show this field only if another field has specific value")
     show_if_value = models.CharField(max_length=200, blank=True)
 
+    # Reporting
+    indexed = models.BooleanField(
+        default=False,
+        help_text="Extract answers into FormSubmissionValue for filtering, cross-tabs and exports"
+    )
+    updated_at = models.DateTimeField(auto_now=True, null=True)
+
     def __str__(self):
         return f"{self.form_template.name} - {self.field_label}"
 
@@ -611,6 +623,7 @@ class KoboWebhookLog(models.Model):
     """
     STATUS_CHOICES = [
         ('received', 'Received'),
+        ('retrying', 'Retrying'),
         ('processed', 'Processed'),
         ('failed', 'Failed'),
         ('duplicate', 'Duplicate'),
@@ -626,6 +639,12 @@ class KoboWebhookLog(models.Model):
     # Processing status
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='received')
     error_message = models.TextField(blank=True)
+    error_class = models.CharField(
+        max_length=100,
+        blank=True,
+        help_text="Exception type of the last processing failure"
+    )
+    replay_count = models.IntegerField(default=0, help_text="Times this submission was reprocessed")
 
     # Linked records
     form_template = models.ForeignKey(
@@ -657,4 +676,52 @@ class KoboWebhookLog(models.Model):
             models.Index(fields=['kobo_asset_uid']),
             models.Index(fields=['submission_uuid']),
             models.Index(fields=['status']),
+            models.Index(fields=['status', 'error_class', 'received_at']),
+        ]
+
+
+class FormFieldResponseTally(models.Model):
+    """
+    Running count of answers per choice field value, maintained as
+    submissions are created, edited and deleted (see forms.response_tallies).
+    Keyed by field_name rather than a FormField FK because the form builder
+    recreates field rows on every save.
+    """
+    form_template = models.ForeignKey(FormTemplate, on_delete=models.CASCADE, related_name='response_tallies')
+    field_name = models.CharField(max_length=100)
+    data_source = models.CharField(max_length=20)
+    value = models.CharField(max_length=255)
+    count = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.form_template_id}:{self.field_name}={self.value} ({self.count})"
+
+    class Meta:
+        db_table = 'upg_form_field_response_tallies'
+        unique_together = ['form_template', 'field_name', 'data_source', 'value']
+
+
+class FormSubmissionValue(models.Model):
+    """
+    Typed copy of one answer to an indexed FormField, extracted from
+    FormSubmission.form_data so answers can be filtered and grouped in SQL
+    (see forms.submission_values). Multi-select answers get one row per item.
+    """
+    submission = models.ForeignKey(FormSubmission, on_delete=models.CASCADE, related_name='indexed_values')
+    form_template = models.ForeignKey(FormTemplate, on_delete=models.CASCADE, related_name='+')
+    field_name = models.CharField(max_length=100)
+    value_text = models.CharField(max_length=255, blank=True)
+    value_number = models.DecimalField(max_digits=18, decimal_places=4, null=True, blank=True)
+    value_date = models.DateField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.submission_id}:{self.field_name}={self.value_text}"
+
+    class Meta:
+        db_table = 'upg_form_submission_values'
+        indexes = [
+            models.Index(fields=['form_template', 'field_name', 'value_text']),
+            models.Index(fields=['form_template', 'field_name', 'value_number']),
+            models.Index(fields=['form_template', 'field_name', 'value_date']),
+            models.Index(fields=['submission', 'field_name']),
         ]
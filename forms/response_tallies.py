@@ -0,0 +1,143 @@
+"""
+Response Tallies for Form Analytics
+
+Keeps FormFieldResponseTally rows (template, field, data source, value, count)
+in step with FormSubmission writes so charts read pre-aggregated counts with
+one indexed query instead of loading every submission's form_data.
+
+Tallies are applied as deltas from forms.signals on submission create, edit
+and delete, which covers the webhook, Kobo sync and web form paths.
+rebuild_tallies() recomputes them from scratch (manage.py rebuild_response_tallies).
+"""
+
+from collections import Counter
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Field types whose answers are counted
+CHOICE_FIELD_TYPES = ['radio', 'select', 'checkbox']
+
+MAX_VALUE_LENGTH = 255
+
+
+def choice_field_names(form_template_id):
+    from .models import FormField
+    return set(FormField.objects.filter(
+        form_template_id=form_template_id, field_type__in=CHOICE_FIELD_TYPES
+    ).values_list('field_name', flat=True))
+
+
+def response_values(form_data, field_names):
+    """Yield (field_name, value) for each counted answer; lists count once per item"""
+    if not form_data:
+        return
+    for field_name in field_names:
+        value = form_data.get(field_name)
+        if not value:
+            continue
+        for item in (value if isinstance(value, list) else [value]):
+            if item not in (None, ''):
+                yield field_name, str(item)[:MAX_VALUE_LENGTH]
+
+
+def count_responses(form_data, data_source, field_names):
+    return Counter(
+        (field_name, data_source, value)
+        for field_name, value in response_values(form_data, field_names)
+    )
+
+
+def apply_tally_delta(form_template_id, delta):
+    """Add delta {(field_name, data_source, value): n} to the stored tallies"""
+    from .models import FormFieldResponseTally
+
+    changes = {key: n for key, n in delta.items() if n}
+    if not changes:
+        return
+
+    with transaction.atomic():
+        for (field_name, data_source, value), n in changes.items():
+            tallies = FormFieldResponseTally.objects.filter(
+                form_template_id=form_template_id, field_name=field_name,
+                data_source=data_source, value=value,
+            )
+            if tallies.update(count=F('count') + n) or n < 0:
+                continue
+            try:
+                with transaction.atomic():
+                    FormFieldResponseTally.objects.create(
+                        form_template_id=form_template_id, field_name=field_name,
+                        data_source=data_source, value=value, count=n,
+                    )
+            except IntegrityError:
+                # Created concurrently by another writer
+                tallies.update(count=F('count') + n)
+
+        FormFieldResponseTally.objects.filter(form_template_id=form_template_id, count__lte=0).delete()
+
+
+def tally_snapshot(submission):
+    """The parts of a submission that tallies depend on"""
+    return (submission.form_template_id, submission.data_source, submission.form_data)
+
+
+def update_tallies(old_snapshot, new_snapshot):
+    """
+    Apply the change between two snapshots (either may be None for create/delete).
+    """
+    per_template = {}
+    for snapshot, sign in ((old_snapshot, -1), (new_snapshot, 1)):
+        if snapshot is None:
+            continue
+        form_template_id, data_source, form_data = snapshot
+        if form_template_id not in per_template:
+            per_template[form_template_id] = (choice_field_names(form_template_id), Counter())
+        field_names, delta = per_template[form_template_id]
+        for key, n in count_responses(form_data, data_source, field_names).items():
+            delta[key] += sign * n
+
+    for form_template_id, (_, delta) in per_template.items():
+        apply_tally_delta(form_template_id, delta)
+
+
+def rebuild_tallies(form_template):
+    """Recompute all tallies for a template from its submissions"""
+    from .models import FormSubmission, FormFieldResponseTally
+
+    field_names = choice_field_names(form_template.id)
+    totals = Counter()
+    submissions = FormSubmission.objects.filter(form_template=form_template).values_list('data_source', 'form_data')
+    for data_source, form_data in submissions.iterator(chunk_size=2000):
+        totals.update(count_responses(form_data, data_source, field_names))
+
+    with transaction.atomic():
+        FormFieldResponseTally.objects.filter(form_template=form_template).delete()
+        FormFieldResponseTally.objects.bulk_create([
+            FormFieldResponseTally(
+                form_template=form_template, field_name=field_name,
+                data_source=data_source, value=value, count=count,
+            )
+            for (field_name, data_source, value), count in totals.items()
+        ], batch_size=1000)
+    return len(totals)
+
+
+def get_response_counts(form_template, field_names, data_source=None):
+    """
+    {field_name: [(value, count), ...]} ordered by count descending, read from
+    tallies in one query. Pass data_source to restrict to one source.
+    """
+    from .models import FormFieldResponseTally
+
+    tallies = FormFieldResponseTally.objects.filter(form_template=form_template, field_name__in=field_names)
+    if data_source:
+        tallies = tallies.filter(data_source=data_source)
+
+    counts = {field_name: [] for field_name in field_names}
+    rows = tallies.values('field_name', 'value').annotate(total=Sum('count')).order_by('field_name', '-total', 'value')
+    for row in rows:
+        counts[row['field_name']].append((row['value'], row['total']))
+    return counts
@@ -1,14 +1,20 @@
 """
 Django Signals for KoboToolbox Auto-Sync
-Automatically trigger form sync when forms are activated or assigned
+Automatically trigger form sync when forms are activated or assigned,
+and keep submission response tallies and indexed values up to date
 """
 
-from django.db.models.signals import post_save, pre_save
+from django.db.models.signals import post_save, pre_save, post_delete
 from django.dispatch import receiver
 from django.conf import settings
+import logging
 
-from .models import FormTemplate, FormAssignment
+from .models import FormTemplate, FormAssignment, FormSubmission
 from .kobo_service import sync_form_to_kobo
+from .response_tallies import tally_snapshot, update_tallies
+from .submission_values import index_submission
+
+logger = logging.getLogger(__name__)
 
 
 # Store previous status to detect changes
@@ -132,3 +138,46 @@ def sync_on_assignment(sender, instance, created, **kwargs):
             import logging
             logger = logging.getLogger(__name__)
             logger.error(f"Auto-sync on assignment failed for form {form.id}: {str(e)}")
+
+
+# =============================================================================
+# Response tallies for submission analytics
+# =============================================================================
+
+@receiver(pre_save, sender=FormSubmission)
+def remember_tallied_values(sender, instance, **kwargs):
+    """Keep the stored answers of an edited submission so tallies can be adjusted"""
+    instance._previous_tally_snapshot = None
+    if instance.pk and not instance._state.adding:
+        instance._previous_tally_snapshot = FormSubmission.objects.filter(pk=instance.pk).values_list(
+            'form_template_id', 'data_source', 'form_data'
+        ).first()
+
+
+@receiver(post_save, sender=FormSubmission)
+def tally_saved_submission(sender, instance, created, **kwargs):
+    """Apply the submission's answers (or the change in them) to the response tallies"""
+    try:
+        update_tallies(getattr(instance, '_previous_tally_snapshot', None), tally_snapshot(instance))
+    except Exception as e:
+        # Tallies can be rebuilt; never block a submission on them
+        logger.error(f"Failed to update response tallies for submission {instance.pk}: {str(e)}")
+
+
+@receiver(post_save, sender=FormSubmission)
+def index_saved_submission(sender, instance, created, **kwargs):
+    """Refresh the typed FormSubmissionValue rows for indexed fields"""
+    try:
+        index_submission(instance, created=created)
+    except Exception as e:
+        # Values can be backfilled; never block a submission on them
+        logger.error(f"Failed to index values for submission {instance.pk}: {str(e)}")
+
+
+@receiver(post_delete, sender=FormSubmission)
+def untally_deleted_submission(sender, instance, **kwargs):
+    """Remove a deleted submission's answers from the response tallies"""
+    try:
+        update_tallies(tally_snapshot(instance), None)
+    except Exception as e:
+        logger.error(f"Failed to update response tallies for deleted submission {instance.pk}: {str(e)}")
@@ -0,0 +1,256 @@
+"""
+Indexed Submission Values
+
+Answers to FormFields flagged as indexed are copied out of
+FormSubmission.form_data into FormSubmissionValue rows with typed
+text/number/date columns. Filtering submissions by answer, cross-tabs and
+exports then run as indexed SQL instead of loading and scanning JSON.
+
+Values are refreshed from forms.signals whenever a submission is saved;
+backfill_values() rebuilds a template in bulk
+(manage.py backfill_submission_values).
+"""
+
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from django.db import transaction
+from django.db.models import Count, Subquery
+import csv
+import logging
+
+logger = logging.getLogger(__name__)
+
+NUMBER_FIELD_TYPES = ['number', 'decimal', 'rating', 'range', 'calculate']
+DATE_FIELD_TYPES = ['date', 'datetime']
+
+MAX_TEXT_LENGTH = 255
+BATCH_SIZE = 1000
+
+# FormSubmissionValue.value_number is DecimalField(max_digits=18, decimal_places=4)
+NUMBER_PLACES = Decimal('0.0001')
+MAX_NUMBER = Decimal(10) ** 14
+
+
+def indexed_fields(form_template_id):
+    """{field_name: field_type} for the template's indexed fields"""
+    from .models import FormField
+    return dict(FormField.objects.filter(
+        form_template_id=form_template_id, indexed=True
+    ).values_list('field_name', 'field_type'))
+
+
+def _to_number(value):
+    try:
+        number = Decimal(str(value).strip())
+        if not number.is_finite():
+            return None
+        number = number.quantize(NUMBER_PLACES)
+    except (InvalidOperation, ValueError):
+        return None
+    # Numbers the column cannot hold are kept as text only
+    return number if abs(number) < MAX_NUMBER else None
+
+
+def _to_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    try:
+        return date.fromisoformat(str(value).strip()[:10])
+    except ValueError:
+        return None
+
+
+def extract_values(submission_id, form_template_id, form_data, fields):
+    """Unsaved FormSubmissionValue rows for one submission's indexed answers"""
+    from .models import FormSubmissionValue
+
+    rows = []
+    if not form_data:
+        return rows
+    for field_name, field_type in fields.items():
+        value = form_data.get(field_name)
+        if value in (None, '', []):
+            continue
+        for item in (value if isinstance(value, list) else [value]):
+            if item in (None, ''):
+                continue
+            rows.append(FormSubmissionValue(
+                submission_id=submission_id,
+                form_template_id=form_template_id,
+                field_name=field_name,
+                value_text=str(item)[:MAX_TEXT_LENGTH],
+                value_number=_to_number(item) if field_type in NUMBER_FIELD_TYPES else None,
+                value_date=_to_date(item) if field_type in DATE_FIELD_TYPES else None,
+            ))
+    return rows
+
+
+def index_submission(submission, created=False):
+    """Refresh the indexed values of one submission"""
+    from .models import FormSubmissionValue
+
+    fields = indexed_fields(submission.form_template_id)
+    with transaction.atomic():
+        if not created:
+            FormSubmissionValue.objects.filter(submission_id=submission.pk).delete()
+        if fields:
+            FormSubmissionValue.objects.bulk_create(
+                extract_values(submission.pk, submission.form_template_id, submission.form_data, fields)
+            )
+
+
+def backfill_values(form_template, batch_size=BATCH_SIZE):
+    """Re-extract indexed values for every submission of a template; returns rows written"""
+    from .models import FormSubmission, FormSubmissionValue
+
+    fields = indexed_fields(form_template.id)
+    written = 0
+    with transaction.atomic():
+        FormSubmissionValue.objects.filter(form_template=form_template).delete()
+        if not fields:
+            return 0
+
+        pending = []
+        submissions = FormSubmission.objects.filter(form_template=form_template).values_list('id', 'form_data')
+        for submission_id, form_data in submissions.iterator(chunk_size=batch_size):
+            pending.extend(extract_values(submission_id, form_template.id, form_data, fields))
+            if len(pending) >= batch_size:
+                FormSubmissionValue.objects.bulk_create(pending, batch_size=batch_size)
+                written += len(pending)
+                pending = []
+        FormSubmissionValue.objects.bulk_create(pending, batch_size=batch_size)
+        written += len(pending)
+    return written
+
+
+# =============================================================================
+# Queries
+# =============================================================================
+
+def filter_by_values(submissions, form_template, filters):
+    """
+    Restrict a FormSubmission queryset to those whose indexed answers match
+    every {field_name: value} in filters (text equality; multi-select
+    answers match if any item matches).
+    """
+    from .models import FormSubmissionValue
+
+    for field_name, value in filters.items():
+        matching = FormSubmissionValue.objects.filter(
+            form_template=form_template, field_name=field_name, value_text=str(value)[:MAX_TEXT_LENGTH]
+        ).values('submission_id')
+        submissions = submissions.filter(id__in=Subquery(matching))
+    return submissions
+
+
+def value_options(form_template, field_names, limit=50):
+    """{field_name: [distinct values]} for building filter dropdowns"""
+    from .models import FormSubmissionValue
+
+    options = {field_name: [] for field_name in field_names}
+    rows = FormSubmissionValue.objects.filter(
+        form_template=form_template, field_name__in=field_names
+    ).values_list('field_name', 'value_text').distinct().order_by('field_name', 'value_text')
+    for field_name, value in rows:
+        if len(options[field_name]) < limit:
+            options[field_name].append(value)
+    return options
+
+
+def value_counts(form_template, field_names, submissions):
+    """
+    {field_name: [(value, count), ...]} ordered by count descending, counted
+    over the indexed answers of a (filtered) FormSubmission queryset in one
+    grouped query. Same shape as response_tallies.get_response_counts().
+    """
+    from .models import FormSubmissionValue
+
+    counts = {field_name: [] for field_name in field_names}
+    rows = FormSubmissionValue.objects.filter(
+        form_template=form_template, field_name__in=field_names,
+        submission_id__in=Subquery(submissions.order_by().values('id')),
+    ).values('field_name', 'value_text').annotate(
+        total=Count('submission_id', distinct=True)
+    ).order_by('field_name', '-total', 'value_text')
+    for row in rows:
+        counts[row['field_name']].append((row['value_text'], row['total']))
+    return counts
+
+
+def cross_tab(form_template, row_field, column_field, submissions=None):
+    """
+    Count submissions for each (row answer, column answer) pair of two
+    indexed fields with a single self-join. Returns
+    {'rows': [...], 'columns': [...], 'counts': {row: {column: n}}}.
+    """
+    from .models import FormSubmissionValue
+
+    pairs = FormSubmissionValue.objects.filter(
+        form_template=form_template, field_name=row_field,
+        submission__indexed_values__field_name=column_field,
+    )
+    if submissions is not None:
+        pairs = pairs.filter(submission_id__in=Subquery(submissions.values('id')))
+    pairs = pairs.values('value_text', 'submission__indexed_values__value_text').annotate(
+        count=Count('submission_id', distinct=True)
+    ).order_by('value_text', 'submission__indexed_values__value_text')
+
+    rows, columns, counts = [], [], {}
+    for pair in pairs:
+        row, column = pair['value_text'], pair['submission__indexed_values__value_text']
+        if row not in counts:
+            rows.append(row)
+            counts[row] = {}
+        if column not in columns:
+            columns.append(column)
+        counts[row][column] = pair['count']
+    return {'rows': rows, 'columns': sorted(columns), 'counts': counts}
+
+
+class Echo:
+    """File-like object whose write() returns the value, for streaming csv.writer"""
+
+    def write(self, value):
+        return value
+
+
+def iter_export_rows(submissions, field_names):
+    """
+    CSV rows (header first) of submission metadata plus indexed answers,
+    read from FormSubmissionValue in pages ordered by submission id.
+    Multi-select answers are joined with '; '.
+    """
+    from .models import FormSubmissionValue
+
+    yield ['submission_id', 'submitted_by', 'submission_date', 'data_source', 'status'] + list(field_names)
+
+    last_id = 0
+    submissions = submissions.order_by('id')
+    while True:
+        page = list(submissions.filter(id__gt=last_id).values_list(
+            'id', 'submitted_by__username', 'submission_date', 'data_source', 'status'
+        )[:BATCH_SIZE])
+        if not page:
+            return
+        last_id = page[-1][0]
+
+        answers = {}
+        values = FormSubmissionValue.objects.filter(
+            submission_id__in=[row[0] for row in page], field_name__in=field_names
+        ).order_by('id').values_list('submission_id', 'field_name', 'value_text')
+        for submission_id, field_name, value in values:
+            answers.setdefault(submission_id, {}).setdefault(field_name, []).append(value)
+
+        for submission_id, username, submitted_at, data_source, status in page:
+            row_answers = answers.get(submission_id, {})
+            yield [submission_id, username, submitted_at.isoformat() if submitted_at else '', data_source, status] + [
+                '; '.join(row_answers.get(field_name, [])) for field_name in field_names
+            ]
+
+
+def stream_export_csv(submissions, field_names):
+    writer = csv.writer(Echo())
+    for row in iter_export_rows(submissions, field_names):
+        yield writer.writerow(row)
@@ -2,15 +2,33 @@
 Tests for Forms App - Critical Path Coverage
 """
 
-from django.test import TestCase, Client
+from django.test import TestCase, Client, override_settings
 from django.urls import reverse
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import IntegrityError
 from unittest.mock import patch, MagicMock
+from openpyxl import Workbook
+import hashlib
+import hmac
+import io
 import json
 import uuid
 
-from .models import FormTemplate, FormField, FormSubmission, FormAssignment
-from .kobo_service import XLSFormConverter, check_form_has_beneficiary_lookup
+from .models import (
+    FormTemplate, FormField, FormSubmission, FormAssignment, FormFieldResponseTally, FormSubmissionValue
+)
+from .kobo_service import XLSFormConverter, check_form_has_beneficiary_lookup, sync_form_to_kobo
+from .form_importer import import_form_from_file
+from .response_tallies import get_response_counts, rebuild_tallies
+from .submission_values import backfill_values, filter_by_values, cross_tab
+from .kobo_mapping import KoboMappingPlan, resolve_form_template
+from .kobo_webhook import KoboSubmissionProcessor, create_webhook_log, process_received_log
+from .webhook_replay import error_class_counts, replay_logs, select_replayable
+from .models import KoboWebhookLog
+from .beneficiary_lookup import validate_submissions_for_purpose, update_households_from_submissions
+from core.models import County, SubCounty, Village
+from households.models import Household, HouseholdMember
 
 User = get_user_model()
 
@@ -167,6 +185,355 @@ class XLSFormConverterTests(TestCase):
         self.assertIn('choices', xlsform)
         self.assertIn('settings', xlsform)
 
+    def test_xlsform_cached_until_fields_change(self):
+        """Unchanged templates reuse the cached XLSForm; field edits rebuild it"""
+        cache.clear()
+        field = FormField.objects.create(
+            form_template=self.template, field_name='name', field_label='Full Name', field_type='text', order=1
+        )
+        first = XLSFormConverter(self.template).convert_to_xlsform()
+
+        # Fingerprint aggregate only; fields are not loaded again
+        with self.assertNumQueries(1):
+            self.assertEqual(XLSFormConverter(self.template).convert_to_xlsform(), first)
+
+        field.field_label = 'Head Name'
+        field.save()
+        labels = [row.get('label') for row in XLSFormConverter(self.template).convert_to_xlsform()['survey']]
+        self.assertIn('Head Name', labels)
+
+    @patch('forms.kobo_service.push_reference_data')
+    @patch('forms.kobo_service.KoboAPIClient')
+    def test_unchanged_form_skips_kobo_update(self, client_class, push_reference_data):
+        """A second sync with identical content does not push the form again"""
+        cache.clear()
+        FormTemplate.objects.filter(pk=self.template.pk).update(
+            sync_to_kobo=True, status='active', kobo_asset_uid='aBc123'
+        )
+        self.template.refresh_from_db()
+        client = client_class.return_value
+        client.update_asset.return_value = {'uid': 'aBc123'}
+        client.get_asset.return_value = {}
+
+        success, _, _ = sync_form_to_kobo(self.template)
+        self.assertTrue(success)
+        self.assertEqual(client.update_asset.call_count, 1)
+
+        success, message, asset_uid = sync_form_to_kobo(self.template)
+        self.assertTrue(success)
+        self.assertEqual(asset_uid, 'aBc123')
+        self.assertIn('up to date', message)
+        self.assertEqual(client.update_asset.call_count, 1)
+        self.assertEqual(client.deploy_asset.call_count, 1)
+        self.assertEqual(push_reference_data.call_count, 2)
+
+        FormField.objects.create(
+            form_template=self.template, field_name='notes', field_label='Notes', field_type='textarea', order=2
+        )
+        sync_form_to_kobo(self.template)
+        self.assertEqual(client.update_asset.call_count, 2)
+
+
+class FormImporterTests(TestCase):
+    """Tests for importing forms from uploaded files"""
+
+    def test_import_xlsform_spreadsheet(self):
+        """XLSForm sheets are streamed into fields with choices and groups"""
+        workbook = Workbook()
+        survey = workbook.active
+        survey.title = 'survey'
+        survey.append(['type', 'name', 'label::English (en)', 'required'])
+        survey.append(['begin_group', 'hh', 'Household'])
+        survey.append(['text', 'head_name', 'Head name', 'yes'])
+        survey.append(['select_one gender', 'gender', 'Gender'])
+        survey.append(['end_group'])
+        survey.append([None, None, None])
+        choices = workbook.create_sheet('choices')
+        choices.append(['list_name', 'name', 'label'])
+        choices.append(['gender', 'male', 'Male'])
+        choices.append(['gender', 'female', 'Female'])
+        settings = workbook.create_sheet('settings')
+        settings.append(['form_title', 'form_id'])
+        settings.append(['Baseline Survey', 'baseline'])
+        upload = io.BytesIO()
+        workbook.save(upload)
+        upload.seek(0)
+
+        metadata, fields, errors, _ = import_form_from_file(upload, 'xlsx')
+
+        self.assertEqual(errors, [])
+        self.assertEqual(metadata['name'], 'Baseline Survey')
+        self.assertEqual([f['field_type'] for f in fields], ['section', 'text', 'select'])
+        self.assertEqual(fields[1]['field_label'], 'Head name')
+        self.assertTrue(fields[1]['required'])
+        self.assertEqual(fields[2]['choices'], [
+            {'value': 'male', 'label': 'Male'}, {'value': 'female', 'label': 'Female'}
+        ])
+
+    def test_import_json_from_file_object(self):
+        """JSON uploads are parsed straight from the file object"""
+        upload = io.BytesIO(json.dumps({
+            'name': 'UPG Form', 'fields': [{'field_name': 'age', 'field_type': 'number'}]
+        }).encode())
+
+        metadata, fields, errors, _ = import_form_from_file(upload, 'json')
+
+        self.assertEqual(errors, [])
+        self.assertEqual(fields[0]['field_name'], 'age')
+
+
+class ResponseTallyTests(TestCase):
+    """Tests for incrementally maintained response tallies"""
+
+    def setUp(self):
+        uid = unique_id()
+        self.user = User.objects.create_user(
+            username=f'me_{uid}', email=f'me_{uid}@test.com',
+            password='testpass123', role='me_staff'
+        )
+        self.template = FormTemplate.objects.create(
+            name='Survey', created_by=self.user, form_type='household_survey', status='active'
+        )
+        FormField.objects.create(
+            form_template=self.template, field_name='crop', field_label='Crop', field_type='select',
+            choices=[{'value': 'maize', 'label': 'Maize'}, {'value': 'beans', 'label': 'Beans'}]
+        )
+        FormField.objects.create(
+            form_template=self.template, field_name='assets', field_label='Assets', field_type='checkbox'
+        )
+        FormField.objects.create(
+            form_template=self.template, field_name='notes', field_label='Notes', field_type='text'
+        )
+
+    def _submit(self, form_data, data_source='web_form'):
+        return FormSubmission.objects.create(
+            form_template=self.template, submitted_by=self.user,
+            form_data=form_data, data_source=data_source
+        )
+
+    def _counts(self, **kwargs):
+        counts = get_response_counts(self.template, ['crop', 'assets'], **kwargs)
+        return {field_name: dict(values) for field_name, values in counts.items()}
+
+    def test_tallies_follow_create_edit_and_delete(self):
+        """Creating, editing and deleting submissions adjusts the counts"""
+        first = self._submit({'crop': 'maize', 'assets': ['goat', 'cow'], 'notes': 'x'})
+        self._submit({'crop': 'maize', 'assets': ['goat']}, data_source='kobo_sync')
+        self.assertEqual(self._counts(), {'crop': {'maize': 2}, 'assets': {'goat': 2, 'cow': 1}})
+        self.assertEqual(self._counts(data_source='kobo_sync')['crop'], {'maize': 1})
+        self.assertFalse(FormFieldResponseTally.objects.filter(field_name='notes').exists())
+
+        first.form_data = {'crop': 'beans', 'assets': ['goat']}
+        first.save()
+        self.assertEqual(self._counts(), {'crop': {'maize': 1, 'beans': 1}, 'assets': {'goat': 2}})
+
+        first.delete()
+        self.assertEqual(self._counts(), {'crop': {'maize': 1}, 'assets': {'goat': 1}})
+        self.assertFalse(FormFieldResponseTally.objects.filter(count__lte=0).exists())
+
+    def test_rebuild_matches_incremental_tallies(self):
+        """Rebuilding from submissions reproduces the incremental counts"""
+        self._submit({'crop': 'maize', 'assets': ['goat']})
+        self._submit({'crop': 'beans'})
+        incremental = self._counts()
+
+        FormFieldResponseTally.objects.all().delete()
+        rebuild_tallies(self.template)
+        self.assertEqual(self._counts(), incremental)
+
+    def test_submissions_page_charts_all_choice_fields(self):
+        """The submissions page reads chart data from tallies with labels"""
+        self._submit({'crop': 'maize', 'assets': ['goat']})
+        self.client.login(username=self.user.username, password='testpass123')
+
+        response = self.client.get(reverse('forms:form_submissions', args=[self.template.id]))
+
+        self.assertEqual(response.status_code, 200)
+        charts = {chart['field_name']: chart for chart in response.context['chart_fields']}
+        self.assertEqual(charts['crop']['labels'], ['Maize'])
+        self.assertEqual(charts['assets']['values'], [1])
+
+    def test_unknown_source_is_ignored(self):
+        """An unrecognised ?source= neither filters the list nor empties the charts"""
+        self._submit({'crop': 'maize', 'assets': ['goat']})
+        self.client.login(username=self.user.username, password='testpass123')
+
+        response = self.client.get(reverse('forms:form_submissions', args=[self.template.id]), {'source': 'bogus'})
+
+        self.assertIsNone(response.context['source_filter'])
+        charts = {chart['field_name']: chart for chart in response.context['chart_fields']}
+        self.assertEqual(charts['crop']['values'], [1])
+
+
+class SubmissionValueTests(TestCase):
+    """Tests for indexed submission values"""
+
+    def setUp(self):
+        uid = unique_id()
+        self.user = User.objects.create_user(
+            username=f'me_{uid}', email=f'me_{uid}@test.com',
+            password='testpass123', role='me_staff'
+        )
+        self.template = FormTemplate.objects.create(
+            name='Visit Survey', created_by=self.user, form_type='household_survey', status='active'
+        )
+        for name, field_type in [('crop', 'select'), ('gender', 'radio'), ('income', 'number'), ('visit', 'date')]:
+            FormField.objects.create(
+                form_template=self.template, field_name=name, field_label=name.title(),
+                field_type=field_type, indexed=True
+            )
+        FormField.objects.create(form_template=self.template, field_name='notes', field_label='Notes', field_type='text')
+
+    def _submit(self, form_data):
+        return FormSubmission.objects.create(form_template=self.template, submitted_by=self.user, form_data=form_data)
+
+    def test_values_are_typed_and_follow_edits(self):
+        """Indexed answers are extracted with typed columns and refreshed on save"""
+        submission = self._submit({'crop': 'maize', 'income': '1500.50', 'visit': '2024-03-01T10:00:00', 'notes': 'x'})
+        values = {v.field_name: v for v in submission.indexed_values.all()}
+        self.assertEqual(set(values), {'crop', 'income', 'visit'})
+        self.assertEqual(str(values['income'].value_number), '1500.5000')
+        self.assertEqual(values['visit'].value_date.isoformat(), '2024-03-01')
+
+        submission.form_data = {'crop': 'beans'}
+        submission.save()
+        self.assertEqual(list(submission.indexed_values.values_list('value_text', flat=True)), ['beans'])
+
+    def test_out_of_range_number_is_stored_as_text(self):
+        """Numbers too large for value_number keep only their text value"""
+        submission = self._submit({'income': '1' + '0' * 20})
+        value = submission.indexed_values.get(field_name='income')
+        self.assertIsNone(value.value_number)
+        self.assertEqual(value.value_text, '1' + '0' * 20)
+
+    def test_filter_and_cross_tab(self):
+        """Filtering and cross-tabs run against the indexed values"""
+        self._submit({'crop': 'maize', 'gender': 'female'})
+        self._submit({'crop': 'maize', 'gender': 'male'})
+        self._submit({'crop': 'beans', 'gender': 'female'})
+        submissions = FormSubmission.objects.filter(form_template=self.template)
+
+        self.assertEqual(filter_by_values(submissions, self.template, {'crop': 'maize', 'gender': 'female'}).count(), 1)
+
+        table = cross_tab(self.template, 'crop', 'gender')
+        self.assertEqual(table['columns'], ['female', 'male'])
+        self.assertEqual(table['counts'], {'beans': {'female': 1}, 'maize': {'female': 1, 'male': 1}})
+
+    def test_backfill_and_export(self):
+        """Backfill rebuilds values; the CSV export streams filtered answers"""
+        self._submit({'crop': 'maize', 'gender': 'female'})
+        self._submit({'crop': 'beans', 'gender': 'male'})
+        FormSubmissionValue.objects.all().delete()
+
+        self.assertEqual(backfill_values(self.template), 4)
+
+        self.client.login(username=self.user.username, password='testpass123')
+        response = self.client.get(
+            reverse('forms:export_submissions', args=[self.template.id]), {'answer_crop': 'beans'}
+        )
+        lines = b''.join(response.streaming_content).decode().strip().splitlines()
+        self.assertEqual(lines[0], 'submission_id,submitted_by,submission_date,data_source,status,crop,gender,income,visit')
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[1].endswith('beans,male,,'))
+
+    def test_filtered_page_charts_the_filtered_submissions(self):
+        """With answer filters, chart counts match the filtered total"""
+        self._submit({'crop': 'maize', 'gender': 'female'})
+        self._submit({'crop': 'maize', 'gender': 'male'})
+        self._submit({'crop': 'beans', 'gender': 'female'})
+        self.client.login(username=self.user.username, password='testpass123')
+
+        response = self.client.get(
+            reverse('forms:form_submissions', args=[self.template.id]), {'answer_gender': 'female'}
+        )
+
+        self.assertEqual(response.context['total_count'], 2)
+        charts = {chart['field_name']: dict(zip(chart['labels'], chart['values']))
+                  for chart in response.context['chart_fields']}
+        self.assertEqual(charts['crop'], {'maize': 1, 'beans': 1})
+        self.assertEqual(charts['gender'], {'female': 2})
+
+
+class BeneficiaryBatchValidationTests(TestCase):
+    """Tests for validating batches of submissions against MIS"""
+
+    def setUp(self):
+        uid = unique_id()
+        self.user = User.objects.create_user(username=f'bv_{uid}', email=f'bv_{uid}@test.com', password='testpass123')
+        county = County.objects.create(name=f'County {uid}')
+        subcounty = SubCounty.objects.create(name=f'SubCounty {uid}', county=county)
+        self.village = Village.objects.create(name=f'Village {uid}', subcounty_obj=subcounty)
+        self.by_id = Household.objects.create(
+            name='Wanjiru', village=self.village, head_first_name='Mary', head_id_number='12345678',
+            national_id='12345678', phone_number='0700000001',
+        )
+        self.by_phone = Household.objects.create(
+            name='Otieno', village=self.village, head_first_name='John', national_id='87654321',
+            head_phone_number='0711222333', phone_number='0711222333',
+        )
+        HouseholdMember.objects.create(
+            household=self.by_phone, name='Jane Otieno', gender='female', age=30,
+            id_number='55556666', relationship_to_head='spouse',
+        )
+        self.template = FormTemplate.objects.create(
+            name='Update Details', created_by=self.user, form_type='custom_form', form_purpose='update_details'
+        )
+
+    def test_batch_matches_each_strategy(self):
+        """IDs, partial IDs, phones and member IDs resolve in a fixed number of queries"""
+        batch = [
+            {'id_number': '12345678', 'first_name': 'Maria'},
+            {'id_number': '4567'},
+            {'phone_number': '+254 711 222333', 'village': self.village.name.upper()},
+            {'id_number': '55556666'},
+            {'id_number': '99999999', 'village': self.village.name},
+            {'first_name': 'Nobody'},
+        ]
+        with self.assertNumQueries(6):
+            results = validate_submissions_for_purpose(self.template, batch)
+
+        self.assertEqual(
+            [(r['household'], r['match_type']) for r in results],
+            [
+                (self.by_id, 'id_number'), (self.by_id, 'id_number_partial'),
+                (self.by_phone, 'phone_and_village'), (self.by_phone, 'member_id_number'),
+                (None, 'village_only'), (None, 'no_identifiers'),
+            ]
+        )
+        self.assertTrue(results[0]['should_update'])
+        self.assertEqual(results[0]['beneficiary_data']['total_members'], 0)
+        self.assertEqual(results[3]['beneficiary_data']['total_members'], 1)
+
+    def test_large_backlog_is_matched_in_chunks(self):
+        """A backlog larger than one query's OR limit still matches, case-insensitively"""
+        self.by_id.head_id_number = 'Ab12345678'
+        self.by_id.save()
+        batch = [{'id_number': f'9{n:07d}'} for n in range(600)] + [
+            {'id_number': 'aB12345678'}, {'id_number': '0711222333'}, {'phone_number': '0711222333'},
+        ]
+
+        results = validate_submissions_for_purpose(self.template, batch)
+
+        self.assertEqual(
+            [(r['household'], r['match_type']) for r in results[-3:]],
+            [(self.by_id, 'id_number'), (None, 'not_found'), (self.by_phone, 'phone_number')]
+        )
+        self.assertTrue(all(r['household'] is None for r in results[:600]))
+
+    def test_bulk_update_applies_latest_answer(self):
+        """Updates for the same household stack and are saved together"""
+        results = update_households_from_submissions([
+            (self.by_id, {'first_name': 'Maria'}),
+            (self.by_id, {'first_name': 'Marian', 'gender': 'female'}),
+            (self.by_phone, {'first_name': 'John'}),
+            (None, {'first_name': 'X'}),
+        ])
+
+        self.assertEqual([r[1] for r in results], [['head_first_name'], ['head_first_name', 'head_gender'], [], []])
+        self.assertFalse(results[3][0])
+        self.by_id.refresh_from_db()
+        self.assertEqual((self.by_id.head_first_name, self.by_id.head_gender), ('Marian', 'female'))
+
 
 class WebhookTests(TestCase):
     """Tests for Kobo webhook processing"""
@@ -220,6 +587,146 @@ class WebhookTests(TestCase):
         # Should return 200 even if processing fails
         self.assertIn(response.status_code, [200, 500])
 
+    def test_webhook_deduplicates_on_submission_uuid(self):
+        """A re-delivered submission is acknowledged as a duplicate without a second log"""
+        body = json.dumps({'_uuid': f'uuid-{unique_id()}', 'formhub/uuid': 'test_asset_123'})
+        first = self.client.post(reverse('forms:kobo_webhook'), data=body, content_type='application/json')
+        second = self.client.post(reverse('forms:kobo_webhook'), data=body, content_type='application/json')
+
+        self.assertEqual(first.json()['status'], 'success')
+        self.assertEqual(second.json()['status'], 'duplicate')
+        self.assertEqual(KoboWebhookLog.objects.filter(submission_uuid=json.loads(body)['_uuid']).count(), 1)
+
+    def test_webhook_defers_processing(self):
+        """The receiver only logs the submission; the background job claims and processes it once"""
+        body = json.dumps({'_uuid': f'uuid-{unique_id()}', 'formhub/uuid': 'test_asset_123'})
+        with patch('forms.kobo_webhook.background.run_in_background') as run_in_background:
+            response = self.client.post(reverse('forms:kobo_webhook'), data=body, content_type='application/json')
+
+        log = KoboWebhookLog.objects.get(pk=response.json()['webhook_log_id'])
+        self.assertEqual(log.status, 'received')
+        self.assertFalse(FormSubmission.objects.filter(kobo_submission_uuid=log.submission_uuid).exists())
+        job, log_id = run_in_background.call_args.args
+        self.assertEqual((job, log_id), (process_received_log, log.id))
+
+        self.assertIsNotNone(process_received_log(log.id))
+        self.assertIsNone(process_received_log(log.id))
+        log.refresh_from_db()
+        self.assertEqual(log.status, 'processed')
+
+    def test_create_webhook_log_only_swallows_duplicate_uuids(self):
+        """An integrity error that is not a duplicate submission_uuid is raised"""
+        fields = {'kobo_asset_uid': 'test_asset_123', 'submission_uuid': f'uuid-{unique_id()}'}
+        self.assertIsNotNone(create_webhook_log(**fields))
+        self.assertIsNone(create_webhook_log(**fields))
+        with patch.object(KoboWebhookLog.objects, 'create', side_effect=IntegrityError('NOT NULL constraint failed')):
+            with self.assertRaises(IntegrityError):
+                create_webhook_log(kobo_asset_uid='test_asset_123', submission_uuid=f'uuid-{unique_id()}')
+
+    @override_settings(KOBO_WEBHOOK_SECRET='s3cret')
+    def test_webhook_verifies_signature(self):
+        """Signed bodies are accepted with or without the sha256= prefix; bad signatures are rejected"""
+        body = json.dumps({'_uuid': f'uuid-{unique_id()}', 'formhub/uuid': 'test_asset_123'}).encode()
+        signature = hmac.new(b's3cret', body, hashlib.sha256).hexdigest()
+
+        rejected = self.client.post(
+            reverse('forms:kobo_webhook'), data=body, content_type='application/json',
+            HTTP_X_KOBO_HOOK_SIGNATURE='0' * 64,
+        )
+        accepted = self.client.post(
+            reverse('forms:kobo_webhook'), data=body, content_type='application/json',
+            HTTP_X_KOBO_HOOK_SIGNATURE=f'sha256={signature.upper()}',
+        )
+        self.assertEqual(rejected.status_code, 403)
+        self.assertEqual(accepted.status_code, 200)
+
+    def process_payload(self, payload):
+        log = KoboWebhookLog.objects.create(
+            kobo_asset_uid='test_asset_123', submission_uuid=f'uuid-{unique_id()}', raw_payload=payload
+        )
+        return KoboSubmissionProcessor().process_submission(log.id)
+
+    def test_processor_uses_compiled_plan(self):
+        """Grouped fields are mapped and coerced; repeat submissions reuse the cached plan"""
+        cache.clear()
+        FormField.objects.create(form_template=self.template, field_name='head_phone', field_label='Phone', field_type='phone')
+        FormField.objects.create(form_template=self.template, field_name='age', field_label='Age', field_type='number')
+        FormField.objects.create(form_template=self.template, field_name='hh_point', field_label='GPS', field_type='location')
+        payload = {
+            '_submitted_by': self.user.username,
+            'household/head_phone': '+254 712 345678',
+            'household/age': '42',
+            'household/hh_point': '-1.5 36.8 0 5',
+        }
+        self.process_payload(payload)
+
+        with patch('forms.kobo_mapping.KoboMappingPlan.for_template', wraps=KoboMappingPlan.for_template) as compile_plan:
+            submission = self.process_payload(payload)
+        compile_plan.assert_not_called()
+
+        self.assertEqual(submission.submitted_by, self.user)
+        self.assertEqual(submission.form_data['head_phone'], '0712345678')
+        self.assertEqual(submission.form_data['age'], 42.0)
+        self.assertEqual((float(submission.gps_latitude), float(submission.gps_longitude)), (-1.5, 36.8))
+
+    def test_replay_failed_webhooks(self):
+        """Failed logs are replayed once; existing submissions are linked, not duplicated"""
+        def failed_log(asset_uid, error_class='ValueError'):
+            return KoboWebhookLog.objects.create(
+                kobo_asset_uid=asset_uid, submission_uuid=f'uuid-{unique_id()}', raw_payload={'q1': 'yes'},
+                status='failed', error_class=error_class,
+            )
+
+        recovered = failed_log('test_asset_123')
+        imported = failed_log('test_asset_123', error_class='')
+        existing = FormSubmission.objects.create(
+            form_template=self.template, submitted_by=self.user, form_data={},
+            kobo_submission_uuid=imported.submission_uuid,
+        )
+        broken = failed_log('unknown_asset')
+        fresh = KoboWebhookLog.objects.create(
+            kobo_asset_uid='test_asset_123', submission_uuid=f'uuid-{unique_id()}', raw_payload={}
+        )
+
+        logs = select_replayable()
+        self.assertNotIn(fresh, logs)
+        self.assertEqual(error_class_counts(logs), {'ValueError': 2, 'Unclassified': 1})
+
+        report = replay_logs(logs.values_list('id', flat=True), concurrency=1)
+        self.assertEqual(
+            (report['processed'], report['already_processed'], report['failed']),
+            (1, 1, {'ValueError': 1})
+        )
+
+        recovered.refresh_from_db()
+        imported.refresh_from_db()
+        broken.refresh_from_db()
+        self.assertEqual((recovered.status, recovered.error_class), ('processed', ''))
+        self.assertEqual(imported.form_submission, existing)
+        self.assertEqual((broken.status, broken.replay_count), ('failed', 1))
+
+        # Processed logs are not replayed again
+        self.assertEqual(replay_logs([recovered.id], concurrency=1)['skipped'], 1)
+
+    def test_plan_invalidated_when_fields_change(self):
+        """Editing a field drops the cached plan"""
+        cache.clear()
+        field = FormField.objects.create(form_template=self.template, field_name='age', field_label='Age', field_type='text')
+        self.assertEqual(self.process_payload({'age': '42'}).form_data['age'], '42')
+
+        field.field_type = 'number'
+        field.save()
+        self.assertEqual(self.process_payload({'age': '42'}).form_data['age'], 42.0)
+
+    def test_unknown_asset_is_not_cached(self):
+        """A template synced after a miss is found by the next submission"""
+        cache.clear()
+        self.assertIsNone(resolve_form_template('later_asset'))
+        FormTemplate.objects.create(
+            name='Later Form', created_by=self.user, form_type='custom_form', kobo_asset_uid='later_asset'
+        )
+        self.assertIsNotNone(resolve_form_template('later_asset'))
+
 
 class PermissionTests(TestCase):
     """Tests for permission decorators and access control"""
@@ -24,6 +24,8 @@ urlpatterns = [
     # Submissions
     path('submissions/<int:pk>/', views.submission_detail, name='submission_detail'),
     path('templates/<int:form_template_id>/submissions/', views.form_submissions_list, name='form_submissions'),
+    path('templates/<int:form_template_id>/submissions/export/', views.export_submissions_csv, name='export_submissions'),
+    path('templates/<int:form_template_id>/submissions/crosstab/', views.submissions_crosstab, name='submissions_crosstab'),
     path('templates/<int:form_template_id>/fetch-submissions/', views.fetch_submissions_from_kobo, name='fetch_submissions'),
 
     # User-specific views
@@ -1,11 +1,13 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse, HttpResponseForbidden
+from django.http import JsonResponse, HttpResponseForbidden, StreamingHttpResponse
 from django.db import transaction
 from django.utils import timezone
 from django.contrib.auth import get_user_model
 from django.core.paginator import Paginator
+from django.utils.text import slugify
+from urllib.parse import urlencode
 import json
 
 from .models import (
@@ -13,7 +15,13 @@ from .models import (
     FormAssignmentMentor, KoboSyncLog, KoboWebhookLog,
     FormFieldAssociate, FormMentorAssignment
 )
+from .response_tallies import CHOICE_FIELD_TYPES, choice_field_names, get_response_counts, rebuild_tallies
+from .submission_values import (
+    indexed_fields, backfill_values, filter_by_values, value_options, cross_tab, stream_export_csv,
+    value_counts,
+)
 from core.models import Village
+from core.services import background
 from households.models import Household
 from business_groups.models import BusinessGroup
 
@@ -387,30 +395,33 @@ def import_form_template(request):
                     'message': 'No file uploaded'
                 }, status=400)
 
-            # Read file content
-            file_content = uploaded_file.read().decode('utf-8')
             filename = uploaded_file.name.lower()
 
             # Determine file type
             if filename.endswith('.json'):
                 file_type = 'json'
-            elif filename.endswith('.xml'):
+            elif filename.endswith(('.xml', '.xform')):
                 file_type = 'xml'
+            elif filename.endswith('.xlsx'):
+                file_type = 'xlsx'
             else:
-                # Try to detect from content
-                file_content_stripped = file_content.strip()
-                if file_content_stripped.startswith('{') or file_content_stripped.startswith('['):
+                # Try to detect from the first bytes rather than reading the whole upload
+                head = uploaded_file.read(512).lstrip(b'\xef\xbb\xbf \t\r\n')
+                uploaded_file.seek(0)
+                if head.startswith((b'{', b'[')):
                     file_type = 'json'
-                elif file_content_stripped.startswith('<'):
+                elif head.startswith(b'<'):
                     file_type = 'xml'
+                elif head.startswith(b'PK'):
+                    file_type = 'xlsx'
                 else:
                     return JsonResponse({
                         'success': False,
-                        'message': 'Could not determine file type. Please use .json or .xml extension.'
+                        'message': 'Could not determine file type. Please use .json, .xml or .xlsx extension.'
                     }, status=400)
 
-            # Parse the file
-            metadata, fields, errors, warnings = import_form_from_file(file_content, file_type)
+            # Parse the file straight from the upload (memory or temp file on disk)
+            metadata, fields, errors, warnings = import_form_from_file(uploaded_file, file_type)
 
             if errors:
                 return JsonResponse({
@@ -701,6 +712,8 @@ def save_form_template(request):
                 form_template.save()
 
                 # Delete existing fields and recreate
+                previous_choice_fields = choice_field_names(form_template.id)
+                previous_indexed_fields = indexed_fields(form_template.id)
                 form_template.fields.all().delete()
 
             else:
@@ -733,6 +746,7 @@ def save_form_template(request):
                     choices=field_data.get('choices', []),
                     min_value=validation.get('min') if validation.get('min') else None,
                     max_value=validation.get('max') if validation.get('max') else None,
+                    indexed=field_data.get('indexed', False),
                     order=order
                 )
 
@@ -740,6 +754,12 @@ def save_form_template(request):
             form_template.form_fields = fields_data
             form_template.save()
 
+            # Response tallies only cover choice fields; recount if that set changed
+            if template_id and choice_field_names(form_template.id) != previous_choice_fields:
+                background.run_in_background(rebuild_tallies, form_template, name=f'tallies-{form_template.id}')
+            if template_id and indexed_fields(form_template.id) != previous_indexed_fields:
+                background.run_in_background(backfill_values, form_template, name=f'indexed-values-{form_template.id}')
+
             # Handle Field Associate assignments
             fa_ids = data.get('field_associates', [])
             if fa_ids:
@@ -1163,61 +1183,60 @@ def form_submissions_list(request, form_template_id):
         form_template=form_template
     ).select_related('submitted_by', 'household', 'business_group').order_by('-submission_date')
 
-    # Filter by data source
+    # Filter by data source (anything else is ignored, here and in the charts)
     source_filter = request.GET.get('source')
-    if source_filter in ['web_form', 'kobo_sync', 'kobo_webhook']:
+    if source_filter not in ['web_form', 'kobo_sync', 'kobo_webhook']:
+        source_filter = None
+    if source_filter:
         submissions = submissions.filter(data_source=source_filter)
 
+    # Filter by answers to indexed fields (?answer_<field_name>=value)
+    filter_fields = list(form_template.fields.filter(indexed=True).order_by('order'))
+    answer_filters = _answer_filters(request, filter_fields)
+    submissions = filter_by_values(submissions, form_template, answer_filters)
+    answer_querystring = urlencode({f'answer_{name}': value for name, value in answer_filters.items()})
+    options = value_options(form_template, [field.field_name for field in filter_fields])
+    answer_filter_fields = [
+        {'field': field, 'options': options[field.field_name], 'selected': answer_filters.get(field.field_name, '')}
+        for field in filter_fields
+    ]
+
     # Statistics
     total_count = submissions.count()
     web_count = submissions.filter(data_source='web_form').count()
     kobo_count = submissions.filter(data_source__in=['kobo_sync', 'kobo_webhook']).count()
 
-    # Build chart data for select/radio/checkbox fields
+    # Build chart data for select/radio/checkbox fields from the response tallies.
+    # Tallies cover the whole template, so with answer filters the charts are
+    # counted from the indexed answers of the filtered submissions instead, and
+    # choice fields that are not indexed are left out.
     chart_fields = []
-    choice_fields = form_template.fields.filter(
-        field_type__in=['radio', 'select', 'checkbox']
-    ).order_by('order')[:6]  # Limit to 6 charts for performance
-
-    all_submissions_data = list(submissions.values_list('form_data', flat=True))
+    choice_fields = form_template.fields.filter(field_type__in=CHOICE_FIELD_TYPES).order_by('order')
+    if answer_filters:
+        choice_fields = list(choice_fields.filter(indexed=True))
+        response_counts = value_counts(form_template, [field.field_name for field in choice_fields], submissions)
+    else:
+        choice_fields = list(choice_fields)
+        response_counts = get_response_counts(
+            form_template, [field.field_name for field in choice_fields], data_source=source_filter
+        )
 
     for field in choice_fields:
-        # Count responses for this field
-        response_counts = {}
-        for form_data in all_submissions_data:
-            if form_data and field.field_name in form_data:
-                value = form_data[field.field_name]
-                if value:
-                    # Handle multiple values (checkbox)
-                    if isinstance(value, list):
-                        for v in value:
-                            response_counts[v] = response_counts.get(v, 0) + 1
-                    else:
-                        response_counts[value] = response_counts.get(value, 0) + 1
-
-        if response_counts:
-            # Sort by count descending, take top 8
-            sorted_responses = sorted(response_counts.items(), key=lambda x: x[1], reverse=True)[:8]
-            labels = [item[0] for item in sorted_responses]
-            values = [item[1] for item in sorted_responses]
-
-            # Create label lookup from field choices
-            choice_labels = {}
-            if field.choices:
-                for choice in field.choices:
-                    choice_labels[choice.get('value', '')] = choice.get('label', choice.get('value', ''))
-
-            # Map values to display labels
-            display_labels = [choice_labels.get(lbl, lbl) for lbl in labels]
-
-            chart_fields.append({
-                'field_name': field.field_name,
-                'field_label': field.field_label,
-                'field_type': field.field_type,
-                'labels': display_labels,
-                'values': values,
-                'total_responses': sum(values),
-            })
+        # Top 8 responses, already sorted by count descending
+        top_responses = response_counts.get(field.field_name, [])[:8]
+        if not top_responses:
+            continue
+
+        # Map values to display labels from field choices
+        choice_labels = {option['value']: option['label'] for option in field.options}
+        chart_fields.append({
+            'field_name': field.field_name,
+            'field_label': field.field_label,
+            'field_type': field.field_type,
+            'labels': [choice_labels.get(value, value) for value, _ in top_responses],
+            'values': [count for _, count in top_responses],
+            'total_responses': sum(count for _, count in top_responses),
+        })
 
     # Submissions by date (for timeline chart)
     from django.db.models.functions import TruncDate
@@ -1249,11 +1268,84 @@ def form_submissions_list(request, form_template_id):
         'source_filter': source_filter,
         'chart_fields': chart_fields,
         'timeline_data': timeline_data,
+        'answer_filter_fields': answer_filter_fields,
+        'answer_filters': answer_filters,
+        'answer_querystring': answer_querystring,
     }
 
     return render(request, 'forms/submissions_list.html', context)
 
 
+def _answer_filters(request, filter_fields):
+    """{field_name: value} from ?answer_<field_name>= params for indexed fields"""
+    filters = {}
+    for field in filter_fields:
+        value = request.GET.get(f'answer_{field.field_name}', '').strip()
+        if value:
+            filters[field.field_name] = value
+    return filters
+
+
+@login_required
+def export_submissions_csv(request, form_template_id):
+    """
+    Stream submissions with their indexed answers as CSV, honouring the
+    same source and answer filters as the submissions list.
+    """
+    user = request.user
+
+    # Permission check
+    if user.role not in ['me_staff', 'ict_admin'] and not user.is_superuser:
+        messages.error(request, 'You do not have permission to export submissions')
+        return redirect('forms:dashboard')
+
+    form_template = get_object_or_404(FormTemplate, id=form_template_id)
+    submissions = FormSubmission.objects.filter(form_template=form_template)
+
+    source_filter = request.GET.get('source')
+    if source_filter in ['web_form', 'kobo_sync', 'kobo_webhook']:
+        submissions = submissions.filter(data_source=source_filter)
+
+    filter_fields = list(form_template.fields.filter(indexed=True).order_by('order'))
+    submissions = filter_by_values(submissions, form_template, _answer_filters(request, filter_fields))
+
+    response = StreamingHttpResponse(
+        stream_export_csv(submissions, [field.field_name for field in filter_fields]),
+        content_type='text/csv'
+    )
+    filename = f"{slugify(form_template.name) or 'form'}_submissions_{timezone.now().strftime('%Y%m%d')}.csv"
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+@login_required
+def submissions_crosstab(request, form_template_id):
+    """Cross-tabulate answers to two indexed fields (?row=<field>&column=<field>)"""
+    user = request.user
+
+    # Permission check
+    if user.role not in ['me_staff', 'ict_admin'] and not user.is_superuser:
+        return JsonResponse({'success': False, 'message': 'Permission denied'}, status=403)
+
+    form_template = get_object_or_404(FormTemplate, id=form_template_id)
+    available = set(indexed_fields(form_template.id))
+    row_field = request.GET.get('row')
+    column_field = request.GET.get('column')
+    if row_field not in available or column_field not in available:
+        return JsonResponse({
+            'success': False,
+            'message': 'row and column must be indexed fields of this form',
+            'indexed_fields': sorted(available),
+        }, status=400)
+
+    return JsonResponse({
+        'success': True,
+        'row_field': row_field,
+        'column_field': column_field,
+        **cross_tab(form_template, row_field, column_field),
+    })
+
+
 @login_required
 def fetch_submissions_from_kobo(request, form_template_id):
     """
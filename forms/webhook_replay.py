@@ -0,0 +1,179 @@
+"""
+Kobo Webhook Replay
+
+The webhook receiver always answers Kobo with 200, so a submission that
+fails in KoboSubmissionProcessor is only recorded as a 'failed'
+KoboWebhookLog. This module selects failed (and stuck) logs and replays them
+through the processor in parallel batches.
+
+Replays are idempotent on submission_uuid: each log is claimed with a
+conditional UPDATE before processing, and a log whose submission already
+exists is linked to it instead of being processed again.
+
+Used by manage.py replay_kobo_webhooks and the KoboWebhookLog admin action.
+"""
+
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import timedelta
+from django.db import connection
+from django.db.models import Count, F, Q
+from django.utils import timezone
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Logs still 'received' (or 'retrying') this long after arriving are treated as stuck
+STUCK_AFTER = timedelta(minutes=15)
+
+DEFAULT_CONCURRENCY = 4
+DEFAULT_BATCH_SIZE = 100
+
+# Reported for failures recorded before error classes were stored
+UNCLASSIFIED = 'Unclassified'
+
+PROCESSED = 'processed'
+ALREADY_PROCESSED = 'already_processed'
+SKIPPED = 'skipped'
+
+
+def _claimable(stuck_after=STUCK_AFTER):
+    cutoff = timezone.now() - stuck_after
+    return (
+        Q(status='failed') |
+        Q(status='received', received_at__lt=cutoff) |
+        Q(status='retrying', processed_at__lt=cutoff)
+    )
+
+
+def select_replayable(asset_uid=None, since=None, until=None, error_classes=None,
+                      include_failed=True, include_stuck=True, stuck_after=STUCK_AFTER):
+    """
+    KoboWebhookLog queryset of logs to replay, oldest first.
+
+    Args:
+        asset_uid: Only logs for this Kobo asset
+        since / until: Bounds on received_at
+        error_classes: Only failures of these exception types (UNCLASSIFIED
+            matches failures with no stored class)
+        include_failed: Include logs marked 'failed'
+        include_stuck: Include logs left 'received'/'retrying' for longer than stuck_after
+    """
+    from .models import KoboWebhookLog
+
+    cutoff = timezone.now() - stuck_after
+    states = Q(pk__in=[])
+    if include_failed:
+        states |= Q(status='failed')
+    if include_stuck:
+        states |= Q(status='received', received_at__lt=cutoff) | Q(status='retrying', processed_at__lt=cutoff)
+
+    logs = KoboWebhookLog.objects.filter(states)
+    if asset_uid:
+        logs = logs.filter(kobo_asset_uid=asset_uid)
+    if since:
+        logs = logs.filter(received_at__gte=since)
+    if until:
+        logs = logs.filter(received_at__lt=until)
+    if error_classes:
+        classes = Q(error_class__in=error_classes)
+        if UNCLASSIFIED in error_classes:
+            classes |= Q(error_class='')
+        logs = logs.filter(classes)
+    return logs.order_by('received_at', 'id')
+
+
+def error_class_counts(logs):
+    """{error class: count} for a KoboWebhookLog queryset"""
+    counts = Counter()
+    for row in logs.order_by().values('status', 'error_class').annotate(total=Count('id')):
+        if row['status'] == 'failed':
+            counts[row['error_class'] or UNCLASSIFIED] += row['total']
+        else:
+            counts[f"stuck ({row['status']})"] += row['total']
+    return dict(counts)
+
+
+def replay_log(log_id, stuck_after=STUCK_AFTER):
+    """
+    Replay one webhook log. Returns PROCESSED, ALREADY_PROCESSED, SKIPPED
+    (claimed elsewhere or no longer replayable) or the failure's error class.
+    """
+    from .models import KoboWebhookLog, FormSubmission
+    from .kobo_webhook import KoboSubmissionProcessor
+
+    claimed = KoboWebhookLog.objects.filter(_claimable(stuck_after), pk=log_id).update(
+        status='retrying', processed_at=timezone.now(), replay_count=F('replay_count') + 1
+    )
+    if not claimed:
+        return SKIPPED
+
+    webhook_log = KoboWebhookLog.objects.only('submission_uuid').get(pk=log_id)
+    existing_id = FormSubmission.objects.filter(
+        kobo_submission_uuid=webhook_log.submission_uuid
+    ).values_list('id', flat=True).first()
+    if existing_id:
+        KoboWebhookLog.objects.filter(pk=log_id).update(
+            status='processed', form_submission_id=existing_id, error_message='', error_class='',
+            processed_at=timezone.now(),
+        )
+        return ALREADY_PROCESSED
+
+    try:
+        KoboSubmissionProcessor().process_submission(log_id)
+    except Exception as e:
+        # The processor has already recorded the failure on the log
+        return type(e).__name__
+    return PROCESSED
+
+
+def _replay_batch(log_ids, stuck_after, threaded):
+    try:
+        return [replay_log(log_id, stuck_after) for log_id in log_ids]
+    finally:
+        if threaded:
+            connection.close()
+
+
+def replay_logs(log_ids, concurrency=DEFAULT_CONCURRENCY, batch_size=DEFAULT_BATCH_SIZE,
+                stuck_after=STUCK_AFTER, progress=None):
+    """
+    Replay webhook logs in batches on up to `concurrency` threads.
+
+    Args:
+        log_ids: KoboWebhookLog IDs, replayed in the given order within each batch
+        progress: Optional callable(done, total) called after each batch
+
+    Returns:
+        dict: {'total', 'processed', 'already_processed', 'skipped', 'failed': {error class: count}}
+    """
+    log_ids = list(log_ids)
+    batches = [log_ids[i:i + batch_size] for i in range(0, len(log_ids), batch_size)]
+    outcomes = Counter()
+    done = 0
+
+    def record(batch_outcomes):
+        nonlocal done
+        outcomes.update(batch_outcomes)
+        done += len(batch_outcomes)
+        if progress:
+            progress(done, len(log_ids))
+
+    if concurrency <= 1 or len(batches) <= 1:
+        for batch in batches:
+            record(_replay_batch(batch, stuck_after, threaded=False))
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='upg-webhook-replay') as executor:
+            futures = [executor.submit(_replay_batch, batch, stuck_after, True) for batch in batches]
+            for future in as_completed(futures):
+                record(future.result())
+
+    report = {
+        'total': len(log_ids),
+        PROCESSED: outcomes.pop(PROCESSED, 0),
+        ALREADY_PROCESSED: outcomes.pop(ALREADY_PROCESSED, 0),
+        SKIPPED: outcomes.pop(SKIPPED, 0),
+        'failed': dict(outcomes),
+    }
+    logger.info(f"Replayed {report['total']} Kobo webhooks: {report}")
+    return report
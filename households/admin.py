@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Household, HouseholdMember, PPI, HouseholdSurvey, HouseholdProgram
+from .models import Household, HouseholdMember, HouseholdStats, PPI, HouseholdSurvey, HouseholdProgram
 
 @admin.register(Household)
 class HouseholdAdmin(admin.ModelAdmin):
@@ -17,6 +17,12 @@ class PPIAdmin(admin.ModelAdmin):
     list_display = ('household', 'name', 'eligibility_score', 'assessment_date')
     list_filter = ('assessment_date',)
 
+@admin.register(HouseholdStats)
+class HouseholdStatsAdmin(admin.ModelAdmin):
+    list_display = ('household', 'total_members', 'children_under_5', 'head_age', 'latest_ppi_score', 'updated_at')
+    search_fields = ('household__name',)
+    raw_id_fields = ('household', 'head_member')
+
 @admin.register(HouseholdProgram)
 class HouseholdProgramAdmin(admin.ModelAdmin):
     list_display = ('household', 'program', 'participation_status', 'mentor')
@@ -2,4 +2,8 @@ from django.apps import AppConfig
 
 class HouseholdsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'households'
\ No newline at end of file
+    name = 'households'
+
+    def ready(self):
+        """Register household stats maintenance signals"""
+        import households.signals  # noqa: F401
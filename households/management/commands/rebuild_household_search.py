@@ -0,0 +1,29 @@
+"""
+Management command to rebuild household search documents.
+
+Household.save() keeps search_document current; run this after bulk loads or
+raw SQL updates that bypass save(), or after changing how documents are built.
+
+Usage:
+    python manage.py rebuild_household_search
+    python manage.py rebuild_household_search --village 12
+"""
+from django.core.management.base import BaseCommand
+
+from households.models import Household
+from households.search import rebuild_search_documents
+
+
+class Command(BaseCommand):
+    help = 'Recompute the normalized search document of every household'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--village', type=int, help='Only rebuild households in this village')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Households updated per query')
+
+    def handle(self, *args, **options):
+        households = Household.objects.all()
+        if options['village']:
+            households = households.filter(village_id=options['village'])
+        updated = rebuild_search_documents(households, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Updated search documents for {updated} households'))
@@ -0,0 +1,28 @@
+"""
+Management command to rebuild household demographic counters.
+
+HouseholdMember and PPI signals keep HouseholdStats current; run this once
+after deploying, and after bulk loads or raw SQL that bypass the signals.
+
+Usage:
+    python manage.py rebuild_household_stats
+    python manage.py rebuild_household_stats --village 12
+"""
+from django.core.management.base import BaseCommand
+
+from households.models import Household
+from households.stats import rebuild_all_household_stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute member counts, head details and latest PPI for every household'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--village', type=int, help='Only rebuild households in this village')
+
+    def handle(self, *args, **options):
+        households = Household.objects.all()
+        if options['village']:
+            households = households.filter(village_id=options['village'])
+        refreshed = rebuild_all_household_stats(households)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt stats for {refreshed} households'))
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:55
+
+from django.db import migrations, models
+
+
+def backfill_search_documents(apps, schema_editor):
+    from households.search import rebuild_search_documents
+    Household = apps.get_model('households', 'Household')
+    rebuild_search_documents(Household.objects.all())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('households', '0006_household_head_gender_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='household',
+            name='search_document',
+            field=models.CharField(blank=True, default='', editable=False, max_length=500),
+        ),
+        migrations.AddIndex(
+            model_name='household',
+            index=models.Index(fields=['name', 'id'], name='upg_househo_name_fe5672_idx'),
+        ),
+        migrations.RunPython(backfill_search_documents, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:03
+
+from django.db import migrations, models
+from django.db.utils import OperationalError
+
+from households.search import FTS_TABLE, FULLTEXT_INDEX, HOUSEHOLD_TABLE
+
+SQLITE_FTS_SQL = [
+    f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+    f"search_document, content='{HOUSEHOLD_TABLE}', content_rowid='id')",
+    f"CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON {HOUSEHOLD_TABLE} BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, search_document) VALUES (new.id, new.search_document); END",
+    f"CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON {HOUSEHOLD_TABLE} BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, search_document) VALUES ('delete', old.id, old.search_document); END",
+    f"CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE OF search_document ON {HOUSEHOLD_TABLE} BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, search_document) VALUES ('delete', old.id, old.search_document); "
+    f"INSERT INTO {FTS_TABLE}(rowid, search_document) VALUES (new.id, new.search_document); END",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'mysql':
+        schema_editor.execute(f'ALTER TABLE {HOUSEHOLD_TABLE} ADD FULLTEXT INDEX {FULLTEXT_INDEX} (search_document)')
+    elif vendor == 'sqlite':
+        try:
+            for sql in SQLITE_FTS_SQL:
+                schema_editor.execute(sql)
+        except OperationalError:
+            # SQLite built without FTS5: search falls back to LIKE
+            pass
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'mysql':
+        schema_editor.execute(f'ALTER TABLE {HOUSEHOLD_TABLE} DROP INDEX {FULLTEXT_INDEX}')
+    elif vendor == 'sqlite':
+        for trigger in ('ai', 'ad', 'au'):
+            schema_editor.execute(f'DROP TRIGGER IF EXISTS {FTS_TABLE}_{trigger}')
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('households', '0007_household_search_document'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='household',
+            index=models.Index(fields=['national_id'], name='upg_househo_nationa_bfb70d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='household',
+            index=models.Index(fields=['phone_number'], name='upg_househo_phone_n_00ceea_idx'),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('households', '0008_household_full_text_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HouseholdStats',
+            fields=[
+                ('household', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='households.household')),
+                ('total_members', models.PositiveIntegerField(default=0)),
+                ('children_under_5', models.PositiveIntegerField(default=0)),
+                ('children_5_to_15', models.PositiveIntegerField(default=0)),
+                ('working_age_members', models.PositiveIntegerField(default=0, help_text='Members aged 16-64')),
+                ('elderly_members', models.PositiveIntegerField(default=0, help_text='Members aged 65 and over')),
+                ('head_age', models.IntegerField(blank=True, null=True)),
+                ('head_education_level', models.CharField(blank=True, max_length=20)),
+                ('spouse_count', models.PositiveIntegerField(default=0)),
+                ('child_count', models.PositiveIntegerField(default=0)),
+                ('latest_ppi_score', models.IntegerField(blank=True, null=True)),
+                ('latest_ppi_date', models.DateField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('head_member', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='households.householdmember')),
+            ],
+            options={
+                'verbose_name_plural': 'Household stats',
+                'db_table': 'upg_household_stats',
+            },
+        ),
+    ]
@@ -6,6 +6,7 @@ Based on Graduation Model Tracking System
 from django.db import models
 from django.contrib.auth import get_user_model
 from core.models import Village, Program, SubCounty, County
+from .search import build_search_document
 
 User = get_user_model()
 
@@ -48,6 +49,9 @@ class Household(models.Model):
     location = models.CharField(max_length=200, blank=True, help_text="Location description (rural, urban, remote)")
     consent_given = models.BooleanField(default=False, help_text="Household consent for program participation")
 
+    # Normalized names, IDs and phone numbers for typeahead search (see households.search)
+    search_document = models.CharField(max_length=500, blank=True, default='', editable=False)
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -56,6 +60,13 @@ class Household(models.Model):
             return f"{self.head_full_name} - {self.village}"
         return f"{self.name} - {self.village}"
 
+    def save(self, *args, **kwargs):
+        self.search_document = build_search_document(self)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'search_document' not in update_fields:
+            kwargs['update_fields'] = list(update_fields) + ['search_document']
+        super().save(*args, **kwargs)
+
     @property
     def head_full_name(self):
         """Get full name of household head"""
@@ -79,30 +90,56 @@ class Household(models.Model):
         from .eligibility import quick_eligibility_check
         return quick_eligibility_check(self)
 
+    @property
+    def household_stats(self):
+        """
+        Maintained HouseholdStats row, or None if it has not been built yet.
+        Use select_related('stats') when reading the properties below in a loop.
+        """
+        try:
+            return self.stats
+        except HouseholdStats.DoesNotExist:
+            return None
+
     @property
     def latest_ppi_score(self):
         """Get the most recent PPI score"""
+        stats = self.household_stats
+        if stats:
+            return stats.latest_ppi_score
         latest_ppi = self.ppi_scores.order_by('-assessment_date').first()
         return latest_ppi.eligibility_score if latest_ppi else None
 
     @property
     def head_member(self):
         """Get the household head"""
+        stats = self.household_stats
+        if stats:
+            return stats.head_member
         return self.members.filter(relationship_to_head='head').first()
 
     @property
     def total_members(self):
         """Get total number of household members"""
+        stats = self.household_stats
+        if stats:
+            return stats.total_members
         return self.members.count()
 
     @property
     def children_under_5_count(self):
         """Count children under 5 years old"""
+        stats = self.household_stats
+        if stats:
+            return stats.children_under_5
         return self.members.filter(age__lt=5).count()
 
     @property
     def working_members_count(self):
         """Count working-age members (16-64)"""
+        stats = self.household_stats
+        if stats:
+            return stats.working_age_members
         return self.members.filter(age__gte=16, age__lte=64).count()
 
     @property
@@ -137,18 +174,27 @@ class Household(models.Model):
     @property
     def head_age(self):
         """Get age of household head"""
+        stats = self.household_stats
+        if stats:
+            return stats.head_age if stats.head_member_id else 0
         head = self.head_member
         return head.age if head else 0
 
     @property
     def head_education_level(self):
         """Get education level of household head"""
+        stats = self.household_stats
+        if stats:
+            return stats.head_education_level if stats.head_member_id else 'none'
         head = self.head_member
         return head.education_level if head else 'none'
 
     @property
     def is_single_parent(self):
         """Check if this is a single parent household"""
+        stats = self.household_stats
+        if stats:
+            return bool(stats.head_member_id) and stats.child_count > 0 and stats.spouse_count == 0
         head = self.head_member
         if not head:
             return False
@@ -160,6 +206,9 @@ class Household(models.Model):
         db_table = 'upg_households'
         indexes = [
             models.Index(fields=['village']),
+            models.Index(fields=['name', 'id']),
+            models.Index(fields=['national_id']),
+            models.Index(fields=['phone_number']),
             models.Index(fields=['head_id_number']),
             models.Index(fields=['head_phone_number']),
             models.Index(fields=['created_at']),
@@ -265,6 +314,42 @@ class HouseholdMember(models.Model):
         ]
 
 
+class HouseholdStats(models.Model):
+    """
+    Demographic counters for a household, maintained from its members and
+    PPI scores (see households.stats) so Household properties read one row
+    instead of querying members and PPI each time.
+    """
+    household = models.OneToOneField(Household, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+
+    # Member counts by age band
+    total_members = models.PositiveIntegerField(default=0)
+    children_under_5 = models.PositiveIntegerField(default=0)
+    children_5_to_15 = models.PositiveIntegerField(default=0)
+    working_age_members = models.PositiveIntegerField(default=0, help_text="Members aged 16-64")
+    elderly_members = models.PositiveIntegerField(default=0, help_text="Members aged 65 and over")
+
+    # Household head and family structure
+    head_member = models.ForeignKey(HouseholdMember, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    head_age = models.IntegerField(null=True, blank=True)
+    head_education_level = models.CharField(max_length=20, blank=True)
+    spouse_count = models.PositiveIntegerField(default=0)
+    child_count = models.PositiveIntegerField(default=0)
+
+    # Latest poverty assessment
+    latest_ppi_score = models.IntegerField(null=True, blank=True)
+    latest_ppi_date = models.DateField(null=True, blank=True)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Stats for {self.household.name}"
+
+    class Meta:
+        db_table = 'upg_household_stats'
+        verbose_name_plural = 'Household stats'
+
+
 class HouseholdProgram(models.Model):
     """
     Household participation in UPG programs
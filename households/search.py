@@ -0,0 +1,350 @@
+"""
+Household Search for UPG System
+
+Every household keeps a normalized search_document: its name, head names,
+ID numbers and phone numbers (in 07.., 7.. and 2547.. forms), lowercased,
+accent-stripped and space-delimited. Each search token must start one of
+those words, so "wanj 0722" finds Mary Wanjiku with phone +254 722 ...
+
+The document is indexed for full-text search: a FULLTEXT index on MySQL and
+an FTS5 table kept in sync by triggers on SQLite. Other backends, and tokens
+shorter than MySQL's minimum indexed word length, fall back to LIKE.
+rank_households() adds exact-match shortcuts for queries that look like an
+ID or phone number and orders results by relevance.
+
+The typeahead (search_households) is scoped by the caller's villages,
+excludes households already in a training, business group or program
+through a subquery, and is paged by keyset on (name, id) so each page costs
+the same however deep it is.
+"""
+
+import base64
+import json
+import re
+import unicodedata
+
+from django.db import connections
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 50
+
+SEARCH_DOCUMENT_LENGTH = 500
+
+HOUSEHOLD_TABLE = 'upg_households'
+FTS_TABLE = 'upg_households_fts'
+FULLTEXT_INDEX = 'upg_households_search_ft'
+
+# innodb_ft_min_token_size: shorter words are not in the MySQL index
+MYSQL_MIN_TOKEN_LENGTH = 3
+
+# Queries that may be typed-in ID numbers or phone numbers
+_ID_LIKE = re.compile(r'^[A-Za-z]{0,3}\d{5,}[A-Za-z]?$')
+
+_NON_ALNUM = re.compile(r'[^a-z0-9]+')
+
+
+class InvalidCursor(ValueError):
+    """Raised when a page cursor cannot be decoded"""
+
+
+def normalize_text(value):
+    """Lowercase, strip accents and collapse everything but letters and digits to single spaces"""
+    if not value:
+        return ''
+    value = unicodedata.normalize('NFKD', str(value))
+    value = ''.join(ch for ch in value if not unicodedata.combining(ch)).lower()
+    return _NON_ALNUM.sub(' ', value).strip()
+
+
+def phone_variants(phone):
+    """The local (07..), bare (7..) and international (2547..) forms of a Kenyan number"""
+    digits = re.sub(r'\D', '', phone or '')
+    if not digits:
+        return []
+    if digits.startswith('254') and len(digits) > 9:
+        bare = digits[3:]
+    elif digits.startswith('0'):
+        bare = digits[1:]
+    else:
+        bare = digits
+    return list(dict.fromkeys([digits, '0' + bare, bare, '254' + bare]))
+
+
+def build_search_document(household):
+    """Search document for a Household instance (see module docstring)"""
+    words = []
+    for value in (
+        household.name, household.head_first_name, household.head_middle_name, household.head_last_name,
+        household.national_id, household.head_id_number,
+    ):
+        words.extend(normalize_text(value).split())
+    for phone in (household.phone_number, household.head_phone_number):
+        words.extend(phone_variants(phone))
+
+    document = ' '.join(dict.fromkeys(words))
+    if len(document) > SEARCH_DOCUMENT_LENGTH - 2:
+        # Drop the word cut by the limit rather than index half of it
+        document = document[:SEARCH_DOCUMENT_LENGTH - 2].rsplit(' ', 1)[0]
+    # Leading and trailing spaces let every token match as ' ' + prefix
+    return f' {document} ' if document else ''
+
+
+def tokenize_query(query):
+    """Distinct normalized tokens of a search query"""
+    return list(dict.fromkeys(normalize_text(query).split()))
+
+
+def full_text_backend(using='default'):
+    """'mysql' or 'sqlite' when the search index exists on that database, else None"""
+    connection = connections[using]
+    if connection.vendor == 'mysql':
+        return 'mysql'
+    if connection.vendor == 'sqlite':
+        if getattr(connection, '_household_fts_ready', None) is None:
+            # The table and its sync triggers (a table rebuild by a later
+            # migration drops the triggers, and the index would go stale)
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT COUNT(*) FROM sqlite_master WHERE name IN (%s, %s, %s, %s)",
+                    [FTS_TABLE, f'{FTS_TABLE}_ai', f'{FTS_TABLE}_ad', f'{FTS_TABLE}_au'],
+                )
+                connection._household_fts_ready = cursor.fetchone()[0] == 4
+        return 'sqlite' if connection._household_fts_ready else None
+    return None
+
+
+def _like_filter(queryset, tokens):
+    """
+    Fallback word-prefix match for when the full-text index can't serve a
+    token: backends without the index, and on MySQL tokens shorter than
+    MYSQL_MIN_TOKEN_LENGTH. LIKE '% tok%' has a leading wildcard, so it cannot
+    use an index and scans whatever rows reach it. On MySQL those are only
+    the rows the MATCH on the longer tokens already selected, unless every
+    token is short.
+    """
+    for token in tokens:
+        queryset = queryset.filter(search_document__contains=f' {token}')
+    return queryset
+
+
+def _full_text(queryset, tokens):
+    """
+    Filter to households matching every token as a word prefix through the
+    full-text index.
+
+    Returns:
+        (queryset, rank): rank is an expression that is higher for better
+        matches, or None when the backend cannot rank
+    """
+    backend = full_text_backend(queryset.db)
+    if backend == 'mysql':
+        indexed = [token for token in tokens if len(token) >= MYSQL_MIN_TOKEN_LENGTH]
+        queryset = _like_filter(queryset, [token for token in tokens if token not in indexed])
+        if not indexed:
+            return queryset, None
+        match = RawSQL(
+            f'MATCH ({HOUSEHOLD_TABLE}.search_document) AGAINST (%s IN BOOLEAN MODE)',
+            [' '.join(f'+{token}*' for token in indexed)],
+            output_field=FloatField(),
+        )
+        return queryset.annotate(fulltext_match=match).filter(fulltext_match__gt=0), match
+
+    if backend == 'sqlite':
+        expression = ' '.join(f'"{token}"*' for token in tokens)
+        queryset = queryset.filter(id__in=RawSQL(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [expression]
+        ))
+        # bm25() is lower for better matches
+        return queryset, RawSQL(
+            f'SELECT -bm25({FTS_TABLE}) FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s AND rowid = {HOUSEHOLD_TABLE}.id',
+            [expression],
+            output_field=FloatField(),
+        )
+
+    return _like_filter(queryset, tokens), None
+
+
+def filter_by_query(queryset, query):
+    """
+    Households whose search document has a word starting with every query
+    token. Phone numbers are stored in all their forms, so 0722.., 722..
+    and 254722.. all match. Served by the full-text index where it exists;
+    see _like_filter for the unindexed fallback.
+    """
+    tokens = tokenize_query(query)
+    return _full_text(queryset, tokens)[0] if tokens else queryset
+
+
+def exact_match_filter(query):
+    """
+    Q for households whose ID or phone number equals the query, or None if
+    the query does not look like an ID or phone number.
+    """
+    value = (query or '').strip()
+    if _ID_LIKE.match(value):
+        id_q = Q(national_id=value) | Q(head_id_number=value)
+    else:
+        id_q = None
+
+    digits = re.sub(r'[\s\-()+]', '', value)
+    if digits.isdigit() and len(digits) >= 9:
+        forms = phone_variants(digits)
+        forms += ['+' + form for form in forms if form.startswith('254')]
+        phone_q = Q(phone_number__in=forms) | Q(head_phone_number__in=forms)
+        return phone_q | id_q if id_q else phone_q
+    return id_q
+
+
+def rank_households(queryset, query):
+    """
+    Search households for household_list, best matches first.
+
+    A query that looks like an ID or phone number is first tried as an exact
+    match on the indexed ID and phone columns; otherwise (or when that finds
+    nothing) the full-text index is used and results are ordered by rank.
+    Every result is annotated with search_rank.
+    """
+    tokens = tokenize_query(query)
+    if not tokens:
+        return queryset.annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+    exact_q = exact_match_filter(query)
+    if exact_q is not None:
+        exact = queryset.filter(exact_q)
+        if exact.exists():
+            return exact.annotate(search_rank=Value(1000.0, output_field=FloatField()))
+
+    queryset, rank = _full_text(queryset, tokens)
+    # Households whose name starts with the query outrank other matches
+    name_first = RawSQL(
+        f'CASE WHEN {HOUSEHOLD_TABLE}.search_document LIKE %s THEN 100 ELSE 0 END',
+        [f' {" ".join(tokens)}%'],
+        output_field=FloatField(),
+    )
+    return queryset.annotate(
+        search_rank=name_first + rank if rank is not None else name_first
+    ).order_by('-search_rank', '-created_at')
+
+
+def enrolled_household_ids(training=None, business_group=None, program=None):
+    """
+    Subquery of household IDs already in the given training, business group
+    and/or program, for use as id__in without loading the IDs.
+    """
+    subqueries = []
+    if training is not None:
+        from training.models import TrainingAttendance
+        subqueries.append(TrainingAttendance.objects.filter(training=training).values('household_id'))
+    if business_group is not None:
+        from business_groups.models import BusinessGroupMember
+        subqueries.append(BusinessGroupMember.objects.filter(business_group=business_group).values('household_id'))
+    if program is not None:
+        from programs.models import ProgramBeneficiary
+        subqueries.append(ProgramBeneficiary.objects.filter(program=program).values('household_id'))
+    return subqueries
+
+
+def encode_cursor(name, pk):
+    return base64.urlsafe_b64encode(json.dumps([name, pk]).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        name, pk = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return str(name), int(pk)
+    except (ValueError, TypeError):
+        raise InvalidCursor(f'Invalid cursor: {cursor!r}')
+
+
+def search_households(queryset, query='', village_id=None, exclude=(), cursor=None, limit=DEFAULT_LIMIT):
+    """
+    One page of typeahead results.
+
+    Args:
+        queryset: Households the caller may see (already village-scoped)
+        query: Free text; every token must prefix-match a searchable word
+        village_id: Optional village to narrow to
+        exclude: Subqueries of household IDs to leave out (enrolled_household_ids)
+        cursor: next_cursor from the previous page
+        limit: Page size, capped at MAX_LIMIT
+
+    Returns:
+        dict: {'households': [{id, name, village, phone, head_name}], 'next_cursor': str or None}
+    """
+    limit = max(1, min(int(limit or DEFAULT_LIMIT), MAX_LIMIT))
+    queryset = filter_by_query(queryset, query)
+    if village_id:
+        queryset = queryset.filter(village_id=village_id)
+    for subquery in exclude:
+        queryset = queryset.exclude(id__in=subquery)
+    if cursor:
+        name, pk = decode_cursor(cursor)
+        queryset = queryset.filter(Q(name__gt=name) | Q(name=name, id__gt=pk))
+
+    rows = list(queryset.order_by('name', 'id').values(
+        'id', 'name', 'village__name', 'phone_number', 'head_phone_number', 'head_first_name', 'head_last_name',
+    )[:limit + 1])
+    next_cursor = encode_cursor(rows[limit - 1]['name'], rows[limit - 1]['id']) if len(rows) > limit else None
+
+    return {
+        'households': [
+            {
+                'id': row['id'],
+                'name': row['name'],
+                'village': row['village__name'] or 'No Village',
+                'phone': row['phone_number'] or row['head_phone_number'],
+                'head_name': ' '.join(p for p in (row['head_first_name'], row['head_last_name']) if p),
+            }
+            for row in rows[:limit]
+        ],
+        'next_cursor': next_cursor,
+    }
+
+
+def search_from_request(request, queryset, exclude=()):
+    """
+    search_households with the q, village, cursor and limit GET parameters.
+    Raises ValueError (including InvalidCursor) for malformed parameters.
+    """
+    village_id = request.GET.get('village') or None
+    return search_households(
+        queryset,
+        query=request.GET.get('q', ''),
+        village_id=int(village_id) if village_id else None,
+        exclude=exclude,
+        cursor=request.GET.get('cursor') or None,
+        limit=request.GET.get('limit') or DEFAULT_LIMIT,
+    )
+
+
+def rebuild_search_documents(queryset, batch_size=1000):
+    """
+    Recompute search_document for every household in queryset (for rows
+    written by bulk operations or before the column existed).
+
+    Returns:
+        int: Number of households whose document changed
+    """
+    fields = [
+        'id', 'name', 'head_first_name', 'head_middle_name', 'head_last_name',
+        'national_id', 'head_id_number', 'phone_number', 'head_phone_number', 'search_document',
+    ]
+    changed = []
+    updated = 0
+    for household in queryset.only(*fields).order_by('id').iterator(chunk_size=batch_size):
+        document = build_search_document(household)
+        if document != household.search_document:
+            household.search_document = document
+            changed.append(household)
+        if len(changed) >= batch_size:
+            queryset.model.objects.bulk_update(changed, ['search_document'])
+            updated += len(changed)
+            changed = []
+    if changed:
+        queryset.model.objects.bulk_update(changed, ['search_document'])
+        updated += len(changed)
+    return updated
@@ -0,0 +1,36 @@
+"""
+Django Signals for Households
+Keep HouseholdStats in step with household members and PPI scores
+"""
+
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+
+from .models import HouseholdMember, PPI
+from .stats import schedule_stats_refresh
+
+
+@receiver(pre_save, sender=HouseholdMember)
+def remember_member_household(sender, instance, **kwargs):
+    """Note the household a member is saved from, in case it is being moved"""
+    instance._previous_household_id = (
+        HouseholdMember.objects.filter(pk=instance.pk).values_list('household_id', flat=True).first()
+        if instance.pk else None
+    )
+
+
+@receiver(post_save, sender=HouseholdMember)
+@receiver(post_delete, sender=HouseholdMember)
+def refresh_stats_for_member(sender, instance, **kwargs):
+    """A member was added, edited, moved or removed"""
+    previous_household_id = getattr(instance, '_previous_household_id', None)
+    if previous_household_id == instance.household_id:
+        previous_household_id = None
+    schedule_stats_refresh(instance.household_id, previous_household_id)
+
+
+@receiver(post_save, sender=PPI)
+@receiver(post_delete, sender=PPI)
+def refresh_stats_for_ppi(sender, instance, **kwargs):
+    """A PPI assessment was recorded, corrected or removed"""
+    schedule_stats_refresh(instance.household_id)
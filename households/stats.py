@@ -0,0 +1,110 @@
+"""
+Household Demographic Counters for UPG System
+
+HouseholdStats keeps each household's member counts by age band, head
+member, spouse/child counts and latest PPI score in one row, so eligibility
+scoring, reports and templates read them without per-household queries.
+
+Rows are refreshed by HouseholdMember and PPI signals once the transaction
+commits, and in bulk by the rebuild_household_stats command. Each refresh
+recomputes the affected households with three grouped queries and one upsert.
+"""
+
+from django.db import transaction
+from django.db.models import Count, Q
+
+from core.services.bulk_upsert import bulk_upsert
+
+from .models import Household, HouseholdMember, HouseholdStats, PPI
+
+BATCH_SIZE = 1000
+
+STATS_FIELDS = [
+    'total_members', 'children_under_5', 'children_5_to_15', 'working_age_members', 'elderly_members',
+    'head_member', 'head_age', 'head_education_level', 'spouse_count', 'child_count',
+    'latest_ppi_score', 'latest_ppi_date',
+]
+
+
+def compute_household_stats(household_ids):
+    """
+    Build (unsaved) HouseholdStats for the given households that still exist.
+
+    Returns:
+        list of HouseholdStats
+    """
+    household_ids = list(Household.objects.filter(id__in=household_ids).values_list('id', flat=True))
+    if not household_ids:
+        return []
+
+    counts = {
+        row.pop('household_id'): row
+        for row in HouseholdMember.objects.filter(household_id__in=household_ids).order_by().values(
+            'household_id'
+        ).annotate(
+            total_members=Count('id'),
+            children_under_5=Count('id', filter=Q(age__lt=5)),
+            children_5_to_15=Count('id', filter=Q(age__gte=5, age__lte=15)),
+            working_age_members=Count('id', filter=Q(age__gte=16, age__lte=64)),
+            elderly_members=Count('id', filter=Q(age__gte=65)),
+            spouse_count=Count('id', filter=Q(relationship_to_head='spouse')),
+            child_count=Count('id', filter=Q(relationship_to_head='child')),
+        )
+    }
+
+    # The first head member by id, as Household.head_member picks it
+    heads = {}
+    for head in HouseholdMember.objects.filter(
+        household_id__in=household_ids, relationship_to_head='head'
+    ).order_by('household_id', 'id').values('household_id', 'id', 'age', 'education_level'):
+        heads.setdefault(head['household_id'], head)
+
+    latest_ppi = {}
+    for ppi in PPI.objects.filter(household_id__in=household_ids).order_by(
+        'household_id', '-assessment_date', '-id'
+    ).values('household_id', 'eligibility_score', 'assessment_date'):
+        latest_ppi.setdefault(ppi['household_id'], ppi)
+
+    stats = []
+    for household_id in household_ids:
+        head = heads.get(household_id)
+        ppi = latest_ppi.get(household_id)
+        stats.append(HouseholdStats(
+            household_id=household_id,
+            head_member_id=head['id'] if head else None,
+            head_age=head['age'] if head else None,
+            head_education_level=head['education_level'] if head else '',
+            latest_ppi_score=ppi['eligibility_score'] if ppi else None,
+            latest_ppi_date=ppi['assessment_date'] if ppi else None,
+            **counts.get(household_id, {}),
+        ))
+    return stats
+
+
+def refresh_household_stats(household_ids):
+    """Recompute and save HouseholdStats for the given households"""
+    household_ids = sorted(set(household_ids))
+    refreshed = 0
+    for start in range(0, len(household_ids), BATCH_SIZE):
+        stats = compute_household_stats(household_ids[start:start + BATCH_SIZE])
+        bulk_upsert(HouseholdStats, stats, unique_fields=['household'], update_fields=STATS_FIELDS + ['updated_at'])
+        refreshed += len(stats)
+    return refreshed
+
+
+def rebuild_all_household_stats(queryset=None):
+    """Recompute HouseholdStats for every household in queryset (default: all)"""
+    queryset = queryset if queryset is not None else Household.objects.all()
+    household_ids = list(queryset.order_by('id').values_list('id', flat=True))
+    return refresh_household_stats(household_ids)
+
+
+def schedule_stats_refresh(*household_ids):
+    """
+    Refresh households' stats after the current transaction commits.
+    Deferring also skips households deleted in the same transaction (their
+    members' delete signals fire before the household row is gone).
+    """
+    household_ids = [household_id for household_id in household_ids if household_id]
+    if household_ids:
+        transaction.on_commit(lambda: refresh_household_stats(household_ids))
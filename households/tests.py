@@ -8,7 +8,7 @@ from django.contrib.auth import get_user_model
 from decimal import Decimal
 import uuid
 
-from .models import Household, HouseholdMember, PPI, HouseholdProgram
+from .models import Household, HouseholdMember, HouseholdStats, PPI, HouseholdProgram
 from core.models import Village, SubCounty, County
 
 User = get_user_model()
@@ -237,3 +237,204 @@ class EligibilityTests(TestCase):
             assessment_date=timezone.now().date()
         )
         self.assertEqual(self.household.latest_ppi_score, 45)
+
+
+class HouseholdSearchTests(TestCase):
+    """Tests for the typeahead household search API"""
+
+    def setUp(self):
+        uid = unique_id()
+        county = County.objects.create(name=f'Test County {uid}')
+        subcounty = SubCounty.objects.create(name=f'Test SubCounty {uid}', county=county)
+        self.village = Village.objects.create(name=f'Village A {uid}', subcounty_obj=subcounty)
+        self.other_village = Village.objects.create(name=f'Village B {uid}', subcounty_obj=subcounty)
+        self.staff = User.objects.create_user(username=f'staff_{uid}', email=f'staff_{uid}@test.com', password='testpass123', role='me_staff')
+        self.mentor = User.objects.create_user(username=f'mentor_{uid}', email=f'mentor_{uid}@test.com', password='testpass123', role='mentor')
+        self.mentor.profile.assigned_villages.add(self.village)
+
+        self.wanjiku = Household.objects.create(
+            name='Wanjiku Household', village=self.village, head_first_name='Mary', head_last_name='Wanjikũ',
+            national_id='12345678', phone_number='+254 722 111 222',
+        )
+        self.otieno = Household.objects.create(
+            name='Otieno Household', village=self.other_village, head_first_name='Peter',
+            national_id='87654321', phone_number='0733444555',
+        )
+
+    def search(self, user, **params):
+        self.client.force_login(user)
+        response = self.client.get(reverse('households:household_search_api'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_search_document_is_normalized(self):
+        """Names are lowercased and accent-stripped; phones are stored in every form"""
+        document = self.wanjiku.search_document
+        for word in ('wanjiku', 'mary', '12345678', '0722111222', '722111222', '254722111222'):
+            self.assertIn(f' {word} ', document)
+
+    def test_token_prefix_search(self):
+        """Every token must prefix-match a word: names, IDs and any phone form"""
+        def names(**params):
+            return [h['name'] for h in self.search(self.staff, **params)['households']]
+
+        self.assertEqual(names(q='wanj MARY'), ['Wanjiku Household'])
+        self.assertEqual(names(q='0722111 mary'), ['Wanjiku Household'])
+        self.assertEqual(names(q='254733'), ['Otieno Household'])
+        self.assertEqual(names(q='8765'), ['Otieno Household'])
+        self.assertEqual(names(q='anjiku'), [])
+
+    def test_scope_and_exclusion(self):
+        """Mentors only see their villages; enrolled households are excluded"""
+        from programs.models import Program, ProgramBeneficiary
+
+        self.assertEqual([h['id'] for h in self.search(self.mentor, q='household')['households']], [self.wanjiku.id])
+
+        program = Program.objects.create(name=f'Program {unique_id()}', description='Test', created_by=self.staff)
+        ProgramBeneficiary.objects.create(program=program, household=self.otieno, enrollment_date='2025-01-01')
+        results = self.search(self.staff, exclude_program=program.id)
+        self.assertEqual([h['id'] for h in results['households']], [self.wanjiku.id])
+
+    def test_keyset_pagination(self):
+        """Pages follow (name, id) order without overlap until next_cursor is empty"""
+        for i in range(5):
+            Household.objects.create(name='Same Name', village=self.village, national_id=f'X{i}', phone_number='')
+
+        seen = []
+        cursor = ''
+        while True:
+            page = self.search(self.staff, limit=3, cursor=cursor)
+            seen.extend(h['id'] for h in page['households'])
+            cursor = page['next_cursor']
+            if not cursor:
+                break
+
+        expected = list(Household.objects.order_by('name', 'id').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('households:household_search_api'), {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_household_list_full_text_ranking(self):
+        """household_list uses the full-text index, exact ID/phone shortcuts and ranks name matches first"""
+        from .search import full_text_backend, rank_households
+
+        self.assertEqual(full_text_backend(), 'sqlite')
+        head_match = Household.objects.create(
+            name='Kamau Household', village=self.village, head_first_name='Otieno', national_id='555',
+            phone_number='',
+        )
+
+        ranked = list(rank_households(Household.objects.all(), 'otieno'))
+        self.assertEqual(ranked, [self.otieno, head_match])
+        self.assertEqual(list(rank_households(Household.objects.all(), '87654321')), [self.otieno])
+        self.assertEqual(list(rank_households(Household.objects.all(), '+254 733 444 555')), [self.otieno])
+
+        # The index follows saves and deletes
+        self.otieno.name = 'Achieng Household'
+        self.otieno.save()
+        self.assertEqual(list(rank_households(Household.objects.all(), 'achieng')), [self.otieno])
+        head_match.delete()
+        self.assertEqual(list(rank_households(Household.objects.all(), 'kamau')), [])
+
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('households:household_list'), {'search': 'wanjiku'})
+        self.assertEqual(list(response.context['households']), [self.wanjiku])
+
+
+class HouseholdStatsTests(TestCase):
+    """Tests for the maintained household demographic counters"""
+
+    def setUp(self):
+        uid = unique_id()
+        county = County.objects.create(name=f'Test County {uid}')
+        subcounty = SubCounty.objects.create(name=f'Test SubCounty {uid}', county=county)
+        self.village = Village.objects.create(name=f'Test Village {uid}', subcounty_obj=subcounty)
+        self.household = Household.objects.create(
+            name='Chebet Household', village=self.village, national_id=f'ID{uid}', phone_number='0712345678'
+        )
+
+    def add_member(self, name, age, relationship, education_level='none'):
+        return HouseholdMember.objects.create(
+            household=self.household, name=name, gender='female', age=age,
+            relationship_to_head=relationship, education_level=education_level,
+        )
+
+    def property_values(self, household):
+        return (
+            household.total_members, household.children_under_5_count, household.working_members_count,
+            household.head_age, household.head_education_level, household.is_single_parent,
+            household.latest_ppi_score,
+        )
+
+    def test_signals_maintain_stats(self):
+        """Member and PPI changes refresh the stats row after commit; properties read it without queries"""
+        from datetime import date
+
+        with self.captureOnCommitCallbacks(execute=True):
+            head = self.add_member('Chebet', 40, 'head', 'secondary')
+            self.add_member('Kip', 3, 'child')
+            self.add_member('Jepchirchir', 12, 'child')
+            PPI.objects.create(household=self.household, name='Baseline', eligibility_score=55,
+                               assessment_date=date(2024, 1, 1))
+            PPI.objects.create(household=self.household, name='Midline', eligibility_score=40,
+                               assessment_date=date(2025, 1, 1))
+
+        stats = HouseholdStats.objects.get(household=self.household)
+        self.assertEqual((stats.head_member_id, stats.children_under_5, stats.children_5_to_15), (head.id, 1, 1))
+        self.assertEqual((stats.latest_ppi_score, stats.latest_ppi_date), (40, date(2025, 1, 1)))
+
+        household = Household.objects.select_related('stats').get(pk=self.household.pk)
+        with self.assertNumQueries(0):
+            values = self.property_values(household)
+        self.assertEqual(values, (3, 1, 1, 40, 'secondary', True, 40))
+
+        # Same answers as the per-query fallback
+        HouseholdStats.objects.all().delete()
+        fallback = Household.objects.get(pk=self.household.pk)
+        self.assertEqual(self.property_values(fallback), values)
+
+    def test_moving_a_member_refreshes_both_households(self):
+        """A member moved to another household is counted there and no longer in the old one"""
+        other = Household.objects.create(name='Other', village=self.village, national_id='X2', phone_number='')
+        with self.captureOnCommitCallbacks(execute=True):
+            member = self.add_member('Kip', 3, 'child')
+        with self.captureOnCommitCallbacks(execute=True):
+            member.household = other
+            member.save()
+
+        self.assertEqual(HouseholdStats.objects.get(household=self.household).total_members, 0)
+        self.assertEqual(HouseholdStats.objects.get(household=other).total_members, 1)
+
+    def test_refresh_without_conflict_target(self):
+        """Backends that can't name a conflict target (MySQL) upsert without unique_fields"""
+        from unittest.mock import patch
+        from django.db import connection
+        from .stats import refresh_household_stats
+
+        self.add_member('Chebet', 40, 'head')
+        with patch.object(connection.features, 'supports_update_conflicts_with_target', False), \
+                patch.object(HouseholdStats.objects, 'bulk_create') as bulk_create:
+            refresh_household_stats([self.household.pk])
+
+        kwargs = bulk_create.call_args.kwargs
+        self.assertTrue(kwargs['update_conflicts'])
+        self.assertIsNone(kwargs['unique_fields'])
+        self.assertIn('total_members', kwargs['update_fields'])
+
+    def test_deleting_household_and_rebuild(self):
+        """Deleting a household with members does not recreate its stats; the command rebuilds all rows"""
+        from io import StringIO
+        from django.core.management import call_command
+
+        self.add_member('Chebet', 40, 'head')
+        other = Household.objects.create(name='Other', village=self.village, national_id='X1', phone_number='')
+        out = StringIO()
+        call_command('rebuild_household_stats', stdout=out)
+        self.assertIn('Rebuilt stats for 2 households', out.getvalue())
+        self.assertEqual(HouseholdStats.objects.get(household=other).total_members, 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.household.delete()
+        self.assertFalse(HouseholdStats.objects.filter(household_id=self.household.pk).exists())
@@ -6,6 +6,7 @@ app_name = 'households'
 
 urlpatterns = [
     path('', views.household_list, name='household_list'),
+    path('api/search/', views.household_search_api, name='household_search_api'),
     path('create/', views.household_create, name='household_create'),
     path('<int:pk>/', views.household_detail, name='household_detail'),
     path('<int:pk>/edit/', views.household_edit, name='household_edit'),
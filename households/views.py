@@ -3,9 +3,9 @@ from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
 from django.http import JsonResponse
 from django.core.paginator import Paginator
-from django.db.models import Q
 from .models import Household, HouseholdMember, HouseholdProgram, PPI, HouseholdSurvey
 from .eligibility import EligibilityScorer, HouseholdQualificationTool, batch_eligibility_assessment
+from .search import rank_households
 from core.models import Village
 from core.decorators import role_required
 
@@ -59,25 +59,20 @@ def household_list(request):
         # Other roles have no access to households
         households = Household.objects.none()
 
-    # Search functionality - search by name, phone, or ID
-    search_query = request.GET.get('search', '').strip()
-    if search_query:
-        households = households.filter(
-            Q(name__icontains=search_query) |
-            Q(phone_number__icontains=search_query) |
-            Q(national_id__icontains=search_query) |
-            Q(head_id_number__icontains=search_query) |
-            Q(head_phone_number__icontains=search_query) |
-            Q(head_first_name__icontains=search_query) |
-            Q(head_last_name__icontains=search_query)
-        )
-
     # Filter by village
     village_filter = request.GET.get('village', '')
     if village_filter:
         households = households.filter(village_id=village_filter)
 
-    households = households.select_related('village').order_by('-created_at')
+    # Search functionality - name, head names, ID or phone through the
+    # household search index, best matches first
+    search_query = request.GET.get('search', '').strip()
+    if search_query:
+        households = rank_households(households, search_query)
+    else:
+        households = households.order_by('-created_at')
+
+    households = households.select_related('village', 'stats')
 
     # Pagination
     from django.core.paginator import Paginator
@@ -387,10 +382,10 @@ def batch_eligibility_report(request):
         household_ids = request.POST.getlist('household_ids')
 
         if household_ids:
-            households = Household.objects.filter(id__in=household_ids)
+            households = Household.objects.filter(id__in=household_ids).select_related('stats')
         else:
             # Process all households if none selected
-            households = Household.objects.all()[:100]  # Limit to prevent timeout
+            households = Household.objects.select_related('stats')[:100]  # Limit to prevent timeout
 
         try:
             # Run batch assessment
@@ -443,7 +438,7 @@ def eligibility_dashboard(request):
     total_households = Household.objects.count()
 
     # Get recent assessments (simplified - would cache this in production)
-    recent_households = Household.objects.all()[:50]
+    recent_households = Household.objects.select_related('stats')[:50]
     assessments = []
 
     for household in recent_households:
@@ -482,4 +477,28 @@ def eligibility_dashboard(request):
         'recent_assessments': assessments[:20],
     }
 
-    return render(request, 'households/eligibility_dashboard.html', context)
\ No newline at end of file
+    return render(request, 'households/eligibility_dashboard.html', context)
+
+@login_required
+def household_search_api(request):
+    """
+    Typeahead search over the households the user can see.
+
+    GET parameters: q, village, limit, cursor, and exclude_training,
+    exclude_group or exclude_program to leave out households already in that
+    training, business group or program.
+    """
+    from core.permissions import get_filtered_households
+    from .search import enrolled_household_ids, search_from_request
+
+    try:
+        exclude = enrolled_household_ids(
+            training=int(request.GET['exclude_training']) if request.GET.get('exclude_training') else None,
+            business_group=int(request.GET['exclude_group']) if request.GET.get('exclude_group') else None,
+            program=int(request.GET['exclude_program']) if request.GET.get('exclude_program') else None,
+        )
+        results = search_from_request(request, get_filtered_households(request.user), exclude)
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+
+    return JsonResponse({'success': True, **results})
@@ -2,7 +2,8 @@ from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.core.paginator import Paginator
-from django.db.models import Q
+from django.db import transaction
+from django.db.models import Count, Q
 from django.http import JsonResponse
 from django.utils import timezone
 from django.urls import reverse
@@ -778,8 +779,8 @@ def enroll_households(request, pk):
         available_households = Household.objects.all()
 
     # Exclude already enrolled households in this specific program
-    enrolled_household_ids = ProgramBeneficiary.objects.filter(program=program).values_list('household_id', flat=True)
-    available_households = available_households.exclude(id__in=enrolled_household_ids).select_related('village')
+    enrolled_household_ids = ProgramBeneficiary.objects.filter(program=program).values('household_id')
+    available_households = available_households.exclude(id__in=enrolled_household_ids)
 
     if request.method == 'POST':
         selected_households = request.POST.getlist('households[]') or request.POST.getlist('households')
@@ -788,19 +789,24 @@ def enroll_households(request, pk):
         if select_all:
             households_to_add = available_households
         else:
-            households_to_add = available_households.filter(id__in=selected_households)
-
-        added_count = 0
-        for household in households_to_add:
-            # Check if already enrolled
-            if not ProgramBeneficiary.objects.filter(program=program, household=household).exists():
-                ProgramBeneficiary.objects.create(
+            households_to_add = available_households.filter(id__in=[h for h in selected_households if h.isdigit()])
+
+        # One insert; the (program, household) unique constraint skips any
+        # household enrolled concurrently
+        household_ids = list(households_to_add.values_list('id', flat=True))
+        enrollment_date = timezone.now().date()
+        with transaction.atomic():
+            before = ProgramBeneficiary.objects.filter(program=program).count()
+            ProgramBeneficiary.objects.bulk_create([
+                ProgramBeneficiary(
                     program=program,
-                    household=household,
-                    enrollment_date=timezone.now().date(),
+                    household_id=household_id,
+                    enrollment_date=enrollment_date,
                     participation_status='active'
                 )
-                added_count += 1
+                for household_id in household_ids
+            ], batch_size=500, ignore_conflicts=True)
+            added_count = ProgramBeneficiary.objects.filter(program=program).count() - before
 
         if added_count > 0:
             messages.success(request, f'{added_count} household(s) enrolled in the program successfully!')
@@ -809,9 +815,15 @@ def enroll_households(request, pk):
 
         return redirect('programs:program_beneficiaries', pk=pk)
 
+    # The household list itself is searched and paged by the household search API
+    village_counts = list(available_households.order_by('village__name').values(
+        'village_id', 'village__name'
+    ).annotate(count=Count('id')))
+
     context = {
         'program': program,
-        'available_households': available_households,
+        'available_count': sum(row['count'] for row in village_counts),
+        'village_counts': village_counts,
         'page_title': f'Enroll Households - {program.name}',
         'user_role': user_role,
     }
@@ -0,0 +1,36 @@
+# Generated by Django 5.2 on 2026-10-19 07:36
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('savings_groups', '0008_simplify_loan_status'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='savingsrecord',
+            name='edit_history',
+            field=models.TextField(blank=True, help_text='History of all edits made to this record'),
+        ),
+        migrations.AddField(
+            model_name='savingsrecord',
+            name='edited_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='savingsrecord',
+            name='edited_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='edited_savings', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='savingsrecord',
+            name='recorded_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='recorded_savings', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
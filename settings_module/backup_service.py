@@ -0,0 +1,586 @@
+"""
+Backup Service for UPG System
+
+Builds full system backups as a background job. The database dump is streamed
+straight into the archive and media files are added from MEDIA_ROOT in place,
+so nothing is staged in a temp directory. Compressible streams go through a
+chunked parallel gzip writer, and progress/throughput is recorded on the
+SystemBackup row so the backup dashboard can poll for status.
+"""
+
+from django.conf import settings as django_settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from collections import deque
+from contextlib import contextmanager
+from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor
+import gzip
+import json
+import os
+import shutil
+import subprocess
+import threading
+import time
+import zipfile
+import logging
+
+from core.services import background
+
+logger = logging.getLogger(__name__)
+
+# Streaming / compression tuning
+CHUNK_SIZE = 1024 * 1024  # 1 MB per compressed gzip member
+COMPRESSION_WORKERS = max(1, min(4, os.cpu_count() or 1))
+COMPRESSION_LEVEL = 6
+PROGRESS_INTERVAL = 2  # seconds between progress writes to the database
+
+# Backup jobs run on daemon threads; one whose heartbeat is older than this
+# died with its worker and is marked failed so it no longer blocks new backups
+BACKUP_STALE_AFTER = timedelta(minutes=30)
+ACTIVE_BACKUP_STATUSES = ['pending', 'running']
+BACKUP_LOCK_KEY = 'backup_job_lock'
+
+# Media that is already compressed is stored as-is; deflating it again only burns CPU
+ALREADY_COMPRESSED_EXTENSIONS = {
+    '.jpg', '.jpeg', '.png', '.gif', '.webp', '.heic',
+    '.zip', '.gz', '.bz2', '.xz', '.7z', '.rar',
+    '.xlsx', '.docx', '.pptx', '.pdf',
+    '.mp3', '.mp4', '.m4a', '.mov', '.avi',
+}
+
+
+def find_mysqldump():
+    """Find mysqldump executable across different platforms"""
+    mysqldump_in_path = shutil.which('mysqldump')
+    if mysqldump_in_path:
+        return mysqldump_in_path
+
+    possible_paths = [
+        '/usr/bin/mysqldump',
+        '/usr/local/bin/mysqldump',
+        '/usr/local/mysql/bin/mysqldump',
+        'C:\\xampp\\mysql\\bin\\mysqldump.exe',
+        'C:\\Program Files\\MySQL\\MySQL Server 8.0\\bin\\mysqldump.exe',
+        'C:\\Program Files\\MySQL\\MySQL Server 5.7\\bin\\mysqldump.exe',
+        '/usr/bin/mariadb-dump',
+    ]
+
+    for path in possible_paths:
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def find_mysql():
+    """Find mysql client executable for restore operations"""
+    mysql_in_path = shutil.which('mysql')
+    if mysql_in_path:
+        return mysql_in_path
+
+    possible_paths = [
+        '/usr/bin/mysql',
+        '/usr/local/bin/mysql',
+        '/usr/local/mysql/bin/mysql',
+        'C:\\xampp\\mysql\\bin\\mysql.exe',
+        'C:\\Program Files\\MySQL\\MySQL Server 8.0\\bin\\mysql.exe',
+        'C:\\Program Files\\MySQL\\MySQL Server 5.7\\bin\\mysql.exe',
+        '/usr/bin/mariadb',
+    ]
+
+    for path in possible_paths:
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def get_backup_dir():
+    """Get or create the backup directory"""
+    backup_dir = os.path.join(django_settings.BASE_DIR, 'backups')
+    os.makedirs(backup_dir, exist_ok=True)
+    return backup_dir
+
+
+def format_file_size(size_bytes):
+    """Format file size in human-readable format"""
+    if size_bytes < 1024:
+        return f"{size_bytes} B"
+    elif size_bytes < 1024 * 1024:
+        return f"{size_bytes / 1024:.2f} KB"
+    elif size_bytes < 1024 * 1024 * 1024:
+        return f"{size_bytes / (1024 * 1024):.2f} MB"
+    else:
+        return f"{size_bytes / (1024 * 1024 * 1024):.2f} GB"
+
+
+# =============================================================================
+# Parallel Compression
+# =============================================================================
+
+class ParallelGzipWriter:
+    """
+    File-like writer that gzip-compresses fixed-size chunks on a thread pool.
+
+    Each chunk becomes an independent gzip member (the pigz approach).
+    Concatenated members form a valid gzip stream, so gzip.open() and the
+    gunzip CLI read the output transparently. zlib releases the GIL while
+    compressing, so the worker threads genuinely run in parallel.
+    """
+
+    def __init__(self, fileobj, chunk_size=CHUNK_SIZE, workers=COMPRESSION_WORKERS,
+                 level=COMPRESSION_LEVEL, on_write=None):
+        self.fileobj = fileobj
+        self.chunk_size = chunk_size
+        self.level = level
+        self.on_write = on_write
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self._buffer = bytearray()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='backup-gzip')
+        self._pending = deque()
+        # Bound in-flight chunks so memory stays at roughly 2 chunks per worker
+        self._max_pending = workers * 2
+        self._closed = False
+
+    def write(self, data):
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        self._buffer.extend(data)
+        self.bytes_in += len(data)
+        while len(self._buffer) >= self.chunk_size:
+            chunk = bytes(self._buffer[:self.chunk_size])
+            del self._buffer[:self.chunk_size]
+            self._submit(chunk)
+        if self.on_write:
+            self.on_write(len(data))
+        return len(data)
+
+    def _submit(self, chunk):
+        self._pending.append(self._executor.submit(gzip.compress, chunk, self.level, mtime=0))
+        while len(self._pending) >= self._max_pending:
+            self._drain_one()
+
+    def _drain_one(self):
+        compressed = self._pending.popleft().result()
+        self.fileobj.write(compressed)
+        self.bytes_out += len(compressed)
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            if self._buffer:
+                self._submit(bytes(self._buffer))
+                self._buffer.clear()
+            while self._pending:
+                self._drain_one()
+        finally:
+            self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+# =============================================================================
+# Progress Tracking
+# =============================================================================
+
+class BackupProgress:
+    """Accumulates bytes processed and periodically persists progress on a SystemBackup"""
+
+    def __init__(self, backup, total_bytes=0):
+        self.backup = backup
+        self.total_bytes = total_bytes
+        self.bytes_processed = 0
+        self.started = time.monotonic()
+        self._last_flush = 0
+
+    def step(self, description):
+        self.backup.current_step = description
+        self.flush(force=True)
+
+    def advance(self, nbytes):
+        self.bytes_processed += nbytes
+        self.flush()
+
+    @property
+    def throughput(self):
+        elapsed = time.monotonic() - self.started
+        return self.bytes_processed / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def percent(self):
+        if not self.total_bytes:
+            return 0
+        # Estimates (e.g. MySQL table sizes) are approximate; only 'completed' shows 100%
+        return min(99, int(self.bytes_processed * 100 / self.total_bytes))
+
+    def flush(self, force=False):
+        now = time.monotonic()
+        if not force and now - self._last_flush < PROGRESS_INTERVAL:
+            return
+        self._last_flush = now
+
+        from .models import SystemBackup
+        self.backup.bytes_processed = self.bytes_processed
+        self.backup.progress_percent = self.percent
+        self.backup.throughput_bytes_per_sec = round(self.throughput, 1)
+        SystemBackup.objects.filter(pk=self.backup.pk).update(
+            bytes_total=self.total_bytes or None,
+            bytes_processed=self.bytes_processed,
+            progress_percent=self.backup.progress_percent,
+            throughput_bytes_per_sec=self.backup.throughput_bytes_per_sec,
+            current_step=self.backup.current_step,
+            heartbeat_at=timezone.now(),
+        )
+
+
+# =============================================================================
+# Database Streaming
+# =============================================================================
+
+def estimate_database_size(db_settings):
+    """Best-effort size of the database in bytes, used for progress reporting"""
+    db_engine = db_settings['ENGINE']
+    try:
+        if 'sqlite3' in db_engine:
+            return os.path.getsize(db_settings['NAME'])
+        with connection.cursor() as cursor:
+            if 'mysql' in db_engine:
+                cursor.execute(
+                    "SELECT COALESCE(SUM(data_length + index_length), 0) "
+                    "FROM information_schema.tables WHERE table_schema = %s",
+                    [db_settings['NAME']]
+                )
+            elif 'postgresql' in db_engine:
+                cursor.execute("SELECT pg_database_size(current_database())")
+            else:
+                return 0
+            return int(cursor.fetchone()[0] or 0)
+    except Exception as e:
+        logger.warning(f"Could not estimate database size: {str(e)}")
+        return 0
+
+
+def _mysqldump_command(db_settings):
+    mysqldump_path = find_mysqldump()
+    if not mysqldump_path:
+        raise Exception('mysqldump not found. Install mysql-client: sudo apt-get install mysql-client')
+
+    cmd = [
+        mysqldump_path,
+        '-h', db_settings.get('HOST', 'localhost'),
+        '-P', str(db_settings.get('PORT', '3306')),
+        '-u', db_settings.get('USER', 'root'),
+    ]
+    if db_settings.get('PASSWORD'):
+        cmd.append(f'--password={db_settings["PASSWORD"]}')
+    cmd.extend(['--single-transaction', '--routines', '--triggers', '--quick', db_settings['NAME']])
+    return cmd, None
+
+
+def _pg_dump_command(db_settings):
+    pg_dump_path = shutil.which('pg_dump') or '/usr/bin/pg_dump'
+
+    env = os.environ.copy()
+    if db_settings.get('PASSWORD'):
+        env['PGPASSWORD'] = db_settings['PASSWORD']
+
+    cmd = [
+        pg_dump_path,
+        '-h', db_settings.get('HOST', 'localhost'),
+        '-p', str(db_settings.get('PORT', '5432')),
+        '-U', db_settings.get('USER', 'postgres'),
+        '-F', 'p',
+        db_settings['NAME']
+    ]
+    return cmd, env
+
+
+def stream_database_dump(out, db_settings, chunk_size=CHUNK_SIZE):
+    """Stream a database dump into a writable file object without a temp copy"""
+    db_engine = db_settings['ENGINE']
+
+    if 'sqlite3' in db_engine:
+        with open(db_settings['NAME'], 'rb') as src:
+            while True:
+                chunk = src.read(chunk_size)
+                if not chunk:
+                    break
+                out.write(chunk)
+        return
+
+    if 'mysql' in db_engine:
+        cmd, env = _mysqldump_command(db_settings)
+        tool = 'mysqldump'
+    elif 'postgresql' in db_engine:
+        cmd, env = _pg_dump_command(db_settings)
+        tool = 'pg_dump'
+    else:
+        raise Exception(f'Unsupported database: {db_engine}')
+
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env)
+    # Drain stderr on a side thread so a chatty dump tool can't block on a full pipe
+    stderr_chunks = []
+    stderr_reader = threading.Thread(target=lambda: stderr_chunks.append(process.stderr.read()), daemon=True)
+    stderr_reader.start()
+    try:
+        while True:
+            chunk = process.stdout.read(chunk_size)
+            if not chunk:
+                break
+            out.write(chunk)
+    finally:
+        process.stdout.close()
+        returncode = process.wait()
+        stderr_reader.join()
+
+    if returncode != 0:
+        stderr = b''.join(stderr_chunks).decode('utf-8', errors='replace')
+        raise Exception(f'{tool} failed: {stderr}')
+
+
+def database_archive_name(db_engine):
+    """Archive entry name for the compressed database dump"""
+    if 'sqlite3' in db_engine:
+        return 'database.sqlite3.gz'
+    return 'database.sql.gz'
+
+
+# =============================================================================
+# Full Backup Job
+# =============================================================================
+
+def iter_media_files(media_root):
+    """Yield (absolute_path, archive_name, size) for every file under MEDIA_ROOT"""
+    if not media_root or not os.path.exists(media_root):
+        return
+    for root, dirs, files in os.walk(media_root):
+        dirs.sort()
+        for filename in sorted(files):
+            file_path = os.path.join(root, filename)
+            try:
+                size = os.path.getsize(file_path)
+            except OSError:
+                continue
+            arcname = os.path.join('media', os.path.relpath(file_path, media_root)).replace(os.sep, '/')
+            yield file_path, arcname, size
+
+
+def write_full_archive(zip_path, db_settings, progress, created_by='automated_backup'):
+    """
+    Write a full system backup archive to zip_path.
+
+    The database dump is gzip-compressed in parallel and streamed into a
+    stored zip entry; media files are read directly from MEDIA_ROOT.
+    """
+    db_engine = db_settings['ENGINE']
+    media_root = getattr(django_settings, 'MEDIA_ROOT', None)
+    media_files = list(iter_media_files(media_root))
+    env_file = os.path.join(django_settings.BASE_DIR, '.env')
+
+    progress.total_bytes = estimate_database_size(db_settings) + sum(size for _, _, size in media_files)
+
+    with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED, allowZip64=True) as zipf:
+        # 1. Database, streamed through the parallel compressor
+        progress.step('Dumping database')
+        db_entry = zipfile.ZipInfo(database_archive_name(db_engine), date_time=time.localtime()[:6])
+        db_entry.compress_type = zipfile.ZIP_STORED
+        with zipf.open(db_entry, mode='w', force_zip64=True) as entry:
+            with ParallelGzipWriter(entry, on_write=progress.advance) as gz:
+                stream_database_dump(gz, db_settings)
+
+        # 2. Media files, added in place without staging
+        progress.step(f'Archiving {len(media_files)} media files')
+        for file_path, arcname, size in media_files:
+            ext = os.path.splitext(file_path)[1].lower()
+            compress_type = zipfile.ZIP_STORED if ext in ALREADY_COMPRESSED_EXTENSIONS else zipfile.ZIP_DEFLATED
+            zipf.write(file_path, arcname, compress_type=compress_type)
+            progress.advance(size)
+
+        # 3. Configuration (env file if exists)
+        if os.path.exists(env_file):
+            zipf.write(env_file, 'env_backup')
+
+        # 4. Manifest
+        manifest = {
+            'created_at': timezone.now().strftime('%Y%m%d_%H%M%S'),
+            'created_by': created_by,
+            'backup_type': 'full',
+            'database_engine': db_engine,
+            'database_entry': database_archive_name(db_engine),
+            'compression': 'gzip-parallel',
+            'includes': {
+                'database': True,
+                'media': bool(media_files),
+                'media_file_count': len(media_files),
+                'env_config': os.path.exists(env_file),
+            }
+        }
+        zipf.writestr('manifest.json', json.dumps(manifest, indent=2, default=str))
+
+
+def run_full_backup(backup_id, db_settings=None):
+    """
+    Execute a full backup for an existing SystemBackup record.
+
+    Safe to run on a worker thread or from a management command; the record's
+    status, progress and throughput are kept current throughout.
+    """
+    from .models import SystemBackup, SystemAuditLog
+
+    backup = SystemBackup.objects.get(pk=backup_id)
+    backup.status = 'running'
+    backup.heartbeat_at = timezone.now()
+    backup.save(update_fields=['status', 'heartbeat_at'])
+
+    progress = BackupProgress(backup)
+    created_by = backup.started_by.username if backup.started_by else 'automated_backup'
+
+    try:
+        db_settings = db_settings or django_settings.DATABASES['default']
+        write_full_archive(backup.file_path, db_settings, progress, created_by)
+
+        progress.flush(force=True)
+        backup.status = 'completed'
+        backup.progress_percent = 100
+        backup.current_step = 'Completed'
+        backup.file_size = os.path.getsize(backup.file_path)
+        backup.completed_at = timezone.now()
+        backup.save()
+
+        SystemAuditLog.objects.create(
+            user=backup.started_by,
+            action='create',
+            model_name='SystemBackup',
+            object_repr=f'Full system backup: {backup.name}',
+            success=True
+        )
+    except Exception as e:
+        logger.error(f"Full backup error: {str(e)}")
+        if os.path.exists(backup.file_path):
+            os.remove(backup.file_path)
+        backup.status = 'failed'
+        backup.error_message = str(e)
+        backup.current_step = 'Failed'
+        backup.save()
+        raise
+
+    return backup
+
+
+def run_in_background(job, backup):
+    """Run a backup job (e.g. run_full_backup) for a SystemBackup on a worker thread"""
+    return background.run_in_background(job, backup.id, name=f'{backup.backup_type}-backup-{backup.id}')
+
+
+class BackupInProgress(Exception):
+    """Raised when a backup of the same type is already queued or running"""
+
+
+def fail_stale_backups():
+    """
+    Mark queued or running backups whose heartbeat (or start, if they never
+    beat) is older than BACKUP_STALE_AFTER as failed.
+
+    Returns:
+        int: number of backups marked failed
+    """
+    from .models import SystemBackup
+
+    cutoff = timezone.now() - BACKUP_STALE_AFTER
+    return SystemBackup.objects.filter(status__in=ACTIVE_BACKUP_STATUSES).filter(
+        Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, started_at__lt=cutoff)
+    ).update(
+        status='failed',
+        current_step='Failed',
+        error_message=f'No progress for {int(BACKUP_STALE_AFTER.total_seconds() // 60)} minutes; '
+                      f'the worker running the backup stopped',
+        completed_at=timezone.now(),
+    )
+
+
+@contextmanager
+def backup_job_lock():
+    """
+    Hold the backup job lock row for the duration of a transaction, after
+    failing stale backups so they no longer count as active.
+
+    Starting a backup and pruning shared backup storage both run under this
+    lock, so neither can act on a stale view of which backups are active.
+    """
+    from .models import SystemConfiguration
+
+    SystemConfiguration.objects.get_or_create(key=BACKUP_LOCK_KEY, defaults={
+        'value': 'lock', 'category': 'backup', 'is_editable': False,
+        'description': 'Locked while a backup job is started, so only one of each type runs at a time',
+    })
+    with transaction.atomic():
+        SystemConfiguration.objects.select_for_update().get(key=BACKUP_LOCK_KEY)
+        fail_stale_backups()
+        yield
+
+
+def claim_backup_job(backup_type, create_record):
+    """
+    Create a backup record with create_record(), unless a backup of the same
+    type is already queued or running. The caller runs the job, either with
+    start_backup_job or synchronously (the create_backup command).
+
+    The check and the insert happen while holding the backup job lock, so two
+    concurrent requests cannot both start a backup.
+
+    Raises:
+        BackupInProgress: if another backup of backup_type is active
+    """
+    from .models import SystemBackup
+
+    with backup_job_lock():
+        if SystemBackup.objects.filter(backup_type=backup_type, status__in=ACTIVE_BACKUP_STATUSES).exists():
+            raise BackupInProgress(f'A {backup_type} backup is already in progress')
+        return create_record()
+
+
+def start_backup_job(backup_type, create_record, job):
+    """
+    Claim a backup record with claim_backup_job and run job on it in the
+    background.
+
+    Raises:
+        BackupInProgress: if another backup of backup_type is active
+    """
+    backup = claim_backup_job(backup_type, create_record)
+    run_in_background(job, backup)
+    return backup
+
+
+def create_full_record(user=None, notes='Full system backup: Database + Media + Configuration'):
+    """Create a pending SystemBackup row for a new full backup"""
+    from .models import SystemBackup
+
+    timestamp = timezone.localtime().strftime('%Y%m%d_%H%M%S')
+    backup_name = f'upg_full_backup_{timestamp}.zip'
+    return SystemBackup.objects.create(
+        name=backup_name,
+        backup_type='full',
+        file_path=os.path.join(get_backup_dir(), backup_name),
+        started_by=user,
+        status='pending',
+        current_step='Queued',
+        notes=notes,
+    )
+
+
+def start_full_backup(user=None, notes='Full system backup: Database + Media + Configuration'):
+    """
+    Create a pending full backup record and run it on a background thread.
+
+    Raises:
+        BackupInProgress: if a full backup is already queued or running
+    """
+    return start_backup_job('full', lambda: create_full_record(user, notes), run_full_backup)
@@ -0,0 +1,542 @@
+"""
+Incremental Backups for UPG System
+
+Snapshots are content-addressed: every database table and media file is stored
+once in a shared chunk store under backups/chunks, keyed by its SHA-256, and
+each snapshot is a small JSON manifest that references those objects. Nightly
+runs therefore only write what changed since the previous snapshot, yet any
+snapshot can be restored (or verified) on its own without replaying a chain.
+
+Tables are serialized in Django's portable JSON-lines format, which lets
+verify_snapshot() load a snapshot into a scratch SQLite database and check
+row counts regardless of the production database engine. Every table is
+hashed on each run and only compressed and written when its content is new.
+"""
+
+from django.apps import apps
+from django.conf import settings as django_settings
+from django.core import serializers
+from django.db import connections, router, transaction, DEFAULT_DB_ALIAS
+from django.utils import timezone
+from contextlib import contextmanager
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import logging
+
+from .backup_service import (
+    ParallelGzipWriter, BackupProgress, get_backup_dir, iter_media_files, format_file_size,
+    ACTIVE_BACKUP_STATUSES, backup_job_lock, start_backup_job,
+)
+
+logger = logging.getLogger(__name__)
+
+CHUNK_STORE_DIRNAME = 'chunks'
+SNAPSHOT_DIRNAME = 'snapshots'
+TABLE_OBJECT_SUFFIX = '.jsonl.gz'
+HASH_BLOCK_SIZE = 1024 * 1024
+SERIALIZE_CHUNK_SIZE = 2000
+VERIFY_DB_ALIAS = 'backup_verify'
+MANIFEST_VERSION = 1
+
+
+# =============================================================================
+# Content-Addressed Chunk Store
+# =============================================================================
+
+class _HashingWriter:
+    """Pass-through writer that hashes and counts lines of everything written (target None: hash only)"""
+
+    def __init__(self, target=None):
+        self.target = target
+        self.sha = hashlib.sha256()
+        self.lines = 0
+
+    def write(self, data):
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        self.sha.update(data)
+        self.lines += data.count(b'\n')
+        if self.target is None:
+            return len(data)
+        return self.target.write(data)
+
+    def flush(self):
+        pass
+
+
+class ChunkStore:
+    """
+    Directory of immutable objects named by the SHA-256 of their content.
+
+    Objects are written to a temp file in the store and renamed into place,
+    so a crashed backup never leaves a half-written object behind a valid name.
+    """
+
+    def __init__(self, root=None):
+        self.root = root or os.path.join(get_backup_dir(), CHUNK_STORE_DIRNAME)
+        os.makedirs(self.root, exist_ok=True)
+
+    def path_for(self, digest, suffix=''):
+        return os.path.join(self.root, digest[:2], f'{digest}{suffix}')
+
+    def has(self, digest, suffix=''):
+        return os.path.exists(self.path_for(digest, suffix))
+
+    def _commit(self, temp_path, digest, suffix):
+        """Move a finished temp file into place; returns bytes newly stored"""
+        final_path = self.path_for(digest, suffix)
+        if os.path.exists(final_path):
+            os.remove(temp_path)
+            return 0
+        os.makedirs(os.path.dirname(final_path), exist_ok=True)
+        os.replace(temp_path, final_path)
+        return os.path.getsize(final_path)
+
+    def put_file(self, src_path, digest=None):
+        """
+        Store a file by content. Returns (digest, bytes_stored); bytes_stored
+        is 0 when identical content was already present.
+        """
+        if digest is None:
+            digest = hash_file(src_path)
+        if self.has(digest):
+            return digest, 0
+        fd, temp_path = tempfile.mkstemp(dir=self.root, prefix='.incoming_')
+        with os.fdopen(fd, 'wb') as dest, open(src_path, 'rb') as src:
+            shutil.copyfileobj(src, dest, HASH_BLOCK_SIZE)
+        return digest, self._commit(temp_path, digest, '')
+
+    def put_table(self, queryset, fields):
+        """
+        Serialize a queryset as gzip'd JSON lines. The digest covers the
+        uncompressed serialization so identical table contents dedupe.
+        Returns (digest, rows, bytes_stored).
+        """
+        fd, temp_path = tempfile.mkstemp(dir=self.root, prefix='.incoming_')
+        try:
+            with os.fdopen(fd, 'wb') as dest:
+                with ParallelGzipWriter(dest) as gz:
+                    hashing = _HashingWriter(gz)
+                    serializers.serialize(
+                        'jsonl', queryset.iterator(chunk_size=SERIALIZE_CHUNK_SIZE),
+                        fields=fields, stream=hashing,
+                    )
+        except Exception:
+            os.remove(temp_path)
+            raise
+        digest = hashing.sha.hexdigest()
+        return digest, hashing.lines, self._commit(temp_path, digest, TABLE_OBJECT_SUFFIX)
+
+    def iter_objects(self):
+        """Yield (digest, path) for every stored object"""
+        for prefix in os.listdir(self.root):
+            prefix_dir = os.path.join(self.root, prefix)
+            if not os.path.isdir(prefix_dir):
+                continue
+            for filename in os.listdir(prefix_dir):
+                yield filename.split('.', 1)[0], os.path.join(prefix_dir, filename)
+
+    def prune(self, referenced):
+        """Delete objects not referenced by any snapshot. Returns (count, bytes)"""
+        removed_count = 0
+        removed_size = 0
+        for digest, path in list(self.iter_objects()):
+            if digest not in referenced:
+                removed_size += os.path.getsize(path)
+                os.remove(path)
+                removed_count += 1
+        return removed_count, removed_size
+
+
+def hash_file(path):
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+# =============================================================================
+# Table Change Detection
+# =============================================================================
+
+def snapshot_models(using=DEFAULT_DB_ALIAS):
+    """Concrete models (including auto-created M2M tables) that exist in the database"""
+    existing_tables = set(connections[using].introspection.table_names())
+    result = []
+    for model in apps.get_models(include_auto_created=True):
+        opts = model._meta
+        if opts.proxy or not opts.managed or opts.db_table not in existing_tables:
+            continue
+        if not router.allow_migrate_model(using, model):
+            continue
+        result.append(model)
+    return result
+
+
+def serialized_fields(model, using=DEFAULT_DB_ALIAS):
+    """
+    Local concrete fields whose columns exist in the database. M2M tables are
+    snapshotted separately, and fields whose migration has not been applied
+    yet are skipped rather than failing the whole snapshot.
+    """
+    db = connections[using]
+    with db.cursor() as cursor:
+        columns = {col.name for col in db.introspection.get_table_description(cursor, model._meta.db_table)}
+    return [
+        field.name for field in model._meta.local_fields
+        if not field.primary_key and field.column in columns
+    ]
+
+
+def table_digest(queryset, fields):
+    """
+    SHA-256 and row count of a table's serialization, without storing it.
+
+    The digest is the one ChunkStore.put_table() would give the same rows, so
+    a table whose digest is already in the store is unchanged. Hashing the
+    content (rather than comparing counts or modification times) also catches
+    QuerySet.update() and bulk_update() changes, which bypass auto_now.
+
+    Returns:
+        tuple: (digest, rows)
+    """
+    hashing = _HashingWriter()
+    serializers.serialize(
+        'jsonl', queryset.iterator(chunk_size=SERIALIZE_CHUNK_SIZE), fields=fields, stream=hashing,
+    )
+    return hashing.sha.hexdigest(), hashing.lines
+
+
+# =============================================================================
+# Snapshot Creation
+# =============================================================================
+
+def get_snapshot_dir():
+    snapshot_dir = os.path.join(get_backup_dir(), SNAPSHOT_DIRNAME)
+    os.makedirs(snapshot_dir, exist_ok=True)
+    return snapshot_dir
+
+
+def load_manifest(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def latest_snapshot_manifest():
+    """Manifest of the most recent completed incremental snapshot, or None"""
+    from .models import SystemBackup
+
+    previous = SystemBackup.objects.filter(
+        backup_type='incremental', status='completed'
+    ).order_by('-started_at').first()
+    if previous and previous.file_path and os.path.exists(previous.file_path):
+        return previous.name, load_manifest(previous.file_path)
+    return None, None
+
+
+def build_snapshot(store, progress, previous=None, using=DEFAULT_DB_ALIAS, rescan=False):
+    """
+    Snapshot all tables and media into the store. Every table is hashed and
+    only compressed and written when its content is not in the store yet;
+    media files are reused from the previous manifest when size and mtime
+    match. rescan rewrites every table object and re-reads every media file
+    (content hashing still dedupes).
+    Returns (manifest, stats).
+    """
+    previous = previous or {}
+    previous_tables = previous.get('tables', {})
+    previous_media = previous.get('media', {})
+    stats = {
+        'tables_total': 0, 'tables_changed': 0,
+        'media_total': 0, 'media_new': 0,
+        'bytes_stored': 0,
+    }
+
+    models = snapshot_models(using)
+    media_root = getattr(django_settings, 'MEDIA_ROOT', None)
+    media_files = list(iter_media_files(media_root))
+    progress.total_bytes = len(models) + sum(size for _, _, size in media_files)
+
+    # 1. Database tables
+    progress.step(f'Checking {len(models)} tables for changes')
+    tables = {}
+    for model in models:
+        label = model._meta.label
+        prior = previous_tables.get(label)
+        fields = serialized_fields(model, using)
+        queryset = model._base_manager.using(using).only(*fields).order_by('pk')
+        digest, rows = table_digest(queryset, fields)
+        if rescan or not store.has(digest, TABLE_OBJECT_SUFFIX):
+            # Rows may change between the two reads; the stored object's digest wins
+            digest, rows, stored = store.put_table(queryset, fields)
+            stats['bytes_stored'] += stored
+        tables[label] = {
+            'table': model._meta.db_table,
+            'object': digest,
+            'rows': rows,
+        }
+        if prior is None or prior.get('object') != digest:
+            stats['tables_changed'] += 1
+        stats['tables_total'] += 1
+        progress.advance(1)
+
+    # 2. Media files: unchanged size + mtime means unchanged content
+    progress.step(f'Checking {len(media_files)} media files for changes')
+    media = {}
+    for file_path, arcname, size in media_files:
+        mtime = int(os.path.getmtime(file_path))
+        prior = previous_media.get(arcname)
+        unchanged = prior and prior['size'] == size and prior['mtime'] == mtime
+        if unchanged and not rescan and store.has(prior['sha256']):
+            media[arcname] = prior
+        else:
+            digest, stored = store.put_file(file_path)
+            media[arcname] = {'sha256': digest, 'size': size, 'mtime': mtime}
+            stats['bytes_stored'] += stored
+            if stored:
+                stats['media_new'] += 1
+        stats['media_total'] += 1
+        progress.advance(size)
+
+    manifest = {
+        'version': MANIFEST_VERSION,
+        'created_at': timezone.now().isoformat(),
+        'database_engine': connections[using].settings_dict['ENGINE'],
+        'parent': previous.get('name'),
+        'tables': tables,
+        'media': media,
+        'stats': stats,
+    }
+    return manifest, stats
+
+
+def run_incremental_backup(backup_id, rescan=False):
+    """Execute an incremental snapshot for an existing SystemBackup record"""
+    from .models import SystemBackup, SystemAuditLog
+
+    backup = SystemBackup.objects.get(pk=backup_id)
+    backup.status = 'running'
+    backup.heartbeat_at = timezone.now()
+    backup.save(update_fields=['status', 'heartbeat_at'])
+    progress = BackupProgress(backup)
+
+    try:
+        parent_name, previous = latest_snapshot_manifest()
+        if previous is not None:
+            previous['name'] = parent_name
+
+        manifest, stats = build_snapshot(ChunkStore(), progress, previous, rescan=rescan)
+        manifest['name'] = backup.name
+        with open(backup.file_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+
+        progress.flush(force=True)
+        backup.status = 'completed'
+        backup.progress_percent = 100
+        backup.current_step = 'Completed'
+        backup.file_size = stats['bytes_stored']
+        backup.completed_at = timezone.now()
+        backup.notes = (
+            f"Incremental snapshot{' of ' + parent_name if parent_name else ''}: "
+            f"{stats['tables_changed']}/{stats['tables_total']} tables changed, "
+            f"{stats['media_new']}/{stats['media_total']} new media files, "
+            f"{format_file_size(stats['bytes_stored'])} stored"
+        )
+        backup.save()
+
+        SystemAuditLog.objects.create(
+            user=backup.started_by,
+            action='create',
+            model_name='SystemBackup',
+            object_repr=f'Incremental backup: {backup.name}',
+            success=True
+        )
+    except Exception as e:
+        logger.error(f"Incremental backup error: {str(e)}")
+        if os.path.exists(backup.file_path):
+            os.remove(backup.file_path)
+        backup.status = 'failed'
+        backup.error_message = str(e)
+        backup.current_step = 'Failed'
+        backup.save()
+        raise
+
+    return backup
+
+
+def create_incremental_record(user=None, notes='Incremental snapshot'):
+    """Create a pending SystemBackup row for a new incremental snapshot"""
+    from .models import SystemBackup
+
+    timestamp = timezone.localtime().strftime('%Y%m%d_%H%M%S')
+    backup_name = f'upg_incremental_{timestamp}.json'
+    return SystemBackup.objects.create(
+        name=backup_name,
+        backup_type='incremental',
+        file_path=os.path.join(get_snapshot_dir(), backup_name),
+        started_by=user,
+        status='pending',
+        current_step='Queued',
+        notes=notes,
+    )
+
+
+def start_incremental_backup(user=None):
+    """
+    Create a pending incremental snapshot record and run it on a background thread.
+
+    Raises:
+        BackupInProgress: if an incremental backup is already queued or running
+    """
+    return start_backup_job('incremental', lambda: create_incremental_record(user), run_incremental_backup)
+
+
+def prune_chunk_store():
+    """
+    Remove chunk store objects no longer referenced by a snapshot.
+
+    A snapshot being written has stored objects before its manifest exists,
+    so nothing is pruned while any backup is queued or running. The check and
+    the prune hold the backup job lock, so no backup can start in between.
+
+    Returns:
+        tuple: (objects removed, bytes freed); (0, 0) if pruning was skipped
+    """
+    from .models import SystemBackup
+
+    with backup_job_lock():
+        if SystemBackup.objects.filter(status__in=ACTIVE_BACKUP_STATUSES).exists():
+            logger.info('Skipping chunk store prune: a backup is in progress')
+            return 0, 0
+        referenced = set()
+        for path in SystemBackup.objects.filter(backup_type='incremental').values_list('file_path', flat=True):
+            if path and os.path.exists(path):
+                manifest = load_manifest(path)
+                referenced.update(entry['object'] for entry in manifest.get('tables', {}).values())
+                referenced.update(entry['sha256'] for entry in manifest.get('media', {}).values())
+        return ChunkStore().prune(referenced)
+
+
+# =============================================================================
+# Restore Verification
+# =============================================================================
+
+@contextmanager
+def scratch_sqlite_database(path, alias=VERIFY_DB_ALIAS):
+    """
+    Temporarily attach an empty SQLite database under a connection alias.
+
+    The connection is bound on the current thread only and never added to
+    settings.DATABASES, so routers and other threads are unaffected.
+    """
+    from django.db.backends.sqlite3.base import DatabaseWrapper
+
+    scratch = DatabaseWrapper({
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': path,
+        'ATOMIC_REQUESTS': False,
+        'AUTOCOMMIT': True,
+        'CONN_MAX_AGE': 0,
+        'CONN_HEALTH_CHECKS': False,
+        'OPTIONS': {},
+        'TIME_ZONE': None,
+        'USER': '',
+        'PASSWORD': '',
+        'HOST': '',
+        'PORT': '',
+        'TEST': {},
+    }, alias=alias)
+    connections[alias] = scratch
+    try:
+        yield scratch
+    finally:
+        scratch.close()
+        del connections[alias]
+
+
+def verify_snapshot(manifest, store=None, deep=False):
+    """
+    Restore a snapshot into a scratch SQLite database and compare row counts.
+
+    Returns a report dict with 'ok', per-table results, missing objects and
+    any referential integrity problems found after loading.
+    """
+    store = store or ChunkStore()
+    report = {'ok': True, 'tables': [], 'missing_objects': [], 'corrupt_objects': [], 'integrity_errors': []}
+
+    # 1. Every referenced object must exist (and, with deep, still hash correctly)
+    for label, entry in manifest.get('tables', {}).items():
+        if not store.has(entry['object'], TABLE_OBJECT_SUFFIX):
+            report['missing_objects'].append(label)
+    for arcname, entry in manifest.get('media', {}).items():
+        if not store.has(entry['sha256']):
+            report['missing_objects'].append(arcname)
+        elif deep and hash_file(store.path_for(entry['sha256'])) != entry['sha256']:
+            report['corrupt_objects'].append(arcname)
+
+    # 2. Load tables into scratch SQLite and count rows
+    scratch_dir = tempfile.mkdtemp(prefix='upg_verify_')
+    try:
+        with scratch_sqlite_database(os.path.join(scratch_dir, 'verify.sqlite3')) as scratch:
+            models = []
+            for label in manifest.get('tables', {}):
+                try:
+                    models.append(apps.get_model(label))
+                except LookupError:
+                    report['tables'].append({'model': label, 'expected': manifest['tables'][label]['rows'],
+                                             'restored': None, 'ok': False, 'error': 'Model no longer exists'})
+
+            # create_model() also creates auto-created M2M tables
+            with scratch.schema_editor() as editor:
+                for model in models:
+                    if not model._meta.auto_created:
+                        editor.create_model(model)
+
+            with scratch.constraint_checks_disabled():
+                for model in models:
+                    entry = manifest['tables'][model._meta.label]
+                    result = {'model': model._meta.label, 'expected': entry['rows'], 'restored': None, 'ok': False}
+                    report['tables'].append(result)
+                    if model._meta.label in report['missing_objects']:
+                        result['error'] = 'Object missing from chunk store'
+                        continue
+                    try:
+                        _load_table(scratch.alias, model, store.path_for(entry['object'], TABLE_OBJECT_SUFFIX))
+                        result['restored'] = model._base_manager.using(scratch.alias).count()
+                        result['ok'] = result['restored'] == entry['rows']
+                    except Exception as e:
+                        result['error'] = str(e)
+
+            try:
+                scratch.check_constraints()
+            except Exception as e:
+                report['integrity_errors'].append(str(e))
+    finally:
+        shutil.rmtree(scratch_dir, ignore_errors=True)
+
+    report['ok'] = (
+        not report['missing_objects']
+        and not report['corrupt_objects']
+        and not report['integrity_errors']
+        and all(table['ok'] for table in report['tables'])
+    )
+    return report
+
+
+def _load_table(alias, model, object_path, batch_size=SERIALIZE_CHUNK_SIZE):
+    """Bulk-insert a serialized table into the given database"""
+    batch = []
+    with transaction.atomic(using=alias):
+        with gzip.open(object_path, 'rt', encoding='utf-8') as stream:
+            for deserialized in serializers.deserialize('jsonl', stream, using=alias, ignorenonexistent=True):
+                batch.append(deserialized.object)
+                if len(batch) >= batch_size:
+                    model._base_manager.using(alias).bulk_create(batch)
+                    batch = []
+        if batch:
+            model._base_manager.using(alias).bulk_create(batch)
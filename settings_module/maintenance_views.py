@@ -4,6 +4,7 @@ Supports system-wide backups including database, media files, and configurations
 """
 
 from django.shortcuts import render, redirect
+from django.urls import reverse
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.http import JsonResponse, HttpResponse, FileResponse
@@ -11,10 +12,15 @@ from django.views.decorators.http import require_POST
 from django.utils import timezone
 from django.conf import settings as django_settings
 from .models import SystemBackup, SystemAuditLog, SystemConfiguration
+from .backup_service import (
+    find_mysqldump, find_mysql, get_backup_dir, format_file_size, start_full_backup, BackupInProgress,
+)
+from .incremental_backup import start_incremental_backup, prune_chunk_store
 import subprocess
 import os
 import shutil
 import zipfile
+import gzip
 import json
 from datetime import timedelta, datetime
 import logging
@@ -22,69 +28,6 @@ import logging
 logger = logging.getLogger(__name__)
 
 
-def find_mysqldump():
-    """Find mysqldump executable across different platforms"""
-    mysqldump_in_path = shutil.which('mysqldump')
-    if mysqldump_in_path:
-        return mysqldump_in_path
-
-    possible_paths = [
-        '/usr/bin/mysqldump',
-        '/usr/local/bin/mysqldump',
-        '/usr/local/mysql/bin/mysqldump',
-        'C:\\xampp\\mysql\\bin\\mysqldump.exe',
-        'C:\\Program Files\\MySQL\\MySQL Server 8.0\\bin\\mysqldump.exe',
-        'C:\\Program Files\\MySQL\\MySQL Server 5.7\\bin\\mysqldump.exe',
-        '/usr/bin/mariadb-dump',
-    ]
-
-    for path in possible_paths:
-        if os.path.exists(path):
-            return path
-    return None
-
-
-def find_mysql():
-    """Find mysql client executable for restore operations"""
-    mysql_in_path = shutil.which('mysql')
-    if mysql_in_path:
-        return mysql_in_path
-
-    possible_paths = [
-        '/usr/bin/mysql',
-        '/usr/local/bin/mysql',
-        '/usr/local/mysql/bin/mysql',
-        'C:\\xampp\\mysql\\bin\\mysql.exe',
-        'C:\\Program Files\\MySQL\\MySQL Server 8.0\\bin\\mysql.exe',
-        'C:\\Program Files\\MySQL\\MySQL Server 5.7\\bin\\mysql.exe',
-        '/usr/bin/mariadb',
-    ]
-
-    for path in possible_paths:
-        if os.path.exists(path):
-            return path
-    return None
-
-
-def get_backup_dir():
-    """Get or create the backup directory"""
-    backup_dir = os.path.join(django_settings.BASE_DIR, 'backups')
-    os.makedirs(backup_dir, exist_ok=True)
-    return backup_dir
-
-
-def format_file_size(size_bytes):
-    """Format file size in human-readable format"""
-    if size_bytes < 1024:
-        return f"{size_bytes} B"
-    elif size_bytes < 1024 * 1024:
-        return f"{size_bytes / 1024:.2f} KB"
-    elif size_bytes < 1024 * 1024 * 1024:
-        return f"{size_bytes / (1024 * 1024):.2f} MB"
-    else:
-        return f"{size_bytes / (1024 * 1024 * 1024):.2f} GB"
-
-
 # =============================================================================
 # Backup Management Dashboard
 # =============================================================================
@@ -180,111 +123,83 @@ def create_backup(request):
 @login_required
 @require_POST
 def create_full_backup(request):
-    """Create a full system backup including database, media, and static files"""
+    """
+    Start a full system backup (database, media and configuration) as a
+    background job. The dashboard polls backup_status for progress.
+    """
     if not (request.user.is_superuser or request.user.role == 'ict_admin'):
         return JsonResponse({'success': False, 'error': 'Permission denied'}, status=403)
 
     try:
-        backup_dir = get_backup_dir()
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        backup_name = f'upg_full_backup_{timestamp}'
-        temp_dir = os.path.join(backup_dir, f'temp_{timestamp}')
-        os.makedirs(temp_dir, exist_ok=True)
-
-        backup_record = SystemBackup.objects.create(
-            name=f'{backup_name}.zip',
-            backup_type='full',
-            file_path=os.path.join(backup_dir, f'{backup_name}.zip'),
-            started_by=request.user,
-            status='running',
-            notes='Full system backup: Database + Media + Configuration'
-        )
+        backup_record = start_full_backup(request.user)
 
-        try:
-            # 1. Backup Database
-            db_settings = django_settings.DATABASES['default']
-            db_engine = db_settings['ENGINE']
-            db_backup_file = os.path.join(temp_dir, 'database.sql')
-
-            if 'sqlite3' in db_engine:
-                shutil.copy2(db_settings['NAME'], os.path.join(temp_dir, 'database.sqlite3'))
-            elif 'mysql' in db_engine:
-                _dump_mysql_to_file(db_backup_file, db_settings)
-            elif 'postgresql' in db_engine:
-                _dump_postgresql_to_file(db_backup_file, db_settings)
-
-            # 2. Backup Media Files
-            media_root = getattr(django_settings, 'MEDIA_ROOT', None)
-            if media_root and os.path.exists(media_root):
-                media_backup_dir = os.path.join(temp_dir, 'media')
-                shutil.copytree(media_root, media_backup_dir, dirs_exist_ok=True)
-
-            # 3. Backup Configuration (env file if exists)
-            env_file = os.path.join(django_settings.BASE_DIR, '.env')
-            if os.path.exists(env_file):
-                shutil.copy2(env_file, os.path.join(temp_dir, 'env_backup'))
-
-            # 4. Create backup manifest
-            manifest = {
-                'created_at': timestamp,
-                'created_by': request.user.username,
-                'backup_type': 'full',
-                'database_engine': db_engine,
-                'django_version': django_settings.INSTALLED_APPS,
-                'includes': {
-                    'database': True,
-                    'media': media_root is not None and os.path.exists(media_root),
-                    'env_config': os.path.exists(env_file),
-                }
-            }
-            with open(os.path.join(temp_dir, 'manifest.json'), 'w') as f:
-                json.dump(manifest, f, indent=2, default=str)
-
-            # 5. Create ZIP archive
-            zip_path = os.path.join(backup_dir, f'{backup_name}.zip')
-            with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                for root, dirs, files in os.walk(temp_dir):
-                    for file in files:
-                        file_path = os.path.join(root, file)
-                        arcname = os.path.relpath(file_path, temp_dir)
-                        zipf.write(file_path, arcname)
-
-            # Clean up temp directory
-            shutil.rmtree(temp_dir, ignore_errors=True)
-
-            # Update backup record
-            backup_record.status = 'completed'
-            backup_record.file_size = os.path.getsize(zip_path)
-            backup_record.completed_at = timezone.now()
-            backup_record.save()
-
-            SystemAuditLog.objects.create(
-                user=request.user,
-                action='create',
-                model_name='SystemBackup',
-                object_repr=f'Full system backup: {backup_name}.zip',
-                success=True
-            )
-
-            return JsonResponse({
-                'success': True,
-                'message': f'Full backup created: {backup_name}.zip',
-                'backup_size': format_file_size(backup_record.file_size),
-                'backup_id': backup_record.id
-            })
-
-        except Exception as e:
-            shutil.rmtree(temp_dir, ignore_errors=True)
-            backup_record.status = 'failed'
-            backup_record.error_message = str(e)
-            backup_record.save()
-            raise
+        return JsonResponse({
+            'success': True,
+            'message': f'Full backup started: {backup_record.name}',
+            'backup_id': backup_record.id,
+            'status_url': reverse('settings:backup_status', args=[backup_record.id]),
+        })
 
+    except BackupInProgress:
+        return JsonResponse({'success': False, 'error': 'A full backup is already in progress'}, status=409)
     except Exception as e:
         logger.error(f"Full backup error: {str(e)}")
         return JsonResponse({'success': False, 'error': str(e)}, status=500)
 
 
+@login_required
+@require_POST
+def create_incremental_backup(request):
+    """
+    Start an incremental snapshot as a background job. Only tables and media
+    files that changed since the previous snapshot are written.
+    """
+    if not (request.user.is_superuser or request.user.role == 'ict_admin'):
+        return JsonResponse({'success': False, 'error': 'Permission denied'}, status=403)
+
+    try:
+        backup_record = start_incremental_backup(request.user)
+
+        return JsonResponse({
+            'success': True,
+            'message': f'Incremental backup started: {backup_record.name}',
+            'backup_id': backup_record.id,
+            'status_url': reverse('settings:backup_status', args=[backup_record.id]),
+        })
+
+    except BackupInProgress:
+        return JsonResponse({'success': False, 'error': 'An incremental backup is already in progress'}, status=409)
+    except Exception as e:
+        logger.error(f"Incremental backup error: {str(e)}")
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+
+@login_required
+def backup_status(request, backup_id):
+    """Progress of a backup, polled by the dashboard while a background backup runs"""
+    if not (request.user.is_superuser or request.user.role == 'ict_admin'):
+        return JsonResponse({'success': False, 'error': 'Permission denied'}, status=403)
+
+    try:
+        backup = SystemBackup.objects.get(id=backup_id)
+    except SystemBackup.DoesNotExist:
+        return JsonResponse({'success': False, 'error': 'Backup not found'}, status=404)
+
+    return JsonResponse({
+        'success': True,
+        'backup_id': backup.id,
+        'name': backup.name,
+        'status': backup.status,
+        'current_step': backup.current_step,
+        'progress_percent': backup.progress_percent,
+        'bytes_processed': backup.bytes_processed,
+        'bytes_total': backup.bytes_total,
+        'throughput': format_file_size(int(backup.throughput_bytes_per_sec or 0)) + '/s',
+        'backup_size': format_file_size(backup.file_size) if backup.file_size else None,
+        'error': backup.error_message,
+    })
+
+
 def _backup_sqlite(user, backup_dir, timestamp):
     """Backup SQLite database"""
     db_name = django_settings.DATABASES['default']['NAME']
@@ -439,6 +354,13 @@ def restore_backup(request, backup_id):
         if not os.path.exists(backup.file_path):
             return JsonResponse({'success': False, 'error': 'Backup file not found'}, status=404)
 
+        if backup.backup_type == 'incremental':
+            return JsonResponse({
+                'success': False,
+                'error': 'Incremental snapshots cannot be restored from the dashboard. '
+                         'Check them with: python manage.py verify_backup'
+            }, status=400)
+
         db_settings = django_settings.DATABASES['default']
         db_engine = db_settings['ENGINE']
 
@@ -481,6 +403,14 @@ def _restore_full_backup(user, backup, db_settings, db_engine):
         else:
             manifest = {}
 
+        # Streamed backups store the dump gzip-compressed; expand it alongside
+        for compressed_name in ('database.sqlite3.gz', 'database.sql.gz'):
+            compressed_path = os.path.join(temp_dir, compressed_name)
+            if os.path.exists(compressed_path):
+                with gzip.open(compressed_path, 'rb') as src, open(compressed_path[:-3], 'wb') as dest:
+                    shutil.copyfileobj(src, dest, 1024 * 1024)
+                os.remove(compressed_path)
+
         # Restore database
         if 'sqlite3' in db_engine:
             sqlite_backup = os.path.join(temp_dir, 'database.sqlite3')
@@ -785,6 +715,10 @@ def cleanup_old_backups(request):
             backup.delete()
             deleted_count += 1
 
+        # Snapshot objects are shared; only drop those no remaining snapshot references
+        pruned_count, pruned_size = prune_chunk_store()
+        deleted_size += pruned_size
+
         SystemAuditLog.objects.create(
             user=request.user, action='delete', model_name='SystemBackup',
             object_repr=f'Cleaned up {deleted_count} old backups ({format_file_size(deleted_size)})',
@@ -5,12 +5,16 @@ Can be scheduled via cron or Windows Task Scheduler.
 Usage:
     python manage.py create_backup                    # Database backup (keeps all backups)
     python manage.py create_backup --full             # Full system backup (keeps all backups)
+    python manage.py create_backup --incremental      # Incremental snapshot (only changed tables/media stored)
     python manage.py create_backup --cleanup          # Also cleanup old backups (uses retention settings)
     python manage.py create_backup --cleanup-days=60  # Cleanup backups older than 60 days
 
 IMPORTANT: By default, backups are PRESERVED to maintain multiple restore points.
 Cleanup only runs when explicitly requested with --cleanup flag.
 
+Incremental snapshots share a content-addressed chunk store (backups/chunks);
+verify them with: python manage.py verify_backup --latest
+
 Cron examples (daily backups, monthly cleanup):
     Daily at 2 AM (keeps all backups):
         0 2 * * * cd /var/www/upg_system && /var/www/upg_system/venv/bin/python manage.py create_backup --full
@@ -19,15 +23,13 @@ Cron examples (daily backups, monthly cleanup):
         0 3 1 * * cd /var/www/upg_system && /var/www/upg_system/venv/bin/python manage.py create_backup --cleanup-days=90
 """
 
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from django.conf import settings
 from django.utils import timezone
 from datetime import datetime, timedelta
 import os
 import shutil
 import subprocess
-import zipfile
-import json
 import logging
 
 logger = logging.getLogger(__name__)
@@ -42,6 +44,16 @@ class Command(BaseCommand):
             action='store_true',
             help='Create full system backup including media files',
         )
+        parser.add_argument(
+            '--incremental',
+            action='store_true',
+            help='Create an incremental snapshot storing only changed tables and new media files',
+        )
+        parser.add_argument(
+            '--rescan',
+            action='store_true',
+            help='With --incremental, rewrite every table object and re-read every media file',
+        )
         parser.add_argument(
             '--cleanup',
             action='store_true',
@@ -75,8 +87,10 @@ class Command(BaseCommand):
             if not options.get('cleanup_only'):
                 self.stdout.write('Starting backup process...')
 
-                if options['full']:
-                    self.create_full_backup(backup_dir, timestamp)
+                if options['incremental']:
+                    self.create_incremental_backup(rescan=options['rescan'])
+                elif options['full']:
+                    self.create_full_backup()
                 else:
                     self.create_db_backup(backup_dir, timestamp)
 
@@ -133,75 +147,42 @@ class Command(BaseCommand):
 
         self.stdout.write(f'Database backup created: {backup_filename} ({self._format_size(backup_record.file_size)})')
 
-    def create_full_backup(self, backup_dir, timestamp):
-        """Create full system backup"""
-        from settings_module.models import SystemBackup
-
-        backup_name = f'upg_full_backup_{timestamp}'
-        temp_dir = os.path.join(backup_dir, f'temp_{timestamp}')
-        os.makedirs(temp_dir, exist_ok=True)
+    def create_full_backup(self):
+        """Create full system backup (database streamed + media, compressed in parallel)"""
+        from settings_module.backup_service import (
+            BackupInProgress, claim_backup_job, create_full_record, run_full_backup,
+        )
 
         try:
-            # 1. Backup Database
-            db_settings = settings.DATABASES['default']
-            db_engine = db_settings['ENGINE']
-
-            if 'sqlite3' in db_engine:
-                shutil.copy2(db_settings['NAME'], os.path.join(temp_dir, 'database.sqlite3'))
-            elif 'mysql' in db_engine:
-                self._dump_mysql(os.path.join(temp_dir, 'database.sql'), db_settings)
-            elif 'postgresql' in db_engine:
-                self._dump_postgresql(os.path.join(temp_dir, 'database.sql'), db_settings)
-
-            # 2. Backup Media Files
-            media_root = getattr(settings, 'MEDIA_ROOT', None)
-            if media_root and os.path.exists(media_root):
-                shutil.copytree(media_root, os.path.join(temp_dir, 'media'), dirs_exist_ok=True)
-                self.stdout.write('Media files backed up')
-
-            # 3. Backup Configuration
-            env_file = os.path.join(settings.BASE_DIR, '.env')
-            if os.path.exists(env_file):
-                shutil.copy2(env_file, os.path.join(temp_dir, 'env_backup'))
-
-            # 4. Create manifest
-            manifest = {
-                'created_at': timestamp,
-                'created_by': 'automated_backup',
-                'backup_type': 'full',
-                'database_engine': db_engine,
-            }
-            with open(os.path.join(temp_dir, 'manifest.json'), 'w') as f:
-                json.dump(manifest, f, indent=2)
-
-            # 5. Create ZIP
-            zip_path = os.path.join(backup_dir, f'{backup_name}.zip')
-            with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                for root, dirs, files in os.walk(temp_dir):
-                    for file in files:
-                        file_path = os.path.join(root, file)
-                        arcname = os.path.relpath(file_path, temp_dir)
-                        zipf.write(file_path, arcname)
-
-            # Cleanup temp
-            shutil.rmtree(temp_dir, ignore_errors=True)
-
-            # Create backup record
-            backup_record = SystemBackup.objects.create(
-                name=f'{backup_name}.zip',
-                backup_type='full',
-                file_path=zip_path,
-                status='completed',
-                file_size=os.path.getsize(zip_path),
-                completed_at=timezone.now(),
+            backup_record = claim_backup_job('full', lambda: create_full_record(
                 notes='Automated full backup via management command'
-            )
+            ))
+        except BackupInProgress as e:
+            raise CommandError(str(e))
 
-            self.stdout.write(f'Full backup created: {backup_name}.zip ({self._format_size(backup_record.file_size)})')
+        backup_record = run_full_backup(backup_record.id)
 
-        except Exception as e:
-            shutil.rmtree(temp_dir, ignore_errors=True)
-            raise
+        duration = backup_record.duration.total_seconds() if backup_record.duration else 0
+        self.stdout.write(
+            f'Full backup created: {backup_record.name} ({self._format_size(backup_record.file_size)}, '
+            f'{self._format_size(int(backup_record.throughput_bytes_per_sec or 0))}/s, {duration:.1f}s)'
+        )
+
+    def create_incremental_backup(self, rescan=False):
+        """Create incremental snapshot against the most recent one"""
+        from settings_module.backup_service import BackupInProgress, claim_backup_job
+        from settings_module.incremental_backup import create_incremental_record, run_incremental_backup
+
+        try:
+            backup_record = claim_backup_job('incremental', lambda: create_incremental_record(
+                notes='Automated incremental snapshot via management command'
+            ))
+        except BackupInProgress as e:
+            raise CommandError(str(e))
+        backup_record = run_incremental_backup(backup_record.id, rescan=rescan)
+
+        self.stdout.write(f'Incremental backup created: {backup_record.name}')
+        self.stdout.write(f'  {backup_record.notes}')
 
     def cleanup_old_backups(self, override_days=None):
         """Cleanup backups older than retention period
@@ -253,6 +234,12 @@ class Command(BaseCommand):
         else:
             self.stdout.write('No old backups to clean up')
 
+        # Drop chunk store objects that no remaining snapshot references
+        from settings_module.incremental_backup import prune_chunk_store
+        pruned_count, pruned_size = prune_chunk_store()
+        if pruned_count:
+            self.stdout.write(f'Pruned {pruned_count} unreferenced snapshot objects ({self._format_size(pruned_size)})')
+
         # Show remaining backup count
         remaining = SystemBackup.objects.filter(status='completed').count()
         self.stdout.write(f'Remaining backups: {remaining}')
@@ -0,0 +1,77 @@
+"""
+Management command for verifying incremental backup snapshots.
+
+Restores the snapshot's tables into a scratch SQLite database, compares row
+counts against the manifest and checks referential integrity and that every
+referenced object is present in the chunk store.
+
+Usage:
+    python manage.py verify_backup --latest          # Verify the most recent snapshot
+    python manage.py verify_backup 42                # Verify SystemBackup #42
+    python manage.py verify_backup --latest --deep   # Also re-hash every media object
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+import os
+
+
+class Command(BaseCommand):
+    help = 'Verify an incremental backup by restoring it into a scratch SQLite database'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'backup_id',
+            nargs='?',
+            type=int,
+            help='ID of the SystemBackup to verify',
+        )
+        parser.add_argument(
+            '--latest',
+            action='store_true',
+            help='Verify the most recent completed incremental snapshot',
+        )
+        parser.add_argument(
+            '--deep',
+            action='store_true',
+            help='Re-hash media objects to detect corruption (slower)',
+        )
+
+    def handle(self, *args, **options):
+        from settings_module.models import SystemBackup
+        from settings_module.incremental_backup import load_manifest, verify_snapshot
+
+        snapshots = SystemBackup.objects.filter(backup_type='incremental', status='completed')
+        if options['backup_id']:
+            backup = snapshots.filter(id=options['backup_id']).first()
+        elif options['latest']:
+            backup = snapshots.order_by('-started_at').first()
+        else:
+            raise CommandError('Specify a backup ID or --latest')
+
+        if backup is None:
+            raise CommandError('No completed incremental snapshot found')
+        if not os.path.exists(backup.file_path):
+            raise CommandError(f'Snapshot manifest not found: {backup.file_path}')
+
+        self.stdout.write(f'Verifying {backup.name}...')
+        report = verify_snapshot(load_manifest(backup.file_path), deep=options['deep'])
+
+        for table in report['tables']:
+            if not table['ok']:
+                detail = table.get('error') or f"expected {table['expected']} rows, restored {table['restored']}"
+                self.stdout.write(self.style.ERROR(f"  {table['model']}: {detail}"))
+        for name in report['missing_objects']:
+            self.stdout.write(self.style.ERROR(f'  Missing object: {name}'))
+        for name in report['corrupt_objects']:
+            self.stdout.write(self.style.ERROR(f'  Corrupt object: {name}'))
+        for error in report['integrity_errors']:
+            self.stdout.write(self.style.ERROR(f'  Integrity: {error}'))
+
+        total_rows = sum(table['restored'] or 0 for table in report['tables'])
+        if not report['ok']:
+            raise CommandError(f'Verification FAILED for {backup.name}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Verified {backup.name}: {len(report['tables'])} tables, {total_rows} rows restored, "
+            f"row counts match"
+        ))
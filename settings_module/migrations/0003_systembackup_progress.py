@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('settings_module', '0002_add_custom_role_model'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='systembackup',
+            name='bytes_processed',
+            field=models.BigIntegerField(default=0, help_text='Uncompressed bytes archived so far'),
+        ),
+        migrations.AddField(
+            model_name='systembackup',
+            name='bytes_total',
+            field=models.BigIntegerField(blank=True, help_text='Estimated bytes to archive', null=True),
+        ),
+        migrations.AddField(
+            model_name='systembackup',
+            name='current_step',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='systembackup',
+            name='progress_percent',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='systembackup',
+            name='throughput_bytes_per_sec',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
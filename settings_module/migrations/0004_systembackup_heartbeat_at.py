@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('settings_module', '0003_systembackup_progress'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='systembackup',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, help_text='Last progress write; a job that stops beating is marked failed', null=True),
+        ),
+    ]
@@ -409,6 +409,15 @@ class SystemBackup(models.Model):
     started_at = models.DateTimeField(auto_now_add=True)
     completed_at = models.DateTimeField(null=True, blank=True)
 
+    # Progress reporting for background backups (polled by the backup dashboard)
+    current_step = models.CharField(max_length=100, blank=True)
+    progress_percent = models.PositiveSmallIntegerField(default=0)
+    bytes_total = models.BigIntegerField(null=True, blank=True, help_text="Estimated bytes to archive")
+    bytes_processed = models.BigIntegerField(default=0, help_text="Uncompressed bytes archived so far")
+    throughput_bytes_per_sec = models.FloatField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True,
+                                        help_text="Last progress write; a job that stops beating is marked failed")
+
     error_message = models.TextField(blank=True)
     notes = models.TextField(blank=True)
 
@@ -0,0 +1,292 @@
+"""
+Tests for Settings Module - Backup Service
+"""
+
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.utils import timezone
+from datetime import timedelta
+import gzip
+import io
+import os
+import shutil
+import tempfile
+import zipfile
+import uuid
+
+from .models import SystemBackup
+from .backup_service import (
+    BACKUP_STALE_AFTER, BackupInProgress, ParallelGzipWriter, run_full_backup, start_full_backup,
+)
+from .incremental_backup import (
+    create_incremental_record, run_incremental_backup, load_manifest, verify_snapshot,
+    prune_chunk_store, ChunkStore,
+)
+
+User = get_user_model()
+
+
+def unique_id():
+    """Generate unique ID for test data"""
+    return str(uuid.uuid4())[:8]
+
+
+class ParallelGzipWriterTests(TestCase):
+    """Tests for the chunked parallel gzip writer"""
+
+    def test_round_trip_across_many_chunks(self):
+        """Output of many independent gzip members decompresses to the input"""
+        payload = b''.join(f'INSERT INTO t VALUES ({i});\n'.encode() for i in range(20000))
+        out = io.BytesIO()
+        with ParallelGzipWriter(out, chunk_size=4096, workers=3) as gz:
+            for start in range(0, len(payload), 1000):
+                gz.write(payload[start:start + 1000])
+
+        self.assertEqual(gzip.decompress(out.getvalue()), payload)
+        self.assertEqual(gz.bytes_in, len(payload))
+        self.assertLess(gz.bytes_out, len(payload))
+
+    def test_reports_progress_per_write(self):
+        """on_write callback receives the uncompressed byte count"""
+        seen = []
+        with ParallelGzipWriter(io.BytesIO(), on_write=seen.append) as gz:
+            gz.write(b'abc')
+            gz.write('de')
+        self.assertEqual(seen, [3, 2])
+
+
+class FullBackupTests(TestCase):
+    """Tests for the streaming full backup job"""
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.work_dir, ignore_errors=True)
+
+        self.db_file = os.path.join(self.work_dir, 'db.sqlite3')
+        with open(self.db_file, 'wb') as f:
+            f.write(b'SQLite format 3\x00' + os.urandom(1024) + b'\x00' * 50000)
+
+        self.media_root = os.path.join(self.work_dir, 'media')
+        os.makedirs(os.path.join(self.media_root, 'photos'))
+        with open(os.path.join(self.media_root, 'photos', 'hh.jpg'), 'wb') as f:
+            f.write(os.urandom(2048))
+        with open(os.path.join(self.media_root, 'notes.txt'), 'w') as f:
+            f.write('field notes\n' * 100)
+
+        uid = unique_id()
+        self.user = User.objects.create_user(
+            username=f'ict_{uid}', email=f'ict_{uid}@test.com',
+            password='testpass123', role='ict_admin'
+        )
+
+    def test_full_backup_streams_database_and_media(self):
+        """Full backup archives the compressed DB dump and media without staging"""
+        zip_path = os.path.join(self.work_dir, 'full.zip')
+        backup = SystemBackup.objects.create(
+            name='full.zip', backup_type='full', file_path=zip_path,
+            started_by=self.user, status='pending'
+        )
+        db_settings = {'ENGINE': 'django.db.backends.sqlite3', 'NAME': self.db_file}
+
+        with override_settings(MEDIA_ROOT=self.media_root, BASE_DIR=self.work_dir):
+            run_full_backup(backup.id, db_settings)
+
+        backup.refresh_from_db()
+        self.assertEqual(backup.status, 'completed')
+        self.assertEqual(backup.progress_percent, 100)
+        self.assertGreater(backup.bytes_processed, 0)
+        self.assertEqual(backup.file_size, os.path.getsize(zip_path))
+
+        with zipfile.ZipFile(zip_path) as zipf:
+            names = set(zipf.namelist())
+            self.assertIn('database.sqlite3.gz', names)
+            self.assertIn('media/photos/hh.jpg', names)
+            self.assertIn('media/notes.txt', names)
+            self.assertIn('manifest.json', names)
+            self.assertEqual(zipf.getinfo('media/photos/hh.jpg').compress_type, zipfile.ZIP_STORED)
+            with open(self.db_file, 'rb') as f:
+                self.assertEqual(gzip.decompress(zipf.read('database.sqlite3.gz')), f.read())
+        self.assertFalse(any(name.startswith('temp_') for name in os.listdir(self.work_dir)))
+
+    def test_failed_backup_is_recorded(self):
+        """A failing dump marks the record failed and removes the partial archive"""
+        zip_path = os.path.join(self.work_dir, 'broken.zip')
+        backup = SystemBackup.objects.create(
+            name='broken.zip', backup_type='full', file_path=zip_path, status='pending'
+        )
+        db_settings = {'ENGINE': 'django.db.backends.sqlite3', 'NAME': os.path.join(self.work_dir, 'missing.db')}
+
+        with override_settings(MEDIA_ROOT=self.media_root, BASE_DIR=self.work_dir):
+            with self.assertRaises(Exception):
+                run_full_backup(backup.id, db_settings)
+
+        backup.refresh_from_db()
+        self.assertEqual(backup.status, 'failed')
+        self.assertFalse(os.path.exists(zip_path))
+
+
+class BackupJobStartTests(TestCase):
+    """Tests for starting background backups one at a time"""
+
+    def setUp(self):
+        uid = unique_id()
+        self.user = User.objects.create_user(
+            username=f'ict_{uid}', email=f'ict_{uid}@test.com',
+            password='testpass123', role='ict_admin'
+        )
+
+    def test_active_backup_blocks_another(self):
+        """A second full backup is refused while the first is still beating"""
+        running = SystemBackup.objects.create(
+            name='running.zip', backup_type='full', status='running', heartbeat_at=timezone.now()
+        )
+        with self.assertRaises(BackupInProgress):
+            start_full_backup(self.user)
+
+        self.client.force_login(self.user)
+        response = self.client.post(reverse('settings:create_full_backup'))
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(SystemBackup.objects.filter(backup_type='full').count(), 1)
+        running.refresh_from_db()
+        self.assertEqual(running.status, 'running')
+
+    def test_stale_backup_is_failed_and_no_longer_blocks(self):
+        """A job whose worker died (no heartbeat) is marked failed before the check"""
+        long_ago = timezone.now() - BACKUP_STALE_AFTER - timedelta(minutes=1)
+        stale = SystemBackup.objects.create(
+            name='stale.zip', backup_type='full', status='running', heartbeat_at=long_ago
+        )
+        never_started = SystemBackup.objects.create(name='queued.zip', backup_type='full', status='pending')
+        SystemBackup.objects.filter(pk=never_started.pk).update(started_at=long_ago)
+
+        backup = start_full_backup(self.user)
+
+        self.assertEqual(backup.status, 'pending')
+        for record in (stale, never_started):
+            record.refresh_from_db()
+            self.assertEqual(record.status, 'failed')
+            self.assertIn('stopped', record.error_message)
+
+
+    def test_command_respects_active_backup(self):
+        """create_backup --full takes the same lock and refuses to overlap a running backup"""
+        from django.core.management import call_command
+        from django.core.management.base import CommandError
+
+        SystemBackup.objects.create(
+            name='running.zip', backup_type='full', status='running', heartbeat_at=timezone.now()
+        )
+        with self.assertRaises(CommandError):
+            call_command('create_backup', '--full', stdout=io.StringIO())
+        self.assertEqual(SystemBackup.objects.filter(backup_type='full').count(), 1)
+
+class IncrementalBackupTests(TestCase):
+    """Tests for content-addressed incremental snapshots"""
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.work_dir, ignore_errors=True)
+        self.media_root = os.path.join(self.work_dir, 'media')
+        os.makedirs(self.media_root)
+        with open(os.path.join(self.media_root, 'photo.jpg'), 'wb') as f:
+            f.write(os.urandom(4096))
+
+        settings_override = override_settings(MEDIA_ROOT=self.media_root, BASE_DIR=self.work_dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        uid = unique_id()
+        self.user = User.objects.create_user(
+            username=f'ict_{uid}', email=f'ict_{uid}@test.com',
+            password='testpass123', role='ict_admin'
+        )
+
+    def _snapshot(self):
+        backup = run_incremental_backup(create_incremental_record(self.user).id)
+        return backup, load_manifest(backup.file_path)
+
+    def test_second_snapshot_only_stores_changes(self):
+        """Unchanged tables and media are reused; a changed table is re-stored"""
+        first, first_manifest = self._snapshot()
+        self.assertEqual(first.status, 'completed')
+        self.assertEqual(first_manifest['stats']['media_new'], 1)
+        self.assertGreater(first.file_size, 0)
+
+        second, second_manifest = self._snapshot()
+        self.assertEqual(second_manifest['parent'], first.name)
+        self.assertEqual(second_manifest['stats']['media_new'], 0)
+        self.assertEqual(
+            second_manifest['media']['media/photo.jpg'], first_manifest['media']['media/photo.jpg']
+        )
+        user_label = User._meta.label
+        self.assertEqual(
+            second_manifest['tables'][user_label]['object'], first_manifest['tables'][user_label]['object']
+        )
+
+        uid = unique_id()
+        User.objects.create_user(username=f'new_{uid}', email=f'new_{uid}@test.com', password='testpass123')
+        _, third_manifest = self._snapshot()
+        self.assertNotEqual(
+            third_manifest['tables'][user_label]['object'], first_manifest['tables'][user_label]['object']
+        )
+        self.assertEqual(
+            third_manifest['tables'][user_label]['rows'], first_manifest['tables'][user_label]['rows'] + 1
+        )
+
+    def test_in_place_update_is_captured(self):
+        """QuerySet.update() keeps count, max pk and auto_now; the content hash still changes"""
+        _, first_manifest = self._snapshot()
+        SystemBackup.objects.update(notes='edited in place')
+        User.objects.filter(pk=self.user.pk).update(first_name='Renamed')
+        _, second_manifest = self._snapshot()
+
+        for label in (User._meta.label, SystemBackup._meta.label):
+            self.assertNotEqual(second_manifest['tables'][label]['object'], first_manifest['tables'][label]['object'])
+
+    def test_verify_restores_row_counts(self):
+        """Verification loads the snapshot into scratch SQLite and row counts match"""
+        _, manifest = self._snapshot()
+        report = verify_snapshot(manifest, deep=True)
+
+        self.assertTrue(report['ok'], report)
+        restored = {table['model']: table['restored'] for table in report['tables']}
+        self.assertEqual(restored[User._meta.label], User.objects.count())
+
+    def test_verify_detects_missing_objects(self):
+        """A snapshot referencing a deleted object fails verification"""
+        _, manifest = self._snapshot()
+        store = ChunkStore()
+        os.remove(store.path_for(manifest['media']['media/photo.jpg']['sha256']))
+
+        report = verify_snapshot(manifest, store=store)
+        self.assertFalse(report['ok'])
+        self.assertIn('media/photo.jpg', report['missing_objects'])
+
+    def test_prune_keeps_referenced_objects(self):
+        """Pruning removes only objects no remaining snapshot references"""
+        _, manifest = self._snapshot()
+        store = ChunkStore()
+        orphan = store.path_for('ff' * 32)
+        os.makedirs(os.path.dirname(orphan), exist_ok=True)
+        with open(orphan, 'wb') as f:
+            f.write(b'orphan')
+
+        removed_count, _ = prune_chunk_store()
+        self.assertEqual(removed_count, 1)
+        self.assertTrue(verify_snapshot(manifest, store=store)['ok'])
+
+    def test_prune_waits_for_backups_in_progress(self):
+        """Objects written by a snapshot still in progress are not pruned before its manifest lands"""
+        self._snapshot()
+        store = ChunkStore()
+        in_flight = store.path_for('ee' * 32)
+        os.makedirs(os.path.dirname(in_flight), exist_ok=True)
+        with open(in_flight, 'wb') as f:
+            f.write(b'in flight')
+        SystemBackup.objects.create(
+            name='running.json', backup_type='incremental', status='running', heartbeat_at=timezone.now()
+        )
+
+        self.assertEqual(prune_chunk_store(), (0, 0))
+        self.assertTrue(os.path.exists(in_flight))
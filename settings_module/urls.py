@@ -35,6 +35,8 @@ urlpatterns = [
     path('backup/', maintenance_views.backup_dashboard, name='backup_dashboard'),
     path('backup/create/', maintenance_views.create_backup, name='create_backup'),
     path('backup/create-full/', maintenance_views.create_full_backup, name='create_full_backup'),
+    path('backup/create-incremental/', maintenance_views.create_incremental_backup, name='create_incremental_backup'),
+    path('backup/<int:backup_id>/status/', maintenance_views.backup_status, name='backup_status'),
     path('backup/<int:backup_id>/restore/', maintenance_views.restore_backup, name='restore_backup'),
     path('backup/<int:backup_id>/download/', maintenance_views.download_backup, name='download_backup'),
     path('backup/<int:backup_id>/delete/', maintenance_views.delete_backup, name='delete_backup'),
@@ -0,0 +1,121 @@
+/**
+ * Dashboard Widgets
+ * Loads every [data-widget] placeholder from its JSON endpoint in parallel.
+ *
+ * Placeholders with data-chart (line, doughnut, bar) are drawn with Chart.js
+ * from the widget's labels/values/colors; others get the widget's rendered
+ * HTML. Each placeholder fails independently with a retry link, and fires a
+ * "widget:loaded" event (detail = the JSON payload) for page-specific code.
+ */
+
+(function () {
+    const CHART_ICONS = {line: 'fa-chart-line', doughnut: 'fa-chart-pie', bar: 'fa-chart-bar'};
+    const BAR_COLORS = [
+        'rgba(54, 162, 235, 0.8)', 'rgba(75, 192, 192, 0.8)', 'rgba(255, 206, 86, 0.8)',
+        'rgba(153, 102, 255, 0.8)', 'rgba(255, 159, 64, 0.8)', 'rgba(255, 99, 132, 0.8)'
+    ];
+    const charts = {};
+
+    function showMessage(el, icon, text) {
+        el.textContent = '';
+        const box = document.createElement('div');
+        box.className = 'text-center text-muted py-4';
+        const i = document.createElement('i');
+        i.className = `fas ${icon} fa-2x mb-2`;
+        const p = document.createElement('p');
+        p.className = 'mb-0';
+        p.textContent = text;
+        box.append(i, p);
+        el.appendChild(box);
+        return box;
+    }
+
+    function chartConfig(el, data) {
+        const type = el.dataset.chart;
+        const dataset = {label: el.dataset.datasetLabel || '', data: data.values};
+
+        if (type === 'line') {
+            Object.assign(dataset, {
+                fill: true,
+                backgroundColor: 'rgba(54, 162, 235, 0.2)',
+                borderColor: 'rgba(54, 162, 235, 1)',
+                borderWidth: 2,
+                tension: 0.3,
+                pointBackgroundColor: 'rgba(54, 162, 235, 1)',
+                pointRadius: 4,
+                pointHoverRadius: 6
+            });
+        } else if (type === 'doughnut') {
+            Object.assign(dataset, {backgroundColor: data.colors, borderWidth: 2, borderColor: '#fff'});
+        } else {
+            Object.assign(dataset, {
+                backgroundColor: data.colors || BAR_COLORS,
+                borderWidth: 1
+            });
+        }
+
+        const options = {
+            responsive: true,
+            maintainAspectRatio: false,
+            plugins: {legend: {display: type !== 'bar', position: type === 'doughnut' ? 'bottom' : 'top'}}
+        };
+        if (type !== 'doughnut') {
+            options.scales = {[el.dataset.indexAxis === 'y' ? 'x' : 'y']: {beginAtZero: true}};
+            options.indexAxis = el.dataset.indexAxis || 'x';
+        }
+        return {type: type, data: {labels: data.labels, datasets: [dataset]}, options: options};
+    }
+
+    function renderChart(el, data) {
+        const type = el.dataset.chart;
+        if (!data.labels || data.labels.length === 0) {
+            showMessage(el, CHART_ICONS[type] || 'fa-chart-bar', 'No data available');
+            return;
+        }
+        el.textContent = '';
+        const canvas = document.createElement('canvas');
+        el.appendChild(canvas);
+        if (charts[el.dataset.widget]) {
+            charts[el.dataset.widget].destroy();
+        }
+        charts[el.dataset.widget] = new Chart(canvas.getContext('2d'), chartConfig(el, data));
+    }
+
+    function loadWidget(el, url) {
+        url = url || el.dataset.widget;
+        return fetch(url, {headers: {'X-Requested-With': 'XMLHttpRequest'}, credentials: 'same-origin'})
+            .then(response => response.json().then(payload => {
+                if (!response.ok || !payload.success) {
+                    throw new Error(payload.error || `HTTP ${response.status}`);
+                }
+                return payload;
+            }))
+            .then(payload => {
+                if (el.dataset.chart) {
+                    renderChart(el, payload.data);
+                } else if (payload.html !== null) {
+                    el.innerHTML = payload.html;
+                }
+                el.dispatchEvent(new CustomEvent('widget:loaded', {detail: payload, bubbles: true}));
+                return payload;
+            })
+            .catch(error => {
+                console.error(`Dashboard widget ${url}:`, error);
+                const box = showMessage(el, 'fa-exclamation-triangle', 'Could not load this section.');
+                const retry = document.createElement('a');
+                retry.href = '#';
+                retry.textContent = 'Retry';
+                retry.addEventListener('click', event => {
+                    event.preventDefault();
+                    loadWidget(el, url);
+                });
+                box.appendChild(retry);
+            });
+    }
+
+    window.loadDashboardWidget = loadWidget;
+
+    document.addEventListener('DOMContentLoaded', function () {
+        document.querySelectorAll('[data-widget]').forEach(el => loadWidget(el));
+    });
+})();
@@ -0,0 +1,206 @@
+"""
+Bulk Training Attendance for UPG System
+
+Adding households to a training used to fetch, check and create attendance
+one household and one date at a time. This module builds the household x
+date matrix in memory, reads the (household, date) pairs that already exist
+with one query and inserts the missing rows with a single bulk_create under
+the (training, household, training_date) unique constraint, so concurrent
+adds cannot create duplicates.
+
+attendance_summary() reads a training's whole household x date matrix with
+one query and derives per-date and per-household rates from it. The result
+is cached under a key versioned on the row count and latest updated_at of
+the training's attendance, so a change made in any worker process is seen
+on the next read.
+"""
+
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from core.services.cache_service import CACHE_PREFIX, MEDIUM_CACHE
+
+from households.models import Household
+from .models import TrainingAttendance
+
+BULK_BATCH_SIZE = 500
+
+SUMMARY_CACHE_PREFIX = f'{CACHE_PREFIX}training_attendance_'
+
+
+def backfill_dates(training, training_date):
+    """
+    Earlier training days a household joining on training_date missed:
+    start_date up to (not including) training_date, capped at end_date.
+    """
+    dates = []
+    if training.start_date and training_date > training.start_date:
+        current_date = training.start_date
+        while current_date < training_date:
+            if not training.end_date or current_date <= training.end_date:
+                dates.append(current_date)
+            current_date += timedelta(days=1)
+    return dates
+
+
+def add_households_to_training(training, household_ids, training_date, user=None):
+    """
+    Mark households present on training_date and absent on the training days
+    before it. Households that already have attendance in the training, and
+    IDs that do not exist, are skipped.
+
+    Returns:
+        dict: {'added': [(household_id, name), ...], 'skipped': int, 'created_rows': int}
+    """
+    requested = []
+    for household_id in household_ids:
+        try:
+            household_id = int(household_id)
+        except (TypeError, ValueError):
+            continue
+        if household_id not in requested:
+            requested.append(household_id)
+
+    with transaction.atomic():
+        names = dict(Household.objects.filter(id__in=requested).values_list('id', 'name'))
+        already_enrolled = set(training.attendances.filter(
+            household_id__in=names
+        ).values_list('household_id', flat=True).distinct())
+        to_add = [hh_id for hh_id in requested if hh_id in names and hh_id not in already_enrolled]
+
+        # household x date matrix: present on training_date, absent before it
+        matrix = {}
+        for household_id in to_add:
+            for missed_date in backfill_dates(training, training_date):
+                matrix[(household_id, missed_date)] = False
+            matrix[(household_id, training_date)] = True
+
+        existing = set()
+        if matrix:
+            existing = set(TrainingAttendance.objects.filter(
+                training=training,
+                household_id__in=to_add,
+                training_date__in={day for _, day in matrix},
+            ).values_list('household_id', 'training_date'))
+
+        now = timezone.now()
+        TrainingAttendance.objects.bulk_create([
+            TrainingAttendance(
+                training=training,
+                household_id=household_id,
+                training_date=day,
+                attendance=present,
+                marked_by=user,
+                attendance_marked_at=now,
+            )
+            for (household_id, day), present in matrix.items()
+            if (household_id, day) not in existing
+        ], batch_size=BULK_BATCH_SIZE, ignore_conflicts=True)
+
+    return {
+        'added': [(hh_id, names[hh_id]) for hh_id in to_add],
+        'skipped': len(household_ids) - len(to_add),
+        'created_rows': len(matrix) - len(existing),
+    }
+
+
+def _rate(present, total):
+    return round((present * 100) / total) if total > 0 else 0
+
+
+def summary_cache_key(training_id):
+    """Cache key for the summary as of the training's current attendance rows"""
+    version = TrainingAttendance.objects.filter(training_id=training_id).aggregate(
+        rows=Count('id'), changed=Max('updated_at'),
+    )
+    changed = version['changed'].timestamp() if version['changed'] else 0
+    return f'{SUMMARY_CACHE_PREFIX}{training_id}_{version["rows"]}_{changed}'
+
+
+def build_attendance_summary(training_id):
+    """
+    Household x date attendance matrix of a training with rates.
+
+    Returns:
+        dict: {
+            'training_id': int,
+            'dates': ['YYYY-MM-DD', ...] with attendance records, ascending,
+            'households': [{'id', 'name', 'phone', 'village', 'present', 'recorded', 'rate',
+                            'attendance': {date: {'id', 'present', 'marked_by', 'marked_at'}}}],
+            'per_date': {date: {'total', 'present', 'absent', 'rate'}},
+            'totals': {'households', 'records', 'present', 'rate'},
+        }
+    """
+    rows = TrainingAttendance.objects.filter(training_id=training_id).order_by(
+        'household__name', 'household_id', 'training_date'
+    ).values(
+        'id', 'household_id', 'household__name', 'household__phone_number', 'household__village__name',
+        'training_date', 'attendance', 'attendance_marked_at',
+        'marked_by__first_name', 'marked_by__last_name', 'marked_by__username',
+    )
+
+    households = {}
+    per_date = {}
+    for row in rows:
+        day = row['training_date'].isoformat()
+        household = households.get(row['household_id'])
+        if household is None:
+            household = households[row['household_id']] = {
+                'id': row['household_id'],
+                'name': row['household__name'],
+                'phone': row['household__phone_number'],
+                'village': row['household__village__name'],
+                'present': 0,
+                'recorded': 0,
+                'attendance': {},
+            }
+        marked_by = ' '.join(
+            part for part in (row['marked_by__first_name'], row['marked_by__last_name']) if part
+        ) or row['marked_by__username'] or ''
+        household['attendance'][day] = {
+            'id': row['id'],
+            'present': row['attendance'],
+            'marked_by': marked_by,
+            'marked_at': row['attendance_marked_at'],
+        }
+        household['recorded'] += 1
+        household['present'] += int(row['attendance'])
+
+        stats = per_date.setdefault(day, {'total': 0, 'present': 0})
+        stats['total'] += 1
+        stats['present'] += int(row['attendance'])
+
+    for household in households.values():
+        household['rate'] = _rate(household['present'], household['recorded'])
+    for stats in per_date.values():
+        stats['absent'] = stats['total'] - stats['present']
+        stats['rate'] = _rate(stats['present'], stats['total'])
+
+    records = sum(stats['total'] for stats in per_date.values())
+    present = sum(stats['present'] for stats in per_date.values())
+    return {
+        'training_id': training_id,
+        'dates': sorted(per_date),
+        'households': list(households.values()),
+        'per_date': per_date,
+        'totals': {
+            'households': len(households),
+            'records': records,
+            'present': present,
+            'rate': _rate(present, records),
+        },
+    }
+
+
+def attendance_summary(training_id):
+    """build_attendance_summary, cached until the training's attendance rows change"""
+    key = summary_cache_key(training_id)
+    summary = cache.get(key)
+    if summary is None:
+        summary = build_attendance_summary(training_id)
+        cache.set(key, summary, MEDIUM_CACHE)
+    return summary
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('training', '0007_alter_trainingattendance_unique_together_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trainingattendance',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, null=True),
+        ),
+    ]
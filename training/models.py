@@ -248,6 +248,7 @@ class TrainingAttendance(models.Model):
                                               help_text="When attendance was last updated")
 
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, null=True)
 
     def __str__(self):
         return f"{self.household.name} - {self.training.name}"
@@ -0,0 +1,136 @@
+"""
+Tests for Training App - Bulk attendance and attendance summary
+"""
+
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.urls import reverse
+from django.test.utils import CaptureQueriesContext
+from datetime import date
+import uuid
+
+from core.models import County, SubCounty, Village
+from households.models import Household
+from .attendance import add_households_to_training, attendance_summary
+from .models import Training, TrainingAttendance
+
+
+def unique_id():
+    """Generate unique ID for test data"""
+    return str(uuid.uuid4())[:8]
+
+
+class BulkAttendanceTests(TestCase):
+    """Tests for adding households to a training in bulk"""
+
+    def setUp(self):
+        county = County.objects.create(name=f'County {unique_id()}')
+        subcounty = SubCounty.objects.create(name=f'SubCounty {unique_id()}', county=county)
+        village = Village.objects.create(name=f'Village {unique_id()}', subcounty_obj=subcounty)
+        self.training = Training.objects.create(
+            name='Savings Basics', module_id='M1', start_date=date(2025, 3, 3), end_date=date(2025, 3, 12)
+        )
+        self.households = [
+            Household.objects.create(name=f'Household {i}', village=village, national_id=str(i), phone_number='0700000000')
+            for i in range(40)
+        ]
+
+    def test_adds_households_with_backfilled_absences(self):
+        """40 households joining on day 10 get 9 absences and 1 presence each in constant queries"""
+        enrolled = self.households[0]
+        TrainingAttendance.objects.create(training=self.training, household=enrolled, training_date=date(2025, 3, 3))
+        ids = [str(hh.id) for hh in self.households] + ['999999', 'not-an-id']
+
+        with CaptureQueriesContext(connection) as queries:
+            result = add_households_to_training(self.training, ids, date(2025, 3, 12))
+
+        # Households, already-enrolled check, existing pairs, then inserts (SQLite
+        # splits the batch by its variable limit) inside a savepoint
+        inserts = [q for q in queries.captured_queries if q['sql'].startswith('INSERT')]
+        self.assertEqual(len(queries) - len(inserts), 5)
+        self.assertLessEqual(len(inserts), 4)
+
+        self.assertEqual((len(result['added']), result['skipped'], result['created_rows']), (39, 3, 390))
+        added = self.households[1]
+        self.assertEqual(
+            list(TrainingAttendance.objects.filter(training=self.training, household=added)
+                 .order_by('training_date').values_list('attendance', flat=True)),
+            [False] * 9 + [True],
+        )
+        self.assertEqual(TrainingAttendance.objects.filter(household=enrolled).count(), 1)
+
+        # Adding again is a no-op
+        again = add_households_to_training(self.training, ids, date(2025, 3, 12))
+        self.assertEqual((again['added'], again['created_rows']), ([], 0))
+
+
+class AttendanceSummaryTests(TestCase):
+    """Tests for the cached household x date attendance summary"""
+
+    def setUp(self):
+        cache.clear()
+        county = County.objects.create(name=f'County {unique_id()}')
+        subcounty = SubCounty.objects.create(name=f'SubCounty {unique_id()}', county=county)
+        village = Village.objects.create(name=f'Village {unique_id()}', subcounty_obj=subcounty)
+        self.training = Training.objects.create(
+            name='Savings Basics', module_id='M1', start_date=date(2025, 3, 3), end_date=date(2025, 3, 4)
+        )
+        self.amina = Household.objects.create(name='Amina', village=village, national_id='1', phone_number='0700000001')
+        self.baraka = Household.objects.create(name='Baraka', village=village, national_id='2', phone_number='0700000002')
+        for household, day, present in [
+            (self.amina, date(2025, 3, 3), True),
+            (self.amina, date(2025, 3, 4), True),
+            (self.baraka, date(2025, 3, 3), False),
+            (self.baraka, date(2025, 3, 4), True),
+        ]:
+            TrainingAttendance.objects.create(
+                training=self.training, household=household, training_date=day, attendance=present
+            )
+
+    def test_matrix_and_rates_from_one_cached_query(self):
+        # One query for the cache version and one for the matrix; cached reads only check the version
+        with self.assertNumQueries(2):
+            summary = attendance_summary(self.training.id)
+        with self.assertNumQueries(1):
+            attendance_summary(self.training.id)
+
+        self.assertEqual(summary['dates'], ['2025-03-03', '2025-03-04'])
+        self.assertEqual([h['name'] for h in summary['households']], ['Amina', 'Baraka'])
+        baraka = summary['households'][1]
+        self.assertEqual((baraka['present'], baraka['recorded'], baraka['rate']), (1, 2, 50))
+        self.assertFalse(baraka['attendance']['2025-03-03']['present'])
+        self.assertEqual(summary['per_date']['2025-03-03'], {'total': 2, 'present': 1, 'absent': 1, 'rate': 50})
+        self.assertEqual(summary['totals'], {'households': 2, 'records': 4, 'present': 3, 'rate': 75})
+
+    def test_attendance_changes_change_the_cache_key(self):
+        attendance_summary(self.training.id)
+
+        record = TrainingAttendance.objects.get(household=self.baraka, training_date=date(2025, 3, 3))
+        record.attendance = True
+        record.save()
+        self.assertEqual(attendance_summary(self.training.id)['per_date']['2025-03-03']['present'], 2)
+
+        record.delete()
+        self.assertEqual(attendance_summary(self.training.id)['per_date']['2025-03-03']['total'], 1)
+
+        # Bulk adds send no signals but still set updated_at
+        newcomer = Household.objects.create(
+            name='Chebet', village=self.amina.village, national_id='3', phone_number='0700000003'
+        )
+        add_households_to_training(self.training, [newcomer.id], date(2025, 3, 4))
+        self.assertEqual(attendance_summary(self.training.id)['totals']['households'], 3)
+
+    def test_summary_api(self):
+        user = get_user_model().objects.create_user(
+            username=f'me_{unique_id()}', email=f'me_{unique_id()}@test.com', password='testpass123', role='me_staff'
+        )
+        self.client.force_login(user)
+        response = self.client.get(reverse('training:training_attendance_summary', args=[self.training.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['totals']['rate'], 75)
+
+        response = self.client.get(reverse('training:manage_attendance', args=[self.training.id]), {'date': '2025-03-03'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.context['present_count'], response.context['attendance_rate']), (1, 50))
@@ -14,6 +14,7 @@ urlpatterns = [
     path('<int:training_id>/complete/', views.complete_training, name='complete_training'),
     path('<int:training_id>/delete/', views.delete_training, name='delete_training'),
     path('<int:training_id>/attendance/', views.manage_attendance, name='manage_attendance'),
+    path('<int:training_id>/attendance-summary/', views.training_attendance_summary, name='training_attendance_summary'),
     path('<int:training_id>/available-households/', views.get_available_households, name='get_available_households'),
     path('<int:training_id>/add-household/', views.add_household_to_training, name='add_household_to_training'),
     path('attendance/<int:attendance_id>/toggle/', views.toggle_attendance, name='toggle_attendance'),
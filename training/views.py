@@ -6,7 +6,9 @@ from django.views.decorators.csrf import csrf_exempt
 from django.utils import timezone
 import json
 from .models import Training, TrainingAttendance, TrainingFieldAssociate, TrainingMentorAssignment
-from households.models import Household
+from .attendance import add_households_to_training, attendance_summary
+from households.search import enrolled_household_ids, search_from_request
+from core.permissions import get_filtered_households
 
 @login_required
 def training_list(request):
@@ -267,10 +269,13 @@ def manage_attendance(request, training_id):
     if not training_dates:
         training_dates = [timezone.now().date()]
 
+    # Whole household x date matrix with rates, from one cached query
+    summary = attendance_summary(training.id)
+
     # Add dates that have attendance records (for historical retroactive entries)
-    attendance_dates = training.attendances.values_list('training_date', flat=True).distinct()
-    for att_date in attendance_dates:
-        if att_date and att_date not in training_dates:
+    for att_date in summary['dates']:
+        att_date = datetime.strptime(att_date, '%Y-%m-%d').date()
+        if att_date not in training_dates:
             training_dates.append(att_date)
 
     # If selected date not in training dates, add it (allows any date to be selected)
@@ -280,34 +285,49 @@ def manage_attendance(request, training_id):
     # Sort dates
     training_dates.sort()
 
-    # Filter attendances for the selected date
-    attendances = training.attendances.filter(training_date=selected_date).select_related('household__village', 'marked_by').order_by('household__name')
-
-    # Get unique households enrolled (from all dates)
-    enrolled_households = training.attendances.values_list('household', flat=True).distinct()
-    total_unique_enrolled = len(set(enrolled_households))
-
-    # Calculate attendance statistics for selected date
-    total_enrolled = attendances.count()
-    present_count = attendances.filter(attendance=True).count()
-    absent_count = total_enrolled - present_count
-    attendance_rate = round((present_count * 100) / total_enrolled) if total_enrolled > 0 else 0
+    # Attendance for the selected date; the page switches dates client-side from the summary
+    selected_key = selected_date.isoformat()
+    day_stats = summary['per_date'].get(selected_key, {'total': 0, 'present': 0, 'absent': 0, 'rate': 0})
+    attendances = [
+        dict(household['attendance'][selected_key], household_name=household['name'])
+        for household in summary['households']
+        if selected_key in household['attendance']
+    ]
+    recent_activity = sorted(
+        (attendance for attendance in attendances if attendance['marked_at']),
+        key=lambda attendance: attendance['marked_at'], reverse=True
+    )[:5]
 
     context = {
         'training': training,
-        'attendances': attendances,
+        'attendance_summary': summary,
+        'recent_activity': recent_activity,
         'page_title': f'Manage Attendance - {training.name}',
-        'total_enrolled': total_enrolled,
-        'total_unique_enrolled': total_unique_enrolled,
-        'present_count': present_count,
-        'absent_count': absent_count,
-        'attendance_rate': attendance_rate,
+        'total_enrolled': day_stats['total'],
+        'total_unique_enrolled': summary['totals']['households'],
+        'present_count': day_stats['present'],
+        'absent_count': day_stats['absent'],
+        'attendance_rate': day_stats['rate'],
         'selected_date': selected_date,
-        'training_dates': sorted(training_dates),
+        'training_dates': training_dates,
     }
 
     return render(request, 'training/manage_attendance.html', context)
 
+@login_required
+def training_attendance_summary(request, training_id):
+    """Household x date attendance matrix with per-date and per-household rates"""
+    training = get_object_or_404(Training, id=training_id)
+
+    # Check permissions
+    user = request.user
+    if not (user.is_superuser or user.role in ['ict_admin', 'me_staff', 'field_associate', 'program_manager'] or
+            (user.role == 'mentor' and training.assigned_mentor == user)):
+        return JsonResponse({'success': False, 'message': 'Permission denied'}, status=403)
+
+    return JsonResponse({'success': True, **attendance_summary(training.id)})
+
+
 @login_required
 @require_http_methods(["POST"])
 def create_training(request):
@@ -622,7 +642,7 @@ def edit_training(request, training_id):
 
 @login_required
 def get_available_households(request, training_id):
-    """Get list of households available to add to training"""
+    """Search households available to add to training, one page at a time"""
     training = get_object_or_404(Training, id=training_id)
 
     # Check permissions
@@ -631,23 +651,16 @@ def get_available_households(request, training_id):
             (user.role == 'mentor' and training.assigned_mentor == user)):
         return JsonResponse({'success': False, 'message': 'Permission denied'})
 
-    # Get households that are not already in this training
-    enrolled_household_ids = training.attendances.values_list('household_id', flat=True)
-    available_households = Household.objects.exclude(id__in=enrolled_household_ids).select_related('village')
-
-    households_data = []
-    for household in available_households:
-        households_data.append({
-            'id': household.id,
-            'name': household.name,
-            'village': household.village.name,
-            'phone': household.phone_number
-        })
+    # One page of matching households in the user's villages that are not
+    # already in this training (q, village, cursor and limit GET parameters)
+    try:
+        results = search_from_request(
+            request, get_filtered_households(user), enrolled_household_ids(training=training)
+        )
+    except ValueError as e:
+        return JsonResponse({'success': False, 'message': str(e)}, status=400)
 
-    return JsonResponse({
-        'success': True,
-        'households': households_data
-    })
+    return JsonResponse({'success': True, **results})
 
 
 @login_required
@@ -680,8 +693,7 @@ def add_household_to_training(request, training_id):
             return JsonResponse({'success': False, 'message': 'Training date is required'})
 
         # Parse training date
-        from datetime import datetime, timedelta
-        from households.models import Household
+        from datetime import datetime
         training_date_obj = datetime.strptime(training_date, '%Y-%m-%d').date()
 
         # Check training capacity
@@ -694,50 +706,11 @@ def add_household_to_training(request, training_id):
                 'message': f'Only {available_slots} slot(s) available. You selected {len(household_ids)} households.'
             })
 
-        added_count = 0
-        skipped_count = 0
-        added_names = []
-
-        for hh_id in household_ids:
-            try:
-                household = Household.objects.get(id=hh_id)
-
-                # Check if household is already in this training
-                if training.attendances.filter(household=household).exists():
-                    skipped_count += 1
-                    continue
-
-                # Create attendance record
-                TrainingAttendance.objects.create(
-                    training=training,
-                    household=household,
-                    training_date=training_date_obj,
-                    attendance=True,
-                    marked_by=user,
-                    attendance_marked_at=timezone.now()
-                )
-                added_count += 1
-                added_names.append(household.name)
-
-                # Mark absent for previous dates if applicable
-                if training.start_date and training_date_obj > training.start_date:
-                    current_date = training.start_date
-                    while current_date < training_date_obj:
-                        if not training.end_date or current_date <= training.end_date:
-                            if not training.attendances.filter(household=household, training_date=current_date).exists():
-                                TrainingAttendance.objects.create(
-                                    training=training,
-                                    household=household,
-                                    training_date=current_date,
-                                    attendance=False,
-                                    marked_by=user,
-                                    attendance_marked_at=timezone.now()
-                                )
-                        current_date += timedelta(days=1)
-
-            except Household.DoesNotExist:
-                skipped_count += 1
-                continue
+        # Present on the chosen date, absent on earlier training days
+        result = add_households_to_training(training, household_ids, training_date_obj, user=user)
+        added_count = len(result['added'])
+        skipped_count = result['skipped']
+        added_names = [name for _, name in result['added']]
 
         if added_count == 0:
             return JsonResponse({
@@ -0,0 +1,320 @@
+"""
+Grant Ledger for UPG System
+
+Household grant applications, SB grants and PR grants are listed as one
+ledger, newest first. Each grant model is projected onto the same normalized
+columns (category, applicant, village, program, status, amounts, dates and
+the display labels) with annotations, and the three projections are read
+with a single UNION ALL query ordered and limited in the database.
+
+Pages are keyset-paged on (created_at, category, id): the cursor carries the
+last row's values and every projection is filtered to the rows after it, so
+a page costs the same however far back it is. Per-status and per-category
+counts and amounts come from one grouped UNION ALL query over the same
+filtered projections.
+"""
+
+from datetime import datetime
+import base64
+import json
+
+from django.db.models import Case, CharField, Count, DecimalField, F, Q, Sum, Value, When
+from django.db.models.functions import Cast, Coalesce, Concat, Trim
+
+from households.search import InvalidCursor
+from .models import HouseholdGrantApplication, PRGrant, SBGrant
+
+PAGE_SIZE = 50
+
+HOUSEHOLD = 'household'
+SB = 'sb'
+PR = 'pr'
+
+CATEGORY_LABELS = {HOUSEHOLD: 'Household Grants', SB: 'SB Grants', PR: 'PR Grants'}
+
+# Roles that see every grant rather than only those they submitted or look after
+ALL_GRANTS_ROLES = ['program_manager', 'county_director', 'executive', 'ict_admin', 'me_staff']
+
+# Normalized ledger columns, in the order every projection selects them
+LEDGER_COLUMNS = (
+    'category', 'grant_id', 'recorded_at', 'heading', 'subheading', 'applicant', 'applicant_type', 'village',
+    'program_name', 'display_type', 'funding_source', 'grant_status', 'status_label', 'amount', 'disbursed',
+    'submitted_on', 'submitted_by_name',
+)
+
+_TEXT = CharField()
+_AMOUNT = DecimalField(max_digits=12, decimal_places=2)
+
+
+def _text(value):
+    return Value(value, output_field=_TEXT)
+
+
+def _amount(value):
+    return Value(value, output_field=_AMOUNT)
+
+
+def _label(field, choices):
+    """The display label of a choice field, as a SQL CASE"""
+    return Case(*[When(**{field: value}, then=_text(label)) for value, label in choices],
+                default=F(field), output_field=_TEXT)
+
+
+def _applicant_type(*fields):
+    """Which applicant relation is set, checked in the model's get_applicant_type() order"""
+    labels = {'household': 'Household', 'business_group': 'Business Group', 'savings_group': 'Savings Group'}
+    return Case(*[When(**{f'{field}__isnull': False}, then=_text(labels[field])) for field in fields],
+                default=_text('Unknown'), output_field=_TEXT)
+
+
+def _user_name(relation):
+    return Trim(Concat(f'{relation}__first_name', _text(' '), f'{relation}__last_name', output_field=_TEXT))
+
+
+def _household_columns():
+    grant_type = _label('grant_type', HouseholdGrantApplication.GRANT_TYPE_CHOICES)
+    return {
+        'category': _text(HOUSEHOLD),
+        'heading': F('title'),
+        'subheading': Coalesce('program__name', _text('Non-program grant'), output_field=_TEXT),
+        'applicant': Coalesce('household__name', 'business_group__name', 'savings_group__name',
+                              _text('Unknown Applicant'), output_field=_TEXT),
+        'applicant_type': _applicant_type('household', 'business_group', 'savings_group'),
+        'program_name': Coalesce('grant_program__name', 'program__name', output_field=_TEXT),
+        'display_type': Case(
+            When(grant_program__isnull=False, then=F('grant_program__name')),
+            When(program__isnull=False, then=Concat('program__name', _text(' - '), grant_type, output_field=_TEXT)),
+            default=Concat(_text('Household - '), grant_type, output_field=_TEXT),
+            output_field=_TEXT,
+        ),
+        'funding_source': Case(
+            When(grant_program__isnull=False, then=_text('Grant Program')),
+            When(program__isnull=False, then=_text('Program')),
+            default=_text('General'),
+            output_field=_TEXT,
+        ),
+        'status_label': _label('status', HouseholdGrantApplication.STATUS_CHOICES),
+        'amount': Cast('requested_amount', _AMOUNT),
+        'disbursed': Cast('disbursed_amount', _AMOUNT),
+        'submitted_on': F('submission_date'),
+        'submitted_by_name': _user_name('submitted_by'),
+    }
+
+
+def _sb_columns():
+    return {
+        'category': _text(SB),
+        'heading': Concat(_text('SB Grant - '), Coalesce('business_group__name', 'household__name',
+                                                          'savings_group__name', _text('Unknown Applicant')),
+                          output_field=_TEXT),
+        'subheading': Coalesce('business_group__business_type', _text(''), output_field=_TEXT),
+        'applicant': Coalesce('business_group__name', 'household__name', 'savings_group__name',
+                              _text('Unknown Applicant'), output_field=_TEXT),
+        'applicant_type': _applicant_type('business_group', 'household', 'savings_group'),
+        'program_name': F('program__name'),
+        'display_type': _text('SB Grant'),
+        'funding_source': _text('SB Grant'),
+        'status_label': _label('status', SBGrant.GRANT_STATUS_CHOICES),
+        'amount': Coalesce('final_grant_amount', 'calculated_grant_amount', _amount(0), output_field=_AMOUNT),
+        'disbursed': Cast('disbursed_amount', _AMOUNT),
+        'submitted_on': F('created_at'),
+        'submitted_by_name': _user_name('submitted_by'),
+    }
+
+
+def _pr_columns():
+    return {
+        'category': _text(PR),
+        'heading': Concat(_text('PR Grant - '), Coalesce('business_group__name', 'household__name',
+                                                          'savings_group__name', _text('Unknown Applicant')),
+                          output_field=_TEXT),
+        'subheading': Concat(_text('Based on SB Grant #'), Cast('sb_grant_id', _TEXT), output_field=_TEXT),
+        'applicant': Coalesce('business_group__name', 'household__name', 'savings_group__name',
+                              _text('Unknown Applicant'), output_field=_TEXT),
+        'applicant_type': _applicant_type('business_group', 'household', 'savings_group'),
+        'program_name': F('program__name'),
+        'display_type': _text('PR Grant'),
+        'funding_source': _text('PR Grant'),
+        'status_label': _label('status', PRGrant.GRANT_STATUS_CHOICES),
+        'amount': Cast('grant_amount', _AMOUNT),
+        # PR grants record no partial disbursements
+        'disbursed': Case(When(status='disbursed', then=Cast('grant_amount', _AMOUNT)), default=_amount(0),
+                          output_field=_AMOUNT),
+        'submitted_on': F('created_at'),
+        'submitted_by_name': _text(''),
+    }
+
+
+_COLUMNS = {HOUSEHOLD: _household_columns, SB: _sb_columns, PR: _pr_columns}
+
+
+def ledger_querysets(user):
+    """
+    The grants of each category a user may list.
+
+    Returns:
+        dict: {'household': queryset, 'sb': queryset, 'pr': queryset}
+    """
+    role = getattr(user, 'role', None)
+    sees_all = role in ALL_GRANTS_ROLES or user.is_superuser
+
+    if sees_all:
+        household_grants = HouseholdGrantApplication.objects.all()
+    elif role == 'mentor':
+        # Mentors only see grants they submitted on behalf of households
+        household_grants = HouseholdGrantApplication.objects.filter(submitted_by=user)
+    elif role == 'field_associate':
+        # FA sees grants for households in their assigned villages
+        assigned_villages = user.profile.assigned_villages.all() if hasattr(user, 'profile') and user.profile else []
+        household_grants = HouseholdGrantApplication.objects.filter(
+            Q(household__village__in=assigned_villages) | Q(submitted_by=user)
+        )
+    else:
+        household_grants = HouseholdGrantApplication.objects.none()
+
+    if sees_all or role == 'field_associate':
+        sb_grants, pr_grants = SBGrant.objects.all(), PRGrant.objects.all()
+    elif role == 'mentor':
+        # Mentors see SB grants they submitted
+        sb_grants, pr_grants = SBGrant.objects.filter(submitted_by=user), PRGrant.objects.none()
+    else:
+        sb_grants, pr_grants = SBGrant.objects.none(), PRGrant.objects.none()
+
+    return {HOUSEHOLD: household_grants, SB: sb_grants, PR: pr_grants}
+
+
+def filter_ledger(querysets, status=None, grant_type=None, funding_source=None):
+    """
+    Apply the list filters. grant_type is 'sb', 'pr' or a household grant
+    type; funding_source is 'grant_program' or 'program' (household grants only).
+    Categories that are filtered out entirely are dropped.
+
+    Returns:
+        dict: category -> queryset
+    """
+    querysets = dict(querysets)
+    if status:
+        querysets = {category: queryset.filter(status=status) for category, queryset in querysets.items()}
+
+    if funding_source == 'grant_program':
+        querysets = {HOUSEHOLD: querysets[HOUSEHOLD].filter(grant_program__isnull=False)}
+    elif funding_source == 'program':
+        querysets = {HOUSEHOLD: querysets[HOUSEHOLD].filter(grant_program__isnull=True, program__isnull=False)}
+
+    if grant_type in (SB, PR):
+        querysets = {category: queryset for category, queryset in querysets.items() if category == grant_type}
+    elif grant_type:
+        querysets = {HOUSEHOLD: querysets[HOUSEHOLD].filter(grant_type=grant_type)} if HOUSEHOLD in querysets else {}
+
+    return querysets
+
+
+def _project(category, queryset):
+    """A queryset of the grants as ledger rows, with the columns in LEDGER_COLUMNS order"""
+    columns = _COLUMNS[category]()
+    columns['grant_id'] = F('id')
+    columns['recorded_at'] = F('created_at')
+    columns['village'] = F('household__village__name')
+    columns['grant_status'] = F('status')
+    return queryset.order_by().annotate(**{name: columns[name] for name in LEDGER_COLUMNS}).values(*LEDGER_COLUMNS)
+
+
+def _union(querysets):
+    querysets = [queryset for queryset in querysets if not queryset.query.is_empty()]
+    if not querysets:
+        return None
+    return querysets[0].union(*querysets[1:], all=True)
+
+
+def encode_cursor(when, category, pk):
+    return base64.urlsafe_b64encode(json.dumps([when.isoformat(), category, pk]).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        when, category, pk = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if category not in _COLUMNS:
+            raise ValueError(category)
+        return datetime.fromisoformat(when), category, int(pk)
+    except (ValueError, TypeError):
+        raise InvalidCursor(f'Invalid cursor: {cursor!r}')
+
+
+def _after(category, cursor):
+    """Grants of `category` that come after the cursor in (created_at, category, id) descending order"""
+    when, cursor_category, pk = cursor
+    if category == cursor_category:
+        return Q(created_at__lt=when) | Q(created_at=when, id__lt=pk)
+    if category < cursor_category:
+        return Q(created_at__lte=when)
+    return Q(created_at__lt=when)
+
+
+def ledger_page(querysets, cursor=None, limit=PAGE_SIZE):
+    """
+    One page of the ledger, newest first, read with a single query.
+
+    Returns:
+        dict: {'grants': [dict with the LEDGER_COLUMNS keys], 'next_cursor': str or None}
+    Raises:
+        InvalidCursor: for a cursor that cannot be decoded
+    """
+    position = decode_cursor(cursor) if cursor else None
+    projections = []
+    for category, queryset in querysets.items():
+        if position:
+            queryset = queryset.filter(_after(category, position))
+        projections.append(_project(category, queryset))
+
+    ledger = _union(projections)
+    if ledger is None:
+        return {'grants': [], 'next_cursor': None}
+    rows = list(ledger.order_by('-recorded_at', '-category', '-grant_id')[:limit + 1])
+
+    next_cursor = None
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        next_cursor = encode_cursor(last['recorded_at'], last['category'], last['grant_id'])
+    return {'grants': rows[:limit], 'next_cursor': next_cursor}
+
+
+def ledger_totals(querysets):
+    """
+    Grant counts and amounts per status and per category, from one grouped query.
+
+    Returns:
+        dict: {'by_status': [{'status', 'label', 'count', 'amount', 'disbursed'}],
+               'by_category': [{'category', 'label', 'count', 'amount', 'disbursed'}],
+               'count': int, 'amount': Decimal, 'disbursed': Decimal}
+    """
+    groups = []
+    for category, queryset in querysets.items():
+        projection = _project(category, queryset)
+        groups.append(projection.values('category', 'grant_status', 'status_label').annotate(
+            grants=Count('grant_id'), total_amount=Sum('amount'), total_disbursed=Sum('disbursed'),
+        ))
+
+    ledger = _union(groups)
+    by_status, by_category = {}, {}
+    for row in (ledger if ledger is not None else []):
+        status = by_status.setdefault(row['grant_status'], {
+            'status': row['grant_status'], 'label': row['status_label'], 'count': 0, 'amount': 0, 'disbursed': 0,
+        })
+        category = by_category.setdefault(row['category'], {
+            'category': row['category'], 'label': CATEGORY_LABELS[row['category']],
+            'count': 0, 'amount': 0, 'disbursed': 0,
+        })
+        for summary in (status, category):
+            summary['count'] += row['grants']
+            summary['amount'] += row['total_amount'] or 0
+            summary['disbursed'] += row['total_disbursed'] or 0
+
+    categories = [by_category[category] for category in _COLUMNS if category in by_category]
+    return {
+        'by_status': sorted(by_status.values(), key=lambda summary: -summary['count']),
+        'by_category': categories,
+        'count': sum(summary['count'] for summary in categories),
+        'amount': sum(summary['amount'] for summary in categories),
+        'disbursed': sum(summary['disbursed'] for summary in categories),
+    }
@@ -1,3 +1,191 @@
+"""
+Tests for UPG Grants App - Grant Ledger
+"""
+
+from datetime import date, timedelta
+from decimal import Decimal
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from business_groups.models import BusinessGroup
+from core.models import County, Program as CoreProgram, SubCounty, Village
+from households.models import Household
+from programs.models import Program
+
+from .ledger import filter_ledger, ledger_page, ledger_querysets, ledger_totals
+from .models import HouseholdGrantApplication, PRGrant, SBGrant
+
+User = get_user_model()
+
+
+def unique_id():
+    """Generate unique ID for test data"""
+    return str(uuid.uuid4())[:8]
+
+
+class GrantLedgerTests(TestCase):
+    """Tests for the unified household, SB and PR grant ledger"""
+
+    def setUp(self):
+        self.county = County.objects.create(name=f'Test County {unique_id()}')
+        self.subcounty = SubCounty.objects.create(name=f'Test SubCounty {unique_id()}', county=self.county)
+        self.village = Village.objects.create(name=f'Test Village {unique_id()}', subcounty_obj=self.subcounty)
+        self.other_village = Village.objects.create(name=f'Other Village {unique_id()}', subcounty_obj=self.subcounty)
+
+        self.manager = self.create_user('program_manager')
+        self.mentor = self.create_user('mentor')
+        self.field_associate = self.create_user('field_associate')
+        self.field_associate.profile.assigned_villages.add(self.village)
+
+        self.program = Program.objects.create(
+            name=f'Program {unique_id()}', description='Test', program_type='graduation', created_by=self.manager,
+        )
+        core_program = CoreProgram.objects.create(
+            name='Core Program', cycle='FY25C1', office='Test Office',
+            start_date=date(2025, 1, 1), end_date=date(2025, 12, 31),
+        )
+        self.business_group = BusinessGroup.objects.create(
+            name='Test Group', program=core_program, business_type='retail', formation_date=date(2025, 1, 1),
+        )
+        self.household = self.create_household(self.village)
+        self.other_household = self.create_household(self.other_village)
+
+        self.now = timezone.now()
+        self.household_grant = self.create_household_grant(
+            self.household, 'submitted', Decimal('12000'), submitted_by=self.mentor, days_ago=1,
+        )
+        self.other_grant = self.create_household_grant(
+            self.other_household, 'approved', Decimal('8000'), submitted_by=self.manager, days_ago=3,
+        )
+        self.sb_grant = SBGrant.objects.create(
+            program=self.program, business_group=self.business_group, business_plan='Plan',
+            calculated_grant_amount=Decimal('15000'), final_grant_amount=Decimal('16000'), status='disbursed',
+            disbursed_amount=Decimal('16000'), submitted_by=self.mentor,
+        )
+        self.pr_grant = PRGrant.objects.create(
+            program=self.program, business_group=self.business_group, sb_grant=self.sb_grant,
+            grant_amount=Decimal('10000'), status='approved',
+        )
+        self.set_created(SBGrant, self.sb_grant, days_ago=2)
+        self.set_created(PRGrant, self.pr_grant, days_ago=2)
+
+    def create_user(self, role):
+        uid = unique_id()
+        return User.objects.create_user(
+            username=f'{role}_{uid}', email=f'{uid}@test.com', password='testpass123', role=role,
+            first_name='Test', last_name=role.title(),
+        )
+
+    def create_household(self, village):
+        uid = unique_id()
+        return Household.objects.create(
+            name=f'Household {uid}', village=village, head_first_name='Jane', head_last_name='Doe',
+            national_id=f'ID{uid}', phone_number='0712345678',
+        )
+
+    def create_household_grant(self, household, status, amount, submitted_by, days_ago):
+        grant = HouseholdGrantApplication.objects.create(
+            household=household, submitted_by=submitted_by, grant_type='livelihood', requested_amount=amount,
+            title=f'Grant for {household.name}', purpose='Purpose', expected_outcomes='Outcomes', status=status,
+            submission_date=self.now - timedelta(days=days_ago),
+        )
+        return self.set_created(HouseholdGrantApplication, grant, days_ago)
+
+    def set_created(self, model, grant, days_ago):
+        model.objects.filter(pk=grant.pk).update(created_at=self.now - timedelta(days=days_ago))
+        return grant
+
+    def test_page_is_one_query_with_normalized_columns(self):
+        grants = ledger_querysets(self.manager)
+        with CaptureQueriesContext(connection) as queries:
+            page = ledger_page(grants)
+        self.assertEqual(len(queries), 1)
+
+        rows = page['grants']
+        # Newest first; the SB and PR grants made at the same instant sort by category
+        self.assertEqual([(row['category'], row['grant_id']) for row in rows], [
+            ('household', self.household_grant.pk), ('sb', self.sb_grant.pk), ('pr', self.pr_grant.pk),
+            ('household', self.other_grant.pk),
+        ])
+        household, sb, pr = rows[0], rows[1], rows[2]
+        self.assertEqual(household['applicant'], self.household.name)
+        self.assertEqual(household['village'], self.village.name)
+        self.assertEqual(household['display_type'], 'Household - Livelihood Grant')
+        self.assertEqual(household['funding_source'], 'General')
+        self.assertEqual(household['status_label'], 'Submitted')
+        self.assertEqual(household['amount'], Decimal('12000'))
+        self.assertEqual(household['submitted_by_name'], 'Test Mentor')
+        self.assertEqual(sb['heading'], 'SB Grant - Test Group')
+        self.assertEqual(sb['applicant_type'], 'Business Group')
+        self.assertEqual(sb['amount'], Decimal('16000'))
+        self.assertEqual(sb['status_label'], 'Disbursed')
+        self.assertEqual(pr['subheading'], f'Based on SB Grant #{self.sb_grant.pk}')
+        self.assertEqual(pr['program_name'], self.program.name)
+        self.assertIsNone(page['next_cursor'])
+
+    def test_keyset_pages_cover_the_ledger_once(self):
+        grants = ledger_querysets(self.manager)
+        seen, cursor = [], None
+        while True:
+            page = ledger_page(grants, cursor=cursor, limit=1)
+            seen.extend((row['category'], row['grant_id']) for row in page['grants'])
+            cursor = page['next_cursor']
+            if not cursor:
+                break
+        self.assertEqual(seen, [(row['category'], row['grant_id']) for row in ledger_page(grants)['grants']])
+
+    def test_totals_by_status_and_category(self):
+        with CaptureQueriesContext(connection) as queries:
+            totals = ledger_totals(ledger_querysets(self.manager))
+        self.assertEqual(len(queries), 1)
+
+        self.assertEqual(totals['count'], 4)
+        self.assertEqual(totals['amount'], Decimal('46000'))
+        self.assertEqual(totals['disbursed'], Decimal('16000'))
+        by_category = {row['category']: (row['count'], row['amount']) for row in totals['by_category']}
+        self.assertEqual(by_category, {
+            'household': (2, Decimal('20000')), 'sb': (1, Decimal('16000')), 'pr': (1, Decimal('10000')),
+        })
+        by_status = {row['status']: (row['label'], row['count']) for row in totals['by_status']}
+        self.assertEqual(by_status['approved'], ('Approved', 2))
+        self.assertEqual(by_status['submitted'], ('Submitted', 1))
+
+    def test_filters_and_role_scope(self):
+        approved = filter_ledger(ledger_querysets(self.manager), status='approved')
+        self.assertEqual(
+            {(row['category'], row['grant_id']) for row in ledger_page(approved)['grants']},
+            {('household', self.other_grant.pk), ('pr', self.pr_grant.pk)},
+        )
+        sb_only = filter_ledger(ledger_querysets(self.manager), grant_type='sb')
+        self.assertEqual([row['category'] for row in ledger_page(sb_only)['grants']], ['sb'])
+        self.assertEqual(ledger_page(filter_ledger(ledger_querysets(self.manager), funding_source='program')), {
+            'grants': [], 'next_cursor': None,
+        })
+
+        # Mentors see what they submitted; FAs see grants in their villages and all SB/PR grants
+        mentor_rows = ledger_page(ledger_querysets(self.mentor))['grants']
+        self.assertEqual({row['category'] for row in mentor_rows}, {'household', 'sb'})
+        fa_rows = ledger_page(ledger_querysets(self.field_associate))['grants']
+        self.assertNotIn(('household', self.other_grant.pk), [(row['category'], row['grant_id']) for row in fa_rows])
+        self.assertEqual(len(fa_rows), 3)
+
+    def test_list_view_pages_and_recovers_from_bad_cursor(self):
+        self.client.force_login(self.manager)
+        url = reverse('upg_grants:application_list')
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['applications']), 4)
+        self.assertEqual(response.context['totals']['count'], 4)
+        self.assertContains(response, 'SB Grant - Test Group')
+        self.assertContains(response, reverse('grants:grant_detail', args=['pr', self.pr_grant.pk]))
 
-# Create your tests here.
+        response = self.client.get(url, {'cursor': 'not-a-cursor', 'status': 'approved'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['applications']), 2)
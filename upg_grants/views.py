@@ -9,12 +9,12 @@ from django.db.models import Q
 from django.http import JsonResponse
 from households.models import Household
 from programs.models import Program
-from .models import (HouseholdGrantApplication, SBGrant, PRGrant,
+from households.search import InvalidCursor
+from .ledger import filter_ledger, ledger_page, ledger_querysets, ledger_totals
+from .models import (HouseholdGrantApplication,
                      GrantProgram, GrantFieldAssociate, GrantMentorAssignment)
 from decimal import Decimal
 import json
-from itertools import chain
-from operator import attrgetter
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
@@ -42,104 +42,36 @@ def _get_user_households(user):
 
 @login_required
 def grant_application_list(request):
-    """List all grant applications (Household, SB, PR) with filtering by status and grant type"""
+    """
+    List all grant applications (Household, SB, PR) with filtering by status and grant type.
+    The three grant tables are read as one ledger, newest first, paged by cursor.
+    """
     user = request.user
     user_role = getattr(user, 'role', None)
 
-    # Get Household grants based on role and assignments
-    if user_role == 'mentor':
-        # Mentors only see grants they submitted on behalf of households
-        household_grants = HouseholdGrantApplication.objects.filter(
-            submitted_by=user
-        ).select_related('household', 'household__village', 'program', 'grant_program', 'approved_by', 'reviewed_by', 'submitted_by')
-
-    elif user_role == 'field_associate':
-        # FA sees grants for households in their assigned villages
-        assigned_villages = user.profile.assigned_villages.all() if hasattr(user, 'profile') and user.profile else []
-        household_grants = HouseholdGrantApplication.objects.filter(
-            Q(household__village__in=assigned_villages) |
-            Q(submitted_by=user)
-        ).select_related('household', 'household__village', 'program', 'grant_program', 'approved_by', 'reviewed_by', 'submitted_by')
-
-    elif user_role in ['program_manager', 'county_director', 'executive', 'ict_admin', 'me_staff'] or user.is_superuser:
-        household_grants = HouseholdGrantApplication.objects.all().select_related('household', 'household__village', 'program', 'grant_program', 'approved_by', 'reviewed_by', 'submitted_by')
-    else:
-        household_grants = HouseholdGrantApplication.objects.none()
-
-    # Get SB and PR grants
-    if user_role in ['program_manager', 'county_director', 'executive', 'ict_admin', 'me_staff', 'field_associate'] or user.is_superuser:
-        sb_grants = SBGrant.objects.all().select_related('business_group', 'program')
-        pr_grants = PRGrant.objects.all().select_related('business_group', 'program', 'sb_grant')
-    elif user_role == 'mentor':
-        # Mentors see SB/PR grants they submitted
-        sb_grants = SBGrant.objects.filter(submitted_by=user).select_related('business_group', 'program')
-        pr_grants = PRGrant.objects.none()
-    else:
-        sb_grants = SBGrant.objects.none()
-        pr_grants = PRGrant.objects.none()
-
     # Apply filters
     status_filter = request.GET.get('status')
     grant_type_filter = request.GET.get('grant_type')
     funding_source_filter = request.GET.get('funding_source')
 
-    if status_filter:
-        household_grants = household_grants.filter(status=status_filter)
-        sb_grants = sb_grants.filter(status=status_filter)
-        pr_grants = pr_grants.filter(status=status_filter)
-
-    # Filter by funding source (grant_program vs program)
-    if funding_source_filter == 'grant_program':
-        household_grants = household_grants.filter(grant_program__isnull=False)
-        sb_grants = SBGrant.objects.none()
-        pr_grants = PRGrant.objects.none()
-    elif funding_source_filter == 'program':
-        household_grants = household_grants.filter(grant_program__isnull=True, program__isnull=False)
-        sb_grants = SBGrant.objects.none()
-        pr_grants = PRGrant.objects.none()
-
-    if grant_type_filter:
-        if grant_type_filter == 'sb':
-            household_grants = HouseholdGrantApplication.objects.none()
-            pr_grants = PRGrant.objects.none()
-        elif grant_type_filter == 'pr':
-            household_grants = HouseholdGrantApplication.objects.none()
-            sb_grants = SBGrant.objects.none()
-        else:
-            # Household grant type filter
-            household_grants = household_grants.filter(grant_type=grant_type_filter)
-            sb_grants = SBGrant.objects.none()
-            pr_grants = PRGrant.objects.none()
-
-    # Add grant type attribute to each grant for display
-    for grant in household_grants:
-        if grant.grant_program:
-            grant.display_type = f'{grant.grant_program.name}'
-            grant.funding_source = 'Grant Program'
-        elif grant.program:
-            grant.display_type = f'{grant.program.name} - {grant.get_grant_type_display()}'
-            grant.funding_source = 'Program'
-        else:
-            grant.display_type = f'Household - {grant.get_grant_type_display()}'
-            grant.funding_source = 'General'
-        grant.grant_category = 'household'
-
-    for grant in sb_grants:
-        grant.display_type = 'SB Grant'
-        grant.grant_category = 'sb'
-        grant.funding_source = 'SB Grant'
-
-    for grant in pr_grants:
-        grant.display_type = 'PR Grant'
-        grant.grant_category = 'pr'
-        grant.funding_source = 'PR Grant'
-
-    # Combine all grants and sort by creation date
-    all_grants = sorted(
-        chain(household_grants, sb_grants, pr_grants),
-        key=attrgetter('created_at'),
-        reverse=True
+    grants = filter_ledger(
+        ledger_querysets(user), status=status_filter, grant_type=grant_type_filter,
+        funding_source=funding_source_filter,
     )
+    totals = ledger_totals(grants)
+    try:
+        page = ledger_page(grants, cursor=request.GET.get('cursor') or None)
+    except InvalidCursor:
+        # A stale or mangled link starts again from the newest grants
+        page = ledger_page(grants)
+
+    next_page_url = None
+    if page['next_cursor']:
+        params = request.GET.copy()
+        params['cursor'] = page['next_cursor']
+        next_page_url = f"{request.path}?{params.urlencode()}"
+    first_page_params = request.GET.copy()
+    first_page_params.pop('cursor', None)
 
     # Determine user permissions
     # FA and Mentors can apply for beneficiaries, PM and ICT can create grant programs
@@ -164,7 +96,11 @@ def grant_application_list(request):
         }
 
     context = {
-        'applications': all_grants,
+        'applications': page['grants'],
+        'totals': totals,
+        'next_page_url': next_page_url,
+        'first_page_url': f"{request.path}?{first_page_params.urlencode()}",
+        'is_first_page': not request.GET.get('cursor'),
         'page_title': 'All Grant Applications',
         'can_create': can_create,
         'can_create_program': can_create_program,
@@ -197,6 +197,7 @@ TWILIO_PHONE_NUMBER = '' # Set in production
 # SMS Settings
 SMS_ENABLED = True
 SMS_BACKEND = 'core.sms.SMSService'  # Can be changed for testing
+SMS_OUTBOX_RATE = 10  # Messages per second sent by process_sms_outbox
 
 # SSL Configuration - Set ENABLE_SSL=True in .env when SSL certificate is configured
 ENABLE_SSL = config('ENABLE_SSL', default=False, cast=bool)
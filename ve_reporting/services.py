@@ -7,7 +7,7 @@ from datetime import datetime, date, timedelta
 from typing import Optional, Dict, Any, List
 from decimal import Decimal
 from django.db.models import Count, Sum, Avg, Q, F, Case, When, Value, IntegerField, DecimalField
-from django.db.models.functions import TruncMonth, Coalesce
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 from django.conf import settings
 
@@ -171,13 +171,14 @@ class VEReportingService:
     ) -> Dict[str, Any]:
         """Get enrollment metrics"""
         from enrollment.models import EnrollmentApplication
+        from core.services.timeseries import first_instant
 
         queryset = EnrollmentApplication.objects.all()
 
         if start_date:
-            queryset = queryset.filter(created_at__date__gte=start_date)
+            queryset = queryset.filter(created_at__gte=first_instant(start_date))
         if end_date:
-            queryset = queryset.filter(created_at__date__lte=end_date)
+            queryset = queryset.filter(created_at__lt=first_instant(end_date + timedelta(days=1)))
 
         status_breakdown = queryset.values('status').annotate(count=Count('id'))
         status_counts = {item['status']: item['count'] for item in status_breakdown if item['status']}
@@ -517,6 +518,7 @@ class VEReportingService:
     ) -> Dict[str, Any]:
         """Get time series data for a metric"""
         from households.models import HouseholdMember
+        from core.services.timeseries import monthly_counts
 
         if not start_date:
             start_date = date.today() - timedelta(days=365)
@@ -527,21 +529,12 @@ class VEReportingService:
 
         if metric == "enrollment":
             try:
-                result = HouseholdMember.objects.filter(
-                    created_at__date__gte=start_date,
-                    created_at__date__lte=end_date
-                ).annotate(
-                    period=TruncMonth('created_at')
-                ).values('period').annotate(
-                    value=Count('id')
-                ).order_by('period')
-
-                for row in result:
-                    if row['period']:
-                        data.append({
-                            "period": row['period'].strftime("%Y-%m"),
-                            "value": row['value']
-                        })
+                counts = monthly_counts(HouseholdMember.objects.all(), 'created_at', start_date, end_date)
+                for period, value in counts.items():
+                    data.append({
+                        "period": period.strftime("%Y-%m"),
+                        "value": value
+                    })
             except Exception:
                 pass
 